@@ -3,15 +3,25 @@ import logging
 import sys
 from datetime import timedelta
 from flask import Flask, render_template, request
-from flask_login import LoginManager
+from flask_login import LoginManager, current_user
 from flask_wtf.csrf import CSRFProtect
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, join_room, leave_room
 from flask_caching import Cache
 from flask_cors import CORS
 from extensions import db, bcrypt, login_manager, migrate, limiter
 from models import User
 from services.logging_service import LoggingService
 from services.monitoring_service import MonitoringService
+from services.standings_service import StandingsService
+from services.cache_service import CacheService
+from services.config_service import ConfigService
+from services.page_cache_service import PageCacheService
+from services.snapshot_service import SnapshotService
+from services.task_service import TaskService
+from services.broker_service import BrokerService, match_topic, tournament_topic, user_topic, audience_topic
+from services.notification_service import NotificationService
+from services.query_stats_service import QueryStatsService
+from services.metrics_service import MetricsService, SOCKETIO_CLIENTS
 from tasks.monitoring_task import start_monitoring, stop_monitoring
 from config import config
 from views import init_views
@@ -20,7 +30,7 @@ from views import init_views
 socketio = SocketIO()
 cache = Cache()
 
-def create_app(config_name='default'):
+def create_app(config_name='default', config_overrides=None):
     """Create and configure Flask application with modern 2025 patterns."""
     try:
         app = Flask(__name__)
@@ -31,6 +41,11 @@ def create_app(config_name='default'):
             config_name = 'default'
         
         app.config.from_object(config[config_name])
+        app.config['CONFIG_NAME'] = config_name
+        if config_overrides:
+            app.config.update(config_overrides)
+        # Task pool processes only run task code - no Socket.IO, no schema setup
+        pool_worker = app.config.get('TASK_POOL_WORKER', False)
         
         # Modern Flask 3.x security configurations
         app.config.update(
@@ -67,10 +82,11 @@ def create_app(config_name='default'):
             # Modern extensions
             csrf = CSRFProtect()
             csrf.init_app(app)
-            socketio.init_app(app, cors_allowed_origins="*", 
-                            async_mode='threading', 
-                            logger=True, 
-                            engineio_logger=True)
+            if not pool_worker:
+                socketio.init_app(app, cors_allowed_origins="*", 
+                                async_mode='threading', 
+                                logger=True, 
+                                engineio_logger=True)
             cache.init_app(app)
             
             # Enable CORS for API endpoints
@@ -86,6 +102,33 @@ def create_app(config_name='default'):
         # Enhanced logging setup
         LoggingService.setup_logging(app)
         
+        # SystemLog entries written in batches on a background thread
+        LoggingService.init_audit_writer(app)
+        
+        # Incremental tournament standings maintained on every match change
+        StandingsService.init_app(app)
+        
+        # Application cache backend (per-process memory or shared Redis)
+        CacheService.init_app(app)
+        
+        # Live updates fan-out (per-process memory or Redis pub/sub across workers)
+        BrokerService.init_app(app)
+        
+        # System settings served from an in-process snapshot, reloaded on version change
+        ConfigService.init_app(app)
+        
+        # Parent page fragments cached per tournament version, with ETag revalidation
+        PageCacheService.init_app(app)
+        
+        # Static HTML/JSON snapshots of finished tournaments, re-published on edits
+        SnapshotService.init_app(app)
+        
+        # Per-request SQL query count/time (Server-Timing, slow query log, per-endpoint percentiles)
+        QueryStatsService.init_app(app)
+        
+        # In-process counters/histograms exported at /metrics
+        MetricsService.init_app(app)
+        
         # Modern Flask-Login configuration
         login_manager.login_view = 'auth.login'
         login_manager.login_message = 'Please log in to access this page.'
@@ -103,19 +146,27 @@ def create_app(config_name='default'):
         # Initialize views and blueprints
         try:
             init_views(app)
-            init_socketio_events(app)
+            if not pool_worker:
+                init_socketio_events(app)
         except Exception as e:
             print(f"Failed to initialize views: {str(e)}")
             raise
         
-        # Database initialization with modern patterns
-        with app.app_context():
-            try:
-                db.create_all()
-                app.logger.info('Database initialized successfully')
-            except Exception as e:
-                app.logger.error(f'Database initialization error: {str(e)}')
-                raise
+        # Database initialization with modern patterns (done by the web process)
+        if not pool_worker:
+            with app.app_context():
+                try:
+                    db.create_all()
+                    app.logger.info('Database initialized successfully')
+                except Exception as e:
+                    app.logger.error(f'Database initialization error: {str(e)}')
+                    raise
+        
+        # Background task queue (in-memory or durable in the task table)
+        try:
+            TaskService().init_app(app)
+        except Exception as e:
+            app.logger.error(f'Task queue initialization error: {str(e)}')
         
         # Modern error handlers with better UX
         @app.errorhandler(404)
@@ -168,8 +219,13 @@ def create_app(config_name='default'):
         def health_check():
             return {'status': 'healthy', 'version': '2025.1'}, 200
         
+        # Prometheus text-format metrics of this worker
+        @app.route('/metrics')
+        def metrics():
+            return MetricsService.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        
         # Start monitoring in production
-        if not app.debug and not app.testing:
+        if not app.debug and not app.testing and not pool_worker:
             try:
                 app.monitoring_thread = start_monitoring(app)
                 
@@ -201,10 +257,12 @@ def init_socketio_events(app):
     
     @socketio.on('connect')
     def handle_connect():
+        SOCKETIO_CLIENTS.inc()
         app.logger.info(f'Client connected: {request.sid}')
     
     @socketio.on('disconnect')
     def handle_disconnect():
+        SOCKETIO_CLIENTS.dec()
         app.logger.info(f'Client disconnected: {request.sid}')
     
     @socketio.on('join_match')
@@ -212,9 +270,51 @@ def init_socketio_events(app):
         """Join a match room for real-time updates."""
         match_id = data.get('match_id')
         if match_id:
-            from flask_socketio import join_room
-            join_room(f'match_{match_id}')
+            join_room(match_topic(match_id))
             app.logger.info(f'Client {request.sid} joined match {match_id}')
+    
+    @socketio.on('join_tournament')
+    def handle_join_tournament(data):
+        """Join a tournament room for updates of all its matches."""
+        tournament_id = data.get('tournament_id')
+        if tournament_id:
+            join_room(tournament_topic(tournament_id))
+            app.logger.info(f'Client {request.sid} joined tournament {tournament_id}')
+    
+    @socketio.on('join_notifications')
+    def handle_join_notifications(data=None):
+        """Join the current user's notification rooms (unread counter and broadcasts)."""
+        if not current_user.is_authenticated:
+            return
+        join_room(user_topic(current_user.id))
+        for audience in NotificationService.audiences_for(current_user.id):
+            join_room(audience_topic(audience))
+    
+    @socketio.on('subscribe')
+    def handle_subscribe(data):
+        """Channel subscriptions used by realtime-enhanced.js."""
+        room = _subscription_room(data)
+        if room:
+            join_room(room)
+    
+    @socketio.on('unsubscribe')
+    def handle_unsubscribe(data):
+        room = _subscription_room(data)
+        if room:
+            leave_room(room)
+    
+    # Broker messages are forwarded to the room named after their topic
+    BrokerService.start_socketio_bridge(socketio)
+
+def _subscription_room(data):
+    """Map a {channel, matchId} subscription onto a broker topic."""
+    if not isinstance(data, dict) or not data.get('matchId'):
+        return None
+    if data.get('channel') == 'match_updates':
+        return match_topic(data['matchId'])
+    if data.get('channel') == 'tournament_updates':
+        return tournament_topic(data['matchId'])
+    return None
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,64 @@
+"""Benchmark: zachłanny przydział par do boisk vs. optymalizator harmonogramu.
+
+Uruchomienie: python -m benchmarks.bench_schedule [liczba_drużyn] [liczba_boisk]
+"""
+import sys
+import time
+
+from services.schedule_optimizer import optimize_schedule
+
+
+def greedy_schedule(teams, fields):
+    """Dotychczasowy algorytm: kolejne pary na pierwsze wolne boisko"""
+    field_slots = {field: 0 for field in range(1, fields + 1)}
+    matches = []
+    for i, team1 in enumerate(teams):
+        for team2 in teams[i + 1:]:
+            field_number = min(field_slots, key=field_slots.get)
+            matches.append({'team1_id': team1, 'team2_id': team2,
+                            'slot': field_slots[field_number], 'field_number': field_number})
+            field_slots[field_number] += 1
+    return matches
+
+
+def conflicts(matches):
+    """Zlicza drużyny grające dwa mecze w jednym slocie i mecze bez przerwy"""
+    slots_by_team = {}
+    for match in matches:
+        for team in (match['team1_id'], match['team2_id']):
+            slots_by_team.setdefault(team, []).append(match['slot'])
+    double_booked = back_to_back = longest_wait = 0
+    for slots in slots_by_team.values():
+        slots.sort()
+        for previous, current in zip(slots, slots[1:]):
+            double_booked += current == previous
+            back_to_back += current == previous + 1
+            longest_wait = max(longest_wait, current - previous - 1)
+    return double_booked, back_to_back, longest_wait
+
+
+def main(team_count=64, fields=8):
+    teams = list(range(1, team_count + 1))
+
+    start = time.perf_counter()
+    greedy = greedy_schedule(teams, fields)
+    greedy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    schedule = optimize_schedule(teams, fields)
+    optimizer_time = time.perf_counter() - start
+
+    print(f'{team_count} drużyn, {fields} boisk, {len(greedy)} meczów')
+    for name, matches, elapsed in (('zachłanny', greedy, greedy_time),
+                                   ('optymalizator', schedule['matches'], optimizer_time)):
+        slots = max(match['slot'] for match in matches) + 1
+        double_booked, back_to_back, longest_wait = conflicts(matches)
+        print(f'{name:14} {elapsed * 1000:8.1f} ms  slotów: {slots:4}  kolizji: {double_booked:5}  '
+              f'mecze bez przerwy: {back_to_back:5}  najdłuższe czekanie: {longest_wait:4}')
+    print(f"ocena planu: {schedule['score']} (dolne ograniczenie {schedule['lower_bound']} slotów)")
+
+    assert optimizer_time < 1.0, 'optymalizator przekroczył 1 s'
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
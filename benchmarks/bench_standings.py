@@ -0,0 +1,82 @@
+"""Benchmark: tabela wyników liczona pętlą vs. agregacja NumPy.
+
+Uruchomienie: python -m benchmarks.bench_standings [liczba_meczów]
+"""
+import random
+import sys
+import time
+
+from services.season_standings_service import compute_standings
+
+
+def generate_matches(match_count, teams_per_tournament=16, seed=42):
+    rng = random.Random(seed)
+    tournament_count = max(1, match_count // (teams_per_tournament * (teams_per_tournament - 1) // 2))
+    matches = []
+    for _ in range(match_count):
+        tournament = rng.randrange(tournament_count)
+        team1, team2 = rng.sample(range(teams_per_tournament), 2)
+        base = tournament * teams_per_tournament + 1
+        matches.append((base + team1, base + team2, rng.randint(0, 5), rng.randint(0, 5)))
+    teams = list(range(1, tournament_count * teams_per_tournament + 1))
+    return teams, matches
+
+
+def loop_standings(teams, matches):
+    """Dotychczasowy algorytm: pętla po drużynach i wszystkich meczach"""
+    standings = []
+    for team in teams:
+        stats = {'team_id': team, 'matches_played': 0, 'wins': 0, 'draws': 0, 'losses': 0,
+                 'goals_for': 0, 'goals_against': 0, 'points': 0}
+        for team1, team2, score1, score2 in matches:
+            if team1 == team:
+                own, opponent = score1, score2
+            elif team2 == team:
+                own, opponent = score2, score1
+            else:
+                continue
+            stats['matches_played'] += 1
+            stats['goals_for'] += own
+            stats['goals_against'] += opponent
+            if own > opponent:
+                stats['wins'] += 1
+                stats['points'] += 3
+            elif own == opponent:
+                stats['draws'] += 1
+                stats['points'] += 1
+            else:
+                stats['losses'] += 1
+        standings.append(stats)
+    return standings
+
+
+def numpy_standings(matches):
+    team1_ids, team2_ids, team1_scores, team2_scores = zip(*matches)
+    return compute_standings(team1_ids, team2_ids, team1_scores, team2_scores)
+
+
+def timed(function, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(match_count=10000):
+    teams, matches = generate_matches(match_count)
+    loop_time, loop_result = timed(loop_standings, teams, matches, repeat=1)
+    numpy_time, numpy_result = timed(numpy_standings, matches)
+
+    points = dict(zip(numpy_result['team_id'].tolist(), numpy_result['points'].tolist()))
+    assert all(points.get(row['team_id'], 0) == row['points'] for row in loop_result)
+
+    print(f'{match_count} meczów, {len(teams)} drużyn')
+    print(f'pętla:  {loop_time * 1000:9.1f} ms')
+    print(f'numpy:  {numpy_time * 1000:9.1f} ms  (x{loop_time / numpy_time:.0f})')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
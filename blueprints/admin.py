@@ -1,10 +1,15 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify
 from flask_login import login_required, current_user
-from models import User, Year, Tournament, Team, Match, SystemLog, SystemSettings
+from models import User, Year, Tournament, Team, Match, SystemLog, SystemSettings, TournamentStanding
 from extensions import db, bcrypt
 from services.logging_service import LoggingService
+from services.log_service import LogService, LogFilters
 from services.tournament_service import TournamentService
 from services.match_service import MatchService
+from services.standings_service import StandingsService
+from services.team_service import TeamService, parse_team_import
+from services.query_service import QueryService
+from services.config_service import ConfigService
 from forms.admin import EmptyForm, YearForm, TournamentForm, TeamForm, MatchForm, AdminForm
 from decorators import admin_required, primary_admin_required
 from sqlalchemy.exc import SQLAlchemyError
@@ -39,8 +44,8 @@ def dashboard():
             'teams_count': Team.query.count(),
             'active_matches': Match.query.filter_by(status='ongoing').count()
         }
-        active_tournaments = Tournament.query.filter_by(status='ongoing').all()
-        recent_matches = Match.query.order_by(Match.start_time.desc()).limit(5).all()
+        active_tournaments = QueryService.tournaments(profile='tournament_summary', status='ongoing')
+        recent_matches = QueryService.recent_matches(5)
         form = EmptyForm()
         
         return render_template('admin/dashboard.html', 
@@ -163,7 +168,9 @@ def manage_logo():
                 except:
                     pass
                 db.session.delete(logo)
+                ConfigService.bump_version()
                 db.session.commit()
+                ConfigService.config_changed()
                 return jsonify({'success': True})
             return jsonify({'error': 'No logo found'}), 404
         
@@ -201,15 +208,16 @@ def manage_logo():
                     setting = SystemSettings(key='logo_path', value=f'uploads/{filename}')
                     db.session.add(setting)
                 
+                ConfigService.bump_version()
                 db.session.commit()
+                ConfigService.config_changed()
                 flash('Logo zostało zaktualizowane', 'success')
                 return redirect(url_for('admin.manage_logo'))
             else:
                 flash('Niedozwolony format pliku', 'danger')
         
-        logo_path = SystemSettings.query.filter_by(key='logo_path').first()
         return render_template('admin/manage_logo.html', 
-                            logo_path=logo_path.value if logo_path else None,
+                            logo_path=ConfigService.get_setting('logo_path'),
                             form=form)
         
     except Exception as e:
@@ -226,37 +234,21 @@ def allowed_file(filename):
 @primary_admin_required
 def view_logs():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = 20  # Zmniejszamy ilość logów na stronę dla lepszej czytelności
-        
-        # Filtrowanie
-        log_type = request.args.get('type')
-        action = request.args.get('action')
-        user = request.args.get('user')
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        
-        query = SystemLog.query
-        
-        if log_type:
-            query = query.filter_by(type=log_type)
-        if action:
-            query = query.filter_by(action=action)
-        if user:
-            query = query.filter(SystemLog.user.ilike(f'%{user}%'))
-        if start_date:
-            query = query.filter(SystemLog.timestamp >= datetime.datetime.strptime(start_date, '%Y-%m-%d'))
-        if end_date:
-            # Dodajemy 23:59:59 do daty końcowej, aby uwzględnić cały dzień
-            end_datetime = datetime.datetime.strptime(end_date, '%Y-%m-%d')
-            end_datetime = end_datetime.replace(hour=23, minute=59, second=59)
-            query = query.filter(SystemLog.timestamp <= end_datetime)
-        
-        # Sortowanie od najnowszych
-        query = query.order_by(SystemLog.timestamp.desc())
-        
-        # Paginacja
-        logs = query.paginate(page=page, per_page=per_page)
+        # Stronicowanie kursorem (timestamp, id) - koszt strony nie rośnie z jej numerem
+        filters = LogFilters.from_args(request.args)
+        filter_args = {key: value for key, value in request.args.items()
+                       if key not in ('cursor', 'direction', 'page') and value}
+        try:
+            logs = LogService().get_logs_page(
+                cursor=request.args.get('cursor'),
+                direction=request.args.get('direction', 'next'),
+                per_page=20,  # Zmniejszamy ilość logów na stronę dla lepszej czytelności
+                filters=filters,
+                include_archive=bool(request.args.get('archive'))
+            )
+        except ValueError:
+            flash('Nieprawidłowy kursor stronicowania', 'warning')
+            return redirect(url_for('admin.view_logs', **filter_args))
         
         # Unikalne wartości dla filtrów
         unique_types = db.session.query(SystemLog.type.distinct()).all()
@@ -265,6 +257,7 @@ def view_logs():
         
         return render_template('admin/view_logs.html',
                            logs=logs,
+                           filter_args=filter_args,
                            unique_types=[t[0] for t in unique_types],
                            unique_actions=[a[0] for a in unique_actions],
                            unique_users=[u[0] for u in unique_users])
@@ -279,12 +272,11 @@ def view_logs():
 @primary_admin_required
 def clear_logs():
     try:
-        # Usuń wszystkie logi starsze niż 30 dni
-        thirty_days_ago = datetime.datetime.now() - datetime.timedelta(days=30)
-        SystemLog.query.filter(SystemLog.timestamp < thirty_days_ago).delete()
-        db.session.commit()
+        # Przenieś do archiwum wszystkie logi starsze niż 30 dni
+        thirty_days_ago = datetime.now() - timedelta(days=30)
+        archived = LogService().archive_logs(thirty_days_ago)
         
-        flash('Stare logi zostały usunięte', 'success')
+        flash(f'Zarchiwizowano {archived} starych logów', 'success')
         return redirect(url_for('admin.view_logs'))
         
     except Exception as e:
@@ -342,6 +334,8 @@ def delete_year(year_id):
             for tournament in year.tournaments:
                 # Usuń wszystkie mecze w turnieju
                 Match.query.filter_by(tournament_id=tournament.id).delete()
+                # Usuń tabelę wyników turnieju
+                TournamentStanding.query.filter_by(tournament_id=tournament.id).delete()
                 # Usuń wszystkie drużyny w turnieju
                 Team.query.filter_by(tournament_id=tournament.id).delete()
             
@@ -538,6 +532,34 @@ def add_team():
     
     return redirect(url_for('admin.tournament_teams', tournament_id=request.form.get('tournament_id')))
 
+@bp.route('/tournaments/<int:tournament_id>/teams/import', methods=['POST'])
+@login_required
+@admin_required
+def import_teams(tournament_id):
+    """Import drużyn z pliku CSV/JSON (formularz) albo z treści JSON (API)"""
+    wants_json = request.is_json
+    try:
+        if wants_json:
+            names = parse_team_import('teams.json', request.get_data())
+        else:
+            upload = request.files.get('file')
+            if not upload or not upload.filename:
+                flash('Wybierz plik CSV lub JSON z drużynami', 'danger')
+                return redirect(url_for('admin.tournament_teams', tournament_id=tournament_id))
+            names = parse_team_import(secure_filename(upload.filename), upload.read())
+    except (ValueError, UnicodeDecodeError) as e:
+        current_app.logger.error(f'Błąd podczas odczytu pliku drużyn: {str(e)}')
+        if wants_json:
+            return jsonify({'success': False, 'message': 'Nieprawidłowy format danych'}), 400
+        flash('Nieprawidłowy format pliku', 'danger')
+        return redirect(url_for('admin.tournament_teams', tournament_id=tournament_id))
+
+    success, message, created = TeamService().import_teams(tournament_id, names, current_user.email)
+    if wants_json:
+        return jsonify({'success': success, 'message': message, 'created': created}), 200 if success else 400
+    flash(message, 'success' if success else 'danger')
+    return redirect(url_for('admin.tournament_teams', tournament_id=tournament_id))
+
 @bp.route('/teams/<int:team_id>/delete', methods=['POST'])
 @login_required
 @admin_required
@@ -556,6 +578,8 @@ def delete_team(team_id):
             Match.query.filter(
                 (Match.team1_id == team_id) | (Match.team2_id == team_id)
             ).delete()
+            # Masowe usunięcie omija zdarzenia sesji, więc przelicz tabelę wyników
+            StandingsService().rebuild(tournament.id, commit=False)
             
             # Usuń drużynę
             db.session.delete(team)
@@ -631,14 +655,14 @@ def edit_team():
 @admin_required
 def tournament_matches(tournament_id):
     try:
-        tournament = Tournament.query.get_or_404(tournament_id)
+        tournament = QueryService.get_tournament_or_404(tournament_id, 'tournament_header')
         if not tournament:
             flash('Nie znaleziono turnieju', 'danger')
             return redirect(url_for('admin.year_tournaments', year_id=tournament.year_id))
             
         # Sortowanie meczów po czasie rozpoczęcia
-        matches = Match.query.filter_by(tournament_id=tournament_id).order_by(Match.start_time.asc()).all()
-        teams = Team.query.filter_by(tournament_id=tournament_id).all()
+        matches = QueryService.tournament_matches(tournament_id)
+        teams = tournament.teams
         
         # Przygotuj formularz z listą drużyn i dostępnymi boiskami
         form = MatchForm()
@@ -668,56 +692,9 @@ def tournament_matches(tournament_id):
 def tournament_results(tournament_id):
     try:
         tournament = Tournament.query.get_or_404(tournament_id)
-        matches = Match.query.filter_by(tournament_id=tournament_id).all()
-        teams = Team.query.filter_by(tournament_id=tournament_id).all()
-        
-        # Calculate team statistics
-        team_stats = []
-        for team in teams:
-            stats = {
-                'team': team,
-                'matches_played': 0,
-                'wins': 0,
-                'draws': 0,
-                'losses': 0,
-                'goals_for': 0,
-                'goals_against': 0,
-                'points': 0
-            }
-            
-            for match in matches:
-                if match.status != 'finished':
-                    continue
-                
-                if match.team1_id == team.id:
-                    stats['goals_for'] += match.team1_score or 0
-                    stats['goals_against'] += match.team2_score or 0
-                    if match.team1_score > match.team2_score:
-                        stats['wins'] += 1
-                        stats['points'] += 3
-                    elif match.team1_score == match.team2_score:
-                        stats['draws'] += 1
-                        stats['points'] += 1
-                    else:
-                        stats['losses'] += 1
-                    stats['matches_played'] += 1
-                elif match.team2_id == team.id:
-                    stats['goals_for'] += match.team2_score or 0
-                    stats['goals_against'] += match.team1_score or 0
-                    if match.team2_score > match.team1_score:
-                        stats['wins'] += 1
-                        stats['points'] += 3
-                    elif match.team1_score == match.team2_score:
-                        stats['draws'] += 1
-                        stats['points'] += 1
-                    else:
-                        stats['losses'] += 1
-                    stats['matches_played'] += 1
-            
-            team_stats.append(stats)
         
-        # Sort teams by points
-        team_stats.sort(key=lambda x: (-x['points'], -(x['goals_for'] - x['goals_against']), -x['goals_for']))
+        # Tabela wyników utrzymywana przyrostowo przez StandingsService
+        team_stats = StandingsService.get_table(tournament_id)
         
         return render_template('admin/tournament_results.html',
                              tournament=tournament,
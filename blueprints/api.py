@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context, send_file, send_from_directory
 from flask_login import login_required, current_user
 from models import Tournament, Match, Team, SystemLog
 from extensions import db, limiter
@@ -9,6 +9,15 @@ from decorators import admin_required
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
 from services.cache_service import CacheService
+from services.broker_service import BrokerService, match_topic, tournament_topic, user_topic, audience_topic
+from services.query_stats_service import QueryStatsService
+from services.metrics_service import MetricsService
+from services.export_service import ExportService, XLSX_MIMETYPE
+from services.export_task_service import ExportTaskService
+from services.notification_service import NotificationService
+from services.snapshot_service import SnapshotService
+import os
+import tempfile
 import json
 
 bp = Blueprint('api', __name__, url_prefix='/api')
@@ -18,6 +27,36 @@ bp = Blueprint('api', __name__, url_prefix='/api')
 def before_request():
     pass
 
+def _publish_match_update(match):
+    """Send the current match state to every live subscriber of the match and its tournament."""
+    BrokerService.publish_match(match.id, match.tournament_id, 'score_updated', {
+        'match_id': match.id,
+        'matchId': match.id,
+        'team1_score': match.team1_score or 0,
+        'team2_score': match.team2_score or 0,
+        'status': match.status,
+        'is_timer_paused': match.is_timer_paused,
+        'elapsed_time': match.clock_elapsed(),
+        'clock': match.clock_state()
+    })
+
+def _event_stream(topics):
+    # The broker stream needs no request context; without stream_with_context the
+    # request ends (and returns its DB connection) before the long-lived stream starts.
+    response = Response(BrokerService.sse_stream(topics), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx must not buffer the stream
+    return response
+
+def _export_stream(chunks, mimetype, filename, export_type, entity_id=None):
+    """Streamed download; rows are generated while the response is being sent."""
+    export_format = request.args.get('format', 'csv')
+    ExportService().log_export(current_user.email, export_type, export_format, entity_id)
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{export_format}'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for monitoring."""
@@ -90,6 +129,7 @@ def start_match(match_id):
             
         match.status = 'ongoing'
         match.start_time = datetime.utcnow()
+        match.start_clock(match.start_time)
         
         LoggingService.add_log(
             type='info',
@@ -99,6 +139,8 @@ def start_match(match_id):
         )
         
         db.session.commit()
+        _publish_match_update(match)
+        BrokerService.publish_match_clock(match)
         return jsonify({'message': 'Mecz został rozpoczęty'})
     except Exception as e:
         db.session.rollback()
@@ -116,6 +158,7 @@ def end_match(match_id):
             
         match.status = 'finished'
         match.end_time = datetime.utcnow()
+        match.stop_clock(match.end_time)
         
         LoggingService.add_log(
             type='info',
@@ -125,6 +168,8 @@ def end_match(match_id):
         )
         
         db.session.commit()
+        _publish_match_update(match)
+        BrokerService.publish_match_clock(match)
         return jsonify({'message': 'Mecz został zakończony'})
     except Exception as e:
         db.session.rollback()
@@ -158,6 +203,7 @@ def update_score(match_id):
         )
         
         db.session.commit()
+        _publish_match_update(match)
         return jsonify({'message': 'Wynik został zaktualizowany'})
     except Exception as e:
         db.session.rollback()
@@ -196,8 +242,9 @@ def get_match_status(match_id):
             'status': match.status,
             'team1_score': match.team1_score,
             'team2_score': match.team2_score,
-            'elapsed_time': match.elapsed_time,
+            'elapsed_time': match.clock_elapsed(),
             'is_timer_paused': match.is_timer_paused,
+            'clock': match.clock_state(),
             'last_updated': datetime.utcnow().isoformat()
         })
     except Exception as e:
@@ -230,10 +277,26 @@ def get_match_events(match_id):
         current_app.logger.error(f'Error getting match events: {str(e)}')
         return jsonify({'error': 'Internal server error'}), 500
 
+@bp.route('/matches/<int:match_id>/stream', methods=['GET'])
+def match_stream(match_id):
+    """Server-Sent Events stream of live updates for one match."""
+    Match.query.get_or_404(match_id)
+    return _event_stream([match_topic(match_id)])
+
+@bp.route('/tournaments/<int:tournament_id>/stream', methods=['GET'])
+def tournament_stream(tournament_id):
+    """Server-Sent Events stream of live updates for all matches of a tournament."""
+    Tournament.query.get_or_404(tournament_id)
+    return _event_stream([tournament_topic(tournament_id)])
+
 @bp.route('/tournaments/<int:tournament_id>/standings', methods=['GET'])
 @limiter.limit("10 per minute")
 def get_tournament_standings(tournament_id):
     """Get cached tournament standings."""
+    # Finished tournaments are served from the published snapshot
+    snapshot = SnapshotService.serve_standings(tournament_id)
+    if snapshot is not None:
+        return snapshot
     try:
         # Use cache service for performance
         standings = CacheService.get_team_standings(tournament_id)
@@ -290,17 +353,13 @@ def update_match_score(match_id):
                 return jsonify({'error': 'Invalid team2_score'}), 400
             match.team2_score = team2_score
         
-        # Update elapsed time if provided
-        elapsed_time = data.get('elapsed_time')
-        if elapsed_time is not None:
-            if not isinstance(elapsed_time, int) or elapsed_time < 0:
-                return jsonify({'error': 'Invalid elapsed_time'}), 400
-            match.elapsed_time = elapsed_time
+        # elapsed_time is derived from the server-side match clock; client pushes are ignored
         
         db.session.commit()
         
         # Invalidate cache for this tournament
         CacheService.invalidate_tournament_cache(match.tournament_id)
+        _publish_match_update(match)
         
         # Log the update
         LoggingService.add_log(
@@ -315,7 +374,7 @@ def update_match_score(match_id):
             'match_id': match.id,
             'team1_score': match.team1_score,
             'team2_score': match.team2_score,
-            'elapsed_time': match.elapsed_time,
+            'elapsed_time': match.clock_elapsed(),
             'last_updated': datetime.utcnow().isoformat()
         })
         
@@ -324,6 +383,79 @@ def update_match_score(match_id):
         current_app.logger.error(f'Error updating match score via API: {str(e)}')
         return jsonify({'error': 'Internal server error'}), 500
 
+@bp.route('/notifications', methods=['GET'])
+@login_required
+def get_notifications():
+    """Broadcast notifications for the current user (keyset by ?before_id=) and unread count."""
+    try:
+        service = NotificationService()
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        broadcasts = service.get_broadcasts(current_user.id, limit, request.args.get('before_id', type=int))
+        last_seen_id = service.get_last_seen_id(current_user.id)
+        return jsonify({
+            'notifications': [{
+                'id': notification.id,
+                'type': notification.type,
+                'title': notification.title,
+                'message': notification.message,
+                'created_at': notification.created_at.isoformat(),
+                'is_read': notification.id <= last_seen_id
+            } for notification in broadcasts],
+            'unread': service.get_unread_count(current_user.id)
+        })
+    except Exception as e:
+        current_app.logger.error(f'Error getting notifications: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@bp.route('/notifications/direct', methods=['GET'])
+@login_required
+def get_direct_notifications():
+    """Notifications addressed to the current user, keyset-paginated by ?before_id=."""
+    try:
+        notifications, next_before_id = NotificationService().get_user_notifications(
+            current_user.id, request.args.get('before_id', type=int),
+            min(request.args.get('limit', 20, type=int), 100)
+        )
+        return jsonify({
+            'notifications': [{
+                'id': notification.id,
+                'type': notification.type,
+                'title': notification.title,
+                'message': notification.message,
+                'created_at': notification.timestamp.isoformat() if notification.timestamp else None,
+                'is_read': bool(notification.is_read)
+            } for notification in notifications],
+            'next_before_id': next_before_id
+        })
+    except Exception as e:
+        current_app.logger.error(f'Error getting direct notifications: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@bp.route('/notifications/stream', methods=['GET'])
+@login_required
+def notifications_stream():
+    """SSE stream with unread counter updates and new broadcast notifications."""
+    audiences = NotificationService.audiences_for(current_user.id)
+    return _event_stream([user_topic(current_user.id)] + [audience_topic(audience) for audience in audiences])
+
+@bp.route('/notifications/read', methods=['POST'])
+@login_required
+def mark_notifications_read():
+    """Advance the read cursor to ?up_to_id= (or mark everything read)."""
+    service = NotificationService()
+    up_to_id = (request.get_json(silent=True) or {}).get('up_to_id')
+    if up_to_id is None:
+        ok = service.mark_all_as_read(current_user.id)
+    else:
+        try:
+            up_to_id = int(up_to_id)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Nieprawidłowy identyfikator up_to_id'}), 400
+        ok = service.mark_broadcasts_read(current_user.id, up_to_id)
+    if not ok:
+        return jsonify({'error': 'Internal server error'}), 500
+    return jsonify({'success': True, 'unread': service.get_unread_count(current_user.id)})
+
 @bp.route('/cache/stats', methods=['GET'])
 @login_required
 @admin_required
@@ -336,6 +468,119 @@ def get_cache_stats():
         current_app.logger.error(f'Error getting cache stats: {str(e)}')
         return jsonify({'error': 'Internal server error'}), 500
 
+@bp.route('/system/query-stats', methods=['GET'])
+@login_required
+@admin_required
+def get_query_stats():
+    """Per-endpoint SQL query count and DB time percentiles."""
+    try:
+        stats = QueryStatsService.get_stats(request.args.get('sort', 'db_ms'))
+        return jsonify({'endpoints': stats})
+    except Exception as e:
+        current_app.logger.error(f'Error getting query stats: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@bp.route('/system/metrics/history', methods=['GET'])
+@login_required
+@admin_required
+def get_metrics_history():
+    """Recent metric snapshots for the admin dashboard."""
+    try:
+        limit = request.args.get('limit', type=int)
+        return jsonify({'history': MetricsService.get_history(limit)})
+    except Exception as e:
+        current_app.logger.error(f'Error getting metrics history: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@bp.route('/export/tournaments/<int:tournament_id>', methods=['GET'])
+@login_required
+@admin_required
+def export_tournament(tournament_id):
+    """Stream tournament summary, standings and matches (?format=csv|json|ndjson)."""
+    chunks, result = ExportService().stream_tournament(tournament_id, request.args.get('format', 'csv'))
+    if chunks is None:
+        return jsonify({'error': result}), 404 if result == 'Nie znaleziono turnieju' else 400
+    return _export_stream(chunks, result, f'tournament_{tournament_id}', 'tournament', tournament_id)
+
+@bp.route('/export/teams/<int:team_id>', methods=['GET'])
+@login_required
+@admin_required
+def export_team_history(team_id):
+    """Stream the finished matches of a team (?format=csv|json|ndjson)."""
+    chunks, result = ExportService().stream_team_history(team_id, request.args.get('format', 'csv'))
+    if chunks is None:
+        return jsonify({'error': result}), 404 if result == 'Nie znaleziono drużyny' else 400
+    return _export_stream(chunks, result, f'team_{team_id}', 'team_history', team_id)
+
+@bp.route('/export/matches', methods=['GET'])
+@login_required
+@admin_required
+def export_matches():
+    """Stream matches across seasons, optionally filtered by year_id or tournament_id."""
+    chunks, result = ExportService().stream_matches(
+        request.args.get('format', 'csv'),
+        year_id=request.args.get('year_id', type=int),
+        tournament_id=request.args.get('tournament_id', type=int)
+    )
+    if chunks is None:
+        return jsonify({'error': result}), 400
+    return _export_stream(chunks, result, 'matches', 'matches')
+
+@bp.route('/export/global', methods=['GET'])
+@login_required
+@admin_required
+def export_global_stats():
+    """Stream global statistics (?format=csv|json|ndjson)."""
+    chunks, result = ExportService().stream_global_stats(request.args.get('format', 'csv'))
+    if chunks is None:
+        return jsonify({'error': result}), 400
+    return _export_stream(chunks, result, 'global_stats', 'global_stats')
+
+@bp.route('/export/workbook', methods=['GET'])
+@login_required
+@admin_required
+def export_workbook():
+    """Excel workbook with one sheet per tournament (?year_id=..., ?tournament_id=... repeated).
+
+    With ?async=1 the workbook is built by a background task and downloaded
+    later from /api/export/files/<filename>.
+    """
+    year_id = request.args.get('year_id', type=int)
+    tournament_ids = request.args.getlist('tournament_id', type=int) or None
+    if request.args.get('async'):
+        try:
+            task_id = ExportTaskService().export_workbook(tournament_ids, year_id, user_id=current_user.id)
+            return jsonify({'task_id': task_id}), 202
+        except Exception as e:
+            current_app.logger.error(f'Error starting workbook export: {str(e)}')
+            return jsonify({'error': 'Internal server error'}), 500
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        ExportService().write_workbook(path, tournament_ids=tournament_ids, year_id=year_id)
+    except ValueError as e:
+        os.remove(path)
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        os.remove(path)
+        current_app.logger.error(f'Error exporting workbook: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+    ExportService().log_export(current_user.email, 'workbook', 'excel', year_id)
+    response = send_file(path, mimetype=XLSX_MIMETYPE, as_attachment=True,
+                         download_name=f'season_{year_id}.xlsx' if year_id else 'tournaments.xlsx')
+    response.call_on_close(lambda: os.path.exists(path) and os.remove(path))
+    return response
+
+@bp.route('/export/files/<path:filename>', methods=['GET'])
+@login_required
+@admin_required
+def download_export(filename):
+    """Download a workbook produced by an export task."""
+    return send_from_directory(os.path.join(current_app.instance_path, 'exports'), filename,
+                               as_attachment=True)
+
 @bp.route('/cache/clear', methods=['POST'])
 @login_required
 @admin_required
@@ -1,9 +1,10 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, session
 from flask_login import login_user, logout_user, login_required, current_user
-from models import User, SystemSettings
+from models import User
 from extensions import db, bcrypt
 from forms.auth import LoginForm
 from services.logging_service import LoggingService
+from services.config_service import ConfigService
 
 bp = Blueprint('auth', __name__)
 
@@ -17,8 +18,7 @@ def login(role=None):
             return redirect(url_for('parent.select_year'))
             
     form = LoginForm()
-    logo_setting = SystemSettings.query.filter_by(key='logo_path').first()
-    logo_path = logo_setting.value if logo_setting else None
+    logo_path = ConfigService.get_setting('logo_path')
 
     if role == 'admin':
         if form.validate_on_submit():
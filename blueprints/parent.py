@@ -1,8 +1,14 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
-from models import Year, Tournament, Team, Match, SystemSettings
+from markupsafe import Markup
+from models import Year, Tournament, Match
 from extensions import db
 from services.tournament_service import TournamentService
-from services.match_service import MatchService
+from services.standings_service import StandingsService
+from services.query_service import QueryService
+from services.stats_service import StatsService
+from services.config_service import ConfigService
+from services.page_cache_service import PageCacheService, CATALOG_SCOPE, tournament_scope
+from services.snapshot_service import SnapshotService, match_title
 from decorators import parent_required
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
@@ -33,17 +39,19 @@ def format_datetime(value):
 @parent_required
 def select_year():
     try:
-        years = Year.query.order_by(Year.year.desc()).all()
-        logo_setting = SystemSettings.query.filter_by(key='logo_path').first()
-        logo_path = logo_setting.value if logo_setting else None
-        
-        # Add tournament count for each year
-        for year in years:
-            year.tournaments_count = len(year.tournaments)
-        
-        return render_template('parent/select_year.html', 
-                            years=years,
-                            logo_path=logo_path)
+        key = PageCacheService.page_key('parent.select_year', CATALOG_SCOPE)
+
+        def render_fragment():
+            years = QueryService.years()
+            # Add tournament count for each year
+            for year in years:
+                year.tournaments_count = len(year.tournaments)
+            return render_template('parent/_select_year.html', years=years)
+
+        return PageCacheService.respond(key, lambda: render_template(
+            'parent/select_year.html',
+            fragment=PageCacheService.fragment(key, render_fragment),
+            logo_path=ConfigService.get_setting('logo_path')))
     except Exception as e:
         current_app.logger.error(f'Błąd podczas ładowania roczników: {str(e)}')
         flash('Wystąpił błąd podczas ładowania danych', 'danger')
@@ -53,15 +61,18 @@ def select_year():
 @parent_required
 def year_tournaments(year_id):
     try:
-        year = Year.query.get_or_404(year_id)
-        tournaments = Tournament.query.filter_by(year_id=year_id).all()
-        logo_setting = SystemSettings.query.filter_by(key='logo_path').first()
-        logo_path = logo_setting.value if logo_setting else None
-        
-        return render_template('parent/tournaments.html',
-                            year=year,
-                            tournaments=tournaments,
-                            logo_path=logo_path)
+        key = PageCacheService.page_key('parent.year_tournaments', CATALOG_SCOPE, year_id=year_id)
+
+        def render_page():
+            year = Year.query.get_or_404(year_id)
+            fragment = PageCacheService.fragment(key, lambda: render_template(
+                'parent/_tournaments.html', tournaments=QueryService.tournaments(year_id=year_id)))
+            return render_template('parent/tournaments.html',
+                                year=year,
+                                fragment=fragment,
+                                logo_path=ConfigService.get_setting('logo_path'))
+
+        return PageCacheService.respond(key, render_page)
     except Exception as e:
         current_app.logger.error(f'Błąd podczas ładowania turniejów: {str(e)}')
         flash('Wystąpił błąd podczas ładowania danych', 'danger')
@@ -71,14 +82,17 @@ def year_tournaments(year_id):
 @parent_required
 def tournaments():
     try:
-        tournaments = Tournament.query.filter_by(status='ongoing').all()
-        logo_setting = SystemSettings.query.filter_by(key='logo_path').first()
-        logo_path = logo_setting.value if logo_setting else None
-        
-        return render_template('parent/tournaments.html',
-                             tournaments=tournaments,
-                             year=None,
-                             logo_path=logo_path)
+        key = PageCacheService.page_key('parent.tournaments', CATALOG_SCOPE)
+
+        def render_fragment():
+            return render_template('parent/_tournaments.html',
+                                tournaments=QueryService.tournaments(status='ongoing'))
+
+        return PageCacheService.respond(key, lambda: render_template(
+            'parent/tournaments.html',
+            fragment=PageCacheService.fragment(key, render_fragment),
+            year=None,
+            logo_path=ConfigService.get_setting('logo_path')))
     except Exception as e:
         current_app.logger.error(f'Błąd podczas ładowania turniejów: {str(e)}')
         flash('Wystąpił błąd podczas ładowania danych', 'danger')
@@ -88,65 +102,37 @@ def tournaments():
 @parent_required
 def tournament_details(tournament_id):
     try:
-        tournament = Tournament.query.get_or_404(tournament_id)
-        matches = Match.query.filter_by(tournament_id=tournament_id).order_by(Match.start_time).all()
-        teams = Team.query.filter_by(tournament_id=tournament_id).all()
-        logo_setting = SystemSettings.query.filter_by(key='logo_path').first()
-        logo_path = logo_setting.value if logo_setting else None
-        
-        # Calculate team statistics
-        team_stats = []
-        for team in teams:
-            stats = {
-                'team': team,
-                'matches_played': 0,
-                'wins': 0,
-                'draws': 0,
-                'losses': 0,
-                'goals_for': 0,
-                'goals_against': 0,
-                'points': 0
-            }
-            
-            for match in matches:
-                if match.status != 'finished':
-                    continue
-                
-                if match.team1_id == team.id:
-                    stats['goals_for'] += match.team1_score or 0
-                    stats['goals_against'] += match.team2_score or 0
-                    if match.team1_score > match.team2_score:
-                        stats['wins'] += 1
-                        stats['points'] += 3
-                    elif match.team1_score == match.team2_score:
-                        stats['draws'] += 1
-                        stats['points'] += 1
-                    else:
-                        stats['losses'] += 1
-                    stats['matches_played'] += 1
-                elif match.team2_id == team.id:
-                    stats['goals_for'] += match.team2_score or 0
-                    stats['goals_against'] += match.team1_score or 0
-                    if match.team2_score > match.team1_score:
-                        stats['wins'] += 1
-                        stats['points'] += 3
-                    elif match.team1_score == match.team2_score:
-                        stats['draws'] += 1
-                        stats['points'] += 1
-                    else:
-                        stats['losses'] += 1
-                    stats['matches_played'] += 1
-            
-            team_stats.append(stats)
-        
-        # Sort teams by points
-        team_stats.sort(key=lambda x: (-x['points'], -(x['goals_for'] - x['goals_against']), -x['goals_for']))
-        
-        return render_template('parent/tournament_details.html',
-                            tournament=tournament,
-                            matches=matches,
-                            team_stats=team_stats,
-                            logo_path=logo_path)
+        # Zakończone turnieje - opublikowany fragment, bez zapytań do bazy
+        snapshot = SnapshotService.page('tournament', tournament_id)
+        if snapshot is not None:
+            # Logo zapisane obok opublikowanych plików - bez odczytu konfiguracji z bazy
+            title, fragment, logo_path = snapshot
+            return render_template('parent/tournament_details.html',
+                                title=title,
+                                fragment=fragment,
+                                logo_path=logo_path)
+
+        key = PageCacheService.page_key('parent.tournament_details', tournament_scope(tournament_id))
+
+        def render_page():
+            tournament = Tournament.query.get_or_404(tournament_id)
+            if tournament.status == 'finished':
+                SnapshotService.ensure_published(tournament_id)
+
+            def render_fragment():
+                # Tabela wyników utrzymywana przyrostowo przez StandingsService
+                return render_template('parent/_tournament_details.html',
+                                    tournament=tournament,
+                                    matches=QueryService.tournament_matches(tournament_id),
+                                    team_stats=StandingsService.get_table(tournament_id))
+
+            return render_template('parent/tournament_details.html',
+                                title=tournament.name,
+                                fragment=PageCacheService.fragment(
+                                    key, render_fragment, PageCacheService.timeout_for(tournament)),
+                                logo_path=ConfigService.get_setting('logo_path'))
+
+        return PageCacheService.respond(key, render_page)
     except Exception as e:
         current_app.logger.error(f'Błąd podczas ładowania szczegółów turnieju: {str(e)}')
         flash('Wystąpił błąd podczas ładowania danych', 'danger')
@@ -156,14 +142,22 @@ def tournament_details(tournament_id):
 @parent_required
 def match_details(match_id):
     try:
-        match = Match.query.get_or_404(match_id)
-        match_stats = MatchService.get_match_stats(match_id)
-        logo_setting = SystemSettings.query.filter_by(key='logo_path').first()
-        logo_path = logo_setting.value if logo_setting else None
-        
+        snapshot = SnapshotService.page('match', match_id)
+        if snapshot is not None:
+            title, fragment, logo_path = snapshot
+        else:
+            match = QueryService.get_match_or_404(match_id)
+            if match.tournament.status == 'finished':
+                SnapshotService.ensure_published(match.tournament_id)
+            title = match_title(match)
+            fragment = render_template('parent/_match_details.html',
+                                    match=match,
+                                    stats=StatsService().get_match_stats(match_id))
+            logo_path = ConfigService.get_setting('logo_path')
+
         return render_template('parent/match_details.html',
-                             match=match,
-                             stats=match_stats,
+                             title=title,
+                             fragment=Markup(fragment),
                              logo_path=logo_path)
     except Exception as e:
         current_app.logger.error(f'Błąd podczas ładowania szczegółów meczu: {str(e)}')
@@ -176,18 +170,20 @@ def results():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = 10
-        logo_setting = SystemSettings.query.filter_by(key='logo_path').first()
-        logo_path = logo_setting.value if logo_setting else None
-        
-        # Pobierz zakończone mecze
-        matches = Match.query.filter_by(status='finished')\
-            .order_by(Match.end_time.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
-            
-        return render_template('parent/results.html',
-                             matches=matches,
-                             logo_path=logo_path)
+        key = PageCacheService.page_key('parent.results', CATALOG_SCOPE, page=page)
+
+        def render_fragment():
+            # Pobierz zakończone mecze
+            matches = QueryService.with_profile(Match.query, 'match_card').filter_by(status='finished')\
+                .order_by(Match.start_time.desc(), Match.id.desc())\
+                .paginate(page=page, per_page=per_page, error_out=False)
+            return render_template('parent/_results.html', matches=matches)
+
+        return PageCacheService.respond(key, lambda: render_template(
+            'parent/results.html',
+            fragment=PageCacheService.fragment(key, render_fragment),
+            logo_path=ConfigService.get_setting('logo_path')))
     except Exception as e:
         current_app.logger.error(f'Błąd podczas ładowania wyników: {str(e)}')
         flash('Wystąpił błąd podczas ładowania danych', 'danger')
-        return redirect(url_for('main.index')) 
\ No newline at end of file
+        return redirect(url_for('main.index'))
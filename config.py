@@ -41,6 +41,19 @@ class BaseConfig:
     # Performance monitoring
     MONITORING_ENABLED = True
     MONITORING_INTERVAL = 60  # seconds
+    QUERY_STATS_ENABLED = True
+    QUERY_STATS_SAMPLES = 1000  # recent requests kept per endpoint for percentiles
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 500))
+    METRICS_ENABLED = True
+    METRICS_HISTORY_SIZE = 1440  # snapshots kept for the admin dashboard (one per MONITORING_INTERVAL)
+    HEALTH_RETENTION_DAYS = {60: 2, 3600: 30, 86400: 365}  # health_metric bucket size (s) -> days kept
+    
+    # Buffered audit log (SystemLog) writer
+    AUDIT_LOG_ASYNC = os.environ.get('AUDIT_LOG_ASYNC', 'true').lower() in ['true', 'on', '1']
+    AUDIT_LOG_BATCH_SIZE = 100
+    AUDIT_LOG_FLUSH_INTERVAL = 1.0  # seconds
+    AUDIT_LOG_BUFFER_SIZE = 10000
+    AUDIT_LOG_ENQUEUE_TIMEOUT = 0.5  # seconds a caller waits on a full buffer before writing itself
     
     # Pagination
     DEFAULT_PAGE_SIZE = 20
@@ -50,6 +63,48 @@ class BaseConfig:
     CACHE_TYPE = 'simple'  # Will be upgraded to Redis in production
     CACHE_DEFAULT_TIMEOUT = 300
     CACHE_KEY_PREFIX = 'football_app:'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')  # 'memory' or 'redis'
+    CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    CACHE_MAX_ENTRIES = None
+    
+    # Parent page fragment cache (keyed by tournament version; finished tournaments kept longest)
+    PAGE_CACHE_ENABLED = True
+    PAGE_CACHE_TIMEOUT = 300
+    PAGE_CACHE_FINISHED_TIMEOUT = 30 * 24 * 3600
+    
+    # Static snapshots of finished tournaments (default: <instance>/snapshots)
+    SNAPSHOT_PUBLISH = True
+    SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR')
+    
+    # Live updates broker (SSE streams and Socket.IO rooms)
+    BROKER_BACKEND = os.environ.get('BROKER_BACKEND', 'memory')  # 'memory' or 'redis'
+    BROKER_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    BROKER_CHANNEL_PREFIX = 'football_app:live:'
+    BROKER_SUBSCRIBER_BUFFER = 100
+    
+    # System configuration snapshot - seconds between DB version checks
+    CONFIG_CHECK_INTERVAL = float(os.environ.get('CONFIG_CHECK_INTERVAL', 5))
+    CONFIG_LISTENER = True  # listen for change signals from other workers
+    
+    # Background tasks
+    TASK_QUEUE_MODE = os.environ.get('TASK_QUEUE_MODE', 'memory')  # 'memory' or 'database'
+    TASK_WORKERS = int(os.environ.get('TASK_WORKERS', 3))
+    TASK_PROCESS_WORKERS = int(os.environ.get('TASK_PROCESS_WORKERS', 0)) or None  # None = min(2, CPU)
+    TASK_REALTIME_WORKERS = 1  # threads reserved for realtime tasks (match notifications)
+    TASK_MAX_PER_USER = int(os.environ.get('TASK_MAX_PER_USER', 2))
+    TASK_TYPE_LIMITS = {
+        '_send_bulk_notifications': 1,
+        '_archive_season': 1,
+        '_cleanup_logs': 1
+    }
+    TASK_VISIBILITY_TIMEOUT = int(os.environ.get('TASK_VISIBILITY_TIMEOUT', 300))
+    TASK_RETRY_BACKOFF = int(os.environ.get('TASK_RETRY_BACKOFF', 30))
+    
+    # Bulk team import (CSV/JSON)
+    TEAM_IMPORT_MAX_ROWS = 1000
+    
+    # Match scheduling - minimum rest (minutes) between a team's matches
+    SCHEDULE_MIN_REST_MINUTES = int(os.environ.get('SCHEDULE_MIN_REST_MINUTES', 10))
     
     # Email Configuration
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'localhost')
@@ -102,6 +157,8 @@ class TestingConfig(BaseConfig):
     WTF_CSRF_ENABLED = False
     CACHE_TYPE = 'simple'
     RATELIMIT_ENABLED = False
+    AUDIT_LOG_ASYNC = False  # in-memory SQLite shares one connection between threads
+    SNAPSHOT_PUBLISH = False  # no background publishing into instance/ from tests
     
     # Override SQLAlchemy engine options for SQLite (no pooling)
     SQLALCHEMY_ENGINE_OPTIONS = {}
@@ -113,7 +170,10 @@ class ProductionConfig(BaseConfig):
     
     # Production caching with Redis
     CACHE_TYPE = 'redis'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis')
     CACHE_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    TASK_QUEUE_MODE = os.environ.get('TASK_QUEUE_MODE', 'database')
+    BROKER_BACKEND = os.environ.get('BROKER_BACKEND', 'redis')
     RATELIMIT_STORAGE_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/1')
     
     # Enhanced security for production
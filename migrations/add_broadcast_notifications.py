@@ -0,0 +1,43 @@
+"""Add broadcast notifications with per-user read cursors
+
+Events addressed to a whole group (tournament/match start and end) are
+stored once in broadcast_notification. Each user keeps the id of the last
+broadcast they have seen in notification_read_cursor, so unread counts are
+a range scan over ix_broadcast_notification_audience_id. Targeted
+notifications stay in the notification table, which gains a title column.
+"""
+
+from flask import current_app
+from extensions import db
+from sqlalchemy import inspect, text
+from models import BroadcastNotification, NotificationReadCursor
+
+def upgrade():
+    """Create broadcast tables and add notification.title."""
+    try:
+        BroadcastNotification.__table__.create(bind=db.engine, checkfirst=True)
+        NotificationReadCursor.__table__.create(bind=db.engine, checkfirst=True)
+
+        existing = {column['name'] for column in inspect(db.engine).get_columns('notification')}
+        if 'title' not in existing:
+            db.session.execute(text('ALTER TABLE notification ADD COLUMN title VARCHAR(200)'))
+        db.session.commit()
+
+        current_app.logger.info('Successfully created broadcast notification tables')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error creating broadcast notification tables: {str(e)}')
+        raise
+
+def downgrade():
+    """Drop broadcast tables (notification.title is left in place)."""
+    try:
+        NotificationReadCursor.__table__.drop(bind=db.engine, checkfirst=True)
+        BroadcastNotification.__table__.drop(bind=db.engine, checkfirst=True)
+        db.session.commit()
+
+        current_app.logger.info('Successfully dropped broadcast notification tables')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error dropping broadcast notification tables: {str(e)}')
+        raise
@@ -0,0 +1,35 @@
+"""Add the health_metric table
+
+System health history moves from system_log rows (action='health_check',
+details parsed with eval) to fixed numeric columns aggregated into 1-minute,
+1-hour and 1-day buckets. Old health_check log rows are left in place and
+expire with the regular log cleanup.
+"""
+
+from flask import current_app
+from extensions import db
+from models import HealthMetric
+
+def upgrade():
+    """Create the health_metric table with its (resolution, bucket_start) key."""
+    try:
+        HealthMetric.__table__.create(bind=db.engine, checkfirst=True)
+        db.session.commit()
+
+        current_app.logger.info('Successfully created health_metric table')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error creating health_metric table: {str(e)}')
+        raise
+
+def downgrade():
+    """Drop the health_metric table."""
+    try:
+        HealthMetric.__table__.drop(bind=db.engine, checkfirst=True)
+        db.session.commit()
+
+        current_app.logger.info('Successfully dropped health_metric table')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error dropping health_metric table: {str(e)}')
+        raise
@@ -0,0 +1,60 @@
+"""Add the server-side match clock columns
+
+The current playing time is derived from clock_started_at and
+clock_accumulated instead of being written every second. Existing matches
+are backfilled from start_time, elapsed_time and is_timer_paused.
+"""
+
+from flask import current_app
+from extensions import db
+from sqlalchemy import inspect, text
+
+CLOCK_COLUMNS = {
+    'clock_started_at': 'TIMESTAMP',
+    'clock_paused_at': 'TIMESTAMP',
+    'clock_accumulated': 'INTEGER NOT NULL DEFAULT 0'
+}
+
+def upgrade():
+    """Add clock columns to the match table and backfill them."""
+    try:
+        existing = {column['name'] for column in inspect(db.engine).get_columns('match')}
+        for name, definition in CLOCK_COLUMNS.items():
+            if name not in existing:
+                db.session.execute(text(f'ALTER TABLE "match" ADD COLUMN "{name}" {definition}'))
+
+        # Running matches: start_time was shifted on every resume, so it marks the running segment
+        db.session.execute(text(
+            "UPDATE \"match\" SET clock_started_at = start_time, clock_accumulated = 0 "
+            "WHERE status = 'ongoing' AND NOT COALESCE(is_timer_paused, FALSE) AND clock_started_at IS NULL"
+        ))
+        db.session.execute(text(
+            "UPDATE \"match\" SET clock_accumulated = COALESCE(elapsed_time, 0) "
+            "WHERE (status = 'finished' OR COALESCE(is_timer_paused, FALSE)) AND clock_started_at IS NULL"
+        ))
+        db.session.commit()
+
+        current_app.logger.info('Successfully added match clock columns')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error adding match clock columns: {str(e)}')
+        raise
+
+def downgrade():
+    """Persist the derived time back into elapsed_time and stop running clocks."""
+    try:
+        db.session.execute(text(
+            "UPDATE \"match\" SET elapsed_time = clock_accumulated, is_timer_paused = TRUE "
+            "WHERE clock_started_at IS NULL"
+        ))
+        db.session.execute(text(
+            "UPDATE \"match\" SET start_time = clock_started_at, is_timer_paused = FALSE "
+            "WHERE clock_started_at IS NOT NULL AND clock_accumulated = 0"
+        ))
+        db.session.commit()
+
+        current_app.logger.info('Successfully reverted match clock state')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error reverting match clock state: {str(e)}')
+        raise
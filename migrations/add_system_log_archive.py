@@ -0,0 +1,41 @@
+"""Add keyset index on system_log and the system_log_archive table
+
+The log list is paged with a (timestamp, id) cursor, served by the composite
+index ix_system_log_timestamp_id. Logs older than the retention window are
+moved into zlib-compressed JSON-lines chunks, one or more per month, instead
+of being deleted.
+"""
+
+from flask import current_app
+from extensions import db
+from models import SystemLog, SystemLogArchive
+
+def upgrade():
+    """Create the keyset index and the system_log_archive table."""
+    try:
+        for index in SystemLog.__table__.indexes:
+            if index.name == 'ix_system_log_timestamp_id':
+                index.create(bind=db.engine, checkfirst=True)
+        SystemLogArchive.__table__.create(bind=db.engine, checkfirst=True)
+        db.session.commit()
+
+        current_app.logger.info('Successfully created system_log_archive table')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error creating system_log_archive table: {str(e)}')
+        raise
+
+def downgrade():
+    """Drop the system_log_archive table and the keyset index."""
+    try:
+        SystemLogArchive.__table__.drop(bind=db.engine, checkfirst=True)
+        for index in SystemLog.__table__.indexes:
+            if index.name == 'ix_system_log_timestamp_id':
+                index.drop(bind=db.engine, checkfirst=True)
+        db.session.commit()
+
+        current_app.logger.info('Successfully dropped system_log_archive table')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error dropping system_log_archive table: {str(e)}')
+        raise
@@ -0,0 +1,50 @@
+"""Backfill the materialized tournament standings table
+
+Creates the tournament_standing table with its unique (tournament_id, team_id)
+constraint and rebuilds every tournament's table from finished matches. After
+this migration standings are maintained incrementally by StandingsService.
+"""
+
+from flask import current_app
+from extensions import db
+from sqlalchemy import text
+from models import Tournament, TournamentStanding
+from services.standings_service import StandingsService
+
+def upgrade():
+    """Create the standings table and fill it from finished matches."""
+    try:
+        TournamentStanding.__table__.create(bind=db.engine, checkfirst=True)
+        db.session.execute(text(
+            'CREATE UNIQUE INDEX IF NOT EXISTS uq_tournament_standing_team '
+            'ON tournament_standing(tournament_id, team_id)'
+        ))
+        db.session.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_tournament_standing_table '
+            'ON tournament_standing(tournament_id, points, goal_difference, goals_for)'
+        ))
+
+        standings_service = StandingsService()
+        for tournament in Tournament.query.all():
+            standings_service.rebuild(tournament.id, commit=False)
+        db.session.commit()
+
+        current_app.logger.info('Successfully backfilled tournament standings')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error backfilling tournament standings: {str(e)}')
+        raise
+
+def downgrade():
+    """Remove all materialized standings rows."""
+    try:
+        db.session.execute(text('DROP INDEX IF EXISTS ix_tournament_standing_table'))
+        db.session.execute(text('DROP INDEX IF EXISTS uq_tournament_standing_team'))
+        TournamentStanding.query.delete()
+        db.session.commit()
+
+        current_app.logger.info('Successfully removed tournament standings backfill')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error removing tournament standings backfill: {str(e)}')
+        raise
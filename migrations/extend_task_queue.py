@@ -0,0 +1,74 @@
+"""Extend the task table for the durable task queue
+
+Adds the columns TaskService needs to persist work across restarts (callable
+reference, JSON arguments, execution lane and priority, attempts, lease and
+availability timestamps) and the (durable, status, priority, available_at)
+index used by workers to claim tasks.
+"""
+
+from flask import current_app
+from extensions import db
+from sqlalchemy import inspect, text
+from models import Task
+
+TASK_COLUMNS = {
+    'uid': 'VARCHAR(36)',
+    'name': 'VARCHAR(200)',
+    'description': 'TEXT',
+    'user_id': 'INTEGER REFERENCES "user"(id)',
+    'notify_user': 'BOOLEAN DEFAULT FALSE',
+    'durable': 'BOOLEAN NOT NULL DEFAULT FALSE',
+    'lane': "VARCHAR(20) NOT NULL DEFAULT 'thread'",
+    'priority': 'SMALLINT NOT NULL DEFAULT 1',
+    'function': 'VARCHAR(255)',
+    'args': 'JSON',
+    'kwargs': 'JSON',
+    'result': 'JSON',
+    'attempts': 'INTEGER NOT NULL DEFAULT 0',
+    'max_attempts': 'INTEGER NOT NULL DEFAULT 3',
+    'visibility_timeout': 'INTEGER',
+    'available_at': 'TIMESTAMP',
+    'locked_until': 'TIMESTAMP',
+    'locked_by': 'VARCHAR(100)',
+    'updated_at': 'TIMESTAMP',
+    'started_at': 'TIMESTAMP'
+}
+
+def upgrade():
+    """Add missing durable queue columns and indexes to the task table."""
+    try:
+        Task.__table__.create(bind=db.engine, checkfirst=True)
+        existing = {column['name'] for column in inspect(db.engine).get_columns('task')}
+        for name, definition in TASK_COLUMNS.items():
+            if name not in existing:
+                db.session.execute(text(f'ALTER TABLE task ADD COLUMN "{name}" {definition}'))
+
+        db.session.execute(text(
+            'CREATE UNIQUE INDEX IF NOT EXISTS ix_task_uid ON task(uid)'
+        ))
+        db.session.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_task_claim ON task(durable, status, priority, available_at)'
+        ))
+        db.session.commit()
+
+        current_app.logger.info('Successfully extended task table for the durable queue')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error extending task table: {str(e)}')
+        raise
+
+def downgrade():
+    """Drop the durable queue indexes; pending durable tasks are cancelled."""
+    try:
+        db.session.execute(text('DROP INDEX IF EXISTS ix_task_claim'))
+        db.session.execute(text('DROP INDEX IF EXISTS ix_task_uid'))
+        db.session.execute(text(
+            "UPDATE task SET status = 'cancelled' WHERE durable AND status IN ('pending', 'running')"
+        ))
+        db.session.commit()
+
+        current_app.logger.info('Successfully removed durable task queue indexes')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error removing durable task queue indexes: {str(e)}')
+        raise
@@ -46,9 +46,70 @@ class Match(db.Model):
     field_number = db.Column(db.Integer, default=1)
     status = db.Column(db.String(20), nullable=False, default='planned')
     is_timer_paused = db.Column(db.Boolean, default=True)
-    elapsed_time = db.Column(db.Integer, default=0)
+    elapsed_time = db.Column(db.Integer, default=0)  # zapisywany tylko przy pauzie i końcu meczu
+    # Zegar meczu: bieżący czas jest wyliczany, a zapis następuje tylko przy zmianie stanu
+    clock_started_at = db.Column(db.DateTime)  # początek bieżącego odcinka (None = zegar stoi)
+    clock_paused_at = db.Column(db.DateTime)
+    clock_accumulated = db.Column(db.Integer, nullable=False, default=0)  # sekundy z poprzednich odcinków
+
+    def clock_elapsed(self, now=None):
+        """Sekundy gry wyliczone z zegara"""
+        elapsed = self.clock_accumulated or 0
+        if self.clock_started_at is not None:
+            now = now or datetime.utcnow()
+            elapsed += max(0, int((now - self.clock_started_at).total_seconds()))
+        return elapsed
+
+    @property
+    def clock_running(self):
+        return self.clock_started_at is not None
+
+    def start_clock(self, now=None):
+        now = now or datetime.utcnow()
+        self.clock_accumulated = 0
+        self.clock_started_at = now
+        self.clock_paused_at = None
+        self.is_timer_paused = False
+        self.elapsed_time = 0
+
+    def pause_clock(self, now=None):
+        if self.clock_started_at is None:
+            return
+        now = now or datetime.utcnow()
+        self.clock_accumulated = self.clock_elapsed(now)
+        self.clock_started_at = None
+        self.clock_paused_at = now
+        self.is_timer_paused = True
+        self.elapsed_time = self.clock_accumulated
+
+    def resume_clock(self, now=None):
+        if self.clock_started_at is not None:
+            return
+        self.clock_started_at = now or datetime.utcnow()
+        self.clock_paused_at = None
+        self.is_timer_paused = False
+
+    def stop_clock(self, now=None):
+        """Zatrzymuje zegar na koniec meczu, utrwalając czas gry"""
+        self.pause_clock(now)
+        self.clock_paused_at = None
+        self.elapsed_time = self.clock_accumulated or 0
+
+    def clock_state(self, now=None):
+        """Stan zegara dla klientów - dalej odliczają lokalnie"""
+        now = now or datetime.utcnow()
+        return {
+            'running': self.clock_running,
+            'elapsed': self.clock_elapsed(now),
+            'started_at': self.clock_started_at.isoformat() if self.clock_started_at else None,
+            'server_time': now.isoformat()
+        }
 
 class SystemLog(db.Model):
+    __table_args__ = (
+        db.Index('ix_system_log_timestamp_id', 'timestamp', 'id'),  # stronicowanie kursorem
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     type = db.Column(db.String(20), nullable=False)
@@ -56,6 +117,57 @@ class SystemLog(db.Model):
     action = db.Column(db.String(50), nullable=False)
     details = db.Column(db.Text)
 
+class SystemLogArchive(db.Model):
+    """Skompresowana paczka starych wpisów system_log z jednego miesiąca"""
+    __table_args__ = (
+        db.Index('ix_system_log_archive_range', 'last_timestamp', 'first_timestamp'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.String(7), nullable=False, index=True)  # 'RRRR-MM'
+    first_timestamp = db.Column(db.DateTime, nullable=False)
+    last_timestamp = db.Column(db.DateTime, nullable=False)
+    first_log_id = db.Column(db.Integer, nullable=False)
+    last_log_id = db.Column(db.Integer, nullable=False)
+    row_count = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)  # zlib(JSON lines), wiersze rosnąco po (timestamp, id)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class HealthMetric(db.Model):
+    """Zagregowane próbki stanu systemu w przedziałach 1 min, 1 h i 1 dzień"""
+    __table_args__ = (
+        db.UniqueConstraint('resolution', 'bucket_start', name='uq_health_metric_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    resolution = db.Column(db.Integer, nullable=False)  # długość przedziału w sekundach
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    samples = db.Column(db.Integer, nullable=False, default=0)
+    cpu_avg = db.Column(db.Float, nullable=False, default=0)
+    cpu_max = db.Column(db.Float, nullable=False, default=0)
+    memory_avg = db.Column(db.Float, nullable=False, default=0)
+    memory_max = db.Column(db.Float, nullable=False, default=0)
+    disk_max = db.Column(db.Float, nullable=False, default=0)
+    db_query_avg_ms = db.Column(db.Float, nullable=False, default=0)
+    db_query_max_ms = db.Column(db.Float, nullable=False, default=0)
+    warning_samples = db.Column(db.Integer, nullable=False, default=0)
+    warning_flags = db.Column(db.Integer, nullable=False, default=0)  # suma bitowa ostrzeżeń z przedziału
+
+    def add_sample(self, cpu, memory, disk, db_query_ms, warning_flags=0):
+        """Dolicza próbkę: średnie ważone liczbą próbek, maksima i flagi ostrzeżeń"""
+        samples = self.samples or 0
+        total = samples + 1
+        self.cpu_avg = ((self.cpu_avg or 0) * samples + cpu) / total
+        self.memory_avg = ((self.memory_avg or 0) * samples + memory) / total
+        self.db_query_avg_ms = ((self.db_query_avg_ms or 0) * samples + db_query_ms) / total
+        self.cpu_max = max(self.cpu_max or 0, cpu)
+        self.memory_max = max(self.memory_max or 0, memory)
+        self.disk_max = max(self.disk_max or 0, disk)
+        self.db_query_max_ms = max(self.db_query_max_ms or 0, db_query_ms)
+        self.warning_flags = (self.warning_flags or 0) | warning_flags
+        self.warning_samples = (self.warning_samples or 0) + (1 if warning_flags else 0)
+        self.samples = total
+
 class SystemSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     key = db.Column(db.String(50), unique=True, nullable=False)
@@ -65,6 +177,11 @@ class SystemSettings(db.Model):
 SystemConfig = SystemSettings
 
 class TournamentStanding(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('tournament_id', 'team_id', name='uq_tournament_standing_team'),
+        db.Index('ix_tournament_standing_table', 'tournament_id', 'points', 'goal_difference', 'goals_for'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'), nullable=False)
     team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
@@ -77,10 +194,39 @@ class TournamentStanding(db.Model):
     goals_against = db.Column(db.Integer, default=0)
     goal_difference = db.Column(db.Integer, default=0)
 
-    tournament = db.relationship('Tournament', backref='standings')
-    team = db.relationship('Team', backref='standings')
+    tournament = db.relationship('Tournament', backref=db.backref('standings', cascade='all'))
+    team = db.relationship('Team', backref=db.backref('standings', cascade='all'))
+
+    COUNTERS = ('points', 'matches_played', 'wins', 'draws', 'losses',
+                'goals_for', 'goals_against', 'goal_difference')
 
-    def update_from_match(self, match):
+    @staticmethod
+    def result_delta(own_score, opponent_score):
+        """Zmiana liczników drużyny wynikająca z jednego zakończonego meczu."""
+        own_score = own_score or 0
+        opponent_score = opponent_score or 0
+        delta = {
+            'points': 0,
+            'matches_played': 1,
+            'wins': 0,
+            'draws': 0,
+            'losses': 0,
+            'goals_for': own_score,
+            'goals_against': opponent_score,
+            'goal_difference': own_score - opponent_score,
+        }
+        if own_score > opponent_score:
+            delta['wins'] = 1
+            delta['points'] = 3
+        elif own_score == opponent_score:
+            delta['draws'] = 1
+            delta['points'] = 1
+        else:
+            delta['losses'] = 1
+        return delta
+
+    def update_from_match(self, match, sign=1):
+        """Dolicza (sign=1) lub wycofuje (sign=-1) wynik zakończonego meczu."""
         if match.status != 'finished':
             return
 
@@ -88,24 +234,15 @@ class TournamentStanding(db.Model):
         own_score = match.team1_score if is_team1 else match.team2_score
         opponent_score = match.team2_score if is_team1 else match.team1_score
 
-        self.matches_played += 1
-        self.goals_for += own_score
-        self.goals_against += opponent_score
-        self.goal_difference = self.goals_for - self.goals_against
-
-        if own_score > opponent_score:
-            self.wins += 1
-            self.points += 3
-        elif own_score == opponent_score:
-            self.draws += 1
-            self.points += 1
-        else:
-            self.losses += 1
+        for column, value in self.result_delta(own_score, opponent_score).items():
+            setattr(self, column, (getattr(self, column) or 0) + sign * value)
 
 class Notification(db.Model):
+    """Powiadomienie skierowane do jednego użytkownika (wiersz na odbiorcę)"""
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     type = db.Column(db.String(50), nullable=False)
+    title = db.Column(db.String(200))
     message = db.Column(db.String(500), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
@@ -116,19 +253,70 @@ class Notification(db.Model):
     tournament = db.relationship('Tournament', backref='notifications')
     match = db.relationship('Match', backref='notifications')
 
+class BroadcastNotification(db.Model):
+    """Powiadomienie zapisywane raz dla całej grupy odbiorców (fan-out przy odczycie).
+
+    Przeczytanie nie zmienia wiersza - użytkownik przesuwa swój kursor
+    NotificationReadCursor, a nieprzeczytane to wpisy grupy o id > kursora.
+    """
+    __table_args__ = (
+        db.Index('ix_broadcast_notification_audience_id', 'audience', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    audience = db.Column(db.String(20), nullable=False, default='all')  # 'all' albo rola użytkownika
+    type = db.Column(db.String(50), nullable=False)
+    title = db.Column(db.String(200))
+    message = db.Column(db.String(500), nullable=False)
+    related_tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'), nullable=True)
+    related_match_id = db.Column(db.Integer, db.ForeignKey('match.id'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+class NotificationReadCursor(db.Model):
+    """Id ostatniego przeczytanego powiadomienia grupowego użytkownika"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    last_seen_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class Task(db.Model):
+    __table_args__ = (
+        db.Index('ix_task_claim', 'durable', 'status', 'priority', 'available_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
+    uid = db.Column(db.String(36), unique=True, index=True)
     type = db.Column(db.String(50), nullable=False)
     status = db.Column(db.String(20), nullable=False, default='pending')
     data = db.Column(db.JSON)
+    name = db.Column(db.String(200))
+    description = db.Column(db.Text)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    notify_user = db.Column(db.Boolean, default=False)
+    # Trwała kolejka: referencja 'moduł:Klasa.metoda' i argumenty w JSON
+    durable = db.Column(db.Boolean, nullable=False, default=False)
+    lane = db.Column(db.String(20), nullable=False, default='thread')  # 'thread' lub 'process'
+    priority = db.Column(db.SmallInteger, nullable=False, default=1)  # 0 realtime, 1 interactive, 2 batch
+    function = db.Column(db.String(255))
+    args = db.Column(db.JSON)
+    kwargs = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    visibility_timeout = db.Column(db.Integer)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime)
+    locked_by = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
     completed_at = db.Column(db.DateTime)
     error_message = db.Column(db.Text)
     
-    def __init__(self, type, data=None):
+    def __init__(self, type, data=None, **kwargs):
+        super().__init__(**kwargs)
         self.type = type
         self.data = data or {}
-        self.status = 'pending'
+        self.status = kwargs.get('status', 'pending')
     
     def complete(self):
         self.status = 'completed'
@@ -137,4 +325,4 @@ class Task(db.Model):
     def fail(self, error_message):
         self.status = 'failed'
         self.completed_at = datetime.utcnow()
-        self.error_message = error_message 
\ No newline at end of file
+        self.error_message = error_message 
@@ -9,7 +9,13 @@ def run_migrations():
     with app.app_context():
         # Lista plików migracji do wykonania
         migration_files = [
-            'migrations.add_field_number'
+            'migrations.add_field_number',
+            'migrations.backfill_tournament_standings',
+            'migrations.extend_task_queue',
+            'migrations.add_match_clock',
+            'migrations.add_health_metrics',
+            'migrations.add_system_log_archive',
+            'migrations.add_broadcast_notifications'
         ]
         
         try:
@@ -9,6 +9,8 @@ from services.task_service import TaskService
 from services.notification_service import NotificationService
 from services.stats_service import StatsService
 from services.config_service import ConfigService
+from services.season_standings_service import SeasonStandingsService
+from models import Year, Tournament
 
 class ArchiveTaskService(BaseService):
     def __init__(self):
@@ -17,6 +19,7 @@ class ArchiveTaskService(BaseService):
         self.notification_service = NotificationService()
         self.stats_service = StatsService()
         self.config_service = ConfigService()
+        self.season_standings_service = SeasonStandingsService()
 
     def schedule_tournament_archive(self, tournament_id: int,
                                   user_id: Optional[int] = None) -> str:
@@ -28,7 +31,9 @@ class ArchiveTaskService(BaseService):
                 description=f'Archiwizacja danych turnieju {tournament_id}',
                 args=(tournament_id,),
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                lane='process',
+                priority='batch'
             )
 
             return task_id
@@ -45,7 +50,7 @@ class ArchiveTaskService(BaseService):
             # Pobierz dane drużyn
             team_data = []
             for team in tournament_data['teams']:
-                team_history = self.stats_service.get_team_history(team['id'])
+                team_history = self.stats_service.get_team_history(team['team_id'])
                 team_data.append({
                     'team': team,
                     'history': team_history
@@ -85,7 +90,8 @@ class ArchiveTaskService(BaseService):
                 description=f'Archiwizacja danych drużyny {team_id}',
                 args=(team_id,),
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                priority='batch'
             )
 
             return task_id
@@ -133,7 +139,9 @@ class ArchiveTaskService(BaseService):
                 description=f'Archiwizacja danych z sezonu {season_year}',
                 args=(season_year,),
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                lane='process',
+                priority='batch'
             )
 
             return task_id
@@ -142,27 +150,33 @@ class ArchiveTaskService(BaseService):
             raise
 
     def _archive_season(self, season_year: int) -> Dict:
-        """Archiwizuje dane z całego sezonu"""
+        """Archiwizuje dane z całego sezonu.
+
+        Całość pochodzi z jednego przebiegu SeasonStandingsService (zakończone
+        mecze i drużyny rocznika) - bez statystyk i historii per turniej/drużyna.
+        """
         try:
-            # TODO: Pobierz wszystkie turnieje z danego sezonu
-            tournaments = []  # Implementacja pobierania turniejów
-            
-            # Archiwizuj każdy turniej
+            tournaments = Tournament.query.join(Year).filter(Year.year == season_year).with_entities(
+                Tournament.id, Tournament.name, Tournament.status
+            ).order_by(Tournament.id).all()
+
+            # Tabele wszystkich turniejów rocznika liczone jednym przebiegiem
+            tables = self.season_standings_service.get_tournament_tables(
+                [tournament.id for tournament in tournaments]
+            )
+
             archived_tournaments = []
             for tournament in tournaments:
-                try:
-                    archive_data = self._archive_tournament(tournament['id'])
-                    archived_tournaments.append({
-                        'tournament_id': tournament['id'],
-                        'status': 'success',
-                        'archive_data': archive_data
-                    })
-                except Exception as e:
-                    archived_tournaments.append({
-                        'tournament_id': tournament['id'],
-                        'status': 'error',
-                        'error': str(e)
-                    })
+                standings = tables.get(tournament.id, [])
+                archived_tournaments.append({
+                    'tournament_id': tournament.id,
+                    'tournament_name': tournament.name,
+                    'status': tournament.status,
+                    # Każdy mecz liczony jest w tabeli dwa razy (raz dla każdej drużyny)
+                    'total_matches': sum(entry['matches_played'] for entry in standings) // 2,
+                    'total_goals': sum(entry['goals_for'] for entry in standings),
+                    'standings': standings
+                })
 
             # Przygotuj podsumowanie sezonu
             season_summary = {
@@ -181,10 +195,8 @@ class ArchiveTaskService(BaseService):
                 'season_year': season_year,
                 'summary_path': summary_path,
                 'total_tournaments': len(tournaments),
-                'successful_archives': len([t for t in archived_tournaments 
-                                         if t['status'] == 'success']),
-                'failed_archives': len([t for t in archived_tournaments 
-                                      if t['status'] == 'error']),
+                'teams_archived': sum(len(table) for table in tables.values()),
+                'data_size': len(json.dumps(season_summary)),
                 'executed_at': datetime.utcnow().isoformat()
             }
         except Exception as e:
@@ -0,0 +1,139 @@
+from typing import Callable, Dict, List, Optional
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_FLUSH = object()
+_STOP = object()
+
+
+class AuditLogWriter:
+    """Buforowany zapis wpisów audytu (SystemLog) na wątku w tle.
+
+    Wpisy trafiają do ograniczonej kolejki, a wątek zapisuje je paczkami:
+    gdy uzbiera się batch_size wpisów albo minie flush_interval sekund.
+    Pełny bufor spowalnia wywołującego (czeka do enqueue_timeout), a gdy
+    miejsce się nie zwolni, wpis jest zapisywany synchronicznie - nic nie
+    ginie. ``sink`` dostaje listę słowników kolumn i zapisuje je jedną operacją.
+    """
+
+    def __init__(self, sink: Callable[[List[Dict]], None], batch_size: int = 100,
+                 flush_interval: float = 1.0, buffer_size: int = 10000,
+                 enqueue_timeout: float = 0.5):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=buffer_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {'enqueued': 0, 'written': 0, 'batches': 0, 'synchronous': 0, 'failed': 0}
+
+    def start(self) -> 'AuditLogWriter':
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._thread.start()
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def write(self, record: Dict) -> None:
+        """Dodaje wpis do bufora; przy pełnym buforze czeka, a potem zapisuje sam"""
+        if not self.running:
+            self._write_batch([record], synchronous=True)
+            return
+        try:
+            self._queue.put(record, timeout=self.enqueue_timeout)
+            self._count('enqueued')
+        except queue.Full:
+            self._write_batch([record], synchronous=True)
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Zapisuje wszystko, co trafiło do bufora przed wywołaniem"""
+        if not self.running:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put((_FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Opróżnia bufor i zatrzymuje wątek (wywoływane przy zamknięciu procesu)"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put((_STOP, None))
+        thread.join(timeout)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, 'buffered': self._queue.qsize()}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def _run(self) -> None:
+        batch: List[Dict] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, tuple) and item and item[0] in (_FLUSH, _STOP):
+                marker, done = item
+                self._write_batch(batch)
+                batch, deadline = [], None
+                if marker is _STOP:
+                    self._drain()
+                    return
+                done.set()
+                continue
+
+            if item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write_batch(batch)
+                batch, deadline = [], None
+
+    def _drain(self) -> None:
+        """Zapisuje wpisy dodane już po sygnale zatrzymania"""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, dict):
+                batch.append(item)
+            elif isinstance(item, tuple) and item and item[0] is _FLUSH:
+                item[1].set()
+        self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Dict], synchronous: bool = False) -> None:
+        if not batch:
+            return
+        try:
+            self.sink(batch)
+            self._count('written', len(batch))
+            if synchronous:
+                self._count('synchronous', len(batch))
+            else:
+                self._count('batches')
+        except Exception as e:
+            self._count('failed', len(batch))
+            logger.error(f'Error writing {len(batch)} audit log entries: {str(e)}')
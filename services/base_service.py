@@ -1,4 +1,6 @@
+from typing import Dict, List, Sequence
 from extensions import db
+from sqlalchemy import insert
 from sqlalchemy.exc import SQLAlchemyError
 from flask import current_app
 
@@ -26,4 +28,20 @@ class BaseService:
             self.db.session.delete(obj)
         except SQLAlchemyError as e:
             current_app.logger.error(f'Error deleting object: {str(e)}')
-            raise 
\ No newline at end of file
+            raise 
+
+    def bulk_insert(self, model, rows: Sequence[Dict], chunk_size: int = 1000) -> int:
+        """Wstawia wiersze jednym INSERT na paczkę (executemany), bez obiektów ORM.
+
+        Omija flush i zdarzenia sesji - nie aktualizuje tabeli wyników ani
+        relacji obiektów już załadowanych. Nie zatwierdza transakcji, więc
+        wywołujący robi jeden commit dla całej operacji.
+        """
+        rows: List[Dict] = list(rows)
+        try:
+            for start in range(0, len(rows), chunk_size):
+                self.db.session.execute(insert(model), rows[start:start + chunk_size])
+            return len(rows)
+        except SQLAlchemyError as e:
+            current_app.logger.error(f'Error bulk inserting {model.__name__}: {str(e)}')
+            raise
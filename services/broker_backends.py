@@ -0,0 +1,193 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from collections import deque
+import json
+import threading
+import time
+
+
+class Subscription:
+    """Skrzynka odbiorcza jednego subskrybenta (strumień SSE, most Socket.IO).
+
+    Każdy subskrybent ma własny, ograniczony bufor - wolny klient traci
+    najstarsze wiadomości zamiast blokować publikującego lub innych klientów.
+    topics=None oznacza wszystkie tematy.
+    """
+
+    def __init__(self, broker: 'MessageBroker', topics: Optional[Iterable[str]], buffer_size: int = 100):
+        self.broker = broker
+        self.topics = None if topics is None else frozenset(topics)
+        self.dropped = 0
+        self.closed = False
+        self._messages: deque = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+
+    def matches(self, topic: str) -> bool:
+        return self.topics is None or topic in self.topics
+
+    def deliver(self, topic: str, message: Dict) -> None:
+        with self._condition:
+            if len(self._messages) == self._messages.maxlen:
+                self.dropped += 1
+            self._messages.append((topic, message))
+            self._condition.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, Dict]]:
+        """Zwraca (temat, wiadomość) albo None po upływie timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not self._messages and not self.closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            return self._messages.popleft() if self._messages else None
+
+    def close(self) -> None:
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MessageBroker:
+    """Interfejs brokera publikuj/subskrybuj z rozsyłaniem do wszystkich subskrybentów tematu"""
+
+    def __init__(self, buffer_size: int = 100):
+        self.buffer_size = buffer_size
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._published = 0
+        self._delivered = 0
+
+    def publish(self, topic: str, message: Dict) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None) -> Subscription:
+        subscription = Subscription(self, topics, self.buffer_size)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def _fan_out(self, topic: str, message: Dict) -> int:
+        """Dostarcza wiadomość do subskrybentów tematu w tym procesie"""
+        with self._lock:
+            targets = [sub for sub in self._subscriptions if sub.matches(topic)]
+        for subscription in targets:
+            subscription.deliver(topic, message)
+        self._delivered += len(targets)
+        return len(targets)
+
+    def close(self) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        return {
+            'subscribers': len(subscriptions),
+            'published': self._published,
+            'delivered': self._delivered,
+            'dropped': sum(sub.dropped for sub in subscriptions)
+        }
+
+
+class MemoryBroker(MessageBroker):
+    """Broker w pamięci procesu - wystarcza przy jednym workerze"""
+
+    def publish(self, topic: str, message: Dict) -> None:
+        self._published += 1
+        self._fan_out(topic, message)
+
+    def stats(self) -> Dict:
+        return {'backend': 'memory', **super().stats()}
+
+
+class RedisBroker(MessageBroker):
+    """Broker oparty o Redis pub/sub - wiadomość trafia do wszystkich workerów.
+
+    Każdy proces ma jeden wątek nasłuchujący z subskrypcją wzorca
+    {prefix}*, który rozsyła wiadomości do lokalnych subskrybentów.
+    Dzięki temu połączenie pub/sub obsługuje tylko jeden wątek.
+    """
+
+    def __init__(self, client, prefix: str = '', buffer_size: int = 100, poll_timeout: float = 1.0):
+        super().__init__(buffer_size)
+        self.client = client
+        self.prefix = prefix
+        self.poll_timeout = poll_timeout
+        self._pubsub = None
+        self._listener: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = '', buffer_size: int = 100) -> 'RedisBroker':
+        import redis
+        return cls(redis.Redis.from_url(url), prefix, buffer_size)
+
+    def publish(self, topic: str, message: Dict) -> None:
+        self._published += 1
+        self.client.publish(f'{self.prefix}{topic}', json.dumps(message, default=str))
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None) -> Subscription:
+        subscription = super().subscribe(topics)
+        self._ensure_listener()
+        return subscription
+
+    def _ensure_listener(self) -> None:
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._ready.clear()
+            self._stopped.clear()
+            self._listener = threading.Thread(target=self._listen, daemon=True)
+            self._listener.start()
+        # Wiadomości opublikowane przed PSUBSCRIBE nie dotarłyby do nowego subskrybenta
+        self._ready.wait(timeout=5)
+
+    def _listen(self) -> None:
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(f'{self.prefix}*')
+        self._ready.set()
+        try:
+            while not self._stopped.is_set():
+                try:
+                    message = self._pubsub.get_message(timeout=self.poll_timeout)
+                except Exception:
+                    time.sleep(self.poll_timeout)  # zerwane połączenie - redis-py połączy ponownie
+                    continue
+                if not message or message.get('type') != 'pmessage':
+                    continue
+                topic = _decode(message['channel'])[len(self.prefix):]
+                try:
+                    payload = json.loads(_decode(message['data']))
+                except ValueError:
+                    continue
+                self._fan_out(topic, payload)
+        finally:
+            self._pubsub.close()
+
+    def close(self) -> None:
+        self._stopped.set()
+        super().close()
+
+    def stats(self) -> Dict:
+        return {'backend': 'redis', **super().stats()}
+
+
+def _decode(value: Any) -> str:
+    return value.decode('utf-8') if isinstance(value, bytes) else value
@@ -0,0 +1,146 @@
+from typing import Dict, Iterable, Iterator, Optional
+import json
+import threading
+from flask import current_app
+
+from services.broker_backends import MessageBroker, MemoryBroker, RedisBroker, Subscription
+
+
+def match_topic(match_id: int) -> str:
+    return f'match_{match_id}'
+
+
+def tournament_topic(tournament_id: int) -> str:
+    return f'tournament_{tournament_id}'
+
+
+def user_topic(user_id: int) -> str:
+    return f'user_{user_id}'
+
+
+def audience_topic(audience: str) -> str:
+    return f'audience_{audience}'
+
+
+class BrokerService:
+    """Rozsyłanie aktualizacji na żywo (tematy match_{id}, tournament_{id},
+    a dla powiadomień user_{id} i audience_{grupa}).
+
+    Wiadomość to {'event': nazwa zdarzenia, 'data': ładunek}. Trafia do
+    każdego subskrybenta tematu: strumieni SSE oraz mostu Socket.IO, który
+    przekazuje ją do pokoju o tej samej nazwie.
+    """
+    _broker: MessageBroker = MemoryBroker()
+    _socketio = None
+    _bridge: Optional[threading.Thread] = None
+    _bridge_lock = threading.Lock()
+
+    @classmethod
+    def init_app(cls, app) -> None:
+        """Wybiera backend brokera na podstawie konfiguracji (BROKER_BACKEND)"""
+        buffer_size = app.config.get('BROKER_SUBSCRIBER_BUFFER', 100)
+        if app.config.get('BROKER_BACKEND', 'memory') == 'redis':
+            broker = RedisBroker.from_url(
+                app.config.get('BROKER_REDIS_URL', 'redis://localhost:6379/0'),
+                prefix=app.config.get('BROKER_CHANNEL_PREFIX', ''),
+                buffer_size=buffer_size
+            )
+        else:
+            broker = MemoryBroker(buffer_size)
+        cls.set_broker(broker)
+
+    @classmethod
+    def set_broker(cls, broker: MessageBroker) -> None:
+        """Podmienia backend brokera (np. w testach); zamyka subskrypcje starego"""
+        previous, cls._broker = cls._broker, broker
+        if previous is not broker:
+            previous.close()
+            # Subskrypcja mostu należała do starego brokera
+            if cls._socketio is not None:
+                cls._bridge = None
+                cls.start_socketio_bridge(cls._socketio)
+
+    @classmethod
+    def get_broker(cls) -> MessageBroker:
+        return cls._broker
+
+    @classmethod
+    def publish(cls, topic: str, event: str, data: Dict) -> None:
+        try:
+            cls._broker.publish(topic, {'event': event, 'data': data})
+        except Exception as e:
+            current_app.logger.error(f'Error publishing {event} to {topic}: {str(e)}')
+
+    @classmethod
+    def publish_match(cls, match_id: int, tournament_id: Optional[int], event: str, data: Dict) -> None:
+        """Publikuje zdarzenie meczu także w temacie jego turnieju"""
+        cls.publish(match_topic(match_id), event, data)
+        if tournament_id is not None:
+            cls.publish(tournament_topic(tournament_id), event, data)
+
+    @classmethod
+    def publish_match_clock(cls, match) -> None:
+        """Publikuje zmianę stanu zegara meczu (start/pauza/wznowienie/koniec).
+
+        Klienci odliczają czas lokalnie od otrzymanego stanu, więc zegar
+        nie wymaga cyklicznych zapisów ani odpytywania serwera.
+        """
+        cls.publish_match(match.id, match.tournament_id, 'clock_changed', {
+            'matchId': match.id,
+            'status': match.status,
+            **match.clock_state()
+        })
+
+    @classmethod
+    def subscribe(cls, topics: Optional[Iterable[str]] = None) -> Subscription:
+        return cls._broker.subscribe(topics)
+
+    @classmethod
+    def sse_stream(cls, topics: Iterable[str], heartbeat: float = 15.0) -> Iterator[str]:
+        """Generator strumienia Server-Sent Events dla podanych tematów"""
+        subscription = cls.subscribe(topics)
+        try:
+            yield 'retry: 3000\n\n'
+            while not subscription.closed:
+                item = subscription.get(timeout=heartbeat)
+                if item is None:
+                    yield ': keep-alive\n\n'  # utrzymuje połączenie przez proxy
+                    continue
+                topic, message = item
+                payload = json.dumps({'topic': topic, **message.get('data', {})}, default=str)
+                yield f"event: {message.get('event', 'message')}\ndata: {payload}\n\n"
+        finally:
+            subscription.close()
+
+    @classmethod
+    def start_socketio_bridge(cls, socketio) -> None:
+        """Uruchamia w tle przekazywanie wiadomości brokera do pokojów Socket.IO.
+
+        Każdy worker ma własny most - z backendem Redis klient podłączony
+        do dowolnego workera dostaje aktualizacje publikowane przez inne.
+        """
+        with cls._bridge_lock:
+            cls._socketio = socketio
+            if cls._bridge is not None and cls._bridge.is_alive():
+                return
+            subscription = cls.subscribe()
+            cls._bridge = threading.Thread(
+                target=cls._forward_to_socketio, args=(socketio, subscription), daemon=True
+            )
+            cls._bridge.start()
+
+    @staticmethod
+    def _forward_to_socketio(socketio, subscription: Subscription) -> None:
+        while not subscription.closed:
+            item = subscription.get(timeout=1.0)
+            if item is None:
+                continue
+            topic, message = item
+            try:
+                socketio.emit(message.get('event', 'message'), message.get('data', {}), to=topic)
+            except Exception:
+                continue
+
+    @classmethod
+    def get_stats(cls) -> Dict:
+        return cls._broker.stats()
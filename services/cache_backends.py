@@ -0,0 +1,354 @@
+from typing import Any, Dict, Iterable, List, Optional
+from collections import OrderedDict
+import pickle
+import sys
+import threading
+import time
+
+
+class CacheBackend:
+    """Interfejs magazynu dla CacheService"""
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, expires_in: int, tags: Iterable[str] = ()) -> bool:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Usuwa wszystkie wpisy oznaczone tagiem, zwraca ich liczbę"""
+        raise NotImplementedError
+
+    def pop_tag_evictions(self) -> Dict[str, int]:
+        """Zwraca (i zeruje) liczbę wymian LRU per tag od ostatniego wywołania"""
+        return {}
+
+    def incr(self, key: str, delta: int) -> Optional[int]:
+        """Zmienia licznik zapisany pod kluczem (nie poniżej zera), zachowując czas wygaśnięcia.
+
+        Zwraca nową wartość albo None, gdy klucza nie ma lub nie jest liczbą -
+        wtedy wywołujący przelicza wartość przy następnym odczycie.
+        """
+        return None
+
+    def try_lock(self, key: str, ttl: int) -> bool:
+        """Blokada przeliczenia klucza widoczna dla innych procesów.
+
+        Backend lokalny dla procesu nie potrzebuje jej - wystarczają blokady
+        wątków w CacheService.
+        """
+        return True
+
+    def unlock(self, key: str) -> None:
+        pass
+
+    def clear(self) -> bool:
+        raise NotImplementedError
+
+    def keys(self, pattern: Optional[str] = None) -> List[str]:
+        raise NotImplementedError
+
+    def cleanup_expired(self) -> int:
+        """Usuwa wygasłe wpisy (backend może robić to sam)"""
+        return 0
+
+    def stats(self) -> Dict:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Cache w pamięci procesu z limitem bajtów, wymianą LRU i wygasaniem w O(1).
+
+    Wpisy trzymane są w OrderedDict w kolejności użycia. Czasy wygaśnięcia
+    grupowane są w kubełki sekundowe, więc usuwanie przeterminowanych wpisów
+    odwiedza każdy kubełek tylko raz zamiast przeglądać cały słownik. Indeks
+    tagów pozwala unieważnić wpisy tagu bez przeglądania pozostałych kluczy.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()  # klucz -> (wartość, rozmiar, wygaśnięcie, tagi)
+        self._buckets: Dict[int, set] = {}
+        self._tags: Dict[str, set] = {}
+        self._tag_evictions: Dict[str, int] = {}
+        self._next_bucket = int(time.time())
+        self._size = 0
+        self._evictions = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _sizeof(key: str, value: Any) -> int:
+        try:
+            value_size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            value_size = sys.getsizeof(value)
+        return len(key.encode('utf-8')) + value_size
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        _, size, expires_at, tags = entry
+        self._size -= size
+        _discard(self._buckets, int(expires_at), key)
+        for tag in tags:
+            _discard(self._tags, tag, key)
+        return True
+
+    def _purge_expired(self, now: float) -> int:
+        current = int(now)
+        if current < self._next_bucket:
+            return 0
+
+        # Przy długiej przerwie taniej przejrzeć istniejące kubełki niż każdą sekundę
+        if current - self._next_bucket > len(self._buckets):
+            seconds = [second for second in self._buckets if second < current]
+        else:
+            seconds = range(self._next_bucket, current)
+
+        removed = 0
+        for second in seconds:
+            for key in list(self._buckets.get(second, ())):
+                removed += self._remove(key)
+        self._next_bucket = current
+        return removed
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            now = time.time()
+            self._purge_expired(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, _, expires_at, _ = entry
+            if expires_at <= now:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, expires_in: int, tags: Iterable[str] = ()) -> bool:
+        size = self._sizeof(key, value)
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            now = time.time()
+            self._purge_expired(now)
+            self._remove(key)
+
+            expires_at = now + expires_in
+            tags = tuple(tags)
+            self._entries[key] = (value, size, expires_at, tags)
+            self._buckets.setdefault(int(expires_at), set()).add(key)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self._size += size
+
+            while self._entries and (self._size > self.max_bytes or
+                                     (self.max_entries and len(self._entries) > self.max_entries)):
+                oldest = next(iter(self._entries))
+                for tag in self._entries[oldest][3]:
+                    self._tag_evictions[tag] = self._tag_evictions.get(tag, 0) + 1
+                self._remove(oldest)
+                self._evictions += 1
+            return True
+
+    def incr(self, key: str, delta: int) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not isinstance(entry[0], int) or entry[2] <= time.time():
+                return None
+            value = max(0, entry[0] + delta)
+            self._entries[key] = (value,) + entry[1:]
+            return value
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            self._remove(key)
+            return True
+
+    def invalidate_tag(self, tag: str) -> int:
+        with self._lock:
+            return sum(self._remove(key) for key in list(self._tags.get(tag, ())))
+
+    def pop_tag_evictions(self) -> Dict[str, int]:
+        with self._lock:
+            evictions, self._tag_evictions = self._tag_evictions, {}
+            return evictions
+
+    def clear(self) -> bool:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._tags.clear()
+            self._tag_evictions.clear()
+            self._size = 0
+            return True
+
+    def keys(self, pattern: Optional[str] = None) -> List[str]:
+        with self._lock:
+            self._purge_expired(time.time())
+            if pattern:
+                return [key for key in self._entries if pattern in key]
+            return list(self._entries)
+
+    def cleanup_expired(self) -> int:
+        with self._lock:
+            now = time.time()
+            removed = self._purge_expired(now)
+            # Bieżący kubełek może zawierać wpisy jeszcze ważne
+            for key in list(self._buckets.get(int(now), ())):
+                if self._entries[key][2] <= now:
+                    removed += self._remove(key)
+            return removed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.time()
+            expired = sum(1 for _, _, expires_at, _ in self._entries.values() if expires_at <= now)
+            return {
+                'backend': 'memory',
+                'total_entries': len(self._entries),
+                'active_entries': len(self._entries) - expired,
+                'expired_entries': expired,
+                'memory_usage': self._size,
+                'max_bytes': self.max_bytes,
+                'evictions': self._evictions
+            }
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache współdzielony przez wszystkie procesy w Redisie.
+
+    Wartości są serializowane przez pickle, a wygasanie realizuje sam Redis
+    (SETEX). Wszystkie klucze mają prefiks CACHE_KEY_PREFIX, więc clear()
+    nie dotyka danych innych aplikacji w tej samej bazie. Tag to zbiór Redisa
+    z kluczami wpisów, wspólny dla wszystkich workerów.
+    """
+
+    def __init__(self, client, prefix: str = ''):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = '') -> 'RedisCacheBackend':
+        import redis
+        return cls(redis.Redis.from_url(url), prefix)
+
+    def _key(self, key: str) -> str:
+        return f'{self.prefix}{key}'
+
+    def _tag_key(self, tag: str) -> str:
+        return f'{self.prefix}tag:{tag}'
+
+    def _lock_key(self, key: str) -> str:
+        return f'{self.prefix}lock:{key}'
+
+    def _scan(self, pattern: Optional[str] = None):
+        match = f'{_escape_glob(self.prefix)}*'
+        if pattern:
+            match = f'{_escape_glob(self.prefix)}*{_escape_glob(pattern)}*'
+        internal = (self._tag_key(''), self._lock_key(''))
+        for raw_key in self.client.scan_iter(match=match, count=500):
+            key = _decode(raw_key)
+            if not key.startswith(internal):
+                yield key
+
+    def get(self, key: str) -> Optional[Any]:
+        payload = self.client.get(self._key(key))
+        if payload is None:
+            return None
+        return pickle.loads(payload)
+
+    def set(self, key: str, value: Any, expires_in: int, tags: Iterable[str] = ()) -> bool:
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        expires_in = max(1, int(expires_in))
+        self.client.setex(self._key(key), expires_in, payload)
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            self.client.sadd(tag_key, self._key(key))
+            # Zbiór tagu żyje co najmniej tak długo jak najdłuższy z jego wpisów
+            if self.client.ttl(tag_key) < expires_in:
+                self.client.expire(tag_key, expires_in)
+        return True
+
+    def incr(self, key: str, delta: int) -> Optional[int]:
+        redis_key = self._key(key)
+
+        def update(pipe):
+            payload = pipe.get(redis_key)
+            value = pickle.loads(payload) if payload is not None else None
+            if not isinstance(value, int):
+                return None
+            ttl = pipe.ttl(redis_key)
+            value = max(0, value + delta)
+            pipe.multi()
+            pipe.setex(redis_key, max(1, ttl), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+            return value
+
+        # WATCH/MULTI - zmiana z innego workera w międzyczasie powtarza odczyt
+        return self.client.transaction(update, redis_key, value_from_callable=True)
+
+    def invalidate_tag(self, tag: str) -> int:
+        tag_key = self._tag_key(tag)
+        keys = list(self.client.smembers(tag_key))
+        if keys:
+            self.client.delete(*keys)
+        self.client.delete(tag_key)
+        return len(keys)
+
+    def try_lock(self, key: str, ttl: int) -> bool:
+        return bool(self.client.set(self._lock_key(key), b'1', nx=True, ex=max(1, int(ttl))))
+
+    def unlock(self, key: str) -> None:
+        self.client.delete(self._lock_key(key))
+
+    def delete(self, key: str) -> bool:
+        self.client.delete(self._key(key))
+        return True
+
+    def clear(self) -> bool:
+        keys = list(self._scan())
+        keys.extend(_decode(key) for key in
+                    self.client.scan_iter(match=f'{_escape_glob(self._tag_key(""))}*', count=500))
+        if keys:
+            self.client.delete(*keys)
+        return True
+
+    def keys(self, pattern: Optional[str] = None) -> List[str]:
+        return [key[len(self.prefix):] for key in self._scan(pattern)]
+
+    def stats(self) -> Dict:
+        total = sum(1 for _ in self._scan())
+        try:
+            memory_usage = self.client.info('memory').get('used_memory', 0)
+        except Exception:
+            memory_usage = 0
+        return {
+            'backend': 'redis',
+            'total_entries': total,
+            'active_entries': total,
+            'expired_entries': 0,
+            'memory_usage': memory_usage
+        }
+
+
+def _escape_glob(value: str) -> str:
+    return ''.join(f'[{char}]' if char in '*?[]' else char for char in value)
+
+
+def _decode(key) -> str:
+    return key.decode('utf-8') if isinstance(key, bytes) else key
+
+
+def _discard(index: Dict, group, key: str) -> None:
+    members = index.get(group)
+    if members is not None:
+        members.discard(key)
+        if not members:
+            del index[group]
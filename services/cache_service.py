@@ -1,19 +1,51 @@
-from typing import Any, Optional, Dict, List, Callable
-from datetime import datetime, timedelta
-import json
+from typing import Any, Optional, Dict, List, Callable, Iterable, Union
+from datetime import datetime
 from flask import current_app
 from functools import wraps
 import time
+import threading
 
 from models import SystemLog, Tournament, Team, Match, TournamentStanding
 from services.base_service import BaseService
 from services.config_service import ConfigService
+from services.standings_service import StandingsService
+from services.cache_backends import CacheBackend, MemoryCacheBackend, RedisCacheBackend
+from services.task_service import TaskService
+from services.metrics_service import CACHE_REQUESTS
 from extensions import db
 
+
+class CachedValue:
+    """Koperta wpisu zapisanego z oknem stale-while-revalidate (z tagami wpisu do statystyk)"""
+    __slots__ = ('value', 'fresh_until', 'tags')
+
+    def __init__(self, value: Any, fresh_until: float, tags: Iterable[str] = ()):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.tags = tuple(tags)
+
+    def __getstate__(self):
+        return self.value, self.fresh_until, self.tags
+
+    def __setstate__(self, state):
+        # Wpisy zapisane przed dodaniem tagów mają dwa pola
+        self.value, self.fresh_until, *tags = state
+        self.tags = tuple(tags[0]) if tags else ()
+
+    @property
+    def is_stale(self) -> bool:
+        return time.time() >= self.fresh_until
+
+
 class CacheService(BaseService):
     _instance = None
-    _cache: Dict[str, Any] = {}
-    _cache_times: Dict[str, datetime] = {}
+    _backend: CacheBackend = MemoryCacheBackend()
+    _tag_stats: Dict[str, Dict[str, int]] = {}
+    _tag_stats_lock = threading.Lock()
+    _key_locks: Dict[str, list] = {}  # klucz -> [blokada, liczba oczekujących]
+    _key_locks_guard = threading.Lock()
+    _refreshing: set = set()
+    LOCK_TIMEOUT = 10  # sekundy oczekiwania na przeliczenie przez inny wątek/proces
 
     def __new__(cls):
         if cls._instance is None:
@@ -27,29 +59,47 @@ class CacheService(BaseService):
             self.initialized = True
 
     @classmethod
-    def get(cls, key: str) -> Optional[Any]:
-        """Pobiera wartość z cache'u"""
-        try:
-            if key not in cls._cache or key not in cls._cache_times:
-                return None
+    def init_app(cls, app) -> None:
+        """Wybiera backend cache'u na podstawie konfiguracji (CACHE_BACKEND)"""
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+        if backend == 'redis':
+            cls._backend = RedisCacheBackend.from_url(
+                app.config.get('CACHE_REDIS_URL', 'redis://localhost:6379/0'),
+                prefix=app.config.get('CACHE_KEY_PREFIX', '')
+            )
+        else:
+            cls._backend = MemoryCacheBackend(
+                max_bytes=app.config.get('CACHE_MAX_BYTES', 64 * 1024 * 1024),
+                max_entries=app.config.get('CACHE_MAX_ENTRIES')
+            )
 
-            # Sprawdź czy wartość nie wygasła
-            if datetime.utcnow() > cls._cache_times[key]:
-                cls.delete(key)
-                return None
+    @classmethod
+    def set_backend(cls, backend: CacheBackend) -> None:
+        """Podmienia backend cache'u (np. w testach)"""
+        cls._backend = backend
 
-            return cls._cache[key]
+    @classmethod
+    def _get_entry(cls, key: str) -> Optional[Any]:
+        try:
+            return cls._backend.get(key)
         except Exception as e:
             current_app.logger.error(f'Error getting from cache: {str(e)}')
             return None
 
     @classmethod
-    def set(cls, key: str, value: Any, expires_in: int = 300) -> bool:
-        """Zapisuje wartość w cache'u"""
+    def get(cls, key: str) -> Optional[Any]:
+        """Pobiera wartość z cache'u"""
+        return cls._unwrap(cls._get_entry(key))
+
+    @staticmethod
+    def _unwrap(entry: Any) -> Any:
+        return entry.value if isinstance(entry, CachedValue) else entry
+
+    @classmethod
+    def set(cls, key: str, value: Any, expires_in: int = 300, tags: Iterable[str] = ()) -> bool:
+        """Zapisuje wartość w cache'u (opcjonalnie pod tagami, np. 'tournament:1')"""
         try:
-            cls._cache[key] = value
-            cls._cache_times[key] = datetime.utcnow() + timedelta(seconds=expires_in)
-            return True
+            return cls._backend.set(key, value, expires_in, tags=tags)
         except Exception as e:
             current_app.logger.error(f'Error setting cache: {str(e)}')
             return False
@@ -58,54 +108,220 @@ class CacheService(BaseService):
     def delete(cls, key: str) -> bool:
         """Usuwa wartość z cache'u"""
         try:
-            if key in cls._cache:
-                del cls._cache[key]
-            if key in cls._cache_times:
-                del cls._cache_times[key]
-            return True
+            return cls._backend.delete(key)
         except Exception as e:
             current_app.logger.error(f'Error deleting from cache: {str(e)}')
             return False
 
+    @classmethod
+    def incr(cls, key: str, delta: int = 1) -> Optional[int]:
+        """Zmienia licznik w cache'u; None gdy go nie ma (wartość zostanie przeliczona)"""
+        try:
+            return cls._backend.incr(key, delta)
+        except Exception as e:
+            current_app.logger.error(f'Error incrementing cache counter: {str(e)}')
+            cls.delete(key)
+            return None
+
     @classmethod
     def clear(cls) -> bool:
         """Czyści cały cache"""
         try:
-            cls._cache.clear()
-            cls._cache_times.clear()
-            return True
+            return cls._backend.clear()
         except Exception as e:
             current_app.logger.error(f'Error clearing cache: {str(e)}')
             return False
 
     @classmethod
-    def get_or_set(cls, key: str, callback: Callable, timeout: int = 300) -> Any:
-        """Get from cache or set using callback if not found."""
-        value = cls.get(key)
-        if value is not None:
-            return value
-        
+    def invalidate_tag(cls, tag: str) -> int:
+        """Usuwa wszystkie wpisy zarejestrowane pod tagiem"""
+        try:
+            removed = cls._backend.invalidate_tag(tag)
+            cls._count_tags((tag,), 'invalidations', removed)
+            return removed
+        except Exception as e:
+            current_app.logger.error(f'Error invalidating cache tag: {str(e)}')
+            return 0
+
+    @classmethod
+    def _count_tags(cls, tags: Iterable[str], counter: str, amount: int = 1) -> None:
+        with cls._tag_stats_lock:
+            for tag in tags:
+                stats = cls._tag_stats.setdefault(
+                    tag, {'hits': 0, 'misses': 0, 'stale_hits': 0, 'evictions': 0, 'invalidations': 0}
+                )
+                stats[counter] += amount
+
+    @classmethod
+    def get_tag_stats(cls) -> Dict[str, Dict[str, int]]:
+        """Liczniki trafień, chybień, wymian i unieważnień per tag (w tym procesie)"""
+        for tag, evictions in cls._backend.pop_tag_evictions().items():
+            cls._count_tags((tag,), 'evictions', evictions)
+        with cls._tag_stats_lock:
+            return {tag: dict(stats) for tag, stats in cls._tag_stats.items()}
+
+    @classmethod
+    def get_or_set(cls, key: str, callback: Callable, timeout: int = 300,
+                   tags: Union[Iterable[str], Callable[[Any], Iterable[str]]] = (),
+                   stale_ttl: int = 0, static_tags: Iterable[str] = ()) -> Any:
+        """Get from cache or set using callback if not found.
+
+        Only one caller per key runs ``callback`` at a time; the others wait for
+        its result. With ``stale_ttl`` an expired value is still served for that
+        many seconds while a background task recomputes it. ``tags`` may be a
+        list of tags or a function deriving them from the computed value; with
+        a function, ``static_tags`` are the tags known up front - the entry is
+        registered under both and hits/misses are counted under both.
+        """
+        if callable(tags):
+            static_tags = tuple(static_tags)
+            dynamic_tags = tags
+            if static_tags:
+                tags = lambda value: (*static_tags, *dynamic_tags(value))
+        else:
+            static_tags = (*static_tags, *tags)
+            tags = static_tags
+
+        entry = cls._get_entry(key)
+        if isinstance(entry, CachedValue):
+            entry_tags = entry.tags or static_tags
+            if entry.is_stale:
+                cls._count_tags(entry_tags, 'stale_hits')
+                CACHE_REQUESTS.inc(result='stale')
+                cls._refresh_in_background(key, callback, timeout, tags, stale_ttl)
+            else:
+                cls._count_tags(entry_tags, 'hits')
+                CACHE_REQUESTS.inc(result='hit')
+            return entry.value
+        if entry is not None:
+            cls._count_tags(static_tags, 'hits')
+            CACHE_REQUESTS.inc(result='hit')
+            return entry
+
+        cls._count_tags(static_tags, 'misses')
+        CACHE_REQUESTS.inc(result='miss')
+        value = cls._compute_single_flight(key, callback, timeout, tags, stale_ttl)
+        if callable(tags):
+            # Tagi wyliczone z wartości znamy dopiero po przeliczeniu
+            cls._count_tags([tag for tag in tags(value) if tag not in static_tags], 'misses')
+        return value
+
+    @classmethod
+    def _store(cls, key: str, value: Any, timeout: int, tags, stale_ttl: int) -> None:
+        tags = tuple(tags(value)) if callable(tags) else tags
+        if stale_ttl:
+            cls.set(key, CachedValue(value, time.time() + timeout, tags), timeout + stale_ttl, tags=tags)
+        else:
+            cls.set(key, value, timeout, tags=tags)
+
+    @classmethod
+    def _acquire_key_lock(cls, key: str) -> threading.Lock:
+        with cls._key_locks_guard:
+            slot = cls._key_locks.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        return slot[0]
+
+    @classmethod
+    def _release_key_lock(cls, key: str) -> None:
+        with cls._key_locks_guard:
+            slot = cls._key_locks.get(key)
+            if slot:
+                slot[1] -= 1
+                if slot[1] <= 0:
+                    del cls._key_locks[key]
+
+    @classmethod
+    def _compute_single_flight(cls, key: str, callback: Callable, timeout: int,
+                               tags, stale_ttl: int) -> Any:
+        """Przelicza wartość raz - pozostali wywołujący czekają na wynik"""
+        lock = cls._acquire_key_lock(key)
+        locked = lock.acquire(timeout=cls.LOCK_TIMEOUT)
+        try:
+            if not cls._wait_for_backend_lock(key):
+                entry = cls._get_entry(key)
+                if entry is not None:
+                    return cls._unwrap(entry)
+                # Inny proces nie zdążył w limicie czasu - liczymy bez blokady
+                value = callback()
+                cls._store(key, value, timeout, tags, stale_ttl)
+                return value
+
+            try:
+                # Poprzedni właściciel blokady mógł już zapisać wynik
+                entry = cls._get_entry(key)
+                if entry is not None:
+                    return cls._unwrap(entry)
+                value = callback()
+                cls._store(key, value, timeout, tags, stale_ttl)
+                return value
+            finally:
+                cls._backend_unlock(key)
+        finally:
+            if locked:
+                lock.release()
+            cls._release_key_lock(key)
+
+    @classmethod
+    def _wait_for_backend_lock(cls, key: str) -> bool:
+        """Zdobywa blokadę backendu; False gdy wynik policzył inny proces lub minął czas"""
+        deadline = time.time() + cls.LOCK_TIMEOUT
+        while not cls._backend_try_lock(key):
+            if time.time() >= deadline or cls._get_entry(key) is not None:
+                return False
+            time.sleep(0.05)
+        return True
+
+    @classmethod
+    def _backend_try_lock(cls, key: str) -> bool:
+        try:
+            return cls._backend.try_lock(key, cls.LOCK_TIMEOUT)
+        except Exception as e:
+            current_app.logger.error(f'Error acquiring cache lock: {str(e)}')
+            return True
+
+    @classmethod
+    def _backend_unlock(cls, key: str) -> None:
+        try:
+            cls._backend.unlock(key)
+        except Exception as e:
+            current_app.logger.error(f'Error releasing cache lock: {str(e)}')
+
+    @classmethod
+    def _refresh_in_background(cls, key: str, callback: Callable, timeout: int,
+                               tags, stale_ttl: int) -> None:
+        """Zleca jedno odświeżenie nieaktualnego wpisu w tle (TaskService)"""
+        with cls._key_locks_guard:
+            if key in cls._refreshing:
+                return
+            cls._refreshing.add(key)
+
+        def refresh():
+            try:
+                if cls._backend_try_lock(key):
+                    try:
+                        cls._store(key, callback(), timeout, tags, stale_ttl)
+                    finally:
+                        cls._backend_unlock(key)
+            finally:
+                with cls._key_locks_guard:
+                    cls._refreshing.discard(key)
+
         try:
-            value = callback()
-            cls.set(key, value, timeout)
-            return value
+            TaskService().submit_task(
+                function=refresh,
+                name=f'Odświeżenie cache {key}',
+                notify_user=False,
+                persist=False
+            )
         except Exception as e:
-            current_app.logger.error(f"Cache get_or_set error: {str(e)}")
-            return callback()  # Fallback to direct call
+            current_app.logger.error(f'Error scheduling cache refresh: {str(e)}')
+            with cls._key_locks_guard:
+                cls._refreshing.discard(key)
 
     def get_stats(self) -> Dict:
         """Zwraca statystyki cache'u"""
         try:
-            current_time = datetime.utcnow()
-            active_keys = [k for k, t in self._cache_times.items() if t > current_time]
-            expired_keys = [k for k, t in self._cache_times.items() if t <= current_time]
-
-            return {
-                'total_entries': len(self._cache),
-                'active_entries': len(active_keys),
-                'expired_entries': len(expired_keys),
-                'memory_usage': self._estimate_memory_usage()
-            }
+            return self._backend.stats()
         except Exception as e:
             current_app.logger.error(f'Error getting cache stats: {str(e)}')
             return {
@@ -115,40 +331,10 @@ class CacheService(BaseService):
                 'memory_usage': 0
             }
 
-    def _estimate_memory_usage(self) -> int:
-        """Szacuje zużycie pamięci przez cache (w bajtach)"""
-        try:
-            total_size = 0
-            for key, value in self._cache.items():
-                # Rozmiar klucza
-                total_size += len(key.encode('utf-8'))
-                
-                # Rozmiar wartości
-                if isinstance(value, (str, bytes, bytearray)):
-                    total_size += len(value)
-                elif isinstance(value, (int, float)):
-                    total_size += 8
-                elif isinstance(value, (list, dict, tuple)):
-                    total_size += len(json.dumps(value, default=str).encode('utf-8'))
-                else:
-                    # Dla innych typów szacujemy
-                    total_size += 100
-
-            return total_size
-        except Exception as e:
-            current_app.logger.error(f'Error estimating memory usage: {str(e)}')
-            return 0
-
     def cleanup_expired(self) -> int:
         """Usuwa wygasłe wpisy z cache'u"""
         try:
-            current_time = datetime.utcnow()
-            expired_keys = [k for k, t in self._cache_times.items() if t <= current_time]
-            
-            for key in expired_keys:
-                self.delete(key)
-
-            return len(expired_keys)
+            return self._backend.cleanup_expired()
         except Exception as e:
             current_app.logger.error(f'Error cleaning up cache: {str(e)}')
             return 0
@@ -183,10 +369,7 @@ class CacheService(BaseService):
     def invalidate_pattern(cls, pattern: str) -> int:
         """Usuwa wszystkie wpisy z cache'u pasujące do wzorca"""
         try:
-            keys_to_delete = [
-                key for key in cls._cache.keys()
-                if pattern in key
-            ]
+            keys_to_delete = cls._backend.keys(pattern)
             
             for key in keys_to_delete:
                 cls.delete(key)
@@ -200,9 +383,7 @@ class CacheService(BaseService):
     def get_keys(cls, pattern: Optional[str] = None) -> List[str]:
         """Zwraca listę kluczy w cache'u"""
         try:
-            if pattern:
-                return [key for key in cls._cache.keys() if pattern in key]
-            return list(cls._cache.keys())
+            return cls._backend.keys(pattern)
         except Exception as e:
             current_app.logger.error(f'Error getting cache keys: {str(e)}')
             return []
@@ -255,7 +436,8 @@ class CacheService(BaseService):
                 current_app.logger.error(f"Error calculating tournament stats: {str(e)}")
                 return {}
         
-        return cls.get_or_set(cache_key, calculate_stats, timeout=600)  # 10 minutes
+        return cls.get_or_set(cache_key, calculate_stats, timeout=600,  # 10 minutes
+                              tags=[f"tournament:{tournament_id}"], stale_ttl=60)
     
     @classmethod
     def get_team_standings(cls, tournament_id: int, force_refresh: bool = False) -> List[Dict]:
@@ -267,94 +449,38 @@ class CacheService(BaseService):
         
         def calculate_standings():
             try:
-                teams = Team.query.filter_by(tournament_id=tournament_id).all()
-                matches = Match.query.filter_by(tournament_id=tournament_id, status='finished').all()
-                
-                standings = []
-                for team in teams:
-                    stats = {
-                        'team_id': team.id,
-                        'team_name': team.name,
-                        'matches_played': 0,
-                        'wins': 0,
-                        'draws': 0,
-                        'losses': 0,
-                        'goals_for': 0,
-                        'goals_against': 0,
-                        'goal_difference': 0,
-                        'points': 0
-                    }
-                    
-                    for match in matches:
-                        if match.team1_id == team.id:
-                            stats['matches_played'] += 1
-                            stats['goals_for'] += match.team1_score or 0
-                            stats['goals_against'] += match.team2_score or 0
-                            
-                            if match.team1_score > match.team2_score:
-                                stats['wins'] += 1
-                                stats['points'] += 3
-                            elif match.team1_score == match.team2_score:
-                                stats['draws'] += 1
-                                stats['points'] += 1
-                            else:
-                                stats['losses'] += 1
-                                
-                        elif match.team2_id == team.id:
-                            stats['matches_played'] += 1
-                            stats['goals_for'] += match.team2_score or 0
-                            stats['goals_against'] += match.team1_score or 0
-                            
-                            if match.team2_score > match.team1_score:
-                                stats['wins'] += 1
-                                stats['points'] += 3
-                            elif match.team1_score == match.team2_score:
-                                stats['draws'] += 1
-                                stats['points'] += 1
-                            else:
-                                stats['losses'] += 1
-                    
-                    stats['goal_difference'] = stats['goals_for'] - stats['goals_against']
-                    standings.append(stats)
-                
-                # Sort by points, then goal difference, then goals for
-                standings.sort(key=lambda x: (-x['points'], -x['goal_difference'], -x['goals_for']))
-                
-                return standings
+                # Tabela jest utrzymywana przyrostowo, więc wystarczy jedno zapytanie
+                return StandingsService.get_standings(tournament_id)
             except Exception as e:
                 current_app.logger.error(f"Error calculating team standings: {str(e)}")
                 return []
         
-        return cls.get_or_set(cache_key, calculate_standings, timeout=300)  # 5 minutes
+        def standings_tags(standings):
+            return [f"team:{row['team_id']}" for row in standings]
+        
+        return cls.get_or_set(cache_key, calculate_standings, timeout=300,  # 5 minutes
+                              tags=standings_tags, stale_ttl=60,
+                              static_tags=[f"tournament:{tournament_id}"])
     
     @classmethod
     def invalidate_tournament_cache(cls, tournament_id: int) -> None:
         """Invalidate all cache entries related to a tournament."""
-        try:
-            keys_to_delete = []
-            for key in cls._cache.keys():
-                if f":{tournament_id}" in key or f"tournament:{tournament_id}" in key:
-                    keys_to_delete.append(key)
-            
-            for key in keys_to_delete:
-                cls.delete(key)
-                
-        except Exception as e:
-            current_app.logger.error(f"Error invalidating tournament cache: {str(e)}")
+        cls.invalidate_tag(f"tournament:{tournament_id}")
     
     @classmethod
     def get_cache_stats(cls) -> Dict:
         """Get cache statistics."""
         try:
-            now = datetime.utcnow()
-            expired_count = sum(1 for exp_time in cls._cache_times.values() if now > exp_time)
-            
+            stats = cls._backend.stats()
             return {
-                'total_keys': len(cls._cache),
-                'expired_keys': expired_count,
-                'active_keys': len(cls._cache) - expired_count,
-                'memory_usage_mb': sum(len(str(v)) for v in cls._cache.values()) / 1024 / 1024
+                'backend': stats.get('backend'),
+                'total_keys': stats['total_entries'],
+                'expired_keys': stats['expired_entries'],
+                'active_keys': stats['active_entries'],
+                'evictions': stats.get('evictions', 0),
+                'memory_usage_mb': stats['memory_usage'] / 1024 / 1024,
+                'tags': cls.get_tag_stats()
             }
         except Exception as e:
             current_app.logger.error(f"Error getting cache stats: {str(e)}")
-            return {} 
\ No newline at end of file
+            return {}
@@ -1,12 +1,59 @@
 from typing import Dict, Optional, Any, Tuple, List
-from datetime import datetime
+from types import MappingProxyType
+import json
+import threading
+import time
 from flask import current_app
 from sqlalchemy.orm import joinedload
 
 from models import SystemConfig, SystemLog
 from services.base_service import BaseService
+from services.broker_service import BrokerService
+
+CONFIG_VERSION_KEY = 'config_version'
+CONFIG_TOPIC = 'config'
+
+
+def _decode_value(raw: Optional[str]) -> Any:
+    """Wartości konfiguracji są zapisywane jako JSON; starsze wpisy (np. logo_path) to zwykły tekst"""
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return raw
+
+
+class ConfigSnapshot:
+    """Niezmienny obraz ustawień z bazy w jednej wersji (wartości domyślne już uzupełnione)"""
+    __slots__ = ('version', 'settings', 'sections')
+
+    def __init__(self, version: int, settings: Dict[str, Any], defaults: Dict[str, Dict]):
+        self.version = version
+        self.settings = MappingProxyType(dict(settings))
+
+        sections = {name: dict(values) for name, values in defaults.items()}
+        for config_key, value in settings.items():
+            parts = config_key.split('.')
+            if len(parts) == 2:
+                sections.setdefault(parts[0], {})[parts[1]] = value
+        self.sections = MappingProxyType({name: MappingProxyType(values) for name, values in sections.items()})
+
 
 class ConfigService(BaseService):
+    """Konfiguracja systemu z bazy, czytana z obrazu w pamięci procesu.
+
+    Obraz ładowany jest raz i wymieniany tylko, gdy zmieni się licznik wersji
+    (wiersz config_version w SystemSettings). Licznik sprawdzany jest najwyżej
+    raz na CONFIG_CHECK_INTERVAL sekund albo od razu po sygnale brokera
+    wysyłanym przez zapisujących, więc odczyty w żądaniach nie pytają bazy.
+    """
+    _snapshot: Optional[ConfigSnapshot] = None
+    _checked_at = 0.0
+    _check_interval = 5.0
+    _snapshot_lock = threading.Lock()
+    _listener: Optional[threading.Thread] = None
+
     # Stałe konfiguracyjne
     DEFAULT_CONFIG = {
         'tournament': {
@@ -48,51 +95,95 @@ class ConfigService(BaseService):
         }
     }
 
-    def get_config(self, section: Optional[str] = None) -> Dict:
-        """Pobiera konfigurację systemu"""
-        try:
-            if section and section not in self.DEFAULT_CONFIG:
-                return {}
-
-            configs = SystemConfig.query.all()
-            current_config = {}
-
-            # Załaduj zapisane wartości
-            for config in configs:
-                sections = config.key.split('.')
-                if len(sections) != 2:
-                    continue
-
-                section_name, key = sections
-                if section_name not in current_config:
-                    current_config[section_name] = {}
-                current_config[section_name][key] = config.value
-
-            # Uzupełnij brakujące wartości domyślnymi
-            for section_name, section_config in self.DEFAULT_CONFIG.items():
-                if section and section != section_name:
-                    continue
-                if section_name not in current_config:
-                    current_config[section_name] = {}
-                for key, default_value in section_config.items():
-                    if key not in current_config[section_name]:
-                        current_config[section_name][key] = default_value
+    @classmethod
+    def init_app(cls, app) -> None:
+        """Ustawia częstotliwość sprawdzania wersji i nasłuch sygnałów zmiany konfiguracji"""
+        cls._check_interval = app.config.get('CONFIG_CHECK_INTERVAL', 5.0)
+        cls._snapshot = None
+        cls._checked_at = 0.0
+        if not app.config.get('CONFIG_LISTENER', True):
+            # Bez nasłuchu zmiany są widoczne najpóźniej po _check_interval sekund
+            return
+        if cls._listener is None or not cls._listener.is_alive():
+            cls._listener = threading.Thread(target=cls._listen, name='config-listener', daemon=True)
+            cls._listener.start()
 
-            return current_config if not section else current_config[section]
-        except Exception as e:
-            current_app.logger.error(f'Error getting config: {str(e)}')
-            return self.DEFAULT_CONFIG if not section else self.DEFAULT_CONFIG.get(section, {})
+    @classmethod
+    def _listen(cls) -> None:
+        """Sygnał od innego workera wymusza sprawdzenie wersji przy najbliższym odczycie"""
+        while True:
+            subscription = BrokerService.subscribe([CONFIG_TOPIC])
+            # Podmiana brokera zamyka subskrypcję - wtedy subskrybujemy nowego
+            while not subscription.closed:
+                if subscription.get(timeout=1.0) is not None:
+                    cls._checked_at = 0.0
+
+    @classmethod
+    def snapshot(cls) -> ConfigSnapshot:
+        """Aktualny obraz konfiguracji; baza jest pytana tylko o wersję, co _check_interval sekund"""
+        snapshot = cls._snapshot
+        if snapshot is not None and time.monotonic() - cls._checked_at < cls._check_interval:
+            return snapshot
+
+        with cls._snapshot_lock:
+            snapshot = cls._snapshot
+            if snapshot is not None and time.monotonic() - cls._checked_at < cls._check_interval:
+                return snapshot
+            try:
+                version = cls._read_version()
+                if snapshot is None or snapshot.version != version:
+                    rows = SystemConfig.query.with_entities(SystemConfig.key, SystemConfig.value).all()
+                    snapshot = ConfigSnapshot(
+                        version,
+                        {key: _decode_value(value) for key, value in rows if key != CONFIG_VERSION_KEY},
+                        cls.DEFAULT_CONFIG
+                    )
+                    cls._snapshot = snapshot
+                cls._checked_at = time.monotonic()
+            except Exception as e:
+                current_app.logger.error(f'Error loading config snapshot: {str(e)}')
+                if snapshot is None:
+                    return ConfigSnapshot(0, {}, cls.DEFAULT_CONFIG)
+            return snapshot
+
+    @staticmethod
+    def _read_version() -> int:
+        value = SystemConfig.query.with_entities(SystemConfig.value).filter_by(key=CONFIG_VERSION_KEY).scalar()
+        return int(value) if value else 0
+
+    @classmethod
+    def bump_version(cls) -> None:
+        """Zwiększa wersję konfiguracji w bieżącej transakcji (wywołujący robi commit)"""
+        row = SystemConfig.query.filter_by(key=CONFIG_VERSION_KEY).with_for_update().first()
+        if row is None:
+            cls().add(SystemConfig(key=CONFIG_VERSION_KEY, value='1'))
+        else:
+            row.value = str(int(row.value or 0) + 1)
+
+    @classmethod
+    def config_changed(cls) -> None:
+        """Po commicie: wymusza przeładowanie obrazu tutaj i w pozostałych workerach"""
+        cls._checked_at = 0.0
+        BrokerService.publish(CONFIG_TOPIC, 'config_changed', {})
+
+    @classmethod
+    def get_setting(cls, key: str, default: Any = None) -> Any:
+        """Pojedyncze ustawienie spoza sekcji (np. logo_path) z obrazu konfiguracji"""
+        value = cls.snapshot().settings.get(key)
+        return default if value is None else value
+
+    def get_config(self, section: Optional[str] = None) -> Dict:
+        """Pobiera konfigurację systemu (kopia z obrazu w pamięci)"""
+        if section and section not in self.DEFAULT_CONFIG:
+            return {}
+        sections = self.snapshot().sections
+        if section:
+            return dict(sections[section])
+        return {name: dict(values) for name, values in sections.items()}
 
     def get_config_value(self, section: str, key: str) -> Any:
         """Pobiera pojedynczą wartość konfiguracji"""
-        try:
-            config = SystemConfig.query.filter_by(key=f'{section}.{key}').first()
-            if config:
-                return config.value
-            return self.DEFAULT_CONFIG.get(section, {}).get(key)
-        except Exception as e:
-            current_app.logger.error(f'Error getting config value: {str(e)}')
-            return self.DEFAULT_CONFIG.get(section, {}).get(key)
+        return self.snapshot().sections.get(section, {}).get(key)
 
     def set_config_value(self, section: str, key: str, value: Any, 
                         user_email: str) -> Tuple[bool, str]:
@@ -110,15 +201,12 @@ class ConfigService(BaseService):
             config = SystemConfig.query.filter_by(key=config_key).first()
             
             if config:
-                old_value = config.value
-                config.value = value
-                config.updated_at = datetime.utcnow()
+                old_value = _decode_value(config.value)
+                config.value = json.dumps(value)
             else:
                 config = SystemConfig(
                     key=config_key,
-                    value=value,
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow()
+                    value=json.dumps(value)
                 )
                 self.add(config)
 
@@ -129,7 +217,9 @@ class ConfigService(BaseService):
                 details=f'Zmieniono konfigurację {config_key} z {old_value if "old_value" in locals() else "domyślnej"} na {value}'
             )
             self.add(log)
+            self.bump_version()
             self.commit()
+            self.config_changed()
 
             return True, "Konfiguracja została zaktualizowana"
         except Exception as e:
@@ -165,7 +255,7 @@ class ConfigService(BaseService):
             if section and section not in self.DEFAULT_CONFIG:
                 return False, "Nieprawidłowa sekcja konfiguracji"
 
-            query = SystemConfig.query
+            query = SystemConfig.query.filter(SystemConfig.key != CONFIG_VERSION_KEY)
             if section:
                 query = query.filter(SystemConfig.key.like(f'{section}.%'))
             
@@ -178,7 +268,9 @@ class ConfigService(BaseService):
                 details=f'Zresetowano konfigurację{f" sekcji {section}" if section else ""} do wartości domyślnych'
             )
             self.add(log)
+            self.bump_version()
             self.commit()
+            self.config_changed()
 
             return True, f"Zresetowano {deleted} ustawień do wartości domyślnych"
         except Exception as e:
@@ -1,15 +1,116 @@
-from typing import List, Dict, Optional, Tuple, Any
-from datetime import datetime
+from typing import List, Dict, Optional, Tuple, Any, Iterable, Iterator, Sequence
+from datetime import date, datetime
 import csv
 import json
 import io
+import os
+import re
+import tempfile
 import xlsxwriter
 from flask import current_app
-from sqlalchemy.orm import joinedload
+from sqlalchemy import case, func
+from sqlalchemy.orm import aliased, joinedload
 
-from models import Tournament, Match, Team, User, SystemLog
+from models import Tournament, Match, Team, User, Year
 from services.base_service import BaseService
 from services.stats_service import StatsService
+from services.standings_service import StandingsService
+from services.logging_service import LoggingService
+
+# Formaty eksportu strumieniowego i ich typy MIME
+STREAM_FORMATS = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson'
+}
+STREAM_CHUNK_ROWS = 500  # wierszy na jeden fragment odpowiedzi i na jedną porcję z kursora
+
+MATCH_EXPORT_COLUMNS = ('match_id', 'year', 'tournament_id', 'tournament_name', 'start_time',
+                        'field_number', 'team1', 'team2', 'team1_score', 'team2_score', 'status')
+MATCH_EXPORT_HEADERS = ['ID meczu', 'Rok', 'ID turnieju', 'Turniej', 'Data', 'Boisko',
+                        'Gospodarz', 'Gość', 'Gole gospodarza', 'Gole gościa', 'Status']
+STANDING_EXPORT_COLUMNS = ('position', 'team_name', 'matches_played', 'wins', 'draws', 'losses',
+                           'goals_for', 'goals_against', 'goal_difference', 'points')
+TEAM_MATCH_EXPORT_COLUMNS = ('date', 'opponent', 'result', 'goals_scored', 'goals_conceded')
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def csv_chunks(rows: Iterable[Sequence], chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[str]:
+    """Wiersze CSV sklejane w fragmenty po chunk_rows; w pamięci jest tylko bieżący fragment"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(items: Iterable[Dict], chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[str]:
+    """Jeden obiekt JSON na linię (NDJSON)"""
+    lines = []
+    for item in items:
+        lines.append(_dumps(item))
+        if len(lines) >= chunk_rows:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def json_chunks(header: Dict, lists: Dict[str, Iterable[Dict]],
+                chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[str]:
+    """Obiekt JSON: pola z header, a pod kluczami lists tablice budowane w trakcie iteracji"""
+    opening = _dumps(header)[:-1]
+    yield opening + (', ' if header and lists else '')
+    for position, (key, items) in enumerate(lists.items()):
+        yield ('' if position == 0 else ', ') + _dumps(key) + ': ['
+        parts, first = [], True
+        for item in items:
+            parts.append(('' if first else ', ') + _dumps(item))
+            first = False
+            if len(parts) >= chunk_rows:
+                yield ''.join(parts)
+                parts = []
+        yield ''.join(parts) + ']'
+    yield '}'
+
+
+def _sheet_name(name: str, year: Optional[int], used: set) -> str:
+    """Unikalna nazwa arkusza Excela (maks. 31 znaków, bez []:*?/\\)"""
+    base = re.sub(r'[\[\]:*?/\\]', ' ', f'{year} {name}' if year else name).strip()[:31] or 'Turniej'
+    candidate, suffix = base, 2
+    while candidate.lower() in used:
+        tail = f' ({suffix})'
+        candidate = base[:31 - len(tail)] + tail
+        suffix += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def _prepend(*parts) -> Iterator:
+    """Łączy pojedyncze elementy i iteratory w jeden strumień"""
+    for part in parts:
+        if isinstance(part, (list, dict)):
+            yield part
+        else:
+            yield from part
 
 class ExportService(BaseService):
     def __init__(self):
@@ -220,6 +321,371 @@ class ExportService(BaseService):
             current_app.logger.error(f'Error exporting global stats: {str(e)}')
             return None, "Wystąpił błąd podczas eksportu"
 
+    def stream_matches(self, format: str = 'csv', year_id: Optional[int] = None,
+                       tournament_id: Optional[int] = None) -> Tuple[Optional[Iterator[str]], str]:
+        """Strumieniowy eksport meczów (np. wielu sezonów) - stała pamięć niezależnie od liczby meczów"""
+        if format not in STREAM_FORMATS:
+            return None, "Nieobsługiwany format"
+
+        criteria = []
+        if year_id is not None:
+            criteria.append(Tournament.year_id == year_id)
+        if tournament_id is not None:
+            criteria.append(Match.tournament_id == tournament_id)
+
+        def generate():
+            rows = self._match_rows(*criteria)
+            if format == 'csv':
+                yield from csv_chunks(_prepend(MATCH_EXPORT_HEADERS,
+                                               ([row[key] for key in MATCH_EXPORT_COLUMNS] for row in rows)))
+            elif format == 'ndjson':
+                yield from ndjson_chunks(rows)
+            else:
+                yield from json_chunks({'year_id': year_id, 'tournament_id': tournament_id}, {'matches': rows})
+
+        return self._guarded(generate(), 'matches'), STREAM_FORMATS[format]
+
+    def stream_tournament(self, tournament_id: int,
+                          format: str = 'csv') -> Tuple[Optional[Iterator[str]], str]:
+        """Strumieniowy eksport turnieju: podsumowanie, tabela i wszystkie mecze"""
+        if format not in STREAM_FORMATS:
+            return None, "Nieobsługiwany format"
+        try:
+            summary = self._tournament_summary(tournament_id)
+            if not summary:
+                return None, "Nie znaleziono turnieju"
+        except Exception as e:
+            current_app.logger.error(f'Error exporting tournament stream: {str(e)}')
+            return None, "Wystąpił błąd podczas eksportu"
+
+        def generate():
+            standings = StandingsService.get_standings(tournament_id)
+            matches = self._match_rows(Match.tournament_id == tournament_id)
+            if format == 'csv':
+                yield from csv_chunks([
+                    ['Nazwa turnieju', summary['tournament_name']],
+                    ['Status', summary['status']],
+                    ['Liczba drużyn', summary['total_teams']],
+                    ['Liczba meczów', summary['total_matches']],
+                    ['Rozegrane mecze', summary['matches_played']],
+                    ['Pozostałe mecze', summary['matches_remaining']],
+                    ['Suma goli', summary['total_goals']],
+                    ['Średnia goli na mecz', summary['avg_goals_per_match']],
+                    [],
+                    ['Pozycja', 'Drużyna', 'Mecze', 'Wygrane', 'Remisy', 'Przegrane',
+                     'Gole strzelone', 'Gole stracone', 'Różnica', 'Punkty'],
+                    *([team[key] for key in STANDING_EXPORT_COLUMNS] for team in standings),
+                    []
+                ])
+                yield from csv_chunks(_prepend(MATCH_EXPORT_HEADERS,
+                                               ([row[key] for key in MATCH_EXPORT_COLUMNS] for row in matches)))
+            elif format == 'ndjson':
+                yield from ndjson_chunks(_prepend(
+                    {'kind': 'tournament', **summary},
+                    ({'kind': 'standing', **{key: team[key] for key in STANDING_EXPORT_COLUMNS}}
+                     for team in standings),
+                    ({'kind': 'match', **row} for row in matches)
+                ))
+            else:
+                yield from json_chunks(summary, {
+                    'teams': ({key: team[key] for key in STANDING_EXPORT_COLUMNS} for team in standings),
+                    'matches': matches
+                })
+
+        return self._guarded(generate(), f'tournament {tournament_id}'), STREAM_FORMATS[format]
+
+    def stream_team_history(self, team_id: int,
+                            format: str = 'csv') -> Tuple[Optional[Iterator[str]], str]:
+        """Strumieniowy eksport historii drużyny; sumy liczone w bazie przed wysłaniem meczów"""
+        if format not in STREAM_FORMATS:
+            return None, "Nieobsługiwany format"
+        try:
+            header = self._team_summary(team_id)
+            if not header:
+                return None, "Nie znaleziono drużyny"
+        except Exception as e:
+            current_app.logger.error(f'Error exporting team history stream: {str(e)}')
+            return None, "Wystąpił błąd podczas eksportu"
+
+        def generate():
+            matches = self._team_match_rows(team_id)
+            if format == 'csv':
+                yield from csv_chunks([
+                    ['Drużyna', header['team_name']],
+                    ['Liczba meczów', header['total_matches']],
+                    ['Gole strzelone', header['total_goals_scored']],
+                    ['Gole stracone', header['total_goals_conceded']],
+                    [],
+                    ['Data', 'Przeciwnik', 'Wynik', 'Gole strzelone', 'Gole stracone']
+                ])
+                yield from csv_chunks([
+                    match['date'].strftime('%Y-%m-%d %H:%M') if match['date'] else '',
+                    match['opponent'], match['result'], match['goals_scored'], match['goals_conceded']
+                ] for match in matches)
+            elif format == 'ndjson':
+                yield from ndjson_chunks(_prepend({'kind': 'team', **header},
+                                                  ({'kind': 'match', **match} for match in matches)))
+            else:
+                yield from json_chunks(header, {'matches': matches})
+
+        return self._guarded(generate(), f'team {team_id}'), STREAM_FORMATS[format]
+
+    def stream_global_stats(self, format: str = 'csv') -> Tuple[Optional[Iterator[str]], str]:
+        """Globalne statystyki jako strumień (sekcje CSV, obiekt JSON albo linia NDJSON na sekcję)"""
+        if format not in STREAM_FORMATS:
+            return None, "Nieobsługiwany format"
+
+        def generate():
+            stats = self.stats_service.get_global_stats()
+            sections = [('Turnieje', 'tournaments'), ('Mecze', 'matches'),
+                        ('Drużyny', 'teams'), ('Użytkownicy', 'users')]
+            if format == 'csv':
+                for position, (title, key) in enumerate(sections):
+                    rows = [[title], *([name, value] for name, value in stats.get(key, {}).items())]
+                    yield from csv_chunks(rows if position == len(sections) - 1 else rows + [[]])
+            elif format == 'ndjson':
+                yield from ndjson_chunks({'kind': key, **value} for key, value in stats.items())
+            else:
+                yield from json_chunks(stats, {})
+
+        return self._guarded(generate(), 'global stats'), STREAM_FORMATS[format]
+
+    def write_workbook(self, path: str, tournament_ids: Optional[List[int]] = None,
+                       year_id: Optional[int] = None) -> Dict:
+        """Zapisuje skoroszyt (arkusz podsumowania + arkusz na turniej) do pliku ``path``.
+
+        Tryb constant_memory xlsxwriter zrzuca każdy wiersz na dysk zaraz po
+        zapisaniu, a mecze są czytane z kursora porcjami - pamięć nie rośnie
+        z liczbą turniejów ani meczów. Wiersze każdego arkusza muszą być więc
+        zapisywane po kolei, a arkusze jeden po drugim.
+        """
+        summaries = self._tournament_summaries(tournament_ids, year_id)
+        if not summaries:
+            raise ValueError('Nie znaleziono turniejów do eksportu')
+
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True,
+                                              'tmpdir': os.path.dirname(path) or None})
+        try:
+            header_format = workbook.add_format({'bold': True, 'align': 'center', 'bg_color': '#D3D3D3'})
+            cell_format = workbook.add_format({'align': 'center'})
+            date_format = workbook.add_format({'align': 'center', 'num_format': 'yyyy-mm-dd hh:mm'})
+
+            summary_sheet = workbook.add_worksheet('Podsumowanie')
+            summary_sheet.set_column(0, 1, 25)
+            summary_sheet.set_column(2, 7, 15)
+            summary_sheet.write_row(0, 0, ['Turniej', 'Sezon', 'Status', 'Drużyny', 'Mecze',
+                                           'Rozegrane mecze', 'Suma goli', 'Średnia goli na mecz'], header_format)
+            for row, summary in enumerate(summaries, start=1):
+                summary_sheet.write_row(row, 0, [
+                    summary['tournament_name'], summary['year'], summary['status'], summary['total_teams'],
+                    summary['total_matches'], summary['matches_played'], summary['total_goals'],
+                    summary['avg_goals_per_match']
+                ], cell_format)
+
+            used_names = {'podsumowanie'}
+            total_matches = 0
+            for summary in summaries:
+                sheet = workbook.add_worksheet(_sheet_name(summary['tournament_name'], summary['year'], used_names))
+                sheet.set_column(0, 0, 18)
+                sheet.set_column(1, 2, 22)
+                sheet.set_column(3, 9, 12)
+                total_matches += self._write_tournament_sheet(
+                    sheet, summary, header_format, cell_format, date_format
+                )
+        finally:
+            workbook.close()
+
+        return {'sheets': len(summaries) + 1, 'tournaments': len(summaries), 'matches': total_matches}
+
+    def export_workbook(self, tournament_ids: Optional[List[int]] = None,
+                        year_id: Optional[int] = None) -> Dict:
+        """Eksport skoroszytu do katalogu instancji (wynik zadania ExportTaskService)"""
+        try:
+            export_dir = os.path.join(current_app.instance_path, 'exports')
+            os.makedirs(export_dir, exist_ok=True)
+            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+            name = f'season_{year_id}' if year_id else 'tournaments'
+            fd, temp_path = tempfile.mkstemp(prefix=f'{name}_{timestamp}_', suffix='.xlsx.part', dir=export_dir)
+            os.close(fd)
+            try:
+                result = self.write_workbook(temp_path, tournament_ids=tournament_ids, year_id=year_id)
+                # Plik pojawia się pod docelową nazwą dopiero w całości
+                export_path = temp_path[:-len('.part')]
+                os.replace(temp_path, export_path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+            return {
+                **result,
+                'export_path': export_path,
+                'filename': os.path.basename(export_path),
+                'size': os.path.getsize(export_path),
+                'executed_at': datetime.utcnow().isoformat()
+            }
+        except Exception as e:
+            current_app.logger.error(f'Error exporting workbook: {str(e)}')
+            raise
+
+    def _write_tournament_sheet(self, sheet, summary: Dict, header_format, cell_format, date_format) -> int:
+        sheet.write_row(0, 0, ['Nazwa turnieju', summary['tournament_name']], header_format)
+        sheet.write_row(1, 0, ['Status', summary['status']], cell_format)
+        sheet.write_row(2, 0, ['Liczba meczów', summary['total_matches']], cell_format)
+        sheet.write_row(3, 0, ['Suma goli', summary['total_goals']], cell_format)
+
+        row = 5
+        sheet.write_row(row, 0, ['Pozycja', 'Drużyna', 'Mecze', 'Wygrane', 'Remisy', 'Przegrane',
+                                 'Gole strzelone', 'Gole stracone', 'Różnica', 'Punkty'], header_format)
+        for team in StandingsService.get_standings(summary['tournament_id']):
+            row += 1
+            sheet.write_row(row, 0, [team[key] for key in STANDING_EXPORT_COLUMNS], cell_format)
+
+        row += 2
+        sheet.write_row(row, 0, ['Data', 'Gospodarz', 'Gość', 'Gole gospodarza', 'Gole gościa',
+                                 'Boisko', 'Status'], header_format)
+        matches = 0
+        for match in self._match_rows(Match.tournament_id == summary['tournament_id']):
+            row += 1
+            matches += 1
+            if match['start_time']:
+                sheet.write_datetime(row, 0, match['start_time'], date_format)
+            sheet.write_row(row, 1, [match['team1'], match['team2'], match['team1_score'],
+                                     match['team2_score'], match['field_number'], match['status']], cell_format)
+        return matches
+
+    def _tournament_summaries(self, tournament_ids: Optional[List[int]] = None,
+                              year_id: Optional[int] = None) -> List[Dict]:
+        """Podsumowania wielu turniejów jednym zapytaniem grupującym"""
+        finished = Match.status == 'finished'
+        team_counts = self.db.session.query(
+            Team.tournament_id, func.count(Team.id).label('teams')
+        ).group_by(Team.tournament_id).subquery()
+        query = self.db.session.query(
+            Tournament.id, Tournament.name, Year.year, Tournament.status,
+            func.coalesce(team_counts.c.teams, 0),
+            func.count(Match.id),
+            func.count(case((finished, 1))),
+            func.coalesce(func.sum(case(
+                (finished, func.coalesce(Match.team1_score, 0) + func.coalesce(Match.team2_score, 0)),
+                else_=0
+            )), 0)
+        ).join(Year, Tournament.year_id == Year.id).outerjoin(
+            team_counts, team_counts.c.tournament_id == Tournament.id
+        ).outerjoin(Match, Match.tournament_id == Tournament.id)
+
+        if tournament_ids:
+            query = query.filter(Tournament.id.in_(tournament_ids))
+        if year_id is not None:
+            query = query.filter(Tournament.year_id == year_id)
+        query = query.group_by(Tournament.id, Tournament.name, Year.year, Tournament.status,
+                               team_counts.c.teams).order_by(Year.year, Tournament.id)
+
+        return [{
+            'tournament_id': tournament_id,
+            'tournament_name': name,
+            'year': year,
+            'status': status,
+            'total_teams': teams,
+            'total_matches': total,
+            'matches_played': played,
+            'total_goals': goals,
+            'avg_goals_per_match': round(goals / played, 2) if played else 0
+        } for tournament_id, name, year, status, teams, total, played, goals in query]
+
+    def _match_rows(self, *criteria) -> Iterator[Dict]:
+        """Mecze jako słowniki kolumn, pobierane z kursora porcjami (bez obiektów ORM)"""
+        team1, team2 = aliased(Team), aliased(Team)
+        query = self.db.session.query(
+            Match.id, Year.year, Match.tournament_id, Tournament.name, Match.start_time,
+            Match.field_number, team1.name, team2.name, Match.team1_score, Match.team2_score,
+            Match.status
+        ).join(Tournament, Match.tournament_id == Tournament.id).join(
+            Year, Tournament.year_id == Year.id
+        ).join(team1, Match.team1_id == team1.id).join(
+            team2, Match.team2_id == team2.id
+        ).filter(*criteria).order_by(Year.year, Match.tournament_id, Match.start_time, Match.id)
+
+        for row in query.yield_per(STREAM_CHUNK_ROWS):
+            yield dict(zip(MATCH_EXPORT_COLUMNS, row))
+
+    def _team_match_rows(self, team_id: int) -> Iterator[Dict]:
+        """Rozegrane mecze drużyny z jej perspektywy (przeciwnik, wynik W/D/L)"""
+        team1, team2 = aliased(Team), aliased(Team)
+        query = self.db.session.query(
+            Match.start_time, Match.team1_id, team1.name, team2.name, Match.team1_score, Match.team2_score
+        ).join(team1, Match.team1_id == team1.id).join(team2, Match.team2_id == team2.id).filter(
+            (Match.team1_id == team_id) | (Match.team2_id == team_id),
+            Match.status == 'finished'
+        ).order_by(Match.start_time, Match.id)
+
+        for start_time, team1_id, team1_name, team2_name, score1, score2 in query.yield_per(STREAM_CHUNK_ROWS):
+            home = team1_id == team_id
+            scored, conceded = (score1, score2) if home else (score2, score1)
+            scored, conceded = scored or 0, conceded or 0
+            yield {
+                'date': start_time,
+                'opponent': team2_name if home else team1_name,
+                'result': 'W' if scored > conceded else 'L' if scored < conceded else 'D',
+                'goals_scored': scored,
+                'goals_conceded': conceded
+            }
+
+    def _tournament_summary(self, tournament_id: int) -> Optional[Dict]:
+        """Podsumowanie turnieju z agregatów SQL zamiast ładowania wszystkich meczów"""
+        tournament = Tournament.query.get(tournament_id)
+        if not tournament:
+            return None
+
+        finished = Match.status == 'finished'
+        total, played, goals = self.db.session.query(
+            func.count(Match.id),
+            func.count(case((finished, 1))),
+            func.coalesce(func.sum(case(
+                (finished, func.coalesce(Match.team1_score, 0) + func.coalesce(Match.team2_score, 0)),
+                else_=0
+            )), 0)
+        ).filter(Match.tournament_id == tournament_id).one()
+
+        return {
+            'tournament_name': tournament.name,
+            'status': tournament.status,
+            'total_teams': Team.query.filter_by(tournament_id=tournament_id).count(),
+            'total_matches': total,
+            'matches_played': played,
+            'matches_remaining': total - played,
+            'total_goals': goals,
+            'avg_goals_per_match': round(goals / played, 2) if played else 0
+        }
+
+    def _team_summary(self, team_id: int) -> Optional[Dict]:
+        team = Team.query.get(team_id)
+        if not team:
+            return None
+
+        home = Match.team1_id == team_id
+        matches, scored, conceded = self.db.session.query(
+            func.count(Match.id),
+            func.coalesce(func.sum(case((home, Match.team1_score), else_=Match.team2_score)), 0),
+            func.coalesce(func.sum(case((home, Match.team2_score), else_=Match.team1_score)), 0)
+        ).filter((Match.team1_id == team_id) | (Match.team2_id == team_id),
+                 Match.status == 'finished').one()
+
+        return {
+            'team_name': team.name,
+            'total_matches': matches,
+            'total_goals_scored': scored,
+            'total_goals_conceded': conceded
+        }
+
+    @staticmethod
+    def _guarded(chunks: Iterator[str], what: str) -> Iterator[str]:
+        """Nagłówki są już wysłane, więc błąd w trakcie strumienia tylko logujemy i kończymy"""
+        try:
+            yield from chunks
+        except Exception as e:
+            current_app.logger.error(f'Error streaming export of {what}: {str(e)}')
+
     def log_export(self, user_email: str, export_type: str, 
                   format: str, entity_id: Optional[int] = None) -> None:
         """Loguje operację eksportu"""
@@ -228,13 +694,6 @@ class ExportService(BaseService):
             if entity_id:
                 details += f' (ID: {entity_id})'
 
-            log = SystemLog(
-                type='info',
-                user=user_email,
-                action='export_data',
-                details=details
-            )
-            self.add(log)
-            self.commit()
+            LoggingService.add_log(type='info', user=user_email, action='export_data', details=details)
         except Exception as e:
             current_app.logger.error(f'Error logging export: {str(e)}') 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from datetime import datetime
 from flask import current_app
 
@@ -18,14 +18,16 @@ class ExportTaskService(BaseService):
                              user_id: Optional[int] = None) -> str:
         """Rozpoczyna zadanie eksportu danych turnieju"""
         try:
+            if format == 'excel':
+                # Skoroszyt trafia do pliku w trybie constant_memory - wynikiem jest ścieżka
+                return self.export_workbook(tournament_ids=[tournament_id], user_id=user_id)
+
             # Wybierz odpowiednią funkcję eksportu
             export_func = None
             if format == 'csv':
                 export_func = self.export_service.export_tournament_to_csv
             elif format == 'json':
                 export_func = self.export_service.export_tournament_to_json
-            elif format == 'excel':
-                export_func = self.export_service.export_tournament_to_excel
             else:
                 raise ValueError(f'Nieobsługiwany format eksportu: {format}')
 
@@ -44,6 +46,26 @@ class ExportTaskService(BaseService):
             current_app.logger.error(f'Error starting tournament export task: {str(e)}')
             raise
 
+    def export_workbook(self, tournament_ids: Optional[List[int]] = None, year_id: Optional[int] = None,
+                        user_id: Optional[int] = None) -> str:
+        """Rozpoczyna eksport skoroszytu Excel (arkusz na turniej) dla sezonu lub listy turniejów"""
+        try:
+            scope = f'sezonu {year_id}' if year_id else f'turniejów {", ".join(map(str, tournament_ids or []))}'
+            task_id = self.task_service.submit_task(
+                function=self.export_service.export_workbook,
+                name=f'Export Excel {scope}',
+                description=f'Eksport skoroszytu Excel {scope}',
+                kwargs={'tournament_ids': list(tournament_ids) if tournament_ids else None, 'year_id': year_id},
+                user_id=user_id,
+                notify_user=True,
+                lane='process'
+            )
+
+            return task_id
+        except Exception as e:
+            current_app.logger.error(f'Error starting workbook export task: {str(e)}')
+            raise
+
     def export_team_history(self, team_id: int, format: str,
                           user_id: Optional[int] = None) -> str:
         """Rozpoczyna zadanie eksportu historii drużyny"""
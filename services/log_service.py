@@ -1,10 +1,112 @@
-from typing import List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
-from sqlalchemy import desc
+from itertools import groupby
+import base64
+import json
+import zlib
+from sqlalchemy import desc, and_, or_
 from flask import current_app
 
-from models import SystemLog
+from models import SystemLog, SystemLogArchive
 from services.base_service import BaseService
+from services.logging_service import LoggingService
+
+LOG_COLUMNS = ('id', 'timestamp', 'type', 'user', 'action', 'details')
+
+
+def encode_cursor(timestamp: datetime, log_id: int) -> str:
+    """Kursor strony: pozycja (timestamp, id) wpisu na jej krawędzi"""
+    return base64.urlsafe_b64encode(f'{timestamp.isoformat()}|{log_id}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Odczytuje kursor; ValueError przy uszkodzonej wartości"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, log_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except Exception:
+        raise ValueError(f'Invalid log cursor: {cursor}')
+
+
+def pack_logs(rows: List[Dict]) -> bytes:
+    lines = '\n'.join(json.dumps({**row, 'timestamp': row['timestamp'].isoformat()}) for row in rows)
+    return zlib.compress(lines.encode('utf-8'), 9)
+
+
+def unpack_logs(payload: bytes) -> List[Dict]:
+    rows = []
+    for line in zlib.decompress(payload).decode('utf-8').splitlines():
+        row = json.loads(line)
+        row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+        rows.append(row)
+    return rows
+
+
+class LogPage:
+    """Strona logów stronicowana kursorem (timestamp, id) zamiast OFFSET"""
+
+    def __init__(self, items: List[SystemLog], next_cursor: Optional[str], prev_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor  # starsze wpisy
+        self.prev_cursor = prev_cursor  # nowsze wpisy
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+
+class LogFilters:
+    """Filtry listy logów stosowane do zapytania i do wierszy z archiwum"""
+
+    def __init__(self, log_type: Optional[str] = None, action: Optional[str] = None,
+                 user: Optional[str] = None, start_date: Optional[datetime] = None,
+                 end_date: Optional[datetime] = None):
+        self.log_type = log_type
+        self.action = action
+        self.user = user
+        self.start_date = start_date
+        self.end_date = end_date
+
+    @classmethod
+    def from_args(cls, args) -> 'LogFilters':
+        """Filtry z parametrów żądania (daty w formacie RRRR-MM-DD)"""
+        start_date = args.get('start_date')
+        end_date = args.get('end_date')
+        return cls(
+            log_type=args.get('type') or None,
+            action=args.get('action') or None,
+            user=args.get('user') or None,
+            start_date=datetime.strptime(start_date, '%Y-%m-%d') if start_date else None,
+            # Dodajemy 23:59:59 do daty końcowej, aby uwzględnić cały dzień
+            end_date=datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
+            if end_date else None
+        )
+
+    def apply(self, query):
+        if self.log_type:
+            query = query.filter(SystemLog.type == self.log_type)
+        if self.action:
+            query = query.filter(SystemLog.action == self.action)
+        if self.user:
+            query = query.filter(SystemLog.user.ilike(f'%{self.user}%'))
+        if self.start_date:
+            query = query.filter(SystemLog.timestamp >= self.start_date)
+        if self.end_date:
+            query = query.filter(SystemLog.timestamp <= self.end_date)
+        return query
+
+    def matches(self, row: Dict) -> bool:
+        return ((not self.log_type or row['type'] == self.log_type)
+                and (not self.action or row['action'] == self.action)
+                and (not self.user or self.user.lower() in (row['user'] or '').lower())
+                and (not self.start_date or row['timestamp'] >= self.start_date)
+                and (not self.end_date or row['timestamp'] <= self.end_date))
+
 
 class LogService(BaseService):
     def get_logs(self, page: int = 1, per_page: int = 50, 
@@ -114,40 +216,157 @@ class LogService(BaseService):
             }
 
     def clear_old_logs(self, days: int = 90) -> Tuple[bool, str]:
-        """Usuwa stare logi starsze niż określona liczba dni"""
+        """Przenosi do archiwum logi starsze niż określona liczba dni"""
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
-            deleted = SystemLog.query.filter(
-                SystemLog.timestamp < cutoff_date
-            ).delete()
+            archived = self.archive_logs(cutoff_date)
 
             log = SystemLog(
                 type='warning',
                 user='system',
                 action='clear_old_logs',
-                details=f'Usunięto {deleted} starych logów starszych niż {days} dni'
+                details=f'Zarchiwizowano {archived} logów starszych niż {days} dni'
             )
             self.add(log)
             self.commit()
 
-            return True, f"Usunięto {deleted} starych logów"
+            return True, f"Zarchiwizowano {archived} starych logów"
         except Exception as e:
             current_app.logger.error(f'Error clearing old logs: {str(e)}')
             return False, "Wystąpił błąd podczas czyszczenia starych logów"
 
     def add_system_log(self, log_type: str, action: str, details: str, 
                       user: str = 'system') -> bool:
-        """Dodaje nowy log systemowy"""
+        """Dodaje nowy log systemowy (przez buforowany zapis LoggingService)"""
         try:
-            log = SystemLog(
-                type=log_type,
-                user=user,
-                action=action,
-                details=details
-            )
-            self.add(log)
-            self.commit()
+            LoggingService.add_log(type=log_type, user=user, action=action, details=details)
             return True
         except Exception as e:
             current_app.logger.error(f'Error adding system log: {str(e)}')
-            return False 
\ No newline at end of file
+            return False
+
+    def get_logs_page(self, cursor: Optional[str] = None, direction: str = 'next',
+                      per_page: int = 20, filters: Optional[LogFilters] = None,
+                      include_archive: bool = False) -> LogPage:
+        """Strona logów od najnowszych, stronicowana kursorem (timestamp, id).
+
+        Koszt strony nie zależy od jej numeru - zapytanie schodzi indeksem
+        ix_system_log_timestamp_id od pozycji kursora. Z include_archive strona,
+        której brakuje wierszy w system_log, jest uzupełniana z archiwum.
+        direction='prev' pobiera stronę nowszą od kursora.
+        """
+        filters = filters or LogFilters()
+        key = decode_cursor(cursor) if cursor else None
+        older = direction != 'prev'
+
+        query = filters.apply(SystemLog.query)
+        if key is not None:
+            timestamp, log_id = key
+            if older:
+                query = query.filter(or_(SystemLog.timestamp < timestamp,
+                                         and_(SystemLog.timestamp == timestamp, SystemLog.id < log_id)))
+            else:
+                query = query.filter(or_(SystemLog.timestamp > timestamp,
+                                         and_(SystemLog.timestamp == timestamp, SystemLog.id > log_id)))
+        if older:
+            query = query.order_by(SystemLog.timestamp.desc(), SystemLog.id.desc())
+        else:
+            query = query.order_by(SystemLog.timestamp.asc(), SystemLog.id.asc())
+
+        # Jeden wiersz ponad stronę mówi, czy istnieje kolejna
+        items = query.limit(per_page + 1).all()
+        if include_archive and older and len(items) <= per_page:
+            items.extend(self._archived_logs(key, older, filters, per_page + 1 - len(items)))
+        elif include_archive and not older:
+            # Archiwum jest starsze od system_log, więc idąc w górę poprzedza jego wiersze
+            items = self._archived_logs(key, older, filters, per_page + 1) + items
+
+        has_more = len(items) > per_page
+        items = items[:per_page]
+        if not older:
+            items.reverse()
+        if not items:
+            return LogPage([], None, None)
+
+        first, last = items[0], items[-1]
+        next_cursor = encode_cursor(last.timestamp, last.id) if (has_more or not older) else None
+        prev_cursor = encode_cursor(first.timestamp, first.id) if (key is not None and (older or has_more)) else None
+        return LogPage(items, next_cursor, prev_cursor)
+
+    def _archived_logs(self, key: Optional[Tuple[datetime, int]], older: bool,
+                       filters: LogFilters, limit: int) -> List[SystemLog]:
+        """Wpisy z archiwum za kursorem; paczki rozpakowywane tylko w potrzebnym zakresie"""
+        query = SystemLogArchive.query
+        if older:
+            if key is not None:
+                query = query.filter(SystemLogArchive.first_timestamp <= key[0])
+            if filters.start_date:
+                query = query.filter(SystemLogArchive.last_timestamp >= filters.start_date)
+            query = query.order_by(SystemLogArchive.last_timestamp.desc(), SystemLogArchive.last_log_id.desc())
+        else:
+            if key is not None:
+                query = query.filter(SystemLogArchive.last_timestamp >= key[0])
+            if filters.end_date:
+                query = query.filter(SystemLogArchive.first_timestamp <= filters.end_date)
+            query = query.order_by(SystemLogArchive.first_timestamp.asc(), SystemLogArchive.first_log_id.asc())
+
+        result = []
+        for chunk in query.yield_per(10):
+            rows = unpack_logs(chunk.payload)
+            if older:
+                rows.reverse()
+            for row in rows:
+                position = (row['timestamp'], row['id'])
+                if key is not None and (position >= key if older else position <= key):
+                    continue
+                if filters.matches(row):
+                    # Obiekt tylko do odczytu - nie jest dodawany do sesji
+                    result.append(SystemLog(**row))
+                    if len(result) >= limit:
+                        return result
+        return result
+
+    def archive_logs(self, before: datetime, batch_size: int = 5000) -> int:
+        """Przenosi wpisy starsze niż ``before`` do skompresowanych paczek miesięcznych.
+
+        Każda partia to jedna transakcja: zapis paczek i usunięcie przeniesionych
+        wierszy, więc przerwane archiwizowanie nie gubi ani nie dubluje wpisów.
+        """
+        archived = 0
+        columns = [getattr(SystemLog, name) for name in LOG_COLUMNS]
+        try:
+            while True:
+                rows = [dict(zip(LOG_COLUMNS, row)) for row in self.db.session.query(*columns).filter(
+                    SystemLog.timestamp < before
+                ).order_by(SystemLog.timestamp.asc(), SystemLog.id.asc()).limit(batch_size).all()]
+                if not rows:
+                    return archived
+
+                for month, month_rows in groupby(rows, key=lambda row: row['timestamp'].strftime('%Y-%m')):
+                    month_rows = list(month_rows)
+                    self.add(SystemLogArchive(
+                        month=month,
+                        first_timestamp=month_rows[0]['timestamp'],
+                        last_timestamp=month_rows[-1]['timestamp'],
+                        first_log_id=month_rows[0]['id'],
+                        last_log_id=month_rows[-1]['id'],
+                        row_count=len(month_rows),
+                        payload=pack_logs(month_rows)
+                    ))
+                SystemLog.query.filter(SystemLog.id.in_([row['id'] for row in rows])).delete(
+                    synchronize_session=False
+                )
+                self.commit()
+                archived += len(rows)
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f'Error archiving logs: {str(e)}')
+            raise
+
+    def iter_archived_logs(self, month: str) -> Iterator[Dict]:
+        """Wszystkie zarchiwizowane wpisy z miesiąca ('RRRR-MM'), rosnąco"""
+        chunks = SystemLogArchive.query.filter_by(month=month).order_by(
+            SystemLogArchive.first_timestamp.asc(), SystemLogArchive.first_log_id.asc()
+        )
+        for chunk in chunks.yield_per(10):
+            yield from unpack_logs(chunk.payload)
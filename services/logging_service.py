@@ -5,9 +5,11 @@ import fcntl
 import platform
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict
-from sqlalchemy import desc
+from sqlalchemy import desc, insert
 from models import SystemLog, db
 from flask import current_app
+from services.audit_log_writer import AuditLogWriter
+import atexit
 import time
 
 class SafeRotatingFileHandler(RotatingFileHandler):
@@ -76,6 +78,40 @@ class SafeRotatingFileHandler(RotatingFileHandler):
             self.release_lock(lock_file)
 
 class LoggingService:
+    _writer: Optional[AuditLogWriter] = None
+
+    @classmethod
+    def init_audit_writer(cls, app) -> None:
+        """Uruchamia buforowany zapis logów systemowych (AUDIT_LOG_ASYNC)"""
+        previous, cls._writer = cls._writer, None
+        if previous is not None:
+            previous.close()
+        if not app.config.get('AUDIT_LOG_ASYNC', True):
+            return
+
+        def insert_logs(rows):
+            with app.app_context():
+                try:
+                    db.session.execute(insert(SystemLog), rows)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+
+        cls._writer = AuditLogWriter(
+            insert_logs,
+            batch_size=app.config.get('AUDIT_LOG_BATCH_SIZE', 100),
+            flush_interval=app.config.get('AUDIT_LOG_FLUSH_INTERVAL', 1.0),
+            buffer_size=app.config.get('AUDIT_LOG_BUFFER_SIZE', 10000),
+            enqueue_timeout=app.config.get('AUDIT_LOG_ENQUEUE_TIMEOUT', 0.5)
+        ).start()
+        atexit.register(cls._writer.close)
+
+    @classmethod
+    def flush_logs(cls, timeout: Optional[float] = 5.0) -> bool:
+        """Czeka na zapis wpisów z bufora (np. przed odczytem logów w testach)"""
+        return cls._writer.flush(timeout) if cls._writer is not None else True
+
     @staticmethod
     def setup_logging(app):
         """Configure logging system with error handling."""
@@ -123,20 +159,29 @@ class LoggingService:
             # Fallback to basic logging
             logging.basicConfig(level=logging.INFO)
 
-    @staticmethod
-    def add_log(type: str, user: str, action: str, details: Optional[str] = None) -> Optional[SystemLog]:
-        """Safely add logs with error handling."""
+    @classmethod
+    def add_log(cls, type: str, user: str, action: str, details: Optional[str] = None) -> Optional[SystemLog]:
+        """Safely add logs with error handling.
+
+        With the buffered writer the entry is queued and saved in a batch on a
+        background thread - the caller's session is not touched or committed
+        and None is returned. Otherwise the entry is inserted and committed.
+        """
         try:
-            log = SystemLog(
-                type=type,
-                user=user,
-                action=action,
-                details=details,
-                timestamp=datetime.utcnow()
-            )
-            
-            db.session.add(log)
-            db.session.commit()
+            record = {
+                'type': type,
+                'user': user,
+                'action': action,
+                'details': details,
+                'timestamp': datetime.utcnow()
+            }
+            log = None
+            if cls._writer is not None:
+                cls._writer.write(record)
+            else:
+                log = SystemLog(**record)
+                db.session.add(log)
+                db.session.commit()
 
             # Log to file
             message = f"{action}: {details}" if details else action
@@ -228,12 +273,12 @@ class LoggingService:
 
     @staticmethod
     def clear_old_logs(days: int = 30) -> bool:
-        """Safely clear old logs."""
+        """Safely move old logs to the monthly archive."""
+        from services.log_service import LogService
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
-            deleted = SystemLog.query.filter(SystemLog.timestamp < cutoff_date).delete()
-            db.session.commit()
-            current_app.logger.info(f"Deleted {deleted} old logs")
+            archived = LogService().archive_logs(cutoff_date)
+            current_app.logger.info(f"Archived {archived} old logs")
             return True
 
         except Exception as e:
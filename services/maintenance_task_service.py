@@ -28,7 +28,8 @@ class MaintenanceTaskService(BaseService):
                 description=f'Usuwanie logów starszych niż {days} dni',
                 args=(days,),
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                priority='batch'
             )
 
             return task_id
@@ -58,7 +59,8 @@ class MaintenanceTaskService(BaseService):
                 name='Czyszczenie cache systemu',
                 description='Usuwanie wygasłych wpisów z cache',
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                priority='batch'
             )
 
             return task_id
@@ -98,7 +100,8 @@ class MaintenanceTaskService(BaseService):
                 description=f'Usuwanie zakończonych zadań starszych niż {days} dni',
                 args=(days,),
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                priority='batch'
             )
 
             return task_id
@@ -128,7 +131,8 @@ class MaintenanceTaskService(BaseService):
                 name='Sprawdzenie stanu systemu',
                 description='Kompleksowe sprawdzenie stanu systemu',
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                priority='batch'
             )
 
             return task_id
@@ -1,10 +1,11 @@
 from typing import Optional, Dict, List, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime
 from flask import current_app
-from sqlalchemy.orm import joinedload
 
 from models import Match, Tournament, Team
 from services.base_service import BaseService
+from services.broker_service import BrokerService
+from services.query_service import QueryService
 from services.notification_service import NotificationService
 from services.task_service import TaskService
 
@@ -17,11 +18,7 @@ class MatchService(BaseService):
     def get_match(self, match_id: int) -> Optional[Match]:
         """Pobiera mecz z relacjami"""
         try:
-            return Match.query.options(
-                joinedload(Match.team1),
-                joinedload(Match.team2),
-                joinedload(Match.tournament)
-            ).get(match_id)
+            return QueryService.get_match(match_id, 'match_list')
         except Exception as e:
             current_app.logger.error(f'Error getting match: {str(e)}')
             return None
@@ -29,10 +26,7 @@ class MatchService(BaseService):
     def get_tournament_matches(self, tournament_id: int) -> List[Match]:
         """Pobiera wszystkie mecze turnieju"""
         try:
-            return Match.query.options(
-                joinedload(Match.team1),
-                joinedload(Match.team2)
-            ).filter_by(tournament_id=tournament_id).all()
+            return QueryService.tournament_matches(tournament_id)
         except Exception as e:
             current_app.logger.error(f'Error getting tournament matches: {str(e)}')
             return []
@@ -67,7 +61,8 @@ class MatchService(BaseService):
                 function=self.notification_service.notify_match_created,
                 name=f'Powiadomienie o utworzeniu meczu {match.id}',
                 args=(match.id,),
-                notify_user=True
+                notify_user=True,
+                priority='realtime'
             )
 
             return match
@@ -106,16 +101,20 @@ class MatchService(BaseService):
             if not match or match.status != 'planned':
                 return False
 
+            now = datetime.utcnow()
             match.status = 'ongoing'
-            match.start_time = datetime.utcnow()
+            match.start_time = now
+            match.start_clock(now)
             self.commit()
+            BrokerService.publish_match_clock(match)
 
             # Zaplanuj powiadomienia
             self.task_service.submit_task(
                 function=self.notification_service.notify_match_start,
                 name=f'Powiadomienia o rozpoczęciu meczu {match_id}',
                 args=(match_id,),
-                notify_user=True
+                notify_user=True,
+                priority='realtime'
             )
 
             return True
@@ -132,14 +131,17 @@ class MatchService(BaseService):
                 return False
 
             match.status = 'finished'
+            match.stop_clock()
             self.commit()
+            BrokerService.publish_match_clock(match)
 
             # Zaplanuj powiadomienia
             self.task_service.submit_task(
                 function=self.notification_service.notify_match_end,
                 name=f'Powiadomienia o zakończeniu meczu {match_id}',
                 args=(match_id,),
-                notify_user=True
+                notify_user=True,
+                priority='realtime'
             )
 
             return True
@@ -179,9 +181,9 @@ class MatchService(BaseService):
             if not match or match.status != 'ongoing':
                 return False
 
-            match.is_timer_paused = True
-            match.elapsed_time = self._calculate_elapsed_time(match)
+            match.pause_clock()
             self.commit()
+            BrokerService.publish_match_clock(match)
             return True
         except Exception as e:
             current_app.logger.error(f'Error pausing match timer: {str(e)}')
@@ -195,9 +197,9 @@ class MatchService(BaseService):
             if not match or match.status != 'ongoing':
                 return False
 
-            match.is_timer_paused = False
-            match.start_time = datetime.utcnow() - timedelta(seconds=match.elapsed_time)
+            match.resume_clock()
             self.commit()
+            BrokerService.publish_match_clock(match)
             return True
         except Exception as e:
             current_app.logger.error(f'Error resuming match timer: {str(e)}')
@@ -205,10 +207,8 @@ class MatchService(BaseService):
             return False
 
     def _calculate_elapsed_time(self, match: Match) -> int:
-        """Oblicza czas, który upłynął od rozpoczęcia meczu"""
-        if match.is_timer_paused:
-            return match.elapsed_time
-        return int((datetime.utcnow() - match.start_time).total_seconds())
+        """Oblicza czas gry z zegara meczu"""
+        return match.clock_elapsed()
 
     def get_match_status(self, match_id: int) -> Dict:
         """Pobiera szczegółowy status meczu"""
@@ -234,7 +234,8 @@ class MatchService(BaseService):
                 'start_time': match.start_time.isoformat() if match.start_time else None,
                 'field_number': match.field_number,
                 'is_timer_paused': match.is_timer_paused,
-                'elapsed_time': self._calculate_elapsed_time(match) if match.status == 'ongoing' else 0
+                'elapsed_time': self._calculate_elapsed_time(match) if match.status == 'ongoing' else 0,
+                'clock': match.clock_state()
             }
         except Exception as e:
             current_app.logger.error(f'Error getting match status: {str(e)}')
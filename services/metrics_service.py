@@ -0,0 +1,327 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from collections import deque
+from datetime import datetime
+import bisect
+import threading
+import time
+from flask import current_app, g, request
+
+# Przedziały histogramu czasu odpowiedzi (sekundy)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Wspólna część metryk: nazwa, opis, etykiety i blokada"""
+    type = 'untyped'
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def _matches(self, key: LabelValues, labels: Dict[str, str]) -> bool:
+        """Czy seria pasuje do podanych (być może niepełnych) etykiet"""
+        return all(key[self.labels.index(name)] == str(value) for name, value in labels.items())
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.type}']
+
+
+class Counter(Metric):
+    """Licznik rosnący monotonicznie"""
+    type = 'counter'
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Suma serii pasujących do etykiet (bez etykiet - suma wszystkich)"""
+        with self._lock:
+            return sum(value for key, value in self._values.items() if self._matches(key, labels))
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}')
+        return lines
+
+
+class Gauge(Metric):
+    """Wartość chwilowa - ustawiana ręcznie albo odczytywana przy eksporcie z funkcji"""
+    type = 'gauge'
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (),
+                 collect: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def values(self) -> Dict[LabelValues, float]:
+        if self._collect is not None:
+            try:
+                return dict(self._collect())
+            except Exception as e:
+                current_app.logger.error(f'Error collecting metric {self.name}: {str(e)}')
+                return {}
+        with self._lock:
+            return dict(self._values)
+
+    def value(self, **labels) -> float:
+        return self.values().get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, value in sorted(self.values().items()):
+            lines.append(f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram(Metric):
+    """Histogram o stałych przedziałach - obserwacja to bisect i dwa dodawania"""
+    type = 'histogram'
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, list] = {}  # etykiety -> [liczniki przedziałów, suma, liczba]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def summary(self, **labels) -> Dict:
+        """Liczba, suma i przybliżone percentyle (górna granica przedziału) pasujących serii"""
+        counts, total, count = [0] * (len(self.buckets) + 1), 0.0, 0
+        with self._lock:
+            for key, series in self._series.items():
+                if self._matches(key, labels):
+                    counts = [a + b for a, b in zip(counts, series[0])]
+                    total += series[1]
+                    count += series[2]
+        result = {'count': count, 'sum': round(total, 6)}
+        for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+            result[name] = self._quantile(counts, count, fraction)
+        return result
+
+    def _quantile(self, counts: List[int], count: int, fraction: float) -> Optional[float]:
+        if not count:
+            return None
+        rank = fraction * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {count}')
+        return lines
+
+
+class MetricsService:
+    """Rejestr metryk procesu eksportowany w formacie tekstowym Prometheusa.
+
+    Liczniki i histogramy żyją w pamięci procesu (każdy worker ma własne,
+    Prometheus sumuje je po stronie serwera). Wartości zależne od stanu
+    (głębokość kolejki, subskrybenci, pula połączeń) są odczytywane dopiero
+    przy eksporcie. Bufor pierścieniowy trzyma ostatnie migawki dla panelu admina.
+    """
+    _metrics: Dict[str, Metric] = {}
+    _lock = threading.Lock()
+    _history: deque = deque(maxlen=1440)
+
+    @classmethod
+    def register(cls, metric: Metric) -> Metric:
+        with cls._lock:
+            return cls._metrics.setdefault(metric.name, metric)
+
+    @classmethod
+    def counter(cls, name: str, description: str, labels: Sequence[str] = ()) -> Counter:
+        return cls.register(Counter(name, description, labels))
+
+    @classmethod
+    def gauge(cls, name: str, description: str, labels: Sequence[str] = (),
+              collect: Optional[Callable[[], Dict[LabelValues, float]]] = None) -> Gauge:
+        gauge = cls.register(Gauge(name, description, labels, collect))
+        if collect is not None:
+            gauge._collect = collect  # kolejne wywołanie init_app wskazuje nową aplikację
+        return gauge
+
+    @classmethod
+    def histogram(cls, name: str, description: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return cls.register(Histogram(name, description, labels, buckets))
+
+    @classmethod
+    def get(cls, name: str) -> Optional[Metric]:
+        return cls._metrics.get(name)
+
+    @classmethod
+    def init_app(cls, app) -> None:
+        """Rejestruje pomiar czasu żądań i metryki odczytywane przy eksporcie"""
+        cls._history = deque(cls._history, maxlen=app.config.get('METRICS_HISTORY_SIZE', 1440))
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+
+        app.before_request(_start_timer)
+        app.after_request(_observe_request)
+
+        cls.gauge('task_queue_depth', 'Tasks waiting in the queue per lane', ('lane',),
+                  collect=lambda: _task_queue_depth(app))
+        cls.gauge('broker_subscribers', 'Live update subscribers (SSE streams and Socket.IO bridge)',
+                  collect=_broker_subscribers)
+        cls.gauge('db_pool_connections', 'Database pool connections by state', ('state',),
+                  collect=lambda: _db_pool_usage(app))
+
+    @classmethod
+    def render(cls) -> str:
+        """Wszystkie metryki w formacie tekstowym (text/plain; version=0.0.4)"""
+        with cls._lock:
+            metrics = sorted(cls._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def snapshot(cls) -> Dict:
+        """Zapisuje w buforze pierścieniowym migawkę najważniejszych wartości"""
+        latency = REQUEST_LATENCY.summary()
+        entry = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'requests': REQUEST_COUNT.value(),
+            'request_latency_p95': latency['p95'],
+            'cache_hits': CACHE_REQUESTS.value(result='hit') + CACHE_REQUESTS.value(result='stale'),
+            'cache_misses': CACHE_REQUESTS.value(result='miss'),
+            'task_queue_depth': sum(cls._gauge_values('task_queue_depth').values()),
+            'broker_subscribers': sum(cls._gauge_values('broker_subscribers').values()),
+            'socketio_clients': SOCKETIO_CLIENTS.value(),
+            'db_pool_checked_out': cls._gauge_values('db_pool_connections').get(('checked_out',), 0)
+        }
+        cls._history.append(entry)
+        return entry
+
+    @classmethod
+    def _gauge_values(cls, name: str) -> Dict[LabelValues, float]:
+        metric = cls.get(name)
+        return metric.values() if isinstance(metric, Gauge) else {}
+
+    @classmethod
+    def get_history(cls, limit: Optional[int] = None) -> List[Dict]:
+        history = list(cls._history)
+        return history[-limit:] if limit else history
+
+
+# Czas żądań mierzony per endpoint, a nie per ścieżka - ograniczona liczba serii
+REQUEST_LATENCY = MetricsService.histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ('endpoint', 'method')
+)
+REQUEST_COUNT = MetricsService.counter(
+    'http_requests_total', 'HTTP requests', ('endpoint', 'method', 'status')
+)
+CACHE_REQUESTS = MetricsService.counter(
+    'cache_requests_total', 'CacheService.get_or_set lookups by result', ('result',)
+)
+SOCKETIO_CLIENTS = MetricsService.gauge('socketio_clients', 'Connected Socket.IO clients')
+SOCKETIO_CLIENTS.set(0)
+
+
+def _start_timer() -> None:
+    g.metrics_started = time.perf_counter()
+
+
+def _observe_request(response):
+    started = g.get('metrics_started')
+    if started is not None and request.endpoint != 'static':
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+        REQUEST_COUNT.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+
+def _task_queue_depth(app) -> Dict[LabelValues, float]:
+    from services.task_service import TaskService
+    with app.app_context():
+        lanes = TaskService().get_queue_stats().get('lanes', {})
+    return {(lane,): stats['queue_depth'] for lane, stats in lanes.items()}
+
+
+def _broker_subscribers() -> Dict[LabelValues, float]:
+    from services.broker_service import BrokerService
+    return {(): BrokerService.get_broker().stats()['subscribers']}
+
+
+def _db_pool_usage(app) -> Dict[LabelValues, float]:
+    from extensions import db
+    with app.app_context():
+        pool = db.engine.pool
+    usage = {}
+    # SQLite w testach używa puli bez tych liczników
+    for state, attribute in (('size', 'size'), ('checked_out', 'checkedout'),
+                             ('idle', 'checkedin'), ('overflow', 'overflow')):
+        method = getattr(pool, attribute, None)
+        if callable(method):
+            usage[(state,)] = method()
+    return usage
@@ -3,8 +3,31 @@ import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from flask import current_app
-from models import SystemLog, db
-from services.logging_service import LoggingService
+from sqlalchemy.exc import IntegrityError
+from models import SystemLog, HealthMetric, db
+
+# Ostrzeżenia zapisywane w historii jako flagi bitowe (kolumna warning_flags)
+HEALTH_WARNINGS = (
+    (1, 'Wysokie użycie CPU'),
+    (2, 'Wysokie użycie pamięci'),
+    (4, 'Mało miejsca na dysku'),
+    (8, 'Wolne zapytania do bazy danych'),
+)
+
+# Przedziały historii: 1 minuta, 1 godzina, 1 dzień
+HEALTH_RESOLUTIONS = (60, 3600, 86400)
+DEFAULT_HEALTH_RETENTION_DAYS = {60: 2, 3600: 30, 86400: 365}
+
+
+def bucket_start(timestamp: datetime, resolution: int) -> datetime:
+    """Początek przedziału o długości resolution sekund zawierającego timestamp"""
+    epoch = int((timestamp - datetime(1970, 1, 1)).total_seconds())
+    return datetime(1970, 1, 1) + timedelta(seconds=epoch - epoch % resolution)
+
+
+def decode_warnings(flags: int) -> List[str]:
+    return [message for flag, message in HEALTH_WARNINGS if flags & flag]
+
 
 class MonitoringService:
     @staticmethod
@@ -89,19 +112,21 @@ class MonitoringService:
             db_metrics = MonitoringService.monitor_database_performance()
 
             # Definiuj progi ostrzeżeń
-            warnings = []
+            flags = 0
             if system_metrics['cpu']['percent'] > 80:
-                warnings.append('Wysokie użycie CPU')
+                flags |= 1
             if system_metrics['memory']['percent'] > 80:
-                warnings.append('Wysokie użycie pamięci')
+                flags |= 2
             if system_metrics['disk']['percent'] > 80:
-                warnings.append('Mało miejsca na dysku')
+                flags |= 4
             if db_metrics['query_time'] > 1.0:
-                warnings.append('Wolne zapytania do bazy danych')
+                flags |= 8
+            warnings = decode_warnings(flags)
 
             health_status = {
                 'status': 'warning' if warnings else 'healthy',
                 'warnings': warnings,
+                'warning_flags': flags,
                 'metrics': {
                     'system': system_metrics,
                     'application': app_metrics,
@@ -110,14 +135,8 @@ class MonitoringService:
                 'timestamp': datetime.utcnow()
             }
 
-            # Loguj ostrzeżenia
-            if warnings:
-                LoggingService.add_log(
-                    type='warning',
-                    user='system',
-                    action='health_check',
-                    details=str(warnings)
-                )
+            # Historia w tabeli health_metric zamiast wpisów system_log
+            MonitoringService.record_health(health_status)
 
             return health_status
         except Exception as e:
@@ -125,24 +144,97 @@ class MonitoringService:
             raise
 
     @staticmethod
-    def get_performance_history(hours: int = 24) -> List[Dict]:
-        """Pobiera historię wydajności systemu."""
+    def record_health(health_status: Dict, timestamp: Optional[datetime] = None) -> None:
+        """Dolicza próbkę stanu systemu do przedziałów 1 min, 1 h i 1 dzień.
+
+        Każdy poziom agregacji jest aktualizowany od razu, więc historia
+        dowolnego zakresu to odczyt kilkudziesięciu wierszy liczbowych.
+        """
+        timestamp = timestamp or health_status.get('timestamp') or datetime.utcnow()
+        metrics = health_status['metrics']
+        sample = {
+            'cpu': metrics['system']['cpu']['percent'],
+            'memory': metrics['system']['memory']['percent'],
+            'disk': metrics['system']['disk']['percent'],
+            'db_query_ms': metrics['database']['query_time'] * 1000,
+            'warning_flags': health_status.get('warning_flags', 0)
+        }
+        for _ in range(2):
+            try:
+                for resolution in HEALTH_RESOLUTIONS:
+                    start = bucket_start(timestamp, resolution)
+                    row = HealthMetric.query.filter_by(resolution=resolution, bucket_start=start).first()
+                    if row is None:
+                        row = HealthMetric(resolution=resolution, bucket_start=start)
+                        db.session.add(row)
+                    row.add_sample(**sample)
+                db.session.commit()
+                return
+            except IntegrityError:
+                # Inny worker utworzył ten sam przedział - ponów na istniejących wierszach
+                db.session.rollback()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f'Błąd podczas zapisu historii stanu systemu: {str(e)}')
+                return
+
+    @staticmethod
+    def apply_health_retention(now: Optional[datetime] = None) -> int:
+        """Usuwa przedziały starsze niż okres przechowywania ich poziomu"""
+        now = now or datetime.utcnow()
+        retention = current_app.config.get('HEALTH_RETENTION_DAYS', DEFAULT_HEALTH_RETENTION_DAYS)
         try:
-            start_date = datetime.utcnow() - timedelta(hours=hours)
-            logs = SystemLog.query.filter(
-                SystemLog.timestamp >= start_date,
-                SystemLog.action == 'health_check'
-            ).order_by(SystemLog.timestamp.asc()).all()
-
-            history = []
-            for log in logs:
-                history.append({
-                    'timestamp': log.timestamp,
-                    'status': 'warning' if log.details else 'healthy',
-                    'warnings': eval(log.details) if log.details else []
-                })
-
-            return history
+            deleted = 0
+            for resolution, days in retention.items():
+                deleted += HealthMetric.query.filter(
+                    HealthMetric.resolution == resolution,
+                    HealthMetric.bucket_start < now - timedelta(days=days)
+                ).delete(synchronize_session=False)
+            db.session.commit()
+            return deleted
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Błąd podczas czyszczenia historii stanu systemu: {str(e)}')
+            return 0
+
+    @staticmethod
+    def get_performance_history(hours: int = 24, start: Optional[datetime] = None,
+                                end: Optional[datetime] = None,
+                                resolution: Optional[int] = None) -> List[Dict]:
+        """Pobiera historię wydajności systemu z zakresu czasu.
+
+        Bez podanej rozdzielczości wybiera najdrobniejszą, przy której zakres
+        mieści się w kilkuset punktach: do 6 h minuty, do 14 dni godziny, dalej dni.
+        """
+        try:
+            end = end or datetime.utcnow()
+            start = start or end - timedelta(hours=hours)
+            if resolution is None:
+                span = end - start
+                if span <= timedelta(hours=6):
+                    resolution = 60
+                elif span <= timedelta(days=14):
+                    resolution = 3600
+                else:
+                    resolution = 86400
+
+            rows = HealthMetric.query.filter(
+                HealthMetric.resolution == resolution,
+                HealthMetric.bucket_start >= bucket_start(start, resolution),
+                HealthMetric.bucket_start <= end
+            ).order_by(HealthMetric.bucket_start.asc()).all()
+
+            return [{
+                'timestamp': row.bucket_start,
+                'resolution': row.resolution,
+                'samples': row.samples,
+                'status': 'warning' if row.warning_samples else 'healthy',
+                'warnings': decode_warnings(row.warning_flags),
+                'cpu': {'avg': round(row.cpu_avg, 2), 'max': round(row.cpu_max, 2)},
+                'memory': {'avg': round(row.memory_avg, 2), 'max': round(row.memory_max, 2)},
+                'disk': round(row.disk_max, 2),
+                'db_query_ms': {'avg': round(row.db_query_avg_ms, 2), 'max': round(row.db_query_max_ms, 2)}
+            } for row in rows]
         except Exception as e:
             current_app.logger.error(f'Błąd podczas pobierania historii wydajności: {str(e)}')
-            raise 
\ No newline at end of file
+            raise
@@ -1,39 +1,137 @@
-from typing import List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import Counter
 from datetime import datetime, timedelta
-from sqlalchemy import desc
+from sqlalchemy import func
 from flask import current_app
-from sqlalchemy.orm import joinedload
 
-from models import Notification, User, Tournament, Match, SystemLog
+from models import Notification, BroadcastNotification, NotificationReadCursor, User, Tournament, SystemLog
 from services.base_service import BaseService
+from services.query_service import QueryService
+from services.broker_service import BrokerService, user_topic, audience_topic
+
+# Grupy odbiorców powiadomień grupowych: wszyscy albo jedna rola
+BROADCAST_AUDIENCES = ('all', 'admin', 'parent')
+UNREAD_COUNTER_TTL = 3600  # licznik jest aktualizowany przy zmianach, TTL tylko porządkuje cache
+
+
+def unread_counter_key(user_id: int) -> str:
+    return f'notifications:unread:{user_id}'
+
+
+def _cache():
+    # Import lokalny: cache_service -> task_service -> notification_service
+    from services.cache_service import CacheService
+    return CacheService
+
+
+def _related_columns(notification_type: str, related_id: Optional[int]) -> Dict:
+    """related_id trafia do kolumny meczu albo turnieju zależnie od typu powiadomienia"""
+    if related_id is None:
+        return {}
+    if notification_type.startswith('match'):
+        return {'related_match_id': related_id}
+    if notification_type.startswith('tournament') or notification_type.startswith('matches_'):
+        return {'related_tournament_id': related_id}
+    return {}
+
 
 class NotificationService(BaseService):
-    def get_user_notifications(self, user_id: int, page: int = 1, 
-                             per_page: int = 20) -> Tuple[List[Notification], int]:
-        """Pobiera powiadomienia użytkownika z paginacją"""
+    @staticmethod
+    def audiences_for(user_id: int) -> Tuple[str, ...]:
+        user = User.query.get(user_id)
+        return ('all', user.role) if user else ('all',)
+
+    def get_user_notifications(self, user_id: int, before_id: Optional[int] = None,
+                             per_page: int = 20) -> Tuple[List[Notification], Optional[int]]:
+        """Powiadomienia skierowane do użytkownika, od najnowszych.
+
+        Stronicowanie kursorem po id zamiast OFFSET i bez osobnego COUNT -
+        zwraca (strona, before_id następnej strony albo None).
+        """
         try:
-            query = Notification.query.filter_by(user_id=user_id)\
-                .order_by(desc(Notification.created_at))
-            
-            total = query.count()
-            notifications = query.offset((page - 1) * per_page).limit(per_page).all()
-            
-            return notifications, total
+            query = Notification.query.filter_by(user_id=user_id)
+            if before_id is not None:
+                query = query.filter(Notification.id < before_id)
+            notifications = query.order_by(Notification.id.desc()).limit(per_page + 1).all()
+
+            next_before_id = notifications[per_page - 1].id if len(notifications) > per_page else None
+            return notifications[:per_page], next_before_id
         except Exception as e:
             current_app.logger.error(f'Error getting user notifications: {str(e)}')
-            return [], 0
+            return [], None
 
-    def get_unread_count(self, user_id: int) -> int:
-        """Pobiera liczbę nieprzeczytanych powiadomień"""
+    def get_broadcasts(self, user_id: int, limit: int = 20,
+                       before_id: Optional[int] = None) -> List[BroadcastNotification]:
+        """Powiadomienia grupowe widoczne dla użytkownika, od najnowszych (kursor before_id)"""
         try:
-            return Notification.query.filter_by(
-                user_id=user_id,
-                is_read=False
+            query = BroadcastNotification.query.filter(
+                BroadcastNotification.audience.in_(self.audiences_for(user_id))
+            )
+            if before_id is not None:
+                query = query.filter(BroadcastNotification.id < before_id)
+            return query.order_by(BroadcastNotification.id.desc()).limit(limit).all()
+        except Exception as e:
+            current_app.logger.error(f'Error getting broadcast notifications: {str(e)}')
+            return []
+
+    def get_last_seen_id(self, user_id: int) -> int:
+        cursor = NotificationReadCursor.query.get(user_id)
+        return cursor.last_seen_id if cursor else 0
+
+    def get_broadcast_unread_count(self, user_id: int) -> int:
+        """Nieprzeczytane powiadomienia grupowe - zakres id > kursora w indeksie (audience, id)"""
+        try:
+            return BroadcastNotification.query.filter(
+                BroadcastNotification.audience.in_(self.audiences_for(user_id)),
+                BroadcastNotification.id > self.get_last_seen_id(user_id)
             ).count()
+        except Exception as e:
+            current_app.logger.error(f'Error getting broadcast unread count: {str(e)}')
+            return 0
+
+    def _count_unread(self, user_id: int) -> int:
+        direct = Notification.query.filter_by(
+            user_id=user_id,
+            is_read=False
+        ).count()
+        return direct + self.get_broadcast_unread_count(user_id)
+
+    def get_unread_count(self, user_id: int) -> int:
+        """Liczba nieprzeczytanych powiadomień (własnych i grupowych) z licznika w cache'u.
+
+        Licznik jest zmieniany przy tworzeniu i czytaniu powiadomień; powiadomienie
+        grupowe unieważnia liczniki swojej grupy tagiem, więc zapytanie liczące
+        wykonuje się najwyżej raz na zmianę, a nie przy każdym renderowaniu strony.
+        """
+        try:
+            # Tagi wyliczane tylko przy przeliczeniu - trafienie w cache nie pyta bazy wcale
+            return _cache().get_or_set(
+                unread_counter_key(user_id),
+                lambda: self._count_unread(user_id),
+                timeout=UNREAD_COUNTER_TTL,
+                tags=lambda _: self._counter_tags(user_id)
+            )
         except Exception as e:
             current_app.logger.error(f'Error getting unread count: {str(e)}')
             return 0
 
+    def _counter_tags(self, user_id: int) -> List[str]:
+        return [f'notifications:audience:{audience}' for audience in self.audiences_for(user_id)]
+
+    def _adjust_unread(self, user_id: int, delta: int) -> None:
+        """Zmienia licznik użytkownika i wysyła nową wartość do podłączonych klientów.
+
+        Bez licznika w cache'u nic nie liczymy - przeliczy go najbliższy odczyt,
+        a klient bez licznika nie ma też czego aktualizować.
+        """
+        unread = _cache().incr(unread_counter_key(user_id), delta)
+        if unread is not None:
+            BrokerService.publish(user_topic(user_id), 'unread_count', {'unread': unread})
+
+    def _reset_unread(self, user_id: int) -> None:
+        _cache().delete(unread_counter_key(user_id))
+        BrokerService.publish(user_topic(user_id), 'unread_count', {'unread': self.get_unread_count(user_id)})
+
     def mark_as_read(self, notification_id: int, user_id: int) -> bool:
         """Oznacza powiadomienie jako przeczytane"""
         try:
@@ -41,79 +139,163 @@ class NotificationService(BaseService):
                 id=notification_id,
                 user_id=user_id
             ).first()
-            
+
             if notification and not notification.is_read:
                 notification.is_read = True
-                notification.read_at = datetime.utcnow()
                 self.commit()
+                self._adjust_unread(user_id, -1)
             return True
         except Exception as e:
             current_app.logger.error(f'Error marking notification as read: {str(e)}')
             return False
 
+    def mark_broadcasts_read(self, user_id: int, up_to_id: Optional[int] = None, commit: bool = True) -> bool:
+        """Przesuwa kursor przeczytanych powiadomień grupowych (nigdy wstecz ani poza ostatnie)"""
+        try:
+            # Kursor poza ostatnim powiadomieniem ukryłby powiadomienia jeszcze niewysłane
+            latest_id = self.db.session.query(func.max(BroadcastNotification.id)).scalar() or 0
+            up_to_id = latest_id if up_to_id is None else min(up_to_id, latest_id)
+            cursor = NotificationReadCursor.query.get(user_id)
+            if cursor is None:
+                self.add(NotificationReadCursor(user_id=user_id, last_seen_id=up_to_id))
+            elif up_to_id > cursor.last_seen_id:
+                cursor.last_seen_id = up_to_id
+            if commit:
+                self.commit()
+                self._reset_unread(user_id)
+            return True
+        except Exception as e:
+            current_app.logger.error(f'Error marking broadcast notifications as read: {str(e)}')
+            self.db.session.rollback()
+            return False
+
     def mark_all_as_read(self, user_id: int) -> bool:
         """Oznacza wszystkie powiadomienia użytkownika jako przeczytane"""
         try:
             Notification.query.filter_by(
                 user_id=user_id,
                 is_read=False
-            ).update({
-                'is_read': True,
-                'read_at': datetime.utcnow()
-            })
+            ).update({'is_read': True})
+            if not self.mark_broadcasts_read(user_id, commit=False):
+                return False
             self.commit()
+            _cache().set(unread_counter_key(user_id), 0, UNREAD_COUNTER_TTL, tags=self._counter_tags(user_id))
+            BrokerService.publish(user_topic(user_id), 'unread_count', {'unread': 0})
             return True
         except Exception as e:
             current_app.logger.error(f'Error marking all notifications as read: {str(e)}')
+            self.db.session.rollback()
             return False
 
-    def create_notification(self, user_id: int, title: str, message: str, 
-                          notification_type: str, related_id: Optional[int] = None) -> bool:
-        """Tworzy nowe powiadomienie dla użytkownika"""
+    def broadcast(self, title: str, message: str, notification_type: str,
+                  related_id: Optional[int] = None, audience: str = 'all') -> Optional[int]:
+        """Zapisuje jedno powiadomienie dla całej grupy odbiorców; zwraca jego id"""
+        try:
+            if audience not in BROADCAST_AUDIENCES:
+                raise ValueError(f'Nieznana grupa odbiorców: {audience}')
+            notification = BroadcastNotification(
+                audience=audience,
+                type=notification_type,
+                title=title,
+                message=message,
+                created_at=datetime.utcnow(),
+                **_related_columns(notification_type, related_id)
+            )
+            self.add(notification)
+            self.commit()
+
+            # Liczniki całej grupy przeliczą się przy następnym odczycie, a klienci
+            # na żywo dostają przyrost - bez zapisu per użytkownik
+            _cache().invalidate_tag(f'notifications:audience:{audience}')
+            BrokerService.publish(audience_topic(audience), 'notification', {
+                'id': notification.id,
+                'type': notification_type,
+                'title': title,
+                'message': message,
+                'unread_delta': 1
+            })
+            return notification.id
+        except Exception as e:
+            current_app.logger.error(f'Error creating broadcast notification: {str(e)}')
+            return None
+
+    def create_notification(self, title: str, message: str, notification_type: str,
+                          user_id: Optional[int] = None, related_id: Optional[int] = None) -> bool:
+        """Tworzy powiadomienie dla użytkownika; bez user_id - powiadomienie grupowe dla wszystkich"""
+        if user_id is None:
+            return self.broadcast(title, message, notification_type, related_id) is not None
         try:
             notification = Notification(
                 user_id=user_id,
                 title=title,
                 message=message,
                 type=notification_type,
-                related_id=related_id,
                 is_read=False,
-                created_at=datetime.utcnow()
+                timestamp=datetime.utcnow(),
+                **_related_columns(notification_type, related_id)
             )
             self.add(notification)
             self.commit()
+            self._adjust_unread(user_id, 1)
             return True
         except Exception as e:
             current_app.logger.error(f'Error creating notification: {str(e)}')
             return False
 
+    def create_notifications_bulk(self, notifications: Iterable[Dict]) -> int:
+        """Powiadomienia skierowane do wielu użytkowników - INSERT paczkami i jeden commit.
+
+        Każdy słownik: user_id, title, message, type (domyślnie 'info'),
+        opcjonalnie related_id.
+        """
+        now = datetime.utcnow()
+        rows = [{
+            'user_id': notification['user_id'],
+            'title': notification.get('title'),
+            'message': notification['message'],
+            'type': notification.get('type', 'info'),
+            'is_read': False,
+            'timestamp': now,
+            'related_match_id': None,
+            'related_tournament_id': None,
+            **_related_columns(notification.get('type', 'info'), notification.get('related_id'))
+        } for notification in notifications]
+        try:
+            inserted = self.bulk_insert(Notification, rows)
+            self.commit()
+            for user_id, count in Counter(row['user_id'] for row in rows).items():
+                self._adjust_unread(user_id, count)
+            return inserted
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f'Error creating notifications in bulk: {str(e)}')
+            raise
+
+    def notify_match_created(self, match_id: int) -> bool:
+        """Powiadamia o zaplanowaniu meczu"""
+        match = QueryService.get_match(match_id, profile='match_list')
+        if not match:
+            return False
+        return self.create_notification(
+            title="Nowy mecz",
+            message=f"Zaplanowano mecz {match.team1.name} vs {match.team2.name} w turnieju {match.tournament.name}",
+            notification_type='match_created',
+            related_id=match_id
+        )
+
     def notify_match_start(self, match_id: int) -> bool:
         """Powiadamia o rozpoczęciu meczu"""
         try:
-            match = Match.query.options(
-                joinedload('team1'),
-                joinedload('team2'),
-                joinedload('tournament')
-            ).get(match_id)
-            
+            match = QueryService.get_match(match_id, profile='match_list')
             if not match:
                 return False
 
-            # Znajdź użytkowników do powiadomienia (np. administratorów turnieju)
-            users = User.query.filter_by(is_active=True).all()
-            
-            title = "Rozpoczęcie meczu"
-            message = f"Mecz {match.team1.name} vs {match.team2.name} w turnieju {match.tournament.name} właśnie się rozpoczął"
-            
-            for user in users:
-                self.create_notification(
-                    user_id=user.id,
-                    title=title,
-                    message=message,
-                    notification_type='match_start',
-                    related_id=match_id
-                )
-            return True
+            return self.broadcast(
+                title="Rozpoczęcie meczu",
+                message=f"Mecz {match.team1.name} vs {match.team2.name} w turnieju {match.tournament.name} właśnie się rozpoczął",
+                notification_type='match_start',
+                related_id=match_id
+            ) is not None
         except Exception as e:
             current_app.logger.error(f'Error notifying match start: {str(e)}')
             return False
@@ -121,29 +303,16 @@ class NotificationService(BaseService):
     def notify_match_end(self, match_id: int) -> bool:
         """Powiadamia o zakończeniu meczu"""
         try:
-            match = Match.query.options(
-                joinedload('team1'),
-                joinedload('team2'),
-                joinedload('tournament')
-            ).get(match_id)
-            
+            match = QueryService.get_match(match_id, profile='match_card')
             if not match:
                 return False
 
-            users = User.query.filter_by(is_active=True).all()
-            
-            title = "Zakończenie meczu"
-            message = f"Mecz {match.team1.name} vs {match.team2.name} zakończył się wynikiem {match.team1_score}:{match.team2_score}"
-            
-            for user in users:
-                self.create_notification(
-                    user_id=user.id,
-                    title=title,
-                    message=message,
-                    notification_type='match_end',
-                    related_id=match_id
-                )
-            return True
+            return self.broadcast(
+                title="Zakończenie meczu",
+                message=f"Mecz {match.team1.name} vs {match.team2.name} zakończył się wynikiem {match.team1_score}:{match.team2_score}",
+                notification_type='match_end',
+                related_id=match_id
+            ) is not None
         except Exception as e:
             current_app.logger.error(f'Error notifying match end: {str(e)}')
             return False
@@ -155,20 +324,12 @@ class NotificationService(BaseService):
             if not tournament:
                 return False
 
-            users = User.query.filter_by(is_active=True).all()
-            
-            title = "Rozpoczęcie turnieju"
-            message = f"Turniej {tournament.name} właśnie się rozpoczął"
-            
-            for user in users:
-                self.create_notification(
-                    user_id=user.id,
-                    title=title,
-                    message=message,
-                    notification_type='tournament_start',
-                    related_id=tournament_id
-                )
-            return True
+            return self.broadcast(
+                title="Rozpoczęcie turnieju",
+                message=f"Turniej {tournament.name} właśnie się rozpoczął",
+                notification_type='tournament_start',
+                related_id=tournament_id
+            ) is not None
         except Exception as e:
             current_app.logger.error(f'Error notifying tournament start: {str(e)}')
             return False
@@ -180,32 +341,29 @@ class NotificationService(BaseService):
             if not tournament:
                 return False
 
-            users = User.query.filter_by(is_active=True).all()
-            
-            title = "Zakończenie turnieju"
-            message = f"Turniej {tournament.name} został zakończony"
-            
-            for user in users:
-                self.create_notification(
-                    user_id=user.id,
-                    title=title,
-                    message=message,
-                    notification_type='tournament_end',
-                    related_id=tournament_id
-                )
-            return True
+            return self.broadcast(
+                title="Zakończenie turnieju",
+                message=f"Turniej {tournament.name} został zakończony",
+                notification_type='tournament_end',
+                related_id=tournament_id
+            ) is not None
         except Exception as e:
             current_app.logger.error(f'Error notifying tournament end: {str(e)}')
             return False
 
     def clear_old_notifications(self, days: int = 30) -> bool:
-        """Usuwa stare powiadomienia"""
+        """Usuwa stare powiadomienia (przeczytane własne i wszystkie grupowe)"""
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
             deleted = Notification.query.filter(
-                Notification.created_at < cutoff_date,
+                Notification.timestamp < cutoff_date,
                 Notification.is_read == True
             ).delete()
+            # Usunięte powiadomienia grupowe znikają z nieprzeczytanych użytkowników,
+            # których kursor był przed nimi - ich liczniki przeliczą się przy odczycie
+            deleted += BroadcastNotification.query.filter(
+                BroadcastNotification.created_at < cutoff_date
+            ).delete()
 
             log = SystemLog(
                 type='info',
@@ -215,7 +373,10 @@ class NotificationService(BaseService):
             )
             self.add(log)
             self.commit()
+            for audience in BROADCAST_AUDIENCES:
+                _cache().invalidate_tag(f'notifications:audience:{audience}')
             return True
         except Exception as e:
             current_app.logger.error(f'Error clearing old notifications: {str(e)}')
-            return False 
\ No newline at end of file
+            self.db.session.rollback()
+            return False
@@ -24,7 +24,8 @@ class NotificationTaskService(BaseService):
                 description=f'Usuwanie powiadomień starszych niż {days} dni',
                 args=(days,),
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                priority='batch'
             )
 
             return task_id
@@ -56,7 +57,8 @@ class NotificationTaskService(BaseService):
                 description=f'Wysyłanie powiadomień o meczu {match_id}',
                 args=(match_id,),
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                priority='realtime'
             )
 
             return task_id
@@ -130,7 +132,8 @@ class NotificationTaskService(BaseService):
                 description=f'Wysyłanie {len(notifications)} powiadomień',
                 args=(notifications,),
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                priority='batch'
             )
 
             return task_id
@@ -139,32 +142,29 @@ class NotificationTaskService(BaseService):
             raise
 
     def _send_bulk_notifications(self, notifications: List[Dict]) -> Dict:
-        """Wysyła wiele powiadomień"""
+        """Wysyła wiele powiadomień: skierowane jednym INSERT-em paczkami, bez user_id - grupowo"""
         try:
-            results = []
-            for notification in notifications:
-                try:
-                    notification_id = self.notification_service.create_notification(
-                        user_id=notification.get('user_id'),
-                        title=notification.get('title'),
-                        message=notification.get('message'),
-                        notification_type=notification.get('type', 'info')
-                    )
-                    results.append({
-                        'status': 'success',
-                        'notification_id': notification_id
-                    })
-                except Exception as e:
-                    results.append({
-                        'status': 'error',
-                        'error': str(e)
-                    })
+            targeted = [n for n in notifications if n.get('user_id') is not None]
+            broadcasts = [n for n in notifications if n.get('user_id') is None]
+
+            created = self.notification_service.create_notifications_bulk(targeted) if targeted else 0
+            broadcast_ids = [
+                self.notification_service.broadcast(
+                    title=notification.get('title'),
+                    message=notification.get('message'),
+                    notification_type=notification.get('type', 'info'),
+                    related_id=notification.get('related_id'),
+                    audience=notification.get('audience', 'all')
+                )
+                for notification in broadcasts
+            ]
+            successful = created + len([i for i in broadcast_ids if i is not None])
 
             return {
                 'total': len(notifications),
-                'successful': len([r for r in results if r['status'] == 'success']),
-                'failed': len([r for r in results if r['status'] == 'error']),
-                'results': results,
+                'successful': successful,
+                'failed': len(notifications) - successful,
+                'broadcasts': len(broadcasts),
                 'executed_at': datetime.utcnow().isoformat()
             }
         except Exception as e:
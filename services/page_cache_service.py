@@ -0,0 +1,174 @@
+from typing import Callable, Iterable, Optional, Set
+from itertools import chain
+import hashlib
+import uuid
+from flask import current_app, request, session
+from markupsafe import Markup
+from sqlalchemy import event, inspect
+
+from models import Match, Team, Tournament, Year
+from services.cache_service import CacheService
+from services.config_service import ConfigService
+from extensions import db
+
+CATALOG_SCOPE = 'catalog'  # listy roczników, turniejów i wyników
+EPOCH_SCOPE = 'epoch'      # zmiany masowe (UPDATE/DELETE/INSERT bez obiektów) - wszystkie strony
+PAGE_TAG = 'pages'
+TRACKED_MODELS = (Match, Team, Tournament, Year)
+
+_PENDING = 'page_cache_scopes'
+
+
+def tournament_scope(tournament_id: int) -> str:
+    return f'tournament:{tournament_id}'
+
+
+class PageCacheService:
+    """Cache wyrenderowanych fragmentów stron rodzica z obsługą ETag.
+
+    Klucz fragmentu zawiera wersję zakresu (turniej albo katalog list) - każdy
+    zatwierdzony zapis meczu, drużyny, turnieju lub rocznika nadaje zakresowi
+    nową wersję, więc stare wpisy przestają być trafiane i wygasają same.
+    Strona składa się z fragmentu i lekkiego szablonu (token CSRF, logo,
+    komunikaty), a ten sam klucz wyznacza ETag - przy pasującym
+    If-None-Match odpowiedź 304 nie renderuje ani nie pyta bazy.
+    """
+    _enabled = True
+    _timeout = 300
+    _finished_timeout = 30 * 24 * 3600
+
+    @classmethod
+    def init_app(cls, app) -> None:
+        """Konfiguracja i nasłuchiwanie zmian w sesji (jednorazowo na proces)"""
+        cls._enabled = app.config.get('PAGE_CACHE_ENABLED', True)
+        cls._timeout = app.config.get('PAGE_CACHE_TIMEOUT', 300)
+        cls._finished_timeout = app.config.get('PAGE_CACHE_FINISHED_TIMEOUT', 30 * 24 * 3600)
+        if event.contains(db.session, 'before_flush', _collect_changes):
+            return
+        event.listen(db.session, 'before_flush', _collect_changes)
+        event.listen(db.session, 'do_orm_execute', _collect_bulk_changes)
+        event.listen(db.session, 'after_commit', _publish_changes)
+        event.listen(db.session, 'after_rollback', _discard_changes)
+
+    @staticmethod
+    def _version_key(scope: str) -> str:
+        return f'page:version:{scope}'
+
+    @classmethod
+    def version(cls, scope: str) -> str:
+        """Bieżąca wersja zakresu; brak (np. po wymianie z cache'u) oznacza nową wersję"""
+        version = CacheService.get(cls._version_key(scope))
+        if version is None:
+            version = cls._new_version(scope)
+        return version
+
+    @classmethod
+    def bump(cls, *scopes: str) -> None:
+        """Nadaje zakresom nowe wersje (wywoływane po commicie)"""
+        for scope in scopes:
+            cls._new_version(scope)
+
+    @classmethod
+    def _new_version(cls, scope: str) -> str:
+        version = uuid.uuid4().hex[:12]
+        CacheService.set(cls._version_key(scope), version, expires_in=cls._finished_timeout)
+        return version
+
+    @classmethod
+    def page_key(cls, endpoint: str, scope: str, **params) -> str:
+        """Klucz fragmentu: endpoint + wersje zakresów + parametry widoku"""
+        versions = ':'.join(cls.version(s) for s in (EPOCH_SCOPE, scope))
+        arguments = ','.join(f'{name}={value}' for name, value in sorted(params.items()))
+        return f'page:{endpoint}:{versions}:{arguments}'
+
+    @classmethod
+    def timeout_for(cls, tournament: Optional[Tournament] = None) -> int:
+        """Zakończone turnieje się nie zmieniają - ich strony trzymamy najdłużej"""
+        if tournament is not None and tournament.status == 'finished':
+            return cls._finished_timeout
+        return cls._timeout
+
+    @classmethod
+    def fragment(cls, key: str, render: Callable[[], str], timeout: Optional[int] = None) -> Markup:
+        """Wyrenderowany fragment z cache'u albo z render() przy chybieniu"""
+        if not cls._enabled:
+            return Markup(render())
+        html = CacheService.get_or_set(key, render, timeout=timeout or cls._timeout, tags=[PAGE_TAG])
+        return Markup(html)
+
+    @staticmethod
+    def etag(key: str) -> str:
+        # Logo jest częścią szablonu strony, nie fragmentu
+        logo_path = ConfigService.get_setting('logo_path') or ''
+        return hashlib.sha1(f'{key}|{logo_path}'.encode('utf-8')).hexdigest()[:20]
+
+    @classmethod
+    def respond(cls, key: str, render_page: Callable[[], str]):
+        """Odpowiedź 304 przy pasującym If-None-Match, inaczej render_page() z ETagiem"""
+        if not cls._enabled:
+            return render_page()
+
+        etag = cls.etag(key)
+        # Oczekujące komunikaty flash muszą zostać wyrenderowane
+        if request.if_none_match.contains_weak(etag) and not session.get('_flashes'):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.make_response(render_page())
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        # Strona zawiera token CSRF sesji - tylko cache przeglądarki, zawsze z rewalidacją
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    @classmethod
+    def clear(cls) -> int:
+        """Usuwa wszystkie zapisane fragmenty"""
+        return CacheService.invalidate_tag(PAGE_TAG)
+
+
+def _pending(session) -> Set[str]:
+    return session.info.setdefault(_PENDING, set())
+
+
+def _tournament_ids(obj) -> Iterable[int]:
+    """Turniej obiektu przed i po zmianie (przeniesienie meczu zmienia oba)"""
+    history = inspect(obj).attrs.tournament_id.history
+    if not history.deleted:
+        return (obj.tournament_id,)
+    return chain(history.added or (), history.unchanged or (), history.deleted)
+
+
+def _collect_changes(session, flush_context, instances) -> None:
+    """Zapamiętuje zakresy zmienione w transakcji - wersje zmieniamy dopiero po commicie"""
+    scopes = None
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, TRACKED_MODELS):
+            continue
+        scopes = scopes if scopes is not None else _pending(session)
+        scopes.add(CATALOG_SCOPE)
+        if isinstance(obj, (Match, Team)):
+            scopes.update(tournament_scope(tournament_id)
+                          for tournament_id in _tournament_ids(obj) if tournament_id is not None)
+        elif isinstance(obj, Tournament) and inspect(obj).identity:
+            scopes.add(tournament_scope(inspect(obj).identity[0]))
+
+
+def _collect_bulk_changes(orm_execute_state) -> None:
+    """Masowe UPDATE/DELETE/INSERT nie przechodzą przez flush - unieważniają wszystko"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, TRACKED_MODELS):
+        _pending(orm_execute_state.session).add(EPOCH_SCOPE)
+
+
+def _publish_changes(session) -> None:
+    scopes = session.info.pop(_PENDING, None)
+    if scopes:
+        PageCacheService.bump(*scopes)
+
+
+def _discard_changes(session) -> None:
+    session.info.pop(_PENDING, None)
@@ -0,0 +1,130 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import Year, Tournament, Team, Match
+
+# Nazwane profile ładowania relacji dla typowych widoków. Relacje w models.py są
+# leniwe (lazy=True), więc szablon odwołujący się do match.team1.name w pętli
+# wykonuje osobne zapytanie na każdy mecz. Relacje "do jednego" ładujemy przez
+# joinedload, kolekcje przez selectinload (jedno IN zamiast iloczynu JOIN-ów).
+# Opcje budujemy leniwie - backrefy (Match.team1, Team.tournament) istnieją
+# dopiero po konfiguracji mapperów.
+LOAD_PROFILES: Dict[str, Callable[[], Tuple]] = {
+    # Karta meczu: nazwy obu drużyn
+    'match_card': lambda: (
+        joinedload(Match.team1),
+        joinedload(Match.team2),
+    ),
+    # Lista meczów z nazwą turnieju (panel admina, ostatnie mecze)
+    'match_list': lambda: (
+        joinedload(Match.team1),
+        joinedload(Match.team2),
+        joinedload(Match.tournament),
+    ),
+    # Szczegóły meczu: drużyny, turniej i jego rocznik
+    'match_detail': lambda: (
+        joinedload(Match.team1),
+        joinedload(Match.team2),
+        joinedload(Match.tournament).joinedload(Tournament.year),
+    ),
+    # Lista turniejów z liczbą drużyn
+    'tournament_list': lambda: (
+        selectinload(Tournament.teams),
+    ),
+    # Turniej z rocznikiem (panel admina)
+    'tournament_summary': lambda: (
+        joinedload(Tournament.year),
+    ),
+    # Nagłówek turnieju w panelu admina: rocznik i drużyny
+    'tournament_header': lambda: (
+        joinedload(Tournament.year),
+        selectinload(Tournament.teams),
+    ),
+    # Strona turnieju: rocznik, drużyny i mecze z nazwami drużyn
+    'tournament_page': lambda: (
+        joinedload(Tournament.year),
+        selectinload(Tournament.teams),
+        selectinload(Tournament.matches).options(
+            joinedload(Match.team1),
+            joinedload(Match.team2),
+        ),
+    ),
+    # Drużyna z turniejem
+    'team_detail': lambda: (
+        joinedload(Team.tournament),
+    ),
+    # Roczniki z turniejami (liczniki na stronie wyboru rocznika)
+    'year_list': lambda: (
+        selectinload(Year.tournaments),
+    ),
+}
+
+
+class QueryService:
+    """Zapytania widoków i serwisów z jawnie określonym ładowaniem relacji"""
+
+    @staticmethod
+    def load_options(profile: str) -> Tuple:
+        """Zwraca opcje ładowania dla nazwanego profilu"""
+        try:
+            return LOAD_PROFILES[profile]()
+        except KeyError:
+            raise ValueError(f'Unknown load profile: {profile}')
+
+    @classmethod
+    def with_profile(cls, query, profile: Optional[str]):
+        """Dołącza do zapytania opcje ładowania profilu (None = bez zmian)"""
+        if profile is None:
+            return query
+        return query.options(*cls.load_options(profile))
+
+    @classmethod
+    def get_match(cls, match_id: int, profile: str = 'match_detail') -> Optional[Match]:
+        return cls.with_profile(Match.query, profile).filter(Match.id == match_id).first()
+
+    @classmethod
+    def get_match_or_404(cls, match_id: int, profile: str = 'match_detail') -> Match:
+        return cls.with_profile(Match.query, profile).filter(Match.id == match_id).first_or_404()
+
+    @classmethod
+    def get_tournament(cls, tournament_id: int, profile: Optional[str] = None) -> Optional[Tournament]:
+        return cls.with_profile(Tournament.query, profile).filter(Tournament.id == tournament_id).first()
+
+    @classmethod
+    def get_tournament_or_404(cls, tournament_id: int, profile: Optional[str] = None) -> Tournament:
+        return cls.with_profile(Tournament.query, profile).filter(Tournament.id == tournament_id).first_or_404()
+
+    @classmethod
+    def get_team(cls, team_id: int, profile: Optional[str] = 'team_detail') -> Optional[Team]:
+        return cls.with_profile(Team.query, profile).filter(Team.id == team_id).first()
+
+    @classmethod
+    def tournament_matches(cls, tournament_id: int, profile: str = 'match_card') -> List[Match]:
+        """Mecze turnieju w kolejności rozgrywania"""
+        return cls.with_profile(Match.query, profile).filter(
+            Match.tournament_id == tournament_id
+        ).order_by(Match.start_time.asc(), Match.id).all()
+
+    @classmethod
+    def team_matches(cls, team_id: int, status: Optional[str] = None,
+                     profile: str = 'match_card') -> List[Match]:
+        """Mecze drużyny (jako gospodarz lub gość) w kolejności rozgrywania"""
+        query = cls.with_profile(Match.query, profile).filter(
+            (Match.team1_id == team_id) | (Match.team2_id == team_id)
+        )
+        if status is not None:
+            query = query.filter(Match.status == status)
+        return query.order_by(Match.start_time).all()
+
+    @classmethod
+    def recent_matches(cls, limit: int = 5, profile: str = 'match_list') -> List[Match]:
+        return cls.with_profile(Match.query, profile).order_by(Match.start_time.desc()).limit(limit).all()
+
+    @classmethod
+    def tournaments(cls, profile: str = 'tournament_list', **filters) -> List[Tournament]:
+        """Turnieje spełniające filtry (np. year_id=..., status='ongoing')"""
+        return cls.with_profile(Tournament.query, profile).filter_by(**filters).order_by(Tournament.id).all()
+
+    @classmethod
+    def years(cls, profile: str = 'year_list') -> List[Year]:
+        return cls.with_profile(Year.query, profile).order_by(Year.year.desc()).all()
@@ -0,0 +1,152 @@
+from typing import Dict, List, Optional, Sequence
+from collections import deque
+import math
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Percentyl metodą najbliższej rangi (values nie musi być posortowane)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class EndpointQueryStats:
+    """Ostatnie próbki jednego endpointu: liczba zapytań, czas bazy, czas żądania"""
+    __slots__ = ('requests', 'queries', 'db_ms', 'total_ms')
+
+    def __init__(self, samples: int):
+        self.requests = 0
+        self.queries = deque(maxlen=samples)
+        self.db_ms = deque(maxlen=samples)
+        self.total_ms = deque(maxlen=samples)
+
+    def add(self, queries: int, db_ms: float, total_ms: float) -> None:
+        self.requests += 1
+        self.queries.append(queries)
+        self.db_ms.append(db_ms)
+        self.total_ms.append(total_ms)
+
+    def summary(self) -> Dict:
+        result = {'requests': self.requests, 'samples': len(self.queries)}
+        for name, values in (('queries', self.queries), ('db_ms', self.db_ms), ('total_ms', self.total_ms)):
+            values = list(values)
+            result[name] = {
+                'p50': round(percentile(values, 0.50), 2),
+                'p95': round(percentile(values, 0.95), 2),
+                'p99': round(percentile(values, 0.99), 2),
+                'max': round(max(values), 2) if values else 0
+            }
+        return result
+
+
+class QueryStatsService:
+    """Pomiar zapytań SQL w obrębie żądania HTTP.
+
+    Zdarzenia kursora SQLAlchemy zliczają zapytania i czas bazy bieżącego
+    żądania. Wynik trafia do nagłówka Server-Timing, a zapytania powyżej
+    SLOW_QUERY_THRESHOLD_MS do logu z nazwą endpointu. Dla każdego endpointu
+    trzymamy w pamięci ostatnie próbki, z których liczone są p50/p95/p99.
+    """
+    _stats: Dict[str, EndpointQueryStats] = {}
+    _lock = threading.Lock()
+    _samples = 1000
+    _slow_threshold_ms: Optional[float] = 500.0
+
+    @classmethod
+    def init_app(cls, app) -> None:
+        """Rejestruje nasłuchiwanie kursora (raz na proces) i hooki żądań aplikacji"""
+        if not app.config.get('QUERY_STATS_ENABLED', True):
+            return
+        cls._samples = app.config.get('QUERY_STATS_SAMPLES', 1000)
+        cls._slow_threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS', 500)
+
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+
+        app.before_request(cls._start_request)
+        app.after_request(cls._finish_request)
+
+    @staticmethod
+    def _start_request() -> None:
+        g.sql_queries = 0
+        g.sql_time = 0.0
+        g.request_started = time.perf_counter()
+
+    @classmethod
+    def _finish_request(cls, response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        total_ms = (time.perf_counter() - started) * 1000
+        queries = g.get('sql_queries', 0)
+        db_ms = g.get('sql_time', 0.0) * 1000
+
+        response.headers.add('Server-Timing', f'db;dur={db_ms:.1f};desc="{queries} queries"')
+        response.headers.add('Server-Timing', f'app;dur={total_ms:.1f}')
+
+        if request.endpoint and request.endpoint != 'static':
+            cls.record(request.endpoint, queries, db_ms, total_ms)
+        return response
+
+    @classmethod
+    def record(cls, endpoint: str, queries: int, db_ms: float, total_ms: float) -> None:
+        with cls._lock:
+            stats = cls._stats.get(endpoint)
+            if stats is None:
+                stats = cls._stats[endpoint] = EndpointQueryStats(cls._samples)
+            stats.add(queries, db_ms, total_ms)
+
+    @classmethod
+    def get_stats(cls, sort_by: str = 'db_ms') -> List[Dict]:
+        """Statystyki endpointów, najbardziej obciążające bazę (p95) na początku"""
+        with cls._lock:
+            rows = [{'endpoint': endpoint, **stats.summary()} for endpoint, stats in cls._stats.items()]
+        if sort_by not in ('queries', 'db_ms', 'total_ms'):
+            sort_by = 'db_ms'
+        return sorted(rows, key=lambda row: row[sort_by]['p95'], reverse=True)
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._stats = {}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _handle_error(exception_context):
+    """Zapytanie zakończone błędem nie wywołuje after_cursor_execute - zdejmujemy jego start"""
+    conn = exception_context.connection
+    if conn is None:
+        return
+    started = conn.info.get('query_started')
+    if started:
+        started.pop()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if not has_request_context() or 'sql_queries' not in g:
+        return
+
+    g.sql_queries += 1
+    g.sql_time += elapsed
+
+    threshold = QueryStatsService._slow_threshold_ms
+    if threshold is not None and elapsed * 1000 >= threshold:
+        current_app.logger.warning(
+            f'Slow query ({elapsed * 1000:.1f} ms) in {request.endpoint}: {statement[:500]}'
+        )
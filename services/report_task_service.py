@@ -24,7 +24,8 @@ class ReportTaskService(BaseService):
                 description=f'Generowanie szczegółowego raportu dla turnieju {tournament_id}',
                 args=(tournament_id,),
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                lane='process'
             )
 
             return task_id
@@ -194,7 +195,8 @@ class ReportTaskService(BaseService):
                 description=f'Generowanie szczegółowego raportu dla drużyny {team_id}',
                 args=(team_id,),
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                lane='process'
             )
 
             return task_id
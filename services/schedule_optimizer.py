@@ -0,0 +1,145 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta
+import math
+
+
+def circle_rounds(team_ids: Sequence[int]) -> List[List[Tuple[int, int]]]:
+    """Dzieli pary "każdy z każdym" na kolejki metodą kołową.
+
+    Pierwsza drużyna stoi w miejscu, pozostałe obracają się o jedną pozycję
+    na kolejkę - w każdej kolejce drużyna gra co najwyżej raz. Przy
+    nieparzystej liczbie drużyn jedna w każdej kolejce pauzuje.
+    """
+    teams = list(team_ids)
+    if len(teams) % 2:
+        teams.append(None)
+    size = len(teams)
+    rounds = []
+    for round_index in range(size - 1):
+        pairs = []
+        for i in range(size // 2):
+            home, away = teams[i], teams[size - 1 - i]
+            if home is None or away is None:
+                continue
+            # Naprzemienne gospodarstwo drużyny stojącej w miejscu
+            if i == 0 and round_index % 2:
+                home, away = away, home
+            pairs.append((home, away))
+        rounds.append(pairs)
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    return rounds
+
+
+def rest_slots(min_rest: int, match_length: int, break_length: int) -> int:
+    """Liczba wolnych slotów potrzebnych, by odpoczynek drużyny trwał min_rest minut.
+
+    Między kolejnymi slotami jest już przerwa break_length, a każdy
+    pominięty slot dodaje match_length + break_length minut.
+    """
+    missing = max(0, min_rest - break_length)
+    return math.ceil(missing / (match_length + break_length)) if missing else 0
+
+
+def optimize_schedule(team_ids: Sequence[int], fields: int, min_rest_slots: int = 1) -> Dict:
+    """Układa mecze "każdy z każdym" w slotach czasowych na wielu boiskach.
+
+    Mecze z kolejek metody kołowej są przydzielane slot po slocie: w każdym
+    slocie zajmowane są wszystkie boiska meczami drużyn, które odpoczęły co
+    najmniej min_rest_slots slotów. Pierwszeństwo mają drużyny z największą
+    liczbą meczów do rozegrania (ścieżka krytyczna wyznacza długość turnieju),
+    potem wcześniejsza kolejka. Zwraca mecze z numerem slotu i boiska oraz
+    ocenę planu (lower_bound / slots, 1.0 = plan optymalny).
+    """
+    fields = max(1, int(fields))
+    rounds = circle_rounds(team_ids)
+    pending = [(round_index, home, away)
+               for round_index, pairs in enumerate(rounds) for home, away in pairs]
+    remaining = {team: 0 for team in team_ids}
+    for _, home, away in pending:
+        remaining[home] += 1
+        remaining[away] += 1
+
+    next_free = {team: 0 for team in team_ids}
+    last_slot: Dict[int, int] = {}
+    max_wait = 0
+    matches = []
+    slot = 0
+    while pending:
+        ready = [(-(remaining[home] + remaining[away]), round_index, index)
+                 for index, (round_index, home, away) in enumerate(pending)
+                 if next_free[home] <= slot and next_free[away] <= slot]
+        busy = set()
+        chosen = []
+        for _, _, index in sorted(ready):
+            round_index, home, away = pending[index]
+            if home in busy or away in busy:
+                continue
+            busy.update((home, away))
+            chosen.append(index)
+            if len(chosen) == fields:
+                break
+
+        for field_number, index in enumerate(sorted(chosen), start=1):
+            round_index, home, away = pending[index]
+            for team in (home, away):
+                if team in last_slot:
+                    max_wait = max(max_wait, slot - last_slot[team] - 1)
+                last_slot[team] = slot
+                next_free[team] = slot + 1 + min_rest_slots
+                remaining[team] -= 1
+            matches.append({
+                'team1_id': home,
+                'team2_id': away,
+                'round': round_index + 1,
+                'slot': slot,
+                'field_number': field_number
+            })
+        if chosen:
+            taken = set(chosen)
+            pending = [item for index, item in enumerate(pending) if index not in taken]
+        slot += 1
+
+    slots = (matches[-1]['slot'] + 1) if matches else 0
+    longest_chain = max((count + (count - 1) * min_rest_slots
+                         for count in _match_counts(matches).values()), default=0)
+    lower_bound = max(math.ceil(len(matches) / fields), longest_chain)
+    return {
+        'matches': matches,
+        'slots': slots,
+        'lower_bound': lower_bound,
+        'score': round(lower_bound / slots, 4) if slots else 1.0,
+        'utilization': round(len(matches) / (slots * fields), 4) if slots else 0.0,
+        'max_wait_slots': max_wait,
+        'min_rest_slots': min_rest_slots
+    }
+
+
+def _match_counts(matches: List[Dict]) -> Dict[int, int]:
+    counts: Dict[int, int] = {}
+    for match in matches:
+        for team in (match['team1_id'], match['team2_id']):
+            counts[team] = counts.get(team, 0) + 1
+    return counts
+
+
+def assign_start_times(schedule: Dict, start_time: datetime, match_length: int,
+                       break_length: int) -> List[Dict]:
+    """Uzupełnia mecze planu o godzinę rozpoczęcia wynikającą z numeru slotu"""
+    slot_length = timedelta(minutes=match_length + break_length)
+    return [{**match, 'start_time': start_time + slot_length * match['slot']}
+            for match in schedule['matches']]
+
+
+def build_schedule(team_ids: Sequence[int], start_time: datetime, fields: int,
+                   match_length: int, break_length: int,
+                   min_rest: Optional[int] = None) -> Dict:
+    """Plan turnieju z godzinami meczów; min_rest w minutach (domyślnie jeden slot)"""
+    if min_rest is None:
+        min_rest_slots = 1
+    else:
+        min_rest_slots = rest_slots(min_rest, match_length, break_length)
+    schedule = optimize_schedule(team_ids, fields, min_rest_slots)
+    schedule['matches'] = assign_start_times(schedule, start_time, match_length, break_length)
+    schedule['end_time'] = (start_time + timedelta(minutes=(match_length + break_length) * (schedule['slots'] - 1)
+                                                   + match_length)) if schedule['slots'] else start_time
+    return schedule
@@ -0,0 +1,115 @@
+from typing import Dict, List, Optional, Sequence
+from flask import current_app
+import numpy as np
+
+from models import Year, Tournament, Team, Match
+from services.base_service import BaseService
+
+COUNTERS = ('points', 'matches_played', 'wins', 'draws', 'losses',
+            'goals_for', 'goals_against', 'goal_difference')
+
+
+def compute_standings(team1_ids, team2_ids, team1_scores, team2_scores) -> Dict[str, np.ndarray]:
+    """Liczy tabelę dla wszystkich drużyn naraz z kolumn zakończonych meczów.
+
+    Każdy mecz rozkładany jest na dwa wiersze (gospodarz i gość), a liczniki
+    sumowane są przez np.bincount po indeksie drużyny - bez pętli w Pythonie.
+    Zwraca słownik tablic wyrównanych do 'team_id'.
+    """
+    team1_ids = np.asarray(team1_ids, dtype=np.int64)
+    team2_ids = np.asarray(team2_ids, dtype=np.int64)
+    team1_scores = np.nan_to_num(np.asarray(team1_scores, dtype=np.float64)).astype(np.int64)
+    team2_scores = np.nan_to_num(np.asarray(team2_scores, dtype=np.float64)).astype(np.int64)
+
+    team_ids = np.concatenate((team1_ids, team2_ids))
+    goals_for = np.concatenate((team1_scores, team2_scores))
+    goals_against = np.concatenate((team2_scores, team1_scores))
+
+    unique_ids, index = np.unique(team_ids, return_inverse=True)
+    size = len(unique_ids)
+
+    def total(values) -> np.ndarray:
+        return np.bincount(index, weights=values, minlength=size).astype(np.int64)
+
+    wins = total(goals_for > goals_against)
+    draws = total(goals_for == goals_against)
+    losses = total(goals_for < goals_against)
+    scored = total(goals_for)
+    conceded = total(goals_against)
+
+    return {
+        'team_id': unique_ids,
+        'points': wins * 3 + draws,
+        'matches_played': np.bincount(index, minlength=size).astype(np.int64),
+        'wins': wins,
+        'draws': draws,
+        'losses': losses,
+        'goals_for': scored,
+        'goals_against': conceded,
+        'goal_difference': scored - conceded,
+    }
+
+
+class SeasonStandingsService(BaseService):
+    """Hurtowe liczenie tabel wielu turniejów (cały rocznik, statystyki globalne)"""
+
+    def load_match_columns(self, tournament_ids: Optional[Sequence[int]] = None) -> Dict[str, np.ndarray]:
+        """Pobiera zakończone mecze jednym zapytaniem jako tablice kolumn"""
+        query = Match.query.with_entities(
+            Match.team1_id, Match.team2_id, Match.team1_score, Match.team2_score
+        ).filter(Match.status == 'finished')
+        if tournament_ids is not None:
+            query = query.filter(Match.tournament_id.in_(list(tournament_ids)))
+
+        rows = query.all()
+        columns = np.array(rows, dtype=np.float64).reshape(len(rows), 4)
+        return {
+            'team1_ids': columns[:, 0],
+            'team2_ids': columns[:, 1],
+            'team1_scores': columns[:, 2],
+            'team2_scores': columns[:, 3],
+        }
+
+    def compute(self, tournament_ids: Optional[Sequence[int]] = None) -> Dict[int, Dict]:
+        """Liczy statystyki drużyn wskazanych turniejów (domyślnie wszystkich)"""
+        columns = self.load_match_columns(tournament_ids)
+        table = compute_standings(**columns)
+
+        team_query = Team.query.with_entities(Team.id, Team.name, Team.tournament_id)
+        if tournament_ids is not None:
+            team_query = team_query.filter(Team.tournament_id.in_(list(tournament_ids)))
+
+        # Drużyny bez zakończonych meczów też trafiają do tabeli (z zerami)
+        stats = {
+            team_id: dict({'team_id': team_id, 'team_name': name, 'tournament_id': tournament_id},
+                          **dict.fromkeys(COUNTERS, 0))
+            for team_id, name, tournament_id in team_query.all()
+        }
+        for row, team_id in enumerate(table['team_id'].tolist()):
+            if team_id in stats:
+                for column in COUNTERS:
+                    stats[team_id][column] = int(table[column][row])
+        return stats
+
+    def get_tournament_tables(self, tournament_ids: Sequence[int]) -> Dict[int, List[Dict]]:
+        """Zwraca posortowane tabele wyników dla wielu turniejów naraz"""
+        tables = {tournament_id: [] for tournament_id in tournament_ids}
+        for entry in self.compute(tournament_ids).values():
+            tables[entry['tournament_id']].append(entry)
+
+        for table in tables.values():
+            table.sort(key=lambda x: (-x['points'], -x['goal_difference'], -x['goals_for'], x['team_id']))
+            for position, entry in enumerate(table, start=1):
+                entry['position'] = position
+        return tables
+
+    def get_year_tables(self, season_year: int) -> Dict[int, List[Dict]]:
+        """Tabele wszystkich turniejów z danego rocznika"""
+        try:
+            tournament_ids = [tournament_id for (tournament_id,) in Tournament.query.join(Year).filter(
+                Year.year == season_year
+            ).with_entities(Tournament.id).all()]
+            return self.get_tournament_tables(tournament_ids)
+        except Exception as e:
+            current_app.logger.error(f'Error computing season standings: {str(e)}')
+            raise
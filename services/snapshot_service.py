@@ -0,0 +1,318 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime
+from itertools import chain
+import json
+import os
+import shutil
+import tempfile
+import threading
+from flask import current_app, render_template, send_file
+from markupsafe import Markup
+from sqlalchemy import event, inspect
+
+from models import Match, Team, Tournament, SystemSettings
+from services.base_service import BaseService
+from services.config_service import ConfigService, _decode_value
+from services.query_service import QueryService
+from services.standings_service import StandingsService
+from services.stats_service import StatsService
+from services.task_service import TaskService
+from extensions import db
+
+_PENDING = 'snapshot_changes'
+_PENDING_LOGO = 'snapshot_logo'
+_REFRESH_ALL = 'all'
+
+
+def match_title(match) -> str:
+    return f'{match.team1.name} - {match.team2.name}'
+
+
+class SnapshotService(BaseService):
+    """Statyczne fragmenty stron zakończonych turniejów publikowane do katalogu instancji.
+
+    Po zakończeniu turnieju zadanie w tle renderuje fragment strony turnieju,
+    fragmenty stron jego meczów i tabelę wyników (JSON) do plików, a widoki
+    rodzica i API korzystają z nich bez zapytań do bazy. Szablon strony
+    (token CSRF, logo, komunikaty) jest renderowany przy każdym żądaniu, tak
+    jak dla fragmentów z PageCacheService - ścieżka logo leży obok plików
+    (layout.json) i jest nadpisywana po zmianie ustawienia. Zmiany meczów,
+    drużyn lub samego turnieju po commicie odświeżają opublikowane pliki.
+    """
+    _scheduled: Set[int] = set()
+    _scheduled_lock = threading.Lock()
+
+    @staticmethod
+    def init_app(app) -> None:
+        """Rejestruje nasłuchiwanie zmian turniejów (jednorazowo na proces)"""
+        if event.contains(db.session, 'before_flush', _collect_changes):
+            return
+        event.listen(db.session, 'before_flush', _collect_changes)
+        event.listen(db.session, 'do_orm_execute', _collect_bulk_changes)
+        event.listen(db.session, 'after_commit', _publish_changes)
+        event.listen(db.session, 'after_rollback', _discard_changes)
+
+    @staticmethod
+    def _root() -> str:
+        return current_app.config.get('SNAPSHOT_DIR') or os.path.join(current_app.instance_path, 'snapshots')
+
+    @classmethod
+    def _path(cls, kind: str, object_id: int) -> str:
+        root = cls._root()
+        if kind == 'match':
+            return os.path.join(root, 'matches', f'{object_id}.json')
+        filename = 'standings.json' if kind == 'standings' else 'index.json'
+        return os.path.join(root, 'tournaments', str(object_id), filename)
+
+    @classmethod
+    def _layout_path(cls) -> str:
+        return os.path.join(cls._root(), 'layout.json')
+
+    @classmethod
+    def is_published(cls, tournament_id: int) -> bool:
+        return os.path.exists(cls._path('tournament', tournament_id)) and os.path.exists(cls._layout_path())
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[Dict]:
+        try:
+            with open(path, encoding='utf-8') as json_file:
+                return json.load(json_file)
+        except (OSError, ValueError):
+            # Brak publikacji albo plik usunięty w trakcie ponownej publikacji
+            return None
+
+    @classmethod
+    def page(cls, kind: str, object_id: int) -> Optional[Tuple[str, Markup, Optional[str]]]:
+        """Opublikowany fragment strony ('tournament', 'match'): (tytuł, fragment, logo) albo None"""
+        layout = cls._read_json(cls._layout_path())
+        page = cls._read_json(cls._path(kind, object_id)) if layout is not None else None
+        if page is None:
+            return None
+        return page['title'], Markup(page['fragment']), layout.get('logo_path')
+
+    @classmethod
+    def write_layout(cls, logo_path: Optional[str]) -> None:
+        """Zapisuje ustawienia szablonu stron używane przy wysyłaniu opublikowanych fragmentów"""
+        cls._write(cls._layout_path(), json.dumps({'logo_path': logo_path}))
+
+    @classmethod
+    def serve_standings(cls, tournament_id: int):
+        """Opublikowana tabela wyników (JSON) albo None"""
+        path = cls._path('standings', tournament_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            return send_file(path, mimetype='application/json', max_age=0)
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def ensure_published(cls, tournament_id: int) -> None:
+        """Zleca publikację zakończonego turnieju, którego plików brak (np. po wyczyszczeniu katalogu)"""
+        if current_app.config.get('SNAPSHOT_PUBLISH', True) and not cls.is_published(tournament_id):
+            cls.schedule(tournament_id)
+
+    @classmethod
+    def schedule(cls, tournament_id) -> None:
+        """Zleca odświeżenie plików turnieju (albo wszystkich dla _REFRESH_ALL) w tle"""
+        with cls._scheduled_lock:
+            if tournament_id in cls._scheduled:
+                return
+            cls._scheduled.add(tournament_id)
+        try:
+            service = cls()
+            function = service.refresh_all if tournament_id == _REFRESH_ALL else service.refresh
+            # Bez wpisu w bazie - wywoływane także z after_commit, gdy sesja nie może pytać bazy
+            TaskService().submit_task(
+                function=function,
+                name=f'Publikacja statycznych stron turnieju {tournament_id}',
+                args=() if tournament_id == _REFRESH_ALL else (tournament_id,),
+                notify_user=False,
+                persist=False,
+                priority='batch'
+            )
+        except Exception as e:
+            current_app.logger.error(f'Error scheduling snapshot of tournament {tournament_id}: {str(e)}')
+            cls._done(tournament_id)
+
+    @classmethod
+    def _done(cls, tournament_id) -> None:
+        with cls._scheduled_lock:
+            cls._scheduled.discard(tournament_id)
+
+    def refresh(self, tournament_id: int) -> Dict:
+        """Publikuje zakończony turniej albo usuwa pliki turnieju, który nie jest zakończony"""
+        try:
+            tournament = QueryService.get_tournament(tournament_id)
+            if tournament is None or tournament.status != 'finished':
+                return {'tournament_id': tournament_id, 'removed': self.unpublish(tournament_id)}
+            return self.publish(tournament)
+        finally:
+            self._done(tournament_id)
+
+    def refresh_all(self) -> Dict:
+        """Sprawdza wszystkie opublikowane turnieje (po zmianach masowych bez znanych turniejów)"""
+        try:
+            tournaments_dir = os.path.join(self._root(), 'tournaments')
+            published = [int(name) for name in os.listdir(tournaments_dir)] if os.path.isdir(tournaments_dir) else []
+            for tournament_id in published:
+                self.refresh(tournament_id)
+            return {'refreshed': len(published)}
+        finally:
+            self._done(_REFRESH_ALL)
+
+    def publish(self, tournament: Tournament) -> Dict:
+        """Renderuje fragment strony turnieju, fragmenty stron meczów i tabelę wyników do plików"""
+        try:
+            matches = QueryService.tournament_matches(tournament.id)
+            standings = StandingsService.get_standings(tournament.id)
+            stats_service = StatsService()
+
+            # Fragmenty korzystają z url_for - potrzebny kontekst żądania
+            with current_app.test_request_context():
+                pages = {self._path('match', match.id): {
+                    'title': match_title(match),
+                    'fragment': render_template('parent/_match_details.html',
+                                                match=match,
+                                                stats=stats_service.get_match_stats(match.id))
+                } for match in matches}
+                # Strona turnieju na końcu - jej obecność oznacza opublikowany turniej
+                pages[self._path('tournament', tournament.id)] = {
+                    'title': tournament.name,
+                    'fragment': render_template('parent/_tournament_details.html',
+                                                tournament=tournament,
+                                                matches=matches,
+                                                team_stats=StandingsService.get_table(tournament.id))
+                }
+
+            published_at = datetime.utcnow().isoformat()
+            self.write_layout(ConfigService.get_setting('logo_path'))
+            self._write(self._path('standings', tournament.id), json.dumps({
+                'tournament_id': tournament.id,
+                'standings': standings,
+                'last_updated': published_at
+            }, default=str))
+            # Strony meczów usuniętych od poprzedniej publikacji
+            match_ids = [match.id for match in matches]
+            for match_id in set(self._read_match_index(tournament.id)) - set(match_ids):
+                stale_page = self._path('match', match_id)
+                if os.path.exists(stale_page):
+                    os.remove(stale_page)
+            self._write(self._match_index(tournament.id), json.dumps(match_ids))
+            for path, page in pages.items():
+                self._write(path, json.dumps(page))
+
+            return {
+                'tournament_id': tournament.id,
+                'pages': len(pages),
+                'published_at': published_at
+            }
+        except Exception as e:
+            current_app.logger.error(f'Error publishing snapshot of tournament {tournament.id}: {str(e)}')
+            raise
+
+    def unpublish(self, tournament_id: int) -> int:
+        """Usuwa pliki turnieju; zwraca liczbę usuniętych stron"""
+        removed = 0
+        tournament_page = self._path('tournament', tournament_id)
+        if os.path.exists(tournament_page):
+            # Najpierw strona turnieju - od tej chwili turniej nie jest opublikowany
+            os.remove(tournament_page)
+            removed += 1
+        for match_id in self._read_match_index(tournament_id):
+            match_page = self._path('match', match_id)
+            if os.path.exists(match_page):
+                os.remove(match_page)
+                removed += 1
+        shutil.rmtree(os.path.dirname(tournament_page), ignore_errors=True)
+        return removed
+
+    @classmethod
+    def _match_index(cls, tournament_id: int) -> str:
+        return os.path.join(os.path.dirname(cls._path('tournament', tournament_id)), 'matches.json')
+
+    @classmethod
+    def _read_match_index(cls, tournament_id: int) -> List[int]:
+        try:
+            with open(cls._match_index(tournament_id), encoding='utf-8') as index:
+                return json.load(index)
+        except (OSError, ValueError):
+            return []
+
+    @staticmethod
+    def _write(path: str, content: str) -> None:
+        """Zapis przez plik tymczasowy - czytający widzi starą albo nową wersję w całości"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.part', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as temp_file:
+                temp_file.write(content)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+def _pending(session) -> Set:
+    return session.info.setdefault(_PENDING, set())
+
+
+def _changed_tournaments(obj) -> Iterable[int]:
+    if isinstance(obj, Tournament):
+        identity = inspect(obj).identity
+        return identity or ()
+    history = inspect(obj).attrs.tournament_id.history
+    if not history.deleted:
+        return (obj.tournament_id,)
+    return chain(history.added or (), history.unchanged or (), history.deleted)
+
+
+def _collect_changes(session, flush_context, instances) -> None:
+    """Zapamiętuje turnieje do odświeżenia - zadania zlecamy dopiero po commicie"""
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, SystemSettings) and obj.key == 'logo_path':
+            session.info[_PENDING_LOGO] = None if obj in session.deleted else _decode_value(obj.value)
+            continue
+        if not isinstance(obj, (Match, Team, Tournament)):
+            continue
+        finished = False
+        if isinstance(obj, Tournament):
+            # Zakończenie turnieju (z dowolnego miejsca) publikuje jego strony
+            finished = 'finished' in (inspect(obj).attrs.status.history.added or ())
+        for tournament_id in _changed_tournaments(obj):
+            if tournament_id is not None:
+                _pending(session).add((tournament_id, finished))
+
+
+def _collect_bulk_changes(orm_execute_state) -> None:
+    """Masowe UPDATE/DELETE/INSERT - nie wiadomo, których turniejów dotyczą"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, (Match, Team, Tournament)):
+        _pending(orm_execute_state.session).add((_REFRESH_ALL, False))
+
+
+def _publish_changes(session) -> None:
+    if _PENDING_LOGO in session.info:
+        logo_path = session.info.pop(_PENDING_LOGO)
+        # Nowe logo od razu w opublikowanych stronach - bez ponownej publikacji
+        if os.path.exists(SnapshotService._layout_path()):
+            SnapshotService.write_layout(logo_path)
+    changes = session.info.pop(_PENDING, None)
+    if not changes or not current_app.config.get('SNAPSHOT_PUBLISH', True):
+        return
+    refresh_all = any(tournament_id == _REFRESH_ALL for tournament_id, _ in changes)
+    if refresh_all and os.path.isdir(SnapshotService._root()):
+        SnapshotService.schedule(_REFRESH_ALL)
+    for tournament_id, finished in changes:
+        # Zmiany w trakcie turnieju nie zlecają zadań - tylko zakończenie i poprawki opublikowanych
+        if tournament_id != _REFRESH_ALL and (finished or SnapshotService.is_published(tournament_id)):
+            SnapshotService.schedule(tournament_id)
+
+
+def _discard_changes(session) -> None:
+    session.info.pop(_PENDING, None)
+    session.info.pop(_PENDING_LOGO, None)
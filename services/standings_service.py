@@ -0,0 +1,169 @@
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict
+from flask import current_app
+from sqlalchemy import event, inspect, update, desc, func, and_
+
+from models import Match, Team, TournamentStanding
+from services.base_service import BaseService
+from extensions import db
+
+# Kolumny meczu, których zmiana może wpłynąć na tabelę wyników
+RESULT_ATTRIBUTES = ('tournament_id', 'team1_id', 'team2_id', 'team1_score', 'team2_score', 'status')
+
+
+class StandingsService(BaseService):
+    """Zmaterializowana tabela wyników (TournamentStanding) aktualizowana przyrostowo.
+
+    Każdy flush sesji, który kończy mecz, poprawia wynik zakończonego meczu albo
+    go usuwa, wycofuje poprzedni wynik i dolicza nowy. Odczyt tabeli to jedno
+    zapytanie po indeksie zamiast przeliczania wszystkich meczów.
+    """
+
+    @staticmethod
+    def init_app(app) -> None:
+        """Rejestruje nasłuchiwanie zmian meczów (jednorazowo na proces)"""
+        if event.contains(db.session, 'before_flush', _apply_match_changes):
+            return
+        # active_history wymusza załadowanie starej wartości przy przypisaniu,
+        # dzięki czemu można wycofać wynik nawet po wygaśnięciu obiektu po commit
+        for attribute in RESULT_ATTRIBUTES:
+            event.listen(getattr(Match, attribute), 'set', _track_result_attribute, active_history=True)
+        event.listen(db.session, 'before_flush', _apply_match_changes)
+
+    @staticmethod
+    def get_table(tournament_id: int) -> List[Dict]:
+        """Pobiera tabelę wyników turnieju jednym zapytaniem (drużyny bez meczów z zerami)"""
+        rows = db.session.query(Team, TournamentStanding).outerjoin(
+            TournamentStanding,
+            and_(TournamentStanding.team_id == Team.id,
+                 TournamentStanding.tournament_id == Team.tournament_id)
+        ).filter(
+            Team.tournament_id == tournament_id
+        ).order_by(
+            desc(func.coalesce(TournamentStanding.points, 0)),
+            desc(func.coalesce(TournamentStanding.goal_difference, 0)),
+            desc(func.coalesce(TournamentStanding.goals_for, 0)),
+            Team.id
+        ).all()
+
+        table = []
+        for team, standing in rows:
+            entry = {'team': team, 'team_id': team.id, 'team_name': team.name}
+            for column in TournamentStanding.COUNTERS:
+                entry[column] = (getattr(standing, column) or 0) if standing else 0
+            table.append(entry)
+        return table
+
+    @classmethod
+    def get_standings(cls, tournament_id: int) -> List[Dict]:
+        """Tabela wyników bez obiektów ORM (do cache'a i odpowiedzi JSON)"""
+        standings = []
+        for position, entry in enumerate(cls.get_table(tournament_id), start=1):
+            entry = dict(entry)
+            del entry['team']
+            entry['position'] = position
+            standings.append(entry)
+        return standings
+
+    def rebuild(self, tournament_id: int, commit: bool = True) -> int:
+        """Przelicza od zera tabelę turnieju (np. po masowym usunięciu meczów)"""
+        try:
+            TournamentStanding.query.filter_by(tournament_id=tournament_id).delete(synchronize_session=False)
+
+            standings = {}
+            matches = Match.query.filter_by(tournament_id=tournament_id, status='finished').all()
+            for match in matches:
+                for team_id in (match.team1_id, match.team2_id):
+                    if team_id not in standings:
+                        standings[team_id] = _new_standing(tournament_id, team_id)
+                    standings[team_id].update_from_match(match)
+
+            for standing in standings.values():
+                self.add(standing)
+            if commit:
+                self.commit()
+            return len(matches)
+        except Exception as e:
+            current_app.logger.error(f'Error rebuilding tournament standings: {str(e)}')
+            self.db.session.rollback()
+            raise
+
+
+def _new_standing(tournament_id: int, team_id: int) -> TournamentStanding:
+    standing = TournamentStanding(tournament_id=tournament_id, team_id=team_id)
+    for column in TournamentStanding.COUNTERS:
+        setattr(standing, column, 0)
+    return standing
+
+
+def _track_result_attribute(target, value, oldvalue, initiator):
+    """Nic nie robi - istnieje tylko po to, by włączyć active_history"""
+    return value
+
+
+def _result_key(values: Dict) -> Optional[Tuple]:
+    """Wynik meczu istotny dla tabeli albo None, gdy mecz nie jest zakończony"""
+    if values['status'] != 'finished':
+        return None
+    return (values['tournament_id'], values['team1_id'], values['team2_id'],
+            values['team1_score'] or 0, values['team2_score'] or 0)
+
+
+def _current_values(match: Match) -> Dict:
+    return {attribute: getattr(match, attribute) for attribute in RESULT_ATTRIBUTES}
+
+
+def _previous_values(match: Match) -> Dict:
+    state = inspect(match)
+    values = {}
+    for attribute in RESULT_ATTRIBUTES:
+        history = state.attrs[attribute].history
+        values[attribute] = history.deleted[0] if history.deleted else getattr(match, attribute)
+    return values
+
+
+def _apply_match_changes(session, flush_context, instances) -> None:
+    """Zamienia zmiany meczów w bieżącym flushu na przyrosty w tabeli wyników"""
+    changes = []  # (wynik, znak)
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, Match):
+                changes.append((_result_key(_current_values(obj)), 1))
+        for obj in session.dirty:
+            if isinstance(obj, Match) and session.is_modified(obj):
+                before = _result_key(_previous_values(obj))
+                after = _result_key(_current_values(obj))
+                if before != after:
+                    changes.append((before, -1))
+                    changes.append((after, 1))
+        for obj in session.deleted:
+            if isinstance(obj, Match):
+                changes.append((_result_key(_previous_values(obj)), -1))
+
+        deltas = defaultdict(lambda: dict.fromkeys(TournamentStanding.COUNTERS, 0))
+        for result, sign in changes:
+            if result is None:
+                continue
+            tournament_id, team1_id, team2_id, team1_score, team2_score = result
+            for team_id, own, opponent in ((team1_id, team1_score, team2_score),
+                                           (team2_id, team2_score, team1_score)):
+                for column, value in TournamentStanding.result_delta(own, opponent).items():
+                    deltas[(tournament_id, team_id)][column] += sign * value
+
+        for (tournament_id, team_id), delta in deltas.items():
+            if not any(delta.values()):
+                continue
+            # Przyrost liczony w SQL, żeby równoległe zapisy nie nadpisywały się nawzajem
+            result = session.execute(
+                update(TournamentStanding)
+                .where(TournamentStanding.tournament_id == tournament_id,
+                       TournamentStanding.team_id == team_id)
+                .values({column: getattr(TournamentStanding, column) + value
+                         for column, value in delta.items() if value})
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                standing = _new_standing(tournament_id, team_id)
+                for column, value in delta.items():
+                    setattr(standing, column, value)
+                session.add(standing)
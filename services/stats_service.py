@@ -1,10 +1,13 @@
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
-from sqlalchemy import func, desc, and_
+from sqlalchemy import func, desc
 from flask import current_app
 
 from models import Tournament, Match, Team, User, SystemLog
 from services.base_service import BaseService
+from services.standings_service import StandingsService
+from services.season_standings_service import SeasonStandingsService
+from services.query_service import QueryService
 
 class StatsService(BaseService):
     def get_tournament_stats(self, tournament_id: int) -> Optional[Dict]:
@@ -32,54 +35,8 @@ class StatsService(BaseService):
             if stats['matches_played'] > 0:
                 stats['avg_goals_per_match'] = round(stats['total_goals'] / stats['matches_played'], 2)
 
-            # Statystyki drużyn
-            for team in teams:
-                team_matches = [m for m in matches if m.team1_id == team.id or m.team2_id == team.id]
-                team_stats = {
-                    'team_name': team.name,
-                    'matches_played': 0,
-                    'wins': 0,
-                    'draws': 0,
-                    'losses': 0,
-                    'goals_for': 0,
-                    'goals_against': 0,
-                    'goal_difference': 0,
-                    'points': 0
-                }
-
-                for match in team_matches:
-                    if match.status != 'finished':
-                        continue
-
-                    team_stats['matches_played'] += 1
-                    if match.team1_id == team.id:
-                        team_stats['goals_for'] += match.team1_score or 0
-                        team_stats['goals_against'] += match.team2_score or 0
-                        if match.team1_score > match.team2_score:
-                            team_stats['wins'] += 1
-                            team_stats['points'] += 3
-                        elif match.team1_score == match.team2_score:
-                            team_stats['draws'] += 1
-                            team_stats['points'] += 1
-                        else:
-                            team_stats['losses'] += 1
-                    else:
-                        team_stats['goals_for'] += match.team2_score or 0
-                        team_stats['goals_against'] += match.team1_score or 0
-                        if match.team2_score > match.team1_score:
-                            team_stats['wins'] += 1
-                            team_stats['points'] += 3
-                        elif match.team1_score == match.team2_score:
-                            team_stats['draws'] += 1
-                            team_stats['points'] += 1
-                        else:
-                            team_stats['losses'] += 1
-
-                team_stats['goal_difference'] = team_stats['goals_for'] - team_stats['goals_against']
-                stats['teams'].append(team_stats)
-
-            # Sortowanie drużyn według punktów i różnicy bramek
-            stats['teams'].sort(key=lambda x: (-x['points'], -x['goal_difference'], -x['goals_for']))
+            # Statystyki drużyn z tabeli utrzymywanej przyrostowo
+            stats['teams'] = StandingsService.get_standings(tournament_id)
 
             return stats
         except Exception as e:
@@ -93,12 +50,7 @@ class StatsService(BaseService):
             if not team:
                 return None
 
-            matches = Match.query.filter(
-                and_(
-                    Match.status == 'finished',
-                    (Match.team1_id == team_id) | (Match.team2_id == team_id)
-                )
-            ).order_by(Match.start_time).all()
+            matches = QueryService.team_matches(team_id, status='finished')
 
             history = {
                 'team_name': team.name,
@@ -147,7 +99,7 @@ class StatsService(BaseService):
     def get_match_stats(self, match_id: int) -> Optional[Dict]:
         """Pobiera szczegółowe statystyki meczu"""
         try:
-            match = Match.query.get(match_id)
+            match = QueryService.get_match(match_id)
             if not match:
                 return None
 
@@ -208,10 +160,20 @@ class StatsService(BaseService):
                 },
                 'users': {
                     'total': User.query.count(),
-                    'active': User.query.filter_by(is_active=True).count()
+                    # Model nie ma flagi aktywności - każde konto jest aktywne (UserMixin)
+                    'active': User.query.count()
                 }
             }
 
+            # Najlepsze drużyny i bilans wyników ze wszystkich turniejów naraz
+            team_stats = sorted(
+                SeasonStandingsService().compute().values(),
+                key=lambda x: (-x['points'], -x['goal_difference'], -x['goals_for'], x['team_id'])
+            )
+            stats['teams']['top'] = team_stats[:10]
+            stats['matches']['draws'] = sum(team['draws'] for team in team_stats) // 2
+            stats['matches']['decided'] = sum(team['wins'] for team in team_stats)
+
             # Oblicz średnią liczbę drużyn na turniej
             if stats['tournaments']['total'] > 0:
                 stats['teams']['avg_per_tournament'] = round(
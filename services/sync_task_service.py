@@ -7,7 +7,7 @@ from services.task_service import TaskService
 from services.notification_service import NotificationService
 from services.stats_service import StatsService
 from services.config_service import ConfigService
-from models.tournament_standing import TournamentStanding
+from services.standings_service import StandingsService
 from models import TeamStats, Team
 from extensions.database import db
 
@@ -29,7 +29,8 @@ class SyncTaskService(BaseService):
                 description=f'Synchronizacja i aktualizacja danych turnieju {tournament_id}',
                 args=(tournament_id,),
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                priority='batch'
             )
 
             return task_id
@@ -46,7 +47,7 @@ class SyncTaskService(BaseService):
             # Aktualizacja statystyk drużyn
             team_stats = []
             for team in tournament_stats['teams']:
-                team_history = self.stats_service.get_team_history(team['id'])
+                team_history = self.stats_service.get_team_history(team['team_id'])
                 team_stats.append({
                     'team': team,
                     'history': team_history
@@ -68,55 +69,12 @@ class SyncTaskService(BaseService):
 
     def _update_tournament_standings(self, tournament_id: int,
                                    team_stats: List[Dict]) -> bool:
-        """Aktualizuje tabelę wyników turnieju"""
+        """Odbudowuje tabelę wyników turnieju z zakończonych meczów"""
         try:
-            # Oblicz punkty i statystyki dla każdej drużyny
-            standings = []
-            for team in team_stats:
-                history = team['history']
-                stats = history.get('stats', {})
-                
-                standings.append({
-                    'team_id': team['team']['id'],
-                    'team_name': team['team']['name'],
-                    'matches_played': stats.get('matches_played', 0),
-                    'wins': stats.get('wins', 0),
-                    'draws': stats.get('draws', 0),
-                    'losses': stats.get('losses', 0),
-                    'goals_for': stats.get('goals_scored', 0),
-                    'goals_against': stats.get('goals_conceded', 0),
-                    'points': (stats.get('wins', 0) * 3) + stats.get('draws', 0)
-                })
-
-            # Sortuj według punktów i różnicy bramek
-            standings.sort(key=lambda x: (-x['points'],
-                                      -(x['goals_for'] - x['goals_against']),
-                                      -x['goals_for']))
-
-            # Usuń stare wyniki
-            TournamentStanding.query.filter_by(tournament_id=tournament_id).delete()
-
-            # Zapisz nowe wyniki
-            for position, standing in enumerate(standings, 1):
-                new_standing = TournamentStanding(
-                    tournament_id=tournament_id,
-                    team_id=standing['team_id'],
-                    matches_played=standing['matches_played'],
-                    wins=standing['wins'],
-                    draws=standing['draws'],
-                    losses=standing['losses'],
-                    goals_for=standing['goals_for'],
-                    goals_against=standing['goals_against'],
-                    points=standing['points'],
-                    position=position
-                )
-                db.session.add(new_standing)
-
-            db.session.commit()
+            StandingsService().rebuild(tournament_id)
             return True
         except Exception as e:
             current_app.logger.error(f'Error updating tournament standings: {str(e)}')
-            db.session.rollback()
             return False
 
     def schedule_team_stats_sync(self, team_id: int,
@@ -129,7 +87,8 @@ class SyncTaskService(BaseService):
                 description=f'Synchronizacja i aktualizacja statystyk drużyny {team_id}',
                 args=(team_id,),
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                priority='batch'
             )
 
             return task_id
@@ -232,7 +191,8 @@ class SyncTaskService(BaseService):
                 name='Synchronizacja globalnych statystyk',
                 description='Synchronizacja i aktualizacja globalnych statystyk systemu',
                 user_id=user_id,
-                notify_user=True
+                notify_user=True,
+                priority='batch'
             )
 
             return task_id
@@ -0,0 +1,60 @@
+from typing import Any, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import pickle
+
+from services.task_queue import resolve_task_reference
+
+# Kontekst aplikacji procesu roboczego - jeden na cały czas życia procesu
+_worker_app = None
+_worker_context = None
+
+
+def create_process_pool(size: int, config_name: str) -> ProcessPoolExecutor:
+    """Tworzy pulę procesów dla zadań obciążających CPU.
+
+    Procesy startują metodą 'spawn' (bez kopiowania wątków i połączeń
+    z bazy procesu WWW), a każdy z nich buduje własną aplikację Flask.
+    """
+    return ProcessPoolExecutor(
+        max_workers=size,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+        initargs=(config_name,)
+    )
+
+
+def init_worker(config_name: str) -> None:
+    """Inicjalizator procesu: lekka aplikacja bez wątków w tle.
+
+    Bez monitoringu, wątków zadań, zapisu logów w tle, nasłuchu zmian
+    konfiguracji, Socket.IO i tworzenia schematu - to robi proces WWW.
+    """
+    global _worker_app, _worker_context
+    from app import create_app
+
+    _worker_app = create_app(config_name, config_overrides={
+        'TASK_POOL_WORKER': True,
+        'TASK_WORKERS_AUTOSTART': False,
+        'AUDIT_LOG_ASYNC': False,
+        'CONFIG_LISTENER': False
+    })
+    _worker_context = _worker_app.app_context()
+    _worker_context.push()
+
+
+def run_task(reference: str, args: List[Any], kwargs: Dict[str, Any]) -> Any:
+    """Wykonuje zadanie w procesie puli i sprząta sesję bazy po każdym zadaniu"""
+    from extensions import db
+    try:
+        return resolve_task_reference(reference)(*args, **kwargs)
+    finally:
+        db.session.remove()
+
+
+def is_picklable(*values: Any) -> bool:
+    try:
+        pickle.dumps(values)
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,439 @@
+from typing import Any, Callable, Dict, Iterable, Optional
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import importlib
+import inspect
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+
+from sqlalchemy import update, or_, and_, func
+
+from models import Task
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+def task_reference(function: Callable) -> Optional[str]:
+    """Zamienia funkcję na referencję 'moduł:Klasa.metoda' albo None, gdy się nie da.
+
+    Metody instancji serwisów zapisywane są przez klasę - worker tworzy
+    nową instancję serwisu. Funkcje lokalne i lambdy nie mają referencji.
+    """
+    if inspect.ismethod(function):
+        owner = function.__self__
+        owner_class = owner if inspect.isclass(owner) else type(owner)
+        qualname = f'{owner_class.__qualname__}.{function.__func__.__name__}'
+        module = owner_class.__module__
+    elif inspect.isfunction(function):
+        qualname = function.__qualname__
+        module = function.__module__
+    else:
+        return None
+
+    if '<' in qualname or module == '__main__':
+        return None
+    return f'{module}:{qualname}'
+
+
+def resolve_task_reference(reference: str) -> Callable:
+    """Odtwarza funkcję z referencji zapisanej przez task_reference"""
+    module_name, qualname = reference.split(':', 1)
+    target = importlib.import_module(module_name)
+    parts = qualname.split('.')
+    for index, part in enumerate(parts):
+        owner = target
+        target = getattr(owner, part)
+        # Metoda instancji: wywołujemy ją na świeżej instancji klasy
+        if inspect.isclass(owner) and inspect.isfunction(target) and index == len(parts) - 1:
+            if not isinstance(inspect.getattr_static(owner, part), staticmethod):
+                target = getattr(owner(), part)
+    return target
+
+
+def is_json_serializable(*values: Any) -> bool:
+    try:
+        json.dumps(values)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def worker_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _claim_pid(locked_by: str) -> int:
+    """PID z locked_by w postaci host:pid[:żeton przejęcia]"""
+    return int(locked_by.split(':')[1])
+
+
+# Klasy priorytetu w kolejności obsługi; w bazie zapisywane jako indeks
+PRIORITIES = ('realtime', 'interactive', 'batch')
+
+
+class FairTaskScheduler:
+    """Kolejka zadań w pamięci z klasami priorytetu i sprawiedliwym przydziałem.
+
+    Zadania wyższej klasy zawsze wychodzą pierwsze. W obrębie klasy
+    użytkownicy obsługiwani są po kolei (round robin), więc 50 zadań jednego
+    użytkownika nie blokuje pojedynczego zadania innego. Limity równoległości
+    per użytkownik i per typ zadania są wspólne dla wszystkich torów i nie
+    dotyczą klasy realtime.
+    """
+
+    def __init__(self, lanes: Iterable[str], per_user_limit: Optional[int] = None,
+                 type_limits: Optional[Dict[str, int]] = None):
+        self.per_user_limit = per_user_limit
+        self.type_limits = dict(type_limits or {})
+        # tor -> klasa -> {użytkownik: kolejka zadań}, kolejność słownika = kolejka round robin
+        self._pending = {lane: {priority: OrderedDict() for priority in PRIORITIES} for lane in lanes}
+        self._unfinished = dict.fromkeys(self._pending, 0)
+        self._running_users: Dict[Any, int] = {}
+        self._running_types: Dict[str, int] = {}
+        self._running_classes = dict.fromkeys(PRIORITIES, 0)
+        self._condition = threading.Condition()
+
+    def configure(self, per_user_limit: Optional[int] = None,
+                  type_limits: Optional[Dict[str, int]] = None) -> None:
+        with self._condition:
+            self.per_user_limit = per_user_limit
+            self.type_limits = dict(type_limits or {})
+            self._condition.notify_all()
+
+    def put(self, task: Dict) -> None:
+        with self._condition:
+            users = self._pending[task['lane']][task['priority']]
+            users.setdefault(task.get('user_id'), deque()).append(task)
+            self._unfinished[task['lane']] += 1
+            # Budzimy wszystkich - wątek zarezerwowany dla realtime nie weźmie zadania batch
+            self._condition.notify_all()
+
+    def _allowed(self, task: Dict) -> bool:
+        if task['priority'] == 'realtime':
+            return True
+        user_id = task.get('user_id')
+        if (self.per_user_limit and user_id is not None and
+                self._running_users.get(user_id, 0) >= self.per_user_limit):
+            return False
+        limit = self.type_limits.get(task.get('type'))
+        return limit is None or self._running_types.get(task.get('type'), 0) < limit
+
+    def _pop(self, lane: str, priorities: Iterable[str]) -> Optional[Dict]:
+        for priority in priorities:
+            users = self._pending[lane][priority]
+            for user_id in list(users):
+                tasks = users[user_id]
+                if not self._allowed(tasks[0]):
+                    continue
+                task = tasks.popleft()
+                # Obsłużony użytkownik trafia na koniec kolejki klasy
+                del users[user_id]
+                if tasks:
+                    users[user_id] = tasks
+                self._acquire(task)
+                return task
+        return None
+
+    def _acquire(self, task: Dict) -> None:
+        self._running_classes[task['priority']] += 1
+        # Zadania realtime nie podlegają limitom, więc ich nie zużywają
+        if task['priority'] == 'realtime':
+            return
+        user_id, task_type = task.get('user_id'), task.get('type')
+        if user_id is not None:
+            self._running_users[user_id] = self._running_users.get(user_id, 0) + 1
+        self._running_types[task_type] = self._running_types.get(task_type, 0) + 1
+
+    def get(self, lane: str, timeout: Optional[float] = None,
+            priorities: Iterable[str] = PRIORITIES) -> Dict:
+        """Zwraca następne zadanie toru, na które pozwalają limity; queue.Empty po czasie"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                task = self._pop(lane, priorities)
+                if task is not None:
+                    return task
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._condition.wait(remaining)
+
+    def task_done(self, task: Dict) -> None:
+        """Zwalnia limity zajęte przez zadanie pobrane przez get()"""
+        with self._condition:
+            if task['priority'] != 'realtime':
+                user_id, task_type = task.get('user_id'), task.get('type')
+                if user_id is not None:
+                    _decrement(self._running_users, user_id)
+                _decrement(self._running_types, task_type)
+            self._running_classes[task['priority']] -= 1
+            self._unfinished[task['lane']] -= 1
+            self._condition.notify_all()
+
+    def join(self, lane: Optional[str] = None) -> None:
+        """Czeka, aż wszystkie zadania toru (domyślnie wszystkich torów) zostaną wykonane"""
+        lanes = [lane] if lane else list(self._unfinished)
+        with self._condition:
+            while any(self._unfinished[name] for name in lanes):
+                self._condition.wait()
+
+    def qsize(self, lane: Optional[str] = None) -> int:
+        lanes = [lane] if lane else list(self._pending)
+        with self._condition:
+            return sum(len(tasks) for name in lanes
+                       for users in self._pending[name].values() for tasks in users.values())
+
+    def stats(self) -> Dict:
+        with self._condition:
+            stats = {}
+            for priority in PRIORITIES:
+                waiting = [tasks for lane in self._pending.values()
+                           for tasks in lane[priority].values()]
+                stats[priority] = {
+                    'queued': sum(len(tasks) for tasks in waiting),
+                    'waiting_users': len(waiting),
+                    'running': self._running_classes[priority]
+                }
+            return stats
+
+
+def _decrement(counter: Dict, key) -> None:
+    counter[key] = counter.get(key, 0) - 1
+    if counter[key] <= 0:
+        del counter[key]
+
+
+class DatabaseTaskQueue:
+    """Trwała kolejka zadań w tabeli task.
+
+    Worker przejmuje zadanie atomowo: na PostgreSQL przez
+    SELECT ... FOR UPDATE SKIP LOCKED, na pozostałych bazach (SQLite)
+    przez warunkowy UPDATE, który udaje się tylko jednemu procesowi.
+    Przejęte zadanie ma dzierżawę (locked_until) - jeśli worker zginie,
+    zadanie wraca do kolejki po upływie visibility timeout. Każde przejęcie
+    zapisuje w locked_by własny żeton (host:pid:uuid, zapamiętany też
+    w task.claim_token), więc wynik, błąd i przedłużenie dzierżawy zapisze
+    tylko to przejęcie - także gdy zadanie przejął ponownie wątek tego
+    samego procesu.
+    """
+
+    def __init__(self, visibility_timeout: int = 300, retry_backoff: int = 30,
+                 max_backoff: int = 3600, per_user_limit: Optional[int] = None,
+                 type_limits: Optional[Dict[str, int]] = None):
+        self.visibility_timeout = visibility_timeout
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.per_user_limit = per_user_limit
+        self.type_limits = dict(type_limits or {})
+        self.worker_id = worker_id()
+
+    def _claim_token(self) -> str:
+        return f'{self.worker_id}:{uuid.uuid4().hex[:12]}'
+
+    def _claimable(self, now: datetime, lane: Optional[str] = None):
+        condition = and_(Task.durable.is_(True), Task.status == 'pending', Task.available_at <= now)
+        if lane is not None:
+            condition = and_(condition, Task.lane == lane)
+        return and_(condition, *self._limit_conditions())
+
+    def _limit_conditions(self) -> list:
+        """Pomija zadania użytkowników i typów, które wyczerpały limit równoległości.
+
+        Limit jest miękki - dwa workery mogą go jednocześnie przekroczyć o jedno zadanie.
+        """
+        if not self.per_user_limit and not self.type_limits:
+            return []
+        running = db.session.query(Task.user_id, Task.type, func.count(Task.id)).filter(
+            Task.durable.is_(True), Task.status == 'running'
+        ).group_by(Task.user_id, Task.type).all()
+        users, types = {}, {}
+        for user_id, task_type, count in running:
+            if user_id is not None:
+                users[user_id] = users.get(user_id, 0) + count
+            types[task_type] = types.get(task_type, 0) + count
+
+        conditions = []
+        busy_users = [user_id for user_id, count in users.items()
+                      if self.per_user_limit and count >= self.per_user_limit]
+        if busy_users:
+            conditions.append(or_(Task.user_id.is_(None), Task.user_id.notin_(busy_users)))
+        busy_types = [task_type for task_type, limit in self.type_limits.items()
+                      if types.get(task_type, 0) >= limit]
+        if busy_types:
+            conditions.append(Task.type.notin_(busy_types))
+        return conditions
+
+    def claim(self, lane: Optional[str] = None) -> Optional[Task]:
+        """Przejmuje najpilniejsze dostępne zadanie (opcjonalnie z danego toru) albo zwraca None"""
+        now = datetime.utcnow()
+        session = db.session
+
+        if db.engine.dialect.name == 'postgresql':
+            task = Task.query.filter(self._claimable(now, lane)).order_by(
+                Task.priority, Task.available_at, Task.id
+            ).with_for_update(skip_locked=True).limit(1).first()
+            if task is None:
+                session.rollback()
+                return None
+            self._mark_claimed(task, now)
+            session.commit()
+            return task
+
+        candidates = [task_id for (task_id,) in session.query(Task.id).filter(
+            self._claimable(now, lane)
+        ).order_by(Task.priority, Task.available_at, Task.id).limit(5).all()]
+        for task_id in candidates:
+            token = self._claim_token()
+            result = session.execute(
+                update(Task)
+                .where(Task.id == task_id, Task.status == 'pending')
+                .values(status='running', locked_by=token,
+                        locked_until=now + timedelta(seconds=self.visibility_timeout),
+                        started_at=now, updated_at=now, attempts=Task.attempts + 1)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+            if result.rowcount == 1:
+                task = session.get(Task, task_id)
+                session.refresh(task)
+                task.claim_token = token
+                if task.visibility_timeout:
+                    task.locked_until = now + timedelta(seconds=task.visibility_timeout)
+                    session.commit()
+                return task
+        session.rollback()
+        return None
+
+    def _mark_claimed(self, task: Task, now: datetime) -> None:
+        task.status = 'running'
+        task.claim_token = task.locked_by = self._claim_token()
+        task.locked_until = now + timedelta(seconds=task.visibility_timeout or self.visibility_timeout)
+        task.started_at = now
+        task.attempts = (task.attempts or 0) + 1
+
+    def _lease_of(self, task: Task) -> int:
+        return task.visibility_timeout or self.visibility_timeout
+
+    def _finish(self, task: Task, **values) -> bool:
+        """Zapis wyniku tylko przez przejęcie, które nadal trzyma dzierżawę zadania"""
+        task_id = task.id
+        result = db.session.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.status == 'running', Task.locked_by == task.claim_token)
+            .values(locked_until=None, updated_at=datetime.utcnow(), **values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if result.rowcount == 0:
+            logger.warning(f'Task {task_id} lease lost - result dropped')
+            return False
+        return True
+
+    def complete(self, task: Task, result: Any) -> bool:
+        """Zapisuje wynik; False, gdy dzierżawa wygasła i zadanie przejął inny worker"""
+        return self._finish(task, status='completed', completed_at=datetime.utcnow(),
+                            result=result if is_json_serializable(result) else str(result))
+
+    def fail(self, task: Task, error_message: str) -> Optional[bool]:
+        """Zapisuje błąd; True - zadanie zostanie ponowione, None - dzierżawa utracona"""
+        if (task.attempts or 0) < (task.max_attempts or 1):
+            delay = min(self.retry_backoff * 2 ** max((task.attempts or 1) - 1, 0), self.max_backoff)
+            recorded = self._finish(task, status='pending', error_message=error_message,
+                                    available_at=datetime.utcnow() + timedelta(seconds=delay))
+            return True if recorded else None
+        recorded = self._finish(task, status='failed', error_message=error_message,
+                                completed_at=datetime.utcnow())
+        return False if recorded else None
+
+    def renew(self, task_id: int, claim_token: str, lease: int) -> bool:
+        """Przedłuża dzierżawę wykonywanego zadania; False, gdy należy już do innego przejęcia"""
+        result = db.session.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.status == 'running', Task.locked_by == claim_token)
+            .values(locked_until=datetime.utcnow() + timedelta(seconds=lease))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    @contextmanager
+    def heartbeat(self, app, task: Task):
+        """Przedłuża dzierżawę w tle co 1/3 jej długości, dopóki zadanie się wykonuje"""
+        task_id, claim_token, lease = task.id, task.claim_token, self._lease_of(task)
+        stopped = threading.Event()
+
+        def beat():
+            while not stopped.wait(lease / 3):
+                with app.app_context():
+                    try:
+                        if not self.renew(task_id, claim_token, lease):
+                            return
+                    except Exception as e:
+                        logger.error(f'Error renewing lease of task {task_id}: {str(e)}')
+                        db.session.rollback()
+                    finally:
+                        db.session.remove()
+
+        thread = threading.Thread(target=beat, name=f'task-lease-{task_id}', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+
+    def requeue_expired(self) -> int:
+        """Zwraca do kolejki zadania, którym wygasła dzierżawa"""
+        now = datetime.utcnow()
+        result = db.session.execute(
+            update(Task)
+            .where(Task.durable.is_(True), Task.status == 'running', Task.locked_until < now)
+            .values(status='pending', available_at=now, locked_by=None, locked_until=None,
+                    updated_at=now, error_message='Przekroczono czas dzierżawy zadania')
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def requeue_orphans(self) -> int:
+        """Przy starcie: zwraca do kolejki zadania martwych procesów z tego hosta"""
+        hostname = socket.gethostname()
+        orphan_ids = []
+        running = db.session.query(Task.id, Task.locked_by).filter(
+            Task.durable.is_(True), Task.status == 'running',
+            or_(Task.locked_by.is_(None), Task.locked_by.like(f'{hostname}:%'))
+        ).all()
+        for task_id, locked_by in running:
+            if locked_by is None or not _process_alive(_claim_pid(locked_by)):
+                orphan_ids.append(task_id)
+
+        if orphan_ids:
+            now = datetime.utcnow()
+            db.session.execute(
+                update(Task)
+                .where(Task.id.in_(orphan_ids), Task.status == 'running')
+                .values(status='pending', available_at=now, locked_by=None,
+                        locked_until=None, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        return len(orphan_ids) + self.requeue_expired()
+
+
+def _process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return False  # to jest nowy proces - poprzedni o tym PID już nie działa
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
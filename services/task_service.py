@@ -1,61 +1,254 @@
 from typing import Dict, Optional, Any, List, Callable
 from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+import os
 import threading
 import queue
+import time
 import uuid
 from flask import current_app
+from sqlalchemy import func, update
 
 from models import SystemLog, Task
 from services.base_service import BaseService
 from services.notification_service import NotificationService
+from services.task_queue import (DatabaseTaskQueue, FairTaskScheduler, PRIORITIES, task_reference,
+                                 resolve_task_reference, is_json_serializable)
+from services.task_pool import create_process_pool, run_task, is_picklable
+
+# Tory wykonania: 'thread' - wątki procesu WWW (zadania I/O),
+# 'process' - pula procesów dla zadań obciążających CPU (raporty, eksporty, archiwa)
+LANES = ('thread', 'process')
 
 class TaskService(BaseService):
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        # Jedna kolejka i jedna pula wątków na proces, niezależnie od liczby serwisów
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(TaskService, cls).__new__(cls)
+        return cls._instance
+
     def __init__(self):
+        if hasattr(self, 'initialized'):
+            return
         super().__init__()
         self.notification_service = NotificationService()
         self._tasks = {}  # Słownik zadań {task_id: task_info}
-        self._task_queue = queue.Queue()
+        self._scheduler = FairTaskScheduler(LANES, per_user_limit=2)
         self._workers = []
         self._running = False
         self._max_workers = 3
-        self._start_workers()
+        self._process_workers = 2
+        self._realtime_workers = 1
+        self._process_pool = None
+        self._pool_lock = threading.Lock()
+        self._config_name = 'default'
+        self._lane_running = dict.fromkeys(LANES, 0)
+        self._lane_lock = threading.Lock()
+        self._lane_latency = {lane: deque(maxlen=500) for lane in LANES}  # (oczekiwanie, wykonanie)
+        self._class_latency = {priority: deque(maxlen=500) for priority in PRIORITIES}
+        self._app = None
+        self._durable_queue: Optional[DatabaseTaskQueue] = None
+        self._poll_interval = 1.0
+        self._last_lease_check = 0.0
+        self.initialized = True
+
+    def init_app(self, app) -> None:
+        """Konfiguruje tryb kolejki (TASK_QUEUE_MODE: 'memory' lub 'database')"""
+        self._app = app
+        self._max_workers = app.config.get('TASK_WORKERS', 3)
+        self._process_workers = app.config.get('TASK_PROCESS_WORKERS') or min(2, os.cpu_count() or 1)
+        self._realtime_workers = app.config.get('TASK_REALTIME_WORKERS', 1)
+        per_user_limit = app.config.get('TASK_MAX_PER_USER', 2)
+        type_limits = app.config.get('TASK_TYPE_LIMITS', {})
+        self._scheduler.configure(per_user_limit, type_limits)
+        self._config_name = app.config.get('CONFIG_NAME', 'default')
+        self._poll_interval = app.config.get('TASK_POLL_INTERVAL', 1.0)
+        # Proces puli tylko wykonuje zadania - kolejką zarządza proces WWW
+        if app.config.get('TASK_QUEUE_MODE', 'memory') != 'database' or app.config.get('TASK_POOL_WORKER'):
+            self._durable_queue = None
+            return
+
+        self._durable_queue = DatabaseTaskQueue(
+            visibility_timeout=app.config.get('TASK_VISIBILITY_TIMEOUT', 300),
+            retry_backoff=app.config.get('TASK_RETRY_BACKOFF', 30),
+            per_user_limit=per_user_limit,
+            type_limits=type_limits
+        )
+        with app.app_context():
+            try:
+                requeued = self._durable_queue.requeue_orphans()
+                if requeued:
+                    app.logger.warning(f'Requeued {requeued} orphaned tasks')
+            except Exception as e:
+                app.logger.error(f'Error requeueing orphaned tasks: {str(e)}')
+                self.db.session.rollback()
+
+        # Zadania sprzed restartu nie mogą czekać na pierwsze nowe zgłoszenie
+        if app.config.get('TASK_WORKERS_AUTOSTART', not app.testing):
+            self._start_workers()
 
     def _start_workers(self) -> None:
-        """Uruchamia wątki robocze"""
-        self._running = True
-        for _ in range(self._max_workers):
-            worker = threading.Thread(target=self._worker_loop, daemon=True)
-            worker.start()
-            self._workers.append(worker)
-
-    def _worker_loop(self) -> None:
-        """Główna pętla wątku roboczego"""
+        """Uruchamia wątki robocze (leniwie, przy pierwszym zadaniu)"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            # Tor procesów obsługują wątki-dyspozytorzy: czekają na wynik z puli,
+            # więc nie konkurują o GIL z obsługą żądań
+            sizes = {'thread': self._max_workers, 'process': self._process_workers}
+            pools = [(lane, PRIORITIES, sizes[lane]) for lane in LANES]
+            # Wątki zarezerwowane dla realtime - powiadomienia meczowe nie czekają na archiwa
+            pools.append(('thread', ('realtime',), self._realtime_workers))
+            for lane, priorities, size in pools:
+                for _ in range(size):
+                    worker = threading.Thread(target=self._worker_loop, args=(lane, priorities),
+                                              daemon=True)
+                    worker.start()
+                    self._workers.append(worker)
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Zatrzymuje wątki robocze i pulę procesów; zadania w bazie czekają na kolejny start"""
+        with self._lock:
+            self._running = False
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.join(timeout if timeout is not None else self._poll_interval * 2)
+        with self._pool_lock:
+            pool, self._process_pool = self._process_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _get_process_pool(self):
+        with self._pool_lock:
+            if self._process_pool is None:
+                self._process_pool = create_process_pool(self._process_workers, self._config_name)
+            return self._process_pool
+
+    def _invoke(self, lane: str, function: Optional[Callable], reference: Optional[str],
+                args, kwargs) -> Any:
+        """Wywołuje funkcję zadania w wątku albo w procesie puli"""
+        if lane != 'process':
+            return function(*args, **kwargs)
+        pool = self._get_process_pool()
+        try:
+            return pool.submit(run_task, reference, list(args), kwargs).result()
+        except BrokenProcessPool:
+            # Proces puli zginął (np. OOM) - kolejne zadanie dostanie nową pulę
+            with self._pool_lock:
+                if self._process_pool is pool:
+                    self._process_pool = None
+            raise
+
+    def _track_running(self, lane: str, delta: int) -> None:
+        with self._lane_lock:
+            self._lane_running[lane] += delta
+
+    def _record_latency(self, lane: str, priority: str, wait: float, run: float) -> None:
+        sample = (max(wait, 0.0), run)
+        self._lane_latency[lane].append(sample)
+        self._class_latency[priority].append(sample)
+
+    def _worker_loop(self, lane: str = 'thread', priorities: tuple = PRIORITIES) -> None:
+        """Główna pętla wątku roboczego toru"""
+        # Zadania realtime nie trafiają do bazy, więc wątki zarezerwowane jej nie odpytują
+        poll_database = 'batch' in priorities
         while self._running:
+            if poll_database and self._durable_queue is not None and self._run_durable_task(lane):
+                continue
             try:
-                task = self._task_queue.get(timeout=1)
-                if task:
-                    self._execute_task(task)
-                self._task_queue.task_done()
+                task = self._scheduler.get(lane, timeout=self._poll_interval, priorities=priorities)
             except queue.Empty:
                 continue
+            try:
+                # Wątek roboczy nie dziedziczy kontekstu żądania
+                with task['app'].app_context():
+                    self._execute_task(task)
             except Exception as e:
-                current_app.logger.error(f'Worker error: {str(e)}')
+                task['app'].logger.error(f'Worker error: {str(e)}')
+            finally:
+                self._scheduler.task_done(task)
+
+    def _run_durable_task(self, lane: str = 'thread') -> bool:
+        """Przejmuje i wykonuje jedno zadanie toru z trwałej kolejki; False gdy kolejka pusta"""
+        app = self._app
+        with app.app_context():
+            try:
+                if time.time() - self._last_lease_check > self._durable_queue.visibility_timeout / 10:
+                    self._last_lease_check = time.time()
+                    self._durable_queue.requeue_expired()
+                task = self._durable_queue.claim(lane)
+            except Exception as e:
+                app.logger.error(f'Error claiming task: {str(e)}')
+                self.db.session.rollback()
+                return False
+            if task is None:
+                return False
+            self._execute_durable_task(task)
+            return True
+
+    def _execute_durable_task(self, task: Task) -> None:
+        """Wykonuje zadanie z bazy, ponawiając je z opóźnieniem przy błędzie"""
+        lane = task.lane if task.lane in LANES else 'thread'
+        priority = PRIORITIES[task.priority] if task.priority in range(len(PRIORITIES)) else 'interactive'
+        started = time.time()
+        wait = (datetime.utcnow() - (task.available_at or task.created_at)).total_seconds()
+        self._track_running(lane, 1)
+        try:
+            function = resolve_task_reference(task.function) if lane == 'thread' else None
+            # Dzierżawa przedłużana w trakcie - długie zadanie nie wraca do kolejki
+            with self._durable_queue.heartbeat(current_app._get_current_object(), task):
+                result = self._invoke(lane, function, task.function, task.args or [], task.kwargs or {})
+            completed = self._durable_queue.complete(task, result)
+            if completed and task.notify_user and task.user_id:
+                self.notification_service.create_notification(
+                    user_id=task.user_id,
+                    title="Zadanie zakończone",
+                    message=f"Zadanie {task.name} zostało zakończone pomyślnie",
+                    notification_type='task_completed'
+                )
+        except Exception as e:
+            error_msg = str(e)
+            current_app.logger.error(f'Task {task.uid} failed (attempt {task.attempts}): {error_msg}')
+            self.db.session.rollback()
+            will_retry = self._durable_queue.fail(task, error_msg)
+            if will_retry is False and task.notify_user and task.user_id:
+                self.notification_service.create_notification(
+                    user_id=task.user_id,
+                    title="Błąd zadania",
+                    message=f"Zadanie {task.name} zakończyło się błędem: {error_msg}",
+                    notification_type='task_failed'
+                )
+        finally:
+            self._track_running(lane, -1)
+            self._record_latency(lane, priority, wait, time.time() - started)
 
     def _execute_task(self, task: Dict) -> None:
         """Wykonuje zadanie i aktualizuje jego status"""
+        lane = task['lane']
+        started = time.time()
+        self._track_running(lane, 1)
         try:
             task_id = task['id']
+            if task['status'] == 'cancelled':
+                return
             self._update_task_status(task_id, 'running')
 
             # Wykonaj zadanie
-            result = task['function'](*task['args'], **task['kwargs'])
-            
+            result = self._invoke(lane, task['function'], task.get('reference'),
+                                  task['args'], task['kwargs'])
+
             # Aktualizuj status i wynik
             self._tasks[task_id]['result'] = result
             self._update_task_status(task_id, 'completed')
-            
+
             # Powiadom o zakończeniu
-            if task.get('notify_user'):
+            if task.get('notify_user') and task.get('user_id'):
                 self.notification_service.create_notification(
                     user_id=task['user_id'],
                     title="Zadanie zakończone",
@@ -66,14 +259,19 @@ class TaskService(BaseService):
             error_msg = str(e)
             self._tasks[task_id]['error'] = error_msg
             self._update_task_status(task_id, 'failed')
-            
-            if task.get('notify_user'):
+
+            if task.get('notify_user') and task.get('user_id'):
                 self.notification_service.create_notification(
                     user_id=task['user_id'],
                     title="Błąd zadania",
                     message=f"Zadanie {task['name']} zakończyło się błędem: {error_msg}",
                     notification_type='task_failed'
                 )
+        finally:
+            self._track_running(lane, -1)
+            if task['status'] != 'cancelled':
+                wait = (datetime.utcfromtimestamp(started) - task['created_at']).total_seconds()
+                self._record_latency(lane, task['priority'], wait, time.time() - started)
 
     def _update_task_status(self, task_id: str, status: str) -> None:
         """Aktualizuje status zadania"""
@@ -83,14 +281,16 @@ class TaskService(BaseService):
                 self._tasks[task_id]['updated_at'] = datetime.utcnow()
 
                 # Zapisz do bazy danych
-                task = Task.query.get(task_id)
+                db_task_id = self._tasks[task_id].get('db_id')
+                task = Task.query.get(db_task_id) if db_task_id else None
                 if task:
                     task.status = status
-                    task.updated_at = datetime.utcnow()
-                    if status == 'completed':
+                    if status == 'running':
+                        task.started_at = datetime.utcnow()
+                    if status in ('completed', 'failed', 'cancelled'):
                         task.completed_at = datetime.utcnow()
                     if 'error' in self._tasks[task_id]:
-                        task.error = self._tasks[task_id]['error']
+                        task.error_message = self._tasks[task_id]['error']
                     self.commit()
 
         except Exception as e:
@@ -98,48 +298,119 @@ class TaskService(BaseService):
 
     def submit_task(self, function: Callable, name: str, description: str = None,
                    args: tuple = None, kwargs: dict = None, user_id: Optional[int] = None,
-                   notify_user: bool = True) -> str:
-        """Dodaje nowe zadanie do kolejki"""
+                   notify_user: bool = True, persist: bool = True, max_attempts: int = 3,
+                   visibility_timeout: Optional[int] = None, lane: str = 'thread',
+                   priority: str = 'interactive') -> str:
+        """Dodaje nowe zadanie do kolejki (persist=False - bez wpisu w bazie).
+
+        priority: 'realtime' (np. powiadomienia meczowe - bez limitów, własny
+        wątek), 'interactive' (zlecone przez użytkownika) lub 'batch'.
+        lane='process' wykonuje zadanie w puli procesów - funkcja musi być
+        importowalna, a argumenty serializowalne przez pickle. W trybie
+        'database' zadanie z importowalną funkcją i argumentami JSON trafia
+        do trwałej kolejki i przetrwa restart procesu.
+        """
         try:
+            if lane not in LANES:
+                raise ValueError(f'Nieznany tor wykonania zadania: {lane}')
+            if priority not in PRIORITIES:
+                raise ValueError(f'Nieznana klasa priorytetu zadania: {priority}')
             task_id = str(uuid.uuid4())
+            args = tuple(args or ())
+            kwargs = kwargs or {}
+
+            reference = task_reference(function)
+            if lane == 'process' and not (reference and is_picklable(args, kwargs)):
+                current_app.logger.warning(f'Task {name} cannot run in a process pool, using threads')
+                lane = 'thread'
+
+            # Zadania realtime są nieaktualne po restarcie - idą przez kolejkę w pamięci
+            if (persist and self._durable_queue and priority != 'realtime' and reference
+                    and is_json_serializable(args, kwargs)):
+                db_task = Task(
+                    type=getattr(function, '__name__', 'task')[:50],
+                    uid=task_id,
+                    name=name,
+                    description=description,
+                    user_id=user_id,
+                    notify_user=notify_user,
+                    durable=True,
+                    lane=lane,
+                    priority=PRIORITIES.index(priority),
+                    function=reference,
+                    args=list(args),
+                    kwargs=kwargs,
+                    max_attempts=max_attempts,
+                    visibility_timeout=visibility_timeout,
+                    available_at=datetime.utcnow()
+                )
+                self.add(db_task)
+                self.commit()
+                self._start_workers()
+                return task_id
+
             task = {
                 'id': task_id,
+                'type': getattr(function, '__name__', 'task')[:50],
                 'name': name,
                 'description': description,
                 'function': function,
-                'args': args or (),
-                'kwargs': kwargs or {},
+                'reference': reference,
+                'lane': lane,
+                'priority': priority,
+                'args': args,
+                'kwargs': kwargs,
                 'status': 'pending',
                 'created_at': datetime.utcnow(),
                 'updated_at': datetime.utcnow(),
                 'user_id': user_id,
-                'notify_user': notify_user
+                'notify_user': notify_user,
+                'app': current_app._get_current_object()
             }
-            
+
             # Zapisz do pamięci
             self._tasks[task_id] = task
-            
+
             # Zapisz do bazy danych
-            db_task = Task(
-                id=task_id,
-                name=name,
-                description=description,
-                status='pending',
-                user_id=user_id,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            self.add(db_task)
-            self.commit()
+            if persist:
+                db_task = Task(
+                    type=getattr(function, '__name__', 'task')[:50],
+                    uid=task_id,
+                    name=name,
+                    description=description,
+                    user_id=user_id,
+                    notify_user=notify_user,
+                    lane=lane,
+                    priority=PRIORITIES.index(priority)
+                )
+                self.add(db_task)
+                self.commit()
+                task['db_id'] = db_task.id
 
-            # Dodaj do kolejki
-            self._task_queue.put(task)
+            # Dodaj do kolejki toru
+            self._start_workers()
+            self._scheduler.put(task)
 
             return task_id
         except Exception as e:
             current_app.logger.error(f'Error submitting task: {str(e)}')
             raise
 
+    @staticmethod
+    def _serialize_task(task: Task) -> Dict:
+        return {
+            'id': task.uid or task.id,
+            'name': task.name,
+            'description': task.description,
+            'status': task.status,
+            'created_at': task.created_at,
+            'updated_at': task.updated_at,
+            'completed_at': task.completed_at,
+            'attempts': task.attempts,
+            'error': task.error_message,
+            'result': task.result
+        }
+
     def get_task_status(self, task_id: str) -> Optional[Dict]:
         """Pobiera status zadania"""
         try:
@@ -154,7 +425,8 @@ class TaskService(BaseService):
                     'error': task.get('error'),
                     'result': task.get('result')
                 }
-            return None
+            task = Task.query.filter_by(uid=task_id).first()
+            return self._serialize_task(task) if task else None
         except Exception as e:
             current_app.logger.error(f'Error getting task status: {str(e)}')
             return None
@@ -166,17 +438,9 @@ class TaskService(BaseService):
             query = Task.query.filter_by(user_id=user_id)
             if status:
                 query = query.filter_by(status=status)
-            
-            return [{
-                'id': task.id,
-                'name': task.name,
-                'description': task.description,
-                'status': task.status,
-                'created_at': task.created_at,
-                'updated_at': task.updated_at,
-                'completed_at': task.completed_at,
-                'error': task.error
-            } for task in query.order_by(Task.created_at.desc()).limit(limit)]
+
+            return [self._serialize_task(task)
+                    for task in query.order_by(Task.created_at.desc()).limit(limit)]
         except Exception as e:
             current_app.logger.error(f'Error getting user tasks: {str(e)}')
             return []
@@ -185,7 +449,15 @@ class TaskService(BaseService):
         """Anuluje zadanie jeśli jeszcze nie zostało rozpoczęte"""
         try:
             if task_id not in self._tasks:
-                return False
+                # Zadanie z trwałej kolejki - anuluj tylko, jeśli nikt go nie przejął
+                result = self.db.session.execute(
+                    update(Task)
+                    .where(Task.uid == task_id, Task.status == 'pending')
+                    .values(status='cancelled', completed_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+                self.commit()
+                return result.rowcount == 1
 
             task = self._tasks[task_id]
             if task['status'] == 'pending':
@@ -200,7 +472,7 @@ class TaskService(BaseService):
         """Usuwa stare zakończone zadania"""
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
-            
+
             # Usuń z bazy danych
             deleted = Task.query.filter(
                 Task.updated_at < cutoff_date,
@@ -214,7 +486,7 @@ class TaskService(BaseService):
                 if task['updated_at'] < cutoff_date and
                 task['status'] in ['completed', 'failed', 'cancelled']
             ]
-            
+
             for task_id in task_ids:
                 del self._tasks[task_id]
 
@@ -227,21 +499,49 @@ class TaskService(BaseService):
     def get_queue_stats(self) -> Dict:
         """Zwraca statystyki kolejki zadań"""
         try:
-            total_tasks = len(self._tasks)
-            pending = sum(1 for task in self._tasks.values() if task['status'] == 'pending')
-            running = sum(1 for task in self._tasks.values() if task['status'] == 'running')
-            completed = sum(1 for task in self._tasks.values() if task['status'] == 'completed')
-            failed = sum(1 for task in self._tasks.values() if task['status'] == 'failed')
-            cancelled = sum(1 for task in self._tasks.values() if task['status'] == 'cancelled')
+            statuses = ('pending', 'running', 'completed', 'failed', 'cancelled')
+            counts = dict.fromkeys(statuses, 0)
+            for task in self._tasks.values():
+                counts[task['status']] = counts.get(task['status'], 0) + 1
+
+            durable = dict.fromkeys(statuses, 0)
+            durable_pending = dict.fromkeys(LANES, 0)
+            if self._durable_queue is not None:
+                rows = self.db.session.query(Task.lane, Task.status, func.count(Task.id)).filter(
+                    Task.durable.is_(True)
+                ).group_by(Task.lane, Task.status).all()
+                for lane, status, count in rows:
+                    durable[status] += count
+                    counts[status] = counts.get(status, 0) + count
+                    if status == 'pending' and lane in durable_pending:
+                        durable_pending[lane] += count
+
+            sizes = {'thread': self._max_workers, 'process': self._process_workers}
+            lanes = {}
+            for lane in LANES:
+                samples = list(self._lane_latency[lane])
+                lanes[lane] = {
+                    'workers': sizes[lane],
+                    'queue_depth': self._scheduler.qsize(lane) + durable_pending[lane],
+                    'running': self._lane_running[lane],
+                    'wait_ms': _latency_summary([wait for wait, _ in samples]),
+                    'run_ms': _latency_summary([run for _, run in samples])
+                }
+
+            classes = self._scheduler.stats()
+            for priority, row in classes.items():
+                samples = list(self._class_latency[priority])
+                row['wait_ms'] = _latency_summary([wait for wait, _ in samples])
+                row['run_ms'] = _latency_summary([run for _, run in samples])
 
             return {
-                'total_tasks': total_tasks,
-                'pending': pending,
-                'running': running,
-                'completed': completed,
-                'failed': failed,
-                'cancelled': cancelled,
-                'queue_size': self._task_queue.qsize(),
+                'total_tasks': sum(counts.values()),
+                **counts,
+                'durable': durable,
+                'lanes': lanes,
+                'classes': classes,
+                'mode': 'database' if self._durable_queue is not None else 'memory',
+                'queue_size': sum(lane['queue_depth'] for lane in lanes.values()),
                 'active_workers': len(self._workers)
             }
         except Exception as e:
@@ -255,4 +555,22 @@ class TaskService(BaseService):
                 'cancelled': 0,
                 'queue_size': 0,
                 'active_workers': 0
-            } 
\ No newline at end of file
+            }
+
+
+def _latency_summary(samples: List[float]) -> Dict:
+    """Średnia i percentyle (w ms) z ostatnich próbek opóźnień toru"""
+    if not samples:
+        return {'count': 0, 'avg': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 2)
+
+    return {
+        'count': len(ordered),
+        'avg': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p50': percentile(0.5),
+        'p95': percentile(0.95),
+        'max': round(ordered[-1] * 1000, 2)
+    }
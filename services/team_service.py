@@ -1,14 +1,46 @@
 from typing import Optional, Tuple, List
+import csv
+import io
+import json
 from flask import current_app
-from sqlalchemy.orm import joinedload
 from models import Team, Tournament, Match, SystemLog
 from services.base_service import BaseService
+from services.standings_service import StandingsService
+from services.query_service import QueryService
+from services.cache_service import CacheService
+
+TEAM_NAME_LENGTH = Team.__table__.c.name.type.length
+
+
+def parse_team_import(filename: str, content: bytes) -> List[str]:
+    """Odczytuje nazwy drużyn z pliku CSV lub JSON.
+
+    CSV: kolumna 'name' (lub 'nazwa'), a bez nagłówka pierwsza kolumna.
+    JSON: lista nazw, lista obiektów z kluczem 'name' albo {"teams": [...]}.
+    """
+    text = content.decode('utf-8-sig')
+    if filename.lower().endswith('.json'):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get('teams', [])
+        if not isinstance(data, list):
+            raise ValueError('Plik JSON musi zawierać listę drużyn')
+        return [str(item.get('name', '') if isinstance(item, dict) else item) for item in data]
+
+    rows = [row for row in csv.reader(io.StringIO(text)) if row]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    for column in ('name', 'nazwa'):
+        if column in header:
+            index = header.index(column)
+            return [row[index] if index < len(row) else '' for row in rows[1:]]
+    return [row[0] for row in rows]
+
 
 class TeamService(BaseService):
     def get_team(self, team_id: int) -> Optional[Team]:
-        return Team.query.options(
-            joinedload('tournament')
-        ).get(team_id)
+        return QueryService.get_team(team_id)
 
     def get_tournament_teams(self, tournament_id: int) -> List[Team]:
         return Team.query.filter_by(tournament_id=tournament_id).all()
@@ -64,6 +96,8 @@ class TeamService(BaseService):
             Match.query.filter(
                 (Match.team1_id == team_id) | (Match.team2_id == team_id)
             ).delete()
+            # Masowe usunięcie omija zdarzenia sesji, więc przelicz tabelę wyników
+            StandingsService().rebuild(tournament.id, commit=False)
 
             # Zapisz nazwę drużyny przed usunięciem
             team_name = team.name
@@ -79,6 +113,7 @@ class TeamService(BaseService):
             )
             self.add(log)
             self.commit()
+            CacheService.invalidate_tournament_cache(tournament.id)
 
             return True, "Drużyna została usunięta"
         except Exception as e:
@@ -117,8 +152,60 @@ class TeamService(BaseService):
             )
             self.add(log)
             self.commit()
+            CacheService.invalidate_tag(f'team:{team_id}')
 
             return True, "Drużyna została zaktualizowana"
         except Exception as e:
             current_app.logger.error(f'Error updating team: {str(e)}')
-            return False, "Wystąpił błąd podczas aktualizacji drużyny" 
\ No newline at end of file
+            return False, "Wystąpił błąd podczas aktualizacji drużyny" 
+
+    def import_teams(self, tournament_id: int, names: List[str], user_email: str) -> Tuple[bool, str, int]:
+        """Dodaje wiele drużyn jednym wsadowym INSERT (pomija duplikaty i puste nazwy)"""
+        try:
+            tournament = Tournament.query.get(tournament_id)
+            if not tournament:
+                return False, "Turniej nie istnieje", 0
+
+            if tournament.status != 'planned':
+                return False, "Można dodawać drużyny tylko do zaplanowanych turniejów", 0
+
+            max_rows = current_app.config.get('TEAM_IMPORT_MAX_ROWS', 1000)
+            if len(names) > max_rows:
+                return False, f"Plik może zawierać najwyżej {max_rows} drużyn", 0
+
+            existing = {name for (name,) in Team.query.with_entities(Team.name).filter_by(tournament_id=tournament_id)}
+            new_names = []
+            invalid = 0
+            for name in (name.strip() for name in names):
+                if not name or len(name) > TEAM_NAME_LENGTH:
+                    invalid += 1
+                    continue
+                if name in existing:
+                    continue
+                existing.add(name)
+                new_names.append(name)
+
+            if not new_names:
+                return False, "Brak nowych drużyn do zaimportowania", 0
+
+            created = self.bulk_insert(Team, [{'name': name, 'tournament_id': tournament_id} for name in new_names])
+            skipped = len(names) - created - invalid
+
+            log = SystemLog(
+                type='info',
+                user=user_email,
+                action='import_teams',
+                details=f'Zaimportowano {created} drużyn do turnieju: {tournament.name}'
+            )
+            self.add(log)
+            self.commit()
+            CacheService.invalidate_tournament_cache(tournament_id)
+
+            message = f"Zaimportowano {created} drużyn"
+            if skipped or invalid:
+                message += f" (pominięto istniejące: {skipped}, nieprawidłowe: {invalid})"
+            return True, message, created
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f'Error importing teams: {str(e)}')
+            return False, "Wystąpił błąd podczas importu drużyn", 0
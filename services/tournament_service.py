@@ -1,12 +1,29 @@
 from typing import Optional, Dict, List
-from datetime import datetime, timedelta
+from datetime import datetime
 from flask import current_app
-from sqlalchemy.orm import joinedload
 
 from models import Tournament, Team, Match, Year, TournamentStanding
 from services.base_service import BaseService
 from services.notification_service import NotificationService
 from services.task_service import TaskService
+from services.standings_service import StandingsService
+from services.query_service import QueryService
+from services.schedule_optimizer import build_schedule
+
+def match_rows(tournament_id: int, schedule: Dict) -> List[Dict]:
+    """Wiersze tabeli match dla planu z build_schedule (do bulk_insert)"""
+    return [
+        {
+            'tournament_id': tournament_id,
+            'team1_id': planned['team1_id'],
+            'team2_id': planned['team2_id'],
+            'start_time': planned['start_time'],
+            'field_number': planned['field_number'],
+            'status': 'planned'
+        }
+        for planned in schedule['matches']
+    ]
+
 
 class TournamentService(BaseService):
     def __init__(self):
@@ -52,11 +69,7 @@ class TournamentService(BaseService):
     def get_tournament(self, tournament_id: int) -> Optional[Tournament]:
         """Pobiera turniej z relacjami"""
         try:
-            return Tournament.query.options(
-                joinedload(Tournament.teams),
-                joinedload(Tournament.matches).joinedload(Match.team1),
-                joinedload(Tournament.matches).joinedload(Match.team2)
-            ).get(tournament_id)
+            return QueryService.get_tournament(tournament_id, 'tournament_page')
         except Exception as e:
             current_app.logger.error(f'Error getting tournament: {str(e)}')
             return None
@@ -186,6 +199,7 @@ class TournamentService(BaseService):
             if has_matches:
                 return False
 
+            TournamentStanding.query.filter_by(team_id=team_id).delete()
             Team.query.filter_by(id=team_id, tournament_id=tournament_id).delete()
             self.commit()
             return True
@@ -205,51 +219,31 @@ class TournamentService(BaseService):
             if len(teams) < 2:
                 return False
 
-            # Generuj wszystkie możliwe pary drużyn
-            matches_to_generate = []
-            for i, team1 in enumerate(teams):
-                for team2 in teams[i+1:]:
-                    matches_to_generate.append((team1, team2))
-
-            # Oblicz czas trwania meczu i przerwy
-            match_duration = timedelta(minutes=tournament.match_length)
-            break_duration = timedelta(minutes=tournament.break_length)
-            
-            # Inicjalizuj czas rozpoczęcia i numery boisk
             if not tournament.start_time:
                 return False
-                
-            start_time = tournament.start_time
-            available_fields = list(range(1, tournament.number_of_fields + 1))
-            field_times = {field: start_time for field in available_fields}
-            
-            # Generuj mecze, przydzielając je do pierwszego dostępnego boiska
-            matches = []
-            for team1, team2 in matches_to_generate:
-                # Znajdź najbliższe dostępne boisko
-                field_number = min(field_times, key=field_times.get)
-                match_start_time = field_times[field_number]
-                
-                # Stwórz mecz
-                match = Match(
-                    tournament_id=tournament_id,
-                    team1_id=team1.id,
-                    team2_id=team2.id,
-                    start_time=match_start_time,
-                    field_number=field_number,
-                    status='planned'
-                )
-                matches.append(match)
-                
-                # Zaktualizuj czas dla tego boiska
-                field_times[field_number] = match_start_time + match_duration + break_duration
-
-            # Usuń istniejące mecze
+
+            # Kolejki metodą kołową rozłożone na wszystkie boiska z minimalnym odpoczynkiem
+            schedule = build_schedule(
+                [team.id for team in teams],
+                start_time=tournament.start_time,
+                fields=tournament.number_of_fields or 1,
+                match_length=tournament.match_length,
+                break_length=tournament.break_length,
+                min_rest=current_app.config.get('SCHEDULE_MIN_REST_MINUTES')
+            )
+            matches = match_rows(tournament_id, schedule)
+            current_app.logger.info(
+                f"Schedule for tournament {tournament_id}: {schedule['slots']} slots "
+                f"(lower bound {schedule['lower_bound']}, score {schedule['score']})"
+            )
+
+            # Usuń istniejące mecze (masowe usunięcie omija zdarzenia sesji,
+            # więc tabelę wyników czyścimy ręcznie)
             Match.query.filter_by(tournament_id=tournament_id).delete()
+            TournamentStanding.query.filter_by(tournament_id=tournament_id).delete()
             
-            # Zapisz wszystkie mecze
-            for match in matches:
-                self.add(match)
+            # Zapisz wszystkie mecze wsadowo w jednej transakcji
+            self.bulk_insert(Match, matches)
             self.commit()
 
             # Powiadom o wygenerowaniu meczów
@@ -269,32 +263,25 @@ class TournamentService(BaseService):
     def get_tournament_standings(self, tournament_id: int) -> List[Dict]:
         """Pobiera aktualną tabelę wyników turnieju"""
         try:
-            standings = TournamentStanding.query.filter_by(tournament_id=tournament_id)\
-                .order_by(TournamentStanding.position).all()
-            
-            if not standings:
-                return []
-            
             result = []
-            for standing in standings:
-                team = standing.team
+            for entry in StandingsService.get_standings(tournament_id):
                 result.append({
                     'team': {
-                        'id': team.id,
-                        'name': team.name
+                        'id': entry['team_id'],
+                        'name': entry['team_name']
                     },
                     'history': {
                         'stats': {
-                            'matches_played': standing.matches_played,
-                            'wins': standing.wins,
-                            'draws': standing.draws,
-                            'losses': standing.losses,
-                            'goals_scored': standing.goals_for,
-                            'goals_conceded': standing.goals_against,
-                            'points': standing.points
+                            'matches_played': entry['matches_played'],
+                            'wins': entry['wins'],
+                            'draws': entry['draws'],
+                            'losses': entry['losses'],
+                            'goals_scored': entry['goals_for'],
+                            'goals_conceded': entry['goals_against'],
+                            'points': entry['points']
                         }
                     },
-                    'position': standing.position
+                    'position': entry['position']
                 })
             
             return result
@@ -653,6 +653,8 @@ class RealTimeUpdates {
     constructor() {
         this.isEnabled = false;
         this.intervals = {};
+        this.streams = {};
+        this.clocks = {};
         this.apiBaseUrl = '/api';
         this.updateIntervals = {
             match: 5000,   // 5 seconds for match updates
@@ -663,6 +665,17 @@ class RealTimeUpdates {
     }
     
     init() {
+        // Seed match clocks rendered by the server so timers tick without a request
+        document.querySelectorAll('.match-timer[data-elapsed]').forEach(timer => {
+            this.setMatchClock(timer.dataset.matchId, {
+                running: timer.dataset.running === 'true',
+                elapsed: parseInt(timer.dataset.elapsed, 10) || 0
+            });
+        });
+        if (Object.keys(this.clocks).length) {
+            this.startClockTicker();
+        }
+        
         // Initialize real-time updates based on current page
         this.detectPageType();
         this.setupEventListeners();
@@ -728,15 +741,65 @@ class RealTimeUpdates {
         if (this.intervals[intervalId]) {
             clearInterval(this.intervals[intervalId]);
         }
+        if (this.streams[intervalId]) {
+            this.streams[intervalId].close();
+        }
         
-        this.intervals[intervalId] = setInterval(() => {
-            this.updateMatchStatus(matchId);
-        }, this.updateIntervals.match);
+        if (window.EventSource) {
+            // Server pushes score changes and clock transitions; the timer ticks locally
+            const stream = new EventSource(`${this.apiBaseUrl}/matches/${matchId}/stream`);
+            stream.addEventListener('score_updated', event => {
+                this.renderMatchUpdate(JSON.parse(event.data));
+            });
+            stream.addEventListener('clock_changed', event => {
+                const data = JSON.parse(event.data);
+                this.setMatchClock(data.matchId, data);
+            });
+            this.streams[intervalId] = stream;
+        } else {
+            this.intervals[intervalId] = setInterval(() => {
+                this.updateMatchStatus(matchId);
+            }, this.updateIntervals.match);
+        }
+        
+        this.startClockTicker();
         
         // Initial update
         this.updateMatchStatus(matchId);
     }
     
+    startClockTicker() {
+        if (this.intervals.clock) return;
+        
+        this.intervals.clock = setInterval(() => {
+            Object.keys(this.clocks).forEach(matchId => this.renderMatchClock(matchId));
+        }, 1000);
+    }
+    
+    setMatchClock(matchId, clock) {
+        this.clocks[matchId] = {
+            running: clock.running,
+            elapsed: clock.elapsed,
+            receivedAt: performance.now()
+        };
+        this.renderMatchClock(matchId);
+    }
+    
+    renderMatchClock(matchId) {
+        const clock = this.clocks[matchId];
+        const matchElement = document.querySelector(`[data-match-id="${matchId}"]`);
+        const timerElement = document.querySelector(`.match-timer[data-match-id="${matchId}"]`)
+            || (matchElement && matchElement.querySelector('.match-timer'));
+        if (!clock || !timerElement) return;
+        
+        let elapsed = clock.elapsed;
+        if (clock.running) {
+            elapsed += Math.floor((performance.now() - clock.receivedAt) / 1000);
+        }
+        const valueElement = timerElement.querySelector('.timer-value') || timerElement;
+        valueElement.textContent = this.formatTime(elapsed);
+    }
+    
     startTournamentUpdate(tournamentId) {
         const intervalId = `tournament_${tournamentId}`;
         
@@ -837,7 +900,9 @@ class RealTimeUpdates {
         
         // Update timer
         const timerElement = matchElement.querySelector('.match-timer');
-        if (timerElement && matchData.elapsed_time !== null) {
+        if (matchData.clock) {
+            this.setMatchClock(matchData.match_id, matchData.clock);
+        } else if (timerElement && matchData.elapsed_time !== null) {
             timerElement.textContent = this.formatTime(matchData.elapsed_time);
         }
         
@@ -898,6 +963,9 @@ class RealTimeUpdates {
         Object.values(this.intervals).forEach(intervalId => {
             clearInterval(intervalId);
         });
+        Object.values(this.streams).forEach(stream => stream.close());
+        this.intervals = {};
+        this.streams = {};
     }
     
     resumeUpdates() {
@@ -906,10 +974,8 @@ class RealTimeUpdates {
     }
     
     stopAllUpdates() {
-        Object.values(this.intervals).forEach(intervalId => {
-            clearInterval(intervalId);
-        });
-        this.intervals = {};
+        this.pauseUpdates();
+        this.clocks = {};
     }
 }
 
@@ -1,6 +1,7 @@
 from datetime import datetime
 from services.monitoring_service import MonitoringService
 from services.logging_service import LoggingService
+from services.metrics_service import MetricsService
 from flask import current_app
 import schedule
 import time
@@ -12,7 +13,8 @@ def monitor_system():
         # Sprawdź stan systemu
         health_status = MonitoringService.check_system_health()
         
-        # Loguj wyniki
+        # Migawka metryk trafia do bufora w pamięci - do system_log tylko ostrzeżenia
+        MetricsService.snapshot()
         if health_status['status'] == 'warning':
             LoggingService.add_log(
                 type='warning',
@@ -20,13 +22,9 @@ def monitor_system():
                 action='system_monitoring',
                 details=str(health_status['warnings'])
             )
-        else:
-            LoggingService.add_log(
-                type='info',
-                user='system',
-                action='system_monitoring',
-                details='System działa prawidłowo'
-            )
+
+        # Usuń przedziały historii stanu starsze niż okres przechowywania
+        MonitoringService.apply_health_retention()
 
         # Wyczyść stare logi co 24 godziny
         if datetime.utcnow().hour == 0:
@@ -47,7 +45,7 @@ def start_monitoring(app):
         with app.app_context():
             while True:
                 monitor_system()
-                time.sleep(300)  # Sprawdzaj co 5 minut
+                time.sleep(app.config.get('MONITORING_INTERVAL', 60))
 
     monitoring_thread = threading.Thread(target=run_monitoring, daemon=True)
     monitoring_thread.start()
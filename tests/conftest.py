@@ -1,4 +1,6 @@
 import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
 from app import create_app
 from extensions import db
 from models import User
@@ -55,4 +57,29 @@ def auth_client(client):
 def admin_user(app):
     with app.app_context():
         admin = User.query.filter_by(email='test@admin.com').first()
-        return admin 
\ No newline at end of file
+        return admin 
+
+@pytest.fixture
+def assert_max_queries(app):
+    """Zwraca menedżer kontekstu sprawdzający limit zapytań SQL w bloku.
+
+    Użycie: with assert_max_queries(10) as statements: client.get(...)
+    """
+    @contextmanager
+    def check(limit):
+        with app.app_context():
+            engine = db.engine
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        assert len(statements) <= limit, (
+            f'{len(statements)} queries executed (limit {limit}):\n' + '\n'.join(statements)
+        )
+    return check
@@ -0,0 +1,72 @@
+import threading
+from models import SystemLog
+from services.audit_log_writer import AuditLogWriter
+from services.logging_service import LoggingService
+
+def test_writer_batches_by_size_and_flush():
+    """Test zapisu paczkami - po rozmiarze i na żądanie"""
+    batches = []
+    writer = AuditLogWriter(lambda rows: batches.append(len(rows)), batch_size=10,
+                            flush_interval=60).start()
+    try:
+        for i in range(25):
+            writer.write({'action': f'a{i}'})
+        assert writer.flush()
+        assert batches == [10, 10, 5]
+    finally:
+        writer.close()
+    assert not writer.running
+
+def test_writer_flushes_by_interval():
+    """Test zapisu niepełnej paczki po upływie flush_interval"""
+    written = threading.Event()
+    writer = AuditLogWriter(lambda rows: written.set(), batch_size=100, flush_interval=0.05).start()
+    try:
+        writer.write({'action': 'goal'})
+        assert written.wait(2)
+    finally:
+        writer.close()
+
+def test_writer_backpressure_writes_synchronously():
+    """Test pełnego bufora - wywołujący zapisuje wpis sam zamiast go gubić"""
+    release = threading.Event()
+    rows_written = []
+
+    def slow_sink(rows):
+        if threading.current_thread().name == 'audit-log-writer':
+            release.wait(2)
+        rows_written.extend(rows)
+
+    writer = AuditLogWriter(slow_sink, batch_size=1, flush_interval=60, buffer_size=1,
+                            enqueue_timeout=0.01).start()
+    try:
+        for i in range(5):
+            writer.write({'i': i})
+        assert writer.stats()['synchronous'] >= 1
+        release.set()
+        assert writer.flush()
+    finally:
+        writer.close()
+    assert sorted(row['i'] for row in rows_written) == list(range(5))
+
+def test_close_drains_buffer():
+    """Test zapisu zaległych wpisów przy zamknięciu"""
+    rows_written = []
+    writer = AuditLogWriter(rows_written.extend, batch_size=100, flush_interval=60).start()
+    for i in range(3):
+        writer.write({'i': i})
+    writer.close()
+    assert len(rows_written) == 3
+
+def test_add_log_buffered(app):
+    """Test LoggingService.add_log z buforowanym zapisem"""
+    app.config['AUDIT_LOG_ASYNC'] = True
+    LoggingService.init_audit_writer(app)
+    try:
+        with app.app_context():
+            assert LoggingService.add_log('info', 'test@admin.com', 'update_score', '1:0') is None
+            assert LoggingService.flush_logs()
+            assert SystemLog.query.filter_by(action='update_score').count() == 1
+    finally:
+        app.config['AUDIT_LOG_ASYNC'] = False
+        LoggingService.init_audit_writer(app)
@@ -0,0 +1,163 @@
+import fnmatch
+import json
+import queue
+import time
+import pytest
+from datetime import datetime, date
+from app import socketio
+from models import Year, Tournament, Team, Match
+from services.broker_backends import MemoryBroker, RedisBroker
+from services.broker_service import BrokerService, match_topic, tournament_topic
+from extensions import db
+
+class FakeRedisServer:
+    """Lokalna atrapa serwera Redis pub/sub współdzielona przez workery"""
+
+    def __init__(self):
+        self.pubsubs = []
+
+    def publish(self, channel, data):
+        receivers = [pubsub for pubsub in self.pubsubs if pubsub.matches(channel)]
+        for pubsub in receivers:
+            pubsub.messages.put({'type': 'pmessage', 'pattern': None,
+                                 'channel': channel.encode('utf-8'), 'data': data.encode('utf-8')})
+        return len(receivers)
+
+class FakePubSub:
+    def __init__(self, server):
+        self.server = server
+        self.patterns = []
+        self.messages = queue.Queue()
+
+    def matches(self, channel):
+        return any(fnmatch.fnmatchcase(channel, pattern) for pattern in self.patterns)
+
+    def psubscribe(self, pattern):
+        self.patterns.append(pattern)
+        self.server.pubsubs.append(self)
+
+    def get_message(self, timeout=0.0):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        if self in self.server.pubsubs:
+            self.server.pubsubs.remove(self)
+
+class FakeRedisClient:
+    def __init__(self, server):
+        self.server = server
+
+    def publish(self, channel, data):
+        return self.server.publish(channel, data)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self.server)
+
+@pytest.fixture
+def live_match(app):
+    """Fixture tworzący mecz w turnieju"""
+    with app.app_context():
+        year = Year(year=2024)
+        db.session.add(year)
+        db.session.commit()
+        tournament = Tournament(name='Live Cup', year_id=year.id, status='ongoing', date=date(2024, 5, 1))
+        db.session.add(tournament)
+        db.session.commit()
+        teams = [Team(name=f'Live {i}', tournament_id=tournament.id) for i in range(2)]
+        db.session.add_all(teams)
+        db.session.commit()
+        match = Match(tournament_id=tournament.id, team1_id=teams[0].id, team2_id=teams[1].id,
+                      start_time=datetime.now(), status='ongoing', team1_score=0, team2_score=0)
+        db.session.add(match)
+        db.session.commit()
+        return match.id, tournament.id
+
+def test_memory_broker_fans_out_to_every_subscriber():
+    """Test dostarczenia wiadomości do wszystkich subskrybentów tematu"""
+    broker = MemoryBroker()
+    tablets = [broker.subscribe(['match_1']) for _ in range(3)]
+    other = broker.subscribe(['match_2'])
+    everything = broker.subscribe()
+
+    broker.publish('match_1', {'event': 'score_updated', 'data': {'team1_score': 1}})
+
+    for tablet in tablets:
+        assert tablet.get(timeout=1) == ('match_1', {'event': 'score_updated', 'data': {'team1_score': 1}})
+    assert other.get(timeout=0.05) is None
+    assert everything.get(timeout=1)[0] == 'match_1'
+    assert broker.stats()['delivered'] == 4
+
+    tablets[0].close()
+    assert broker.stats()['subscribers'] == 4
+
+def test_slow_subscriber_drops_oldest_messages():
+    """Test ograniczonego bufora subskrybenta"""
+    broker = MemoryBroker(buffer_size=2)
+    slow = broker.subscribe(['match_1'])
+    for goal in range(5):
+        broker.publish('match_1', {'event': 'score_updated', 'data': {'goal': goal}})
+
+    assert [slow.get(timeout=1)[1]['data']['goal'] for _ in range(2)] == [3, 4]
+    assert broker.stats()['dropped'] == 3
+
+def test_redis_broker_reaches_subscribers_in_all_workers():
+    """Test rozsyłania przez Redis pub/sub między workerami"""
+    server = FakeRedisServer()
+    workers = [RedisBroker(FakeRedisClient(server), prefix='football_app:live:', poll_timeout=0.05)
+               for _ in range(2)]
+    try:
+        subscriptions = [worker.subscribe([tournament_topic(7)]) for worker in workers]
+        workers[0].publish(tournament_topic(7), {'event': 'score_updated', 'data': {'match_id': 3}})
+        workers[0].publish(tournament_topic(8), {'event': 'score_updated', 'data': {'match_id': 4}})
+
+        for subscription in subscriptions:
+            topic, message = subscription.get(timeout=2)
+            assert topic == 'tournament_7'
+            assert message['data'] == {'match_id': 3}
+            assert subscription.get(timeout=0.1) is None
+    finally:
+        for worker in workers:
+            worker.close()
+
+def test_sse_stream_receives_match_updates(app, client, live_match):
+    """Test strumienia SSE meczu"""
+    match_id, tournament_id = live_match
+    response = client.get(f'/api/matches/{match_id}/stream')
+    assert response.mimetype == 'text/event-stream'
+    stream = (chunk.decode('utf-8') for chunk in response.response)
+    assert next(stream).startswith('retry:')
+
+    with app.app_context():
+        BrokerService.publish_match(match_id, tournament_id, 'score_updated', {'team1_score': 2})
+    chunk = next(stream)
+    assert chunk.startswith('event: score_updated\n')
+    payload = json.loads(chunk.split('data: ', 1)[1])
+    assert payload == {'topic': match_topic(match_id), 'team1_score': 2}
+    response.close()
+
+def test_socketio_rooms_receive_broker_messages(app, live_match):
+    """Test mostu broker -> pokoje Socket.IO"""
+    match_id, tournament_id = live_match
+    match_client = socketio.test_client(app)
+    tournament_client = socketio.test_client(app)
+    outsider = socketio.test_client(app)
+    match_client.emit('join_match', {'match_id': match_id})
+    tournament_client.emit('join_tournament', {'tournament_id': tournament_id})
+
+    with app.app_context():
+        BrokerService.publish_match(match_id, tournament_id, 'score_updated', {'team2_score': 1})
+
+    deadline = time.time() + 2
+    received = {}
+    while time.time() < deadline and len(received) < 2:
+        for name, test_client in (('match', match_client), ('tournament', tournament_client)):
+            events = [event for event in test_client.get_received() if event['name'] == 'score_updated']
+            if events:
+                received[name] = events[0]['args'][0]
+        time.sleep(0.02)
+
+    assert received == {'match': {'team2_score': 1}, 'tournament': {'team2_score': 1}}
+    assert not [event for event in outsider.get_received() if event['name'] == 'score_updated']
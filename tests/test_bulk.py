@@ -0,0 +1,95 @@
+import io
+import json
+from datetime import datetime, date
+from sqlalchemy import event
+from models import Year, Tournament, Team, Match
+from services.base_service import BaseService
+from services.team_service import TeamService, parse_team_import
+from services.tournament_service import TournamentService
+from extensions import db
+
+def create_tournament(name='Bulk Cup', start_time=None, fields=4):
+    year = Year.query.filter_by(year=2024).first()
+    if not year:
+        year = Year(year=2024)
+        db.session.add(year)
+        db.session.commit()
+    tournament = Tournament(name=name, year_id=year.id, status='planned', date=date(2024, 6, 1),
+                            start_time=start_time or datetime(2024, 6, 1, 9, 0), number_of_fields=fields,
+                            match_length=10, break_length=2)
+    db.session.add(tournament)
+    db.session.commit()
+    return tournament
+
+def test_bulk_insert_uses_batched_statements(app):
+    """Test wsadowego INSERT - jedno wykonanie na paczkę wierszy"""
+    with app.app_context():
+        tournament = create_tournament()
+        inserts = []
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_inserts(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT INTO team'):
+                inserts.append(statement)
+
+        try:
+            rows = [{'name': f'Team {i}', 'tournament_id': tournament.id} for i in range(250)]
+            assert BaseService().bulk_insert(Team, rows, chunk_size=100) == 250
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_inserts)
+
+        assert Team.query.filter_by(tournament_id=tournament.id).count() == 250
+        assert 1 <= len(inserts) <= 3
+
+def test_generate_matches_bulk_inserts_schedule(app):
+    """Test generowania dużego turnieju wsadowym zapisem meczów"""
+    with app.app_context():
+        tournament = create_tournament()
+        BaseService().bulk_insert(Team, [{'name': f'Team {i}', 'tournament_id': tournament.id} for i in range(40)])
+        db.session.commit()
+
+        assert TournamentService().generate_matches(tournament.id)
+
+        matches = Match.query.filter_by(tournament_id=tournament.id).all()
+        assert len(matches) == 40 * 39 // 2
+        assert all(match.status == 'planned' and match.clock_accumulated == 0 for match in matches)
+
+def test_parse_team_import():
+    """Test odczytu nazw drużyn z CSV i JSON"""
+    assert parse_team_import('teams.csv', 'id,name\n1,Orły\n2,Sokoły\n'.encode('utf-8')) == ['Orły', 'Sokoły']
+    assert parse_team_import('teams.csv', b'Lwy\nTygrysy\n') == ['Lwy', 'Tygrysy']
+    assert parse_team_import('teams.json', json.dumps(['A', {'name': 'B'}]).encode()) == ['A', 'B']
+    assert parse_team_import('teams.json', json.dumps({'teams': ['C']}).encode()) == ['C']
+
+def test_import_teams_skips_duplicates(app):
+    """Test importu drużyn z pominięciem duplikatów i pustych nazw"""
+    with app.app_context():
+        tournament = create_tournament()
+        db.session.add(Team(name='Orły', tournament_id=tournament.id))
+        db.session.commit()
+
+        names = ['Orły', 'Sokoły', 'Sokoły', '  ', 'x' * 101] + [f'Drużyna {i}' for i in range(300)]
+        success, message, created = TeamService().import_teams(tournament.id, names, 'test@admin.com')
+
+        assert success, message
+        assert created == 301
+        assert Team.query.filter_by(tournament_id=tournament.id).count() == 302
+
+def test_import_teams_endpoint(app, auth_client):
+    """Test endpointu importu drużyn (plik CSV i treść JSON)"""
+    with app.app_context():
+        tournament_id = create_tournament().id
+
+    csv_file = (io.BytesIO('name\nOrły\nSokoły\n'.encode('utf-8')), 'teams.csv')
+    response = auth_client.post(f'/admin/tournaments/{tournament_id}/teams/import',
+                                data={'file': csv_file}, content_type='multipart/form-data')
+    assert response.status_code == 302
+
+    response = auth_client.post(f'/admin/tournaments/{tournament_id}/teams/import',
+                                json=['Lwy', 'Orły'])
+    assert response.status_code == 200
+    assert response.get_json()['created'] == 1
+
+    with app.app_context():
+        assert Team.query.filter_by(tournament_id=tournament_id).count() == 3
@@ -0,0 +1,271 @@
+import fnmatch
+import threading
+import time
+import pytest
+from services.cache_backends import MemoryCacheBackend, RedisCacheBackend
+from services.cache_service import CacheService
+from services.task_service import TaskService
+
+class FakeRedis:
+    """Minimalna atrapa klienta redis (klucze z TTL, zbiory, scan_iter)"""
+
+    def __init__(self):
+        self.store = {}
+
+    def _alive(self, key):
+        value, expires_at = self.store.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.time():
+            del self.store[key]
+            return None
+        return value
+
+    def get(self, key):
+        return self._alive(key)
+
+    def setex(self, key, seconds, value):
+        self.store[key] = (value, time.time() + seconds)
+        return True
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and self._alive(key) is not None:
+            return None
+        self.store[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.store.pop(key, None) is not None)
+
+    def scan_iter(self, match='*', count=None):
+        for key in list(self.store):
+            if self._alive(key) is not None and fnmatch.fnmatchcase(key, match):
+                yield key.encode('utf-8')
+
+    def info(self, section=None):
+        return {'used_memory': 1024}
+
+    def sadd(self, key, *members):
+        current, expires_at = self.store.get(key, (set(), None))
+        current.update(members)
+        self.store[key] = (current, expires_at)
+
+    def smembers(self, key):
+        return set(self._alive(key) or ())
+
+    def ttl(self, key):
+        if key not in self.store:
+            return -2
+        expires_at = self.store[key][1]
+        return -1 if expires_at is None else int(expires_at - time.time())
+
+    def expire(self, key, seconds):
+        if key in self.store:
+            self.store[key] = (self.store[key][0], time.time() + seconds)
+
+@pytest.fixture
+def redis_backend(app):
+    backend = RedisCacheBackend(FakeRedis(), prefix=app.config['CACHE_KEY_PREFIX'])
+    CacheService.set_backend(backend)
+    yield backend
+    CacheService.init_app(app)
+
+def test_memory_backend_lru_eviction_respects_byte_cap():
+    """Test wymiany LRU po przekroczeniu limitu bajtów"""
+    backend = MemoryCacheBackend(max_bytes=800)
+    backend.set('a', 'x' * 300, 60)
+    backend.set('b', 'y' * 300, 60)
+    backend.get('a')  # 'a' staje się najświeższy
+    backend.set('c', 'z' * 300, 60)
+
+    assert backend.get('b') is None
+    assert backend.get('a') == 'x' * 300
+    assert backend.get('c') == 'z' * 300
+    stats = backend.stats()
+    assert stats['memory_usage'] <= 800
+    assert stats['evictions'] == 1
+
+    # Wartość większa niż cały limit nie jest zapisywana
+    assert backend.set('huge', 'h' * 5000, 60) is False
+
+def test_memory_backend_expiry(monkeypatch):
+    """Test wygasania wpisów przez kubełki czasowe"""
+    now = [1000.0]
+    monkeypatch.setattr('services.cache_backends.time.time', lambda: now[0])
+    backend = MemoryCacheBackend()
+    backend.set('short', 1, 5)
+    backend.set('long', 2, 60)
+
+    now[0] += 10
+    assert backend.cleanup_expired() == 1
+    assert backend.keys() == ['long']
+    assert backend.stats()['memory_usage'] > 0
+
+    now[0] += 100
+    assert backend.get('long') is None
+    assert backend.stats()['memory_usage'] == 0
+
+def test_redis_backend_prefix_and_patterns(app, redis_backend):
+    """Test backendu Redis na atrapie klienta"""
+    with app.app_context():
+        CacheService.set('team_standings:1', [{'team_id': 1, 'points': 3}], 60)
+        CacheService.set('tournament_stats:1', {'total_goals': 4}, 60, tags=['tournament:1'])
+        CacheService.set('tournament_stats:2', {'total_goals': 1}, 60, tags=['tournament:2'])
+
+        assert CacheService.get('team_standings:1') == [{'team_id': 1, 'points': 3}]
+        assert all(key.startswith('football_app:') for key in redis_backend.client.store)
+        assert 'football_app:tag:tournament:1' in redis_backend.client.store
+        assert sorted(CacheService.get_keys('stats')) == ['tournament_stats:1', 'tournament_stats:2']
+
+        CacheService.invalidate_tournament_cache(1)
+        assert CacheService.get('tournament_stats:1') is None
+        assert CacheService.get('tournament_stats:2') == {'total_goals': 1}
+
+        # clear() usuwa tylko klucze z prefiksem aplikacji
+        redis_backend.client.setex('other_app:key', 60, b'1')
+        CacheService.clear()
+        assert list(redis_backend.client.store) == ['other_app:key']
+
+def test_get_or_set_shared_between_workers(app):
+    """Test współdzielenia cache'u przez procesy korzystające z jednego Redisa"""
+    client = FakeRedis()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'value': 42}
+
+    with app.app_context():
+        for _ in range(3):  # trzy "workery" z osobnymi instancjami backendu
+            CacheService.set_backend(RedisCacheBackend(client, prefix='football_app:'))
+            assert CacheService.get_or_set('shared', compute, timeout=60) == {'value': 42}
+        CacheService.init_app(app)
+
+    assert len(calls) == 1
+
+@pytest.mark.parametrize('make_backend', [
+    lambda: MemoryCacheBackend(),
+    lambda: RedisCacheBackend(FakeRedis(), prefix='football_app:'),
+], ids=['memory', 'redis'])
+def test_tag_invalidation_and_counters(app, make_backend):
+    """Test unieważniania po tagu i liczników per tag"""
+    CacheService.set_backend(make_backend())
+    CacheService._tag_stats.clear()
+    try:
+        with app.app_context():
+            tags = ['tournament:1', 'team:7']
+            CacheService.get_or_set('team_standings:1', lambda: [1], tags=tags)
+            CacheService.get_or_set('team_standings:1', lambda: [1], tags=tags)
+            CacheService.set('tournament_stats:2', {'goals': 1}, 60, tags=['tournament:2'])
+            CacheService.set('untagged:1', 'x', 60)
+
+            assert CacheService.invalidate_tag('team:7') == 1
+            assert CacheService.get('team_standings:1') is None
+            assert CacheService.get('tournament_stats:2') == {'goals': 1}
+            assert CacheService.get('untagged:1') == 'x'
+
+            stats = CacheService.get_cache_stats()['tags']
+            assert stats['tournament:1'] == {'hits': 1, 'misses': 1, 'stale_hits': 0,
+                                             'evictions': 0, 'invalidations': 0}
+            assert stats['team:7']['invalidations'] == 1
+    finally:
+        CacheService.init_app(app)
+
+def test_dynamic_tag_counters(app):
+    """Test liczników dla tagów wyliczanych z wartości i tagów znanych z góry"""
+    CacheService._tag_stats.clear()
+    try:
+        with app.app_context():
+            for _ in range(2):
+                CacheService.get_or_set('team_standings:3', lambda: [{'team_id': 5}],
+                                        tags=lambda rows: [f"team:{row['team_id']}" for row in rows],
+                                        stale_ttl=60, static_tags=['tournament:3'])
+
+            stats = CacheService.get_tag_stats()
+            assert stats['tournament:3']['misses'] == 1 and stats['tournament:3']['hits'] == 1
+            assert stats['team:5']['misses'] == 1 and stats['team:5']['hits'] == 1
+            assert CacheService.invalidate_tag('tournament:3') == 1
+    finally:
+        CacheService.init_app(app)
+
+def test_tag_eviction_counter(app):
+    """Test liczenia wymian LRU per tag"""
+    CacheService.set_backend(MemoryCacheBackend(max_bytes=500))
+    CacheService._tag_stats.clear()
+    try:
+        with app.app_context():
+            CacheService.set('a', 'x' * 300, 60, tags=['tournament:1'])
+            CacheService.set('b', 'y' * 300, 60, tags=['tournament:2'])
+            assert CacheService.get_tag_stats()['tournament:1']['evictions'] == 1
+    finally:
+        CacheService.init_app(app)
+
+def test_clear_resets_tag_evictions():
+    """Test zerowania wymian per tag przy czyszczeniu cache'u"""
+    backend = MemoryCacheBackend(max_bytes=500)
+    backend.set('a', 'x' * 300, 60, tags=['tournament:1'])
+    backend.set('b', 'y' * 300, 60, tags=['tournament:2'])
+    assert backend.clear()
+    assert backend.pop_tag_evictions() == {}
+
+def test_get_or_set_single_flight(app):
+    """Test jednokrotnego przeliczenia przy równoczesnych żądaniach"""
+    calls = []
+    results = []
+
+    def slow_compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'points': 3}
+
+    def request():
+        with app.app_context():
+            results.append(CacheService.get_or_set('team_standings:99', slow_compute, timeout=60))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{'points': 3}] * 8
+
+def test_get_or_set_error_runs_callback_once(app):
+    """Test braku ponownego wywołania funkcji po błędzie"""
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise ValueError('boom')
+
+    with app.app_context():
+        with pytest.raises(ValueError):
+            CacheService.get_or_set('failing', failing)
+    assert len(calls) == 1
+
+def test_stale_while_revalidate_refreshes_in_background(app, monkeypatch):
+    """Test serwowania nieaktualnej wartości i odświeżenia w tle"""
+    values = iter([1, 2])
+    with app.app_context():
+        assert CacheService.get_or_set('swr', lambda: next(values), timeout=30, stale_ttl=60) == 1
+
+        real_time = time.time
+        monkeypatch.setattr('services.cache_service.time.time', lambda: real_time() + 45)
+        assert CacheService.get_or_set('swr', lambda: next(values), timeout=30, stale_ttl=60) == 1
+
+        TaskService()._scheduler.join('thread')
+        monkeypatch.setattr('services.cache_service.time.time', real_time)
+        assert CacheService.get('swr') == 2
+
+def test_waits_for_other_worker_holding_redis_lock(app, redis_backend):
+    """Test oczekiwania na wynik liczony przez inny proces"""
+    redis_backend.try_lock('shared_standings', 10)  # blokada "innego workera"
+
+    def other_worker():
+        time.sleep(0.2)
+        redis_backend.set('shared_standings', ['computed elsewhere'], 60)
+        redis_backend.unlock('shared_standings')
+
+    threading.Thread(target=other_worker).start()
+    with app.app_context():
+        value = CacheService.get_or_set('shared_standings', lambda: ['computed here'], timeout=60)
+    assert value == ['computed elsewhere']
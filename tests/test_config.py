@@ -0,0 +1,56 @@
+import pytest
+from extensions import db
+from services.config_service import ConfigService, CONFIG_VERSION_KEY
+from models import SystemSettings
+
+def test_config_read_from_snapshot(app, assert_max_queries):
+    """Test odczytu konfiguracji z obrazu w pamięci bez zapytań do bazy"""
+    with app.app_context():
+        service = ConfigService()
+        assert service.get_config_value('tournament', 'points_for_win') == 3
+
+        with assert_max_queries(0):
+            service.get_config('tournament')
+            service.get_config_value('match', 'show_timer')
+            ConfigService.get_setting('logo_path')
+
+def test_writer_bumps_version(app):
+    """Test zmiany wersji i przeładowania obrazu po zapisie"""
+    with app.app_context():
+        service = ConfigService()
+        version = ConfigService.snapshot().version
+
+        success, _ = service.set_config_value('tournament', 'points_for_win', 2, 'test@admin.com')
+
+        assert success
+        assert service.get_config_value('tournament', 'points_for_win') == 2
+        assert ConfigService.snapshot().version == version + 1
+
+        service.reset_to_default('tournament', 'test@admin.com')
+        assert service.get_config_value('tournament', 'points_for_win') == 3
+        assert SystemSettings.query.filter_by(key=CONFIG_VERSION_KEY).first() is not None
+
+def test_snapshot_rechecks_version(app, monkeypatch):
+    """Test wykrycia zmiany wersji zapisanej przez inny proces"""
+    with app.app_context():
+        monkeypatch.setattr(ConfigService, '_check_interval', 0)
+        assert ConfigService.get_setting('logo_path') is None
+
+        # Zapis z pominięciem serwisu, jak w innym workerze
+        db.session.add(SystemSettings(key='logo_path', value='uploads/logo.png'))
+        db.session.commit()
+        assert ConfigService.get_setting('logo_path') is None
+
+        ConfigService.bump_version()
+        db.session.commit()
+        assert ConfigService.get_setting('logo_path') == 'uploads/logo.png'
+
+def test_snapshot_is_immutable(app):
+    """Test niezmienności obrazu i kopii zwracanych przez get_config"""
+    with app.app_context():
+        config = ConfigService().get_config('tournament')
+        config['points_for_win'] = 10
+
+        assert ConfigService().get_config_value('tournament', 'points_for_win') == 3
+        with pytest.raises(TypeError):
+            ConfigService.snapshot().sections['tournament']['points_for_win'] = 10
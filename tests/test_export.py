@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+from datetime import datetime, date
+from models import Year, Tournament, Team, Match
+from services.export_service import ExportService, csv_chunks, json_chunks
+from extensions import db
+
+def create_season(year_value, matches=3):
+    year = Year(year=year_value)
+    db.session.add(year)
+    db.session.flush()
+    tournament = Tournament(name=f'Cup {year_value}', year_id=year.id, status='finished',
+                            date=date(year_value, 6, 1))
+    db.session.add(tournament)
+    db.session.flush()
+    home = Team(name=f'Orły {year_value}', tournament_id=tournament.id)
+    away = Team(name=f'Sokoły {year_value}', tournament_id=tournament.id)
+    db.session.add_all([home, away])
+    db.session.flush()
+    for i in range(matches):
+        db.session.add(Match(tournament_id=tournament.id, team1_id=home.id, team2_id=away.id,
+                             team1_score=i, team2_score=1, status='finished',
+                             start_time=datetime(year_value, 6, 1, 9 + i)))
+    db.session.commit()
+    return year, tournament, home
+
+def test_chunk_helpers():
+    """Test fragmentów CSV i JSON - poprawny wynik po sklejeniu"""
+    chunks = list(csv_chunks([[i, 'a,b'] for i in range(5)], chunk_rows=2))
+    assert len(chunks) == 3
+    assert len(list(csv.reader(io.StringIO(''.join(chunks))))) == 5
+
+    body = ''.join(json_chunks({'name': 'Cup'}, {'matches': iter([{'id': 1}, {'id': 2}]), 'teams': iter([])},
+                               chunk_rows=1))
+    assert json.loads(body) == {'name': 'Cup', 'matches': [{'id': 1}, {'id': 2}], 'teams': []}
+
+def test_stream_matches_formats(app):
+    """Test eksportu meczów wielu sezonów w CSV, JSON i NDJSON"""
+    with app.app_context():
+        year, _, _ = create_season(2023)
+        create_season(2024, matches=2)
+        service = ExportService()
+
+        chunks, mimetype = service.stream_matches('csv')
+        rows = list(csv.reader(io.StringIO(''.join(chunks))))
+        assert mimetype == 'text/csv'
+        assert len(rows) == 1 + 5
+        assert rows[1][1] == '2023'
+
+        chunks, _ = service.stream_matches('json', year_id=year.id)
+        assert len(json.loads(''.join(chunks))['matches']) == 3
+
+        chunks, mimetype = service.stream_matches('ndjson')
+        lines = ''.join(chunks).splitlines()
+        assert mimetype == 'application/x-ndjson'
+        assert [json.loads(line)['year'] for line in lines] == [2023] * 3 + [2024] * 2
+
+        assert service.stream_matches('xml') == (None, 'Nieobsługiwany format')
+
+def test_stream_team_history(app):
+    """Test strumieniowej historii drużyny - sumy z bazy i wyniki z perspektywy drużyny"""
+    with app.app_context():
+        _, _, home = create_season(2024)
+        chunks, _ = ExportService().stream_team_history(home.id, 'json')
+        history = json.loads(''.join(chunks))
+
+        assert history['total_matches'] == 3
+        assert history['total_goals_scored'] == 3
+        assert [match['result'] for match in history['matches']] == ['L', 'D', 'W']
+        assert ExportService().stream_team_history(999, 'csv') == (None, 'Nie znaleziono drużyny')
+
+def test_export_endpoint_streams(app, auth_client):
+    """Test endpointu eksportu - odpowiedź strumieniowa z załącznikiem"""
+    with app.app_context():
+        _, tournament, _ = create_season(2024)
+        tournament_id = tournament.id
+
+    response = auth_client.get(f'/api/export/tournaments/{tournament_id}?format=ndjson')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert 'tournament_' in response.headers['Content-Disposition']
+    kinds = [json.loads(line)['kind'] for line in response.get_data(as_text=True).splitlines()]
+    assert kinds[0] == 'tournament'
+    assert kinds.count('match') == 3
+
+def test_workbook_one_sheet_per_tournament(app, tmp_path):
+    """Test skoroszytu sezonu w trybie constant_memory - arkusz na turniej"""
+    import zipfile
+    with app.app_context():
+        year, _, _ = create_season(2024)
+        tournament = Tournament(name='Cup 2024', year_id=year.id, status='planned', date=date(2024, 7, 1))
+        db.session.add(tournament)
+        db.session.commit()
+
+        path = str(tmp_path / 'season.xlsx')
+        result = ExportService().write_workbook(path, year_id=year.id)
+
+    assert result == {'sheets': 3, 'tournaments': 2, 'matches': 3}
+    with zipfile.ZipFile(path) as archive:
+        sheets = [name for name in archive.namelist() if name.startswith('xl/worksheets/sheet')]
+        workbook_xml = archive.read('xl/workbook.xml').decode('utf-8')
+    assert len(sheets) == 3
+    assert '2024 Cup 2024 (2)' in workbook_xml
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+import pytest
+from extensions import db
+from models import SystemLog, SystemLogArchive
+from services.log_service import LogService, LogFilters, encode_cursor, decode_cursor
+
+def _seed_logs(count, start=datetime(2024, 1, 1)):
+    SystemLog.query.delete()
+    for i in range(count):
+        # Co drugi wpis ma ten sam timestamp - kolejność rozstrzyga id
+        db.session.add(SystemLog(type='info' if i % 3 else 'error', user='test@admin.com',
+                                 action=f'action_{i}', details=str(i),
+                                 timestamp=start + timedelta(hours=i // 2)))
+    db.session.commit()
+
+def _walk(service, **kwargs):
+    actions, cursor = [], None
+    while True:
+        page = service.get_logs_page(cursor=cursor, per_page=4, **kwargs)
+        actions.extend(log.action for log in page.items)
+        if not page.has_next:
+            return actions
+        cursor = page.next_cursor
+
+def test_cursor_round_trip():
+    """Test kodowania i dekodowania kursora"""
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+    with pytest.raises(ValueError):
+        decode_cursor('nie-kursor')
+
+def test_keyset_pages_cover_all_logs(app):
+    """Test stronicowania kursorem - bez powtórzeń i luk przy równych timestampach"""
+    with app.app_context():
+        _seed_logs(10)
+        actions = _walk(LogService())
+
+    assert actions == [f'action_{i}' for i in reversed(range(10))]
+
+def test_prev_page_returns_newer_logs(app):
+    """Test powrotu do nowszej strony kursorem prev"""
+    with app.app_context():
+        _seed_logs(10)
+        service = LogService()
+        first = service.get_logs_page(per_page=4)
+        second = service.get_logs_page(cursor=first.next_cursor, per_page=4)
+        back = service.get_logs_page(cursor=second.prev_cursor, direction='prev', per_page=4)
+
+        assert not first.has_prev
+        assert [log.id for log in back.items] == [log.id for log in first.items]
+        assert not back.has_prev
+
+def test_filters_applied(app):
+    """Test filtrów na stronach kursora"""
+    with app.app_context():
+        _seed_logs(10)
+        actions = _walk(LogService(), filters=LogFilters(log_type='error'))
+
+    assert actions == ['action_9', 'action_6', 'action_3', 'action_0']
+
+def test_archive_and_read_across(app):
+    """Test archiwizacji i przeglądania logów ponad granicą archiwum"""
+    with app.app_context():
+        _seed_logs(10)
+        service = LogService()
+        archived = service.archive_logs(datetime(2024, 1, 1, 3), batch_size=3)
+
+        assert archived == 6
+        assert SystemLog.query.count() == 4
+        assert sum(chunk.row_count for chunk in SystemLogArchive.query) == 6
+        assert [row['action'] for row in service.iter_archived_logs('2024-01')] == \
+            [f'action_{i}' for i in range(6)]
+
+        assert _walk(service) == [f'action_{i}' for i in reversed(range(6, 10))]
+        assert _walk(service, include_archive=True) == [f'action_{i}' for i in reversed(range(10))]
+
+def test_view_logs_page(app, auth_client):
+    """Test widoku logów z kursorem i niepoprawnym kursorem"""
+    with app.app_context():
+        _seed_logs(30)
+
+    response = auth_client.get('/admin/view_logs')
+    assert response.status_code == 200
+    assert b'cursor=' in response.data
+
+    response = auth_client.get('/admin/view_logs?cursor=zly')
+    assert response.status_code == 302
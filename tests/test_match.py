@@ -321,4 +321,66 @@ def test_match_time_validation(app, match_data):
         db.session.commit()
         
         # Sprawdź czy mecz został utworzony pomimo przeszłej daty
-        assert match.start_time == past_time 
\ No newline at end of file
+        assert match.start_time == past_time
+
+
+def test_match_clock(app, match_data):
+    """Test zegara meczu - czas wyliczany ze stanu, bez zapisów co sekundę"""
+    with app.app_context():
+        kickoff = datetime(2023, 12, 1, 10, 0, 0)
+        match = Match(status='ongoing')
+        match.start_clock(kickoff)
+        assert match.clock_running
+        assert match.clock_elapsed(kickoff + timedelta(seconds=90)) == 90
+
+        match.pause_clock(kickoff + timedelta(seconds=120))
+        assert match.is_timer_paused
+        assert match.elapsed_time == 120
+        assert match.clock_elapsed(kickoff + timedelta(hours=1)) == 120
+
+        match.resume_clock(kickoff + timedelta(seconds=300))
+        assert match.clock_elapsed(kickoff + timedelta(seconds=330)) == 150
+
+        match.stop_clock(kickoff + timedelta(seconds=400))
+        assert not match.clock_running
+        assert match.elapsed_time == 220
+        assert match.clock_state(kickoff + timedelta(hours=2))['elapsed'] == 220
+
+def test_match_clock_broadcasts_transitions(app, match_data):
+    """Test rozsyłania tylko zmian stanu zegara"""
+    from services.broker_service import BrokerService, match_topic
+    from services.match_service import MatchService
+
+    with app.app_context():
+        year = Year(year=match_data['year'])
+        db.session.add(year)
+        db.session.commit()
+        tournament = Tournament(name=match_data['tournament_name'], year_id=year.id,
+                                status='ongoing', date=date(2023, 12, 1))
+        db.session.add(tournament)
+        db.session.commit()
+        team1 = Team(name=match_data['team1_name'], tournament_id=tournament.id)
+        team2 = Team(name=match_data['team2_name'], tournament_id=tournament.id)
+        db.session.add_all([team1, team2])
+        db.session.commit()
+        match = Match(tournament_id=tournament.id, team1_id=team1.id, team2_id=team2.id,
+                      start_time=datetime.now(), status='ongoing')
+        match.start_clock()
+        db.session.add(match)
+        db.session.commit()
+
+        service = MatchService()
+        with BrokerService.subscribe([match_topic(match.id)]) as subscription:
+            assert service.pause_match_timer(match.id)
+            assert service.resume_match_timer(match.id)
+
+            events = []
+            while True:
+                item = subscription.get(timeout=0.1)
+                if item is None:
+                    break
+                events.append(item[1])
+
+        assert [event['event'] for event in events] == ['clock_changed', 'clock_changed']
+        assert [event['data']['running'] for event in events] == [False, True]
+        assert service.get_match_status(match.id)['clock']['running']
@@ -0,0 +1,63 @@
+from services.cache_service import CacheService
+from services.metrics_service import MetricsService, Counter, Histogram, CACHE_REQUESTS
+
+def test_histogram_buckets_and_quantiles():
+    """Test histogramu - przedziały skumulowane i przybliżone percentyle"""
+    histogram = Histogram('test_latency_seconds', 'Test', ('endpoint',), buckets=(0.1, 0.5, 1.0))
+    for value in (0.05, 0.05, 0.2, 0.7, 3.0):
+        histogram.observe(value, endpoint='a')
+    histogram.observe(0.05, endpoint='b')
+
+    summary = histogram.summary(endpoint='a')
+    assert summary['count'] == 5
+    assert summary['p50'] == 0.5
+    assert summary['p99'] == float('inf')
+    assert histogram.summary()['count'] == 6
+
+    lines = histogram.render()
+    assert 'test_latency_seconds_bucket{endpoint="a",le="0.1"} 2' in lines
+    assert 'test_latency_seconds_bucket{endpoint="a",le="+Inf"} 5' in lines
+    assert 'test_latency_seconds_count{endpoint="b"} 1' in lines
+
+def test_counter_partial_labels():
+    """Test sumowania licznika po części etykiet"""
+    counter = Counter('test_total', 'Test', ('endpoint', 'status'))
+    counter.inc(endpoint='a', status=200)
+    counter.inc(2, endpoint='a', status=500)
+    counter.inc(endpoint='b', status=200)
+    assert counter.value(endpoint='a') == 3
+    assert counter.value(status=200) == 2
+    assert counter.value() == 4
+
+def test_cache_hits_and_misses_counted(app):
+    """Test liczników trafień i chybień cache'u"""
+    with app.app_context():
+        hits, misses = CACHE_REQUESTS.value(result='hit'), CACHE_REQUESTS.value(result='miss')
+        CacheService.get_or_set('metrics:test', lambda: 42, timeout=60)
+        CacheService.get_or_set('metrics:test', lambda: 42, timeout=60)
+
+        assert CACHE_REQUESTS.value(result='miss') == misses + 1
+        assert CACHE_REQUESTS.value(result='hit') == hits + 1
+
+def test_metrics_endpoint(app, client):
+    """Test endpointu /metrics w formacie tekstowym"""
+    client.get('/health')
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    body = response.get_data(as_text=True)
+    assert 'http_requests_total{endpoint="health_check",method="GET",status="200"}' in body
+    assert '# TYPE http_request_duration_seconds histogram' in body
+    assert 'task_queue_depth{lane="thread"}' in body
+    assert 'broker_subscribers' in body
+
+def test_snapshot_ring_buffer(app):
+    """Test bufora pierścieniowego migawek"""
+    with app.app_context():
+        for _ in range(3):
+            MetricsService.snapshot()
+        history = MetricsService.get_history(2)
+
+    assert len(history) == 2
+    assert {'timestamp', 'requests', 'cache_hits', 'task_queue_depth'} <= set(history[-1])
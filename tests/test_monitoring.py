@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+from models import HealthMetric
+from services.monitoring_service import MonitoringService, bucket_start
+
+def health_status(cpu, query_time=0.01, flags=0):
+    return {
+        'warning_flags': flags,
+        'metrics': {
+            'system': {'cpu': {'percent': cpu}, 'memory': {'percent': 50.0}, 'disk': {'percent': 40.0}},
+            'database': {'query_time': query_time}
+        }
+    }
+
+def test_bucket_start():
+    """Test wyznaczania początku przedziału"""
+    timestamp = datetime(2024, 6, 1, 10, 17, 42)
+    assert bucket_start(timestamp, 60) == datetime(2024, 6, 1, 10, 17)
+    assert bucket_start(timestamp, 3600) == datetime(2024, 6, 1, 10, 0)
+    assert bucket_start(timestamp, 86400) == datetime(2024, 6, 1)
+
+def test_record_health_rollups(app):
+    """Test agregacji próbek w przedziały minutowe, godzinowe i dzienne"""
+    with app.app_context():
+        start = datetime(2024, 6, 1, 10, 0, 5)
+        MonitoringService.record_health(health_status(20.0), start)
+        MonitoringService.record_health(health_status(40.0), start + timedelta(seconds=30))
+        MonitoringService.record_health(health_status(90.0, flags=1), start + timedelta(minutes=5))
+
+        assert HealthMetric.query.filter_by(resolution=60).count() == 2
+        hour = HealthMetric.query.filter_by(resolution=3600).one()
+        assert hour.samples == 3
+        assert hour.cpu_avg == 50.0
+        assert hour.cpu_max == 90.0
+        assert hour.warning_samples == 1
+        assert HealthMetric.query.filter_by(resolution=86400).one().samples == 3
+
+def test_performance_history_resolution(app):
+    """Test zakresów historii - dobór rozdzielczości i dekodowanie ostrzeżeń"""
+    with app.app_context():
+        end = datetime(2024, 6, 2, 12, 0)
+        for minutes in range(0, 48 * 60, 30):
+            flags = 8 if minutes == 60 else 0
+            MonitoringService.record_health(health_status(10.0, flags=flags), end - timedelta(minutes=minutes))
+
+        recent = MonitoringService.get_performance_history(hours=2, end=end)
+        assert {row['resolution'] for row in recent} == {60}
+        assert any(row['warnings'] == ['Wolne zapytania do bazy danych'] for row in recent)
+
+        day = MonitoringService.get_performance_history(hours=24, end=end)
+        assert {row['resolution'] for row in day} == {3600}
+        assert 24 <= len(day) <= 25
+        assert all(isinstance(row['cpu']['avg'], float) for row in day)
+
+def test_health_retention(app):
+    """Test usuwania przedziałów starszych niż okres przechowywania"""
+    with app.app_context():
+        now = datetime(2024, 6, 10, 12, 0)
+        MonitoringService.record_health(health_status(10.0), now - timedelta(days=5))
+        MonitoringService.record_health(health_status(10.0), now)
+
+        MonitoringService.apply_health_retention(now)
+
+        assert HealthMetric.query.filter_by(resolution=60).count() == 1
+        assert HealthMetric.query.filter_by(resolution=3600).count() == 2
@@ -0,0 +1,171 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import event
+from models import User, Year, Tournament, Notification, BroadcastNotification
+from services.notification_service import NotificationService
+from extensions import db
+
+def create_tournament():
+    year = Year(year=2024)
+    db.session.add(year)
+    db.session.flush()
+    tournament = Tournament(name='Notify Cup', year_id=year.id, status='ongoing', date=date(2024, 6, 1))
+    db.session.add(tournament)
+    db.session.commit()
+    return tournament
+
+def test_tournament_start_stored_once(app):
+    """Test powiadomienia grupowego - jeden wiersz niezależnie od liczby odbiorców"""
+    with app.app_context():
+        tournament = create_tournament()
+        admin = User.query.filter_by(email='test@admin.com').first()
+        service = NotificationService()
+
+        assert service.notify_tournament_start(tournament.id)
+        assert BroadcastNotification.query.count() == 1
+        assert Notification.query.count() == 0
+        assert service.get_unread_count(admin.id) == 1
+
+def test_read_cursor(app):
+    """Test kursora przeczytanych - przesuwany tylko do przodu"""
+    with app.app_context():
+        admin = User.query.filter_by(email='test@admin.com').first()
+        service = NotificationService()
+        first = service.broadcast('A', 'Pierwsze', 'info')
+        second = service.broadcast('B', 'Drugie', 'info')
+        service.broadcast('C', 'Dla rodziców', 'info', audience='parent')
+
+        assert service.get_broadcast_unread_count(admin.id) == 2
+        assert service.mark_broadcasts_read(admin.id, first)
+        assert service.get_broadcast_unread_count(admin.id) == 1
+        assert service.mark_broadcasts_read(admin.id, 0)
+        assert service.get_last_seen_id(admin.id) == first
+
+        assert service.mark_all_as_read(admin.id)
+        assert service.get_last_seen_id(admin.id) >= second
+        assert service.get_unread_count(admin.id) == 0
+
+def test_bulk_targeted_notifications(app):
+    """Test powiadomień skierowanych - wsadowy INSERT i jeden commit"""
+    with app.app_context():
+        admin = User.query.filter_by(email='test@admin.com').first()
+        inserts = []
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_inserts(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT INTO notification'):
+                inserts.append(statement)
+
+        try:
+            created = NotificationService().create_notifications_bulk(
+                {'user_id': admin.id, 'title': 'Wynik', 'message': f'Mecz {i}', 'type': 'match_end',
+                 'related_id': None} for i in range(1500)
+            )
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_inserts)
+
+        assert created == 1500
+        assert 1 <= len(inserts) <= 2
+        assert NotificationService().get_unread_count(admin.id) == 1500
+
+def test_bulk_to_cold_counters(app, assert_max_queries):
+    """Test wysyłki wsadowej - brak liczników w cache'u nie wywołuje przeliczeń"""
+    with app.app_context():
+        users = [User(email=f'parent{i}@test.com', password='x', role='parent') for i in range(50)]
+        db.session.add_all(users)
+        db.session.commit()
+        user_ids = [user.id for user in users]
+
+        with assert_max_queries(5):
+            created = NotificationService().create_notifications_bulk(
+                {'user_id': user_id, 'title': 'Wynik', 'message': 'Mecz zakończony'} for user_id in user_ids
+            )
+
+        assert created == 50
+        assert NotificationService().get_unread_count(user_ids[0]) == 1
+
+def test_notifications_api(app, auth_client):
+    """Test API listy powiadomień i oznaczania jako przeczytane"""
+    with app.app_context():
+        NotificationService().broadcast('Start', 'Turniej się rozpoczął', 'tournament_start')
+
+    data = auth_client.get('/api/notifications').get_json()
+    assert data['unread'] == 1
+    assert data['notifications'][0]['is_read'] is False
+
+    response = auth_client.post('/api/notifications/read', json={})
+    assert response.get_json()['unread'] == 0
+
+def test_read_cursor_clamped(app, auth_client):
+    """Test kursora ograniczonego do ostatniego powiadomienia i walidacji up_to_id"""
+    with app.app_context():
+        latest = NotificationService().broadcast('Start', 'Turniej się rozpoczął', 'tournament_start')
+
+    assert auth_client.post('/api/notifications/read', json={'up_to_id': 'abc'}).status_code == 400
+    response = auth_client.post('/api/notifications/read', json={'up_to_id': latest + 1000})
+    assert response.get_json()['unread'] == 0
+
+    with app.app_context():
+        admin = User.query.filter_by(email='test@admin.com').first()
+        service = NotificationService()
+        assert service.get_last_seen_id(admin.id) == latest
+        service.broadcast('Koniec', 'Turniej zakończony', 'tournament_end')
+        assert service.get_unread_count(admin.id) == 1
+
+def test_unread_counter_cached_and_pushed(app, assert_max_queries):
+    """Test licznika nieprzeczytanych - odczyt z cache'u, zmiany wysyłane na żywo"""
+    from services.broker_service import BrokerService, user_topic
+    with app.app_context():
+        admin_id = User.query.filter_by(email='test@admin.com').first().id
+        service = NotificationService()
+        assert service.get_unread_count(admin_id) == 0
+
+        with assert_max_queries(0):
+            assert service.get_unread_count(admin_id) == 0
+
+        subscription = BrokerService.subscribe([user_topic(admin_id)])
+        try:
+            service.create_notification('Wynik', 'Mecz zakończony', 'match_end', user_id=admin_id)
+            topic, message = subscription.get(timeout=1)
+        finally:
+            subscription.close()
+        assert message == {'event': 'unread_count', 'data': {'unread': 1}}
+
+        with assert_max_queries(0):
+            assert service.get_unread_count(admin_id) == 1
+
+        # Powiadomienie grupowe unieważnia licznik - przeliczony przy odczycie
+        service.broadcast('Start', 'Turniej się rozpoczął', 'tournament_start')
+        assert service.get_unread_count(admin_id) == 2
+
+        notification = Notification.query.filter_by(user_id=admin_id).first()
+        assert service.mark_as_read(notification.id, admin_id)
+        assert service.get_unread_count(admin_id) == 1
+        assert service.mark_all_as_read(admin_id)
+        assert service.get_unread_count(admin_id) == 0
+
+def test_history_keyset_pagination(app):
+    """Test historii powiadomień stronicowanej kursorem"""
+    with app.app_context():
+        admin_id = User.query.filter_by(email='test@admin.com').first().id
+        service = NotificationService()
+        service.create_notifications_bulk({'user_id': admin_id, 'message': f'N{i}'} for i in range(5))
+
+        first, before_id = service.get_user_notifications(admin_id, per_page=2)
+        second, before_id = service.get_user_notifications(admin_id, before_id, per_page=2)
+        last, end = service.get_user_notifications(admin_id, before_id, per_page=2)
+
+        assert [n.message for n in first + second + last] == ['N4', 'N3', 'N2', 'N1', 'N0']
+        assert end is None
+
+def test_clear_old_broadcasts_resets_counters(app):
+    """Test przeliczenia liczników po usunięciu starych powiadomień grupowych"""
+    with app.app_context():
+        admin = User.query.filter_by(email='test@admin.com').first()
+        service = NotificationService()
+        broadcast_id = service.broadcast('Start', 'Turniej się rozpoczął', 'tournament_start')
+        assert service.get_unread_count(admin.id) == 1
+
+        db.session.get(BroadcastNotification, broadcast_id).created_at = datetime.utcnow() - timedelta(days=31)
+        db.session.commit()
+        assert service.clear_old_notifications(days=30)
+        assert service.get_unread_count(admin.id) == 0
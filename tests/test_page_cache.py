@@ -0,0 +1,113 @@
+from datetime import datetime, date
+from models import Year, Tournament, Team, Match
+from services.page_cache_service import PageCacheService, CATALOG_SCOPE, tournament_scope
+from extensions import db
+
+def create_tournament(status='ongoing'):
+    year = Year(year=2024)
+    db.session.add(year)
+    db.session.commit()
+    tournament = Tournament(name='Cache Cup', year_id=year.id, status=status, date=date(2024, 6, 1),
+                            start_time=datetime(2024, 6, 1, 9, 0), number_of_fields=1)
+    db.session.add(tournament)
+    db.session.commit()
+    team1 = Team(name='Eagles', tournament_id=tournament.id)
+    team2 = Team(name='Hawks', tournament_id=tournament.id)
+    db.session.add_all([team1, team2])
+    db.session.commit()
+    match = Match(tournament_id=tournament.id, team1_id=team1.id, team2_id=team2.id,
+                  start_time=datetime(2024, 6, 1, 9, 0), field_number=1, status='planned')
+    db.session.add(match)
+    db.session.commit()
+    return tournament.id, match.id
+
+def parent_session(client):
+    with client.session_transaction() as sess:
+        sess['role'] = 'parent'
+
+def test_tournament_page_served_from_cache(app, client, assert_max_queries):
+    """Test fragmentu strony turnieju z cache'u i odpowiedzi 304 dla ETag"""
+    with app.app_context():
+        tournament_id, _ = create_tournament()
+    parent_session(client)
+
+    first = client.get(f'/parent/tournament/{tournament_id}')
+    assert first.status_code == 200
+    assert first.headers['ETag'].startswith('W/')
+    assert 'no-cache' in first.headers['Cache-Control']
+
+    # Trafienie w cache - tylko odczyt turnieju do nagłówka strony
+    with assert_max_queries(1):
+        second = client.get(f'/parent/tournament/{tournament_id}')
+    assert b'Hawks' in second.data
+    assert second.headers['ETag'] == first.headers['ETag']
+
+    with assert_max_queries(0):
+        cached = client.get(f'/parent/tournament/{tournament_id}',
+                            headers={'If-None-Match': first.headers['ETag']})
+    assert cached.status_code == 304
+
+def test_match_change_invalidates_tournament_page(app, client):
+    """Test nowej wersji strony po zapisie meczu"""
+    with app.app_context():
+        tournament_id, match_id = create_tournament()
+    parent_session(client)
+
+    before = client.get(f'/parent/tournament/{tournament_id}')
+
+    with app.app_context():
+        catalog = PageCacheService.version(CATALOG_SCOPE)
+        match = db.session.get(Match, match_id)
+        match.team1_score, match.team2_score, match.status = 3, 1, 'finished'
+        db.session.commit()
+        assert PageCacheService.version(CATALOG_SCOPE) != catalog
+
+    after = client.get(f'/parent/tournament/{tournament_id}',
+                       headers={'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != before.headers['ETag']
+
+def test_rollback_keeps_version(app):
+    """Test braku unieważnienia po wycofanej transakcji"""
+    with app.app_context():
+        tournament_id, match_id = create_tournament()
+        version = PageCacheService.version(tournament_scope(tournament_id))
+
+        db.session.get(Match, match_id).team1_score = 5
+        db.session.flush()
+        db.session.rollback()
+
+        assert PageCacheService.version(tournament_scope(tournament_id)) == version
+
+def test_bulk_delete_invalidates_all_pages(app):
+    """Test unieważnienia wszystkich stron po masowym usunięciu meczów"""
+    with app.app_context():
+        tournament_id, _ = create_tournament()
+        key = PageCacheService.page_key('parent.tournament_details', tournament_scope(tournament_id))
+
+        Match.query.filter_by(tournament_id=tournament_id).delete()
+        db.session.commit()
+
+        assert PageCacheService.page_key('parent.tournament_details', tournament_scope(tournament_id)) != key
+
+def test_finished_tournament_cached_longest(app):
+    """Test dłuższego czasu życia stron zakończonych turniejów"""
+    with app.app_context():
+        tournament_id, _ = create_tournament(status='finished')
+        tournament = db.session.get(Tournament, tournament_id)
+
+        assert PageCacheService.timeout_for(tournament) == app.config['PAGE_CACHE_FINISHED_TIMEOUT']
+        assert PageCacheService.timeout_for() == app.config['PAGE_CACHE_TIMEOUT']
+
+def test_results_page(app, client):
+    """Test strony wyników z zakończonymi meczami"""
+    with app.app_context():
+        _, match_id = create_tournament()
+        match = db.session.get(Match, match_id)
+        match.team1_score, match.team2_score, match.status = 2, 0, 'finished'
+        db.session.commit()
+    parent_session(client)
+
+    response = client.get('/parent/results')
+    assert response.status_code == 200
+    assert b'Eagles' in response.data
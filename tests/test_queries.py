@@ -0,0 +1,75 @@
+from datetime import datetime, date, timedelta
+import pytest
+from models import Year, Tournament, Team, Match
+from services.base_service import BaseService
+from services.query_service import QueryService
+from services.stats_service import StatsService
+from extensions import db
+
+def create_tournament_with_matches(team_count=12, match_count=60):
+    year = Year(year=2024)
+    db.session.add(year)
+    db.session.commit()
+    tournament = Tournament(name='Query Cup', year_id=year.id, status='ongoing', date=date(2024, 6, 1),
+                            start_time=datetime(2024, 6, 1, 9, 0), number_of_fields=2)
+    db.session.add(tournament)
+    db.session.commit()
+
+    BaseService().bulk_insert(Team, [{'name': f'Team {i}', 'tournament_id': tournament.id} for i in range(team_count)])
+    team_ids = [team_id for (team_id,) in Team.query.with_entities(Team.id).filter_by(tournament_id=tournament.id)]
+    rows = []
+    for i in range(match_count):
+        team1_id = team_ids[i % team_count]
+        team2_id = team_ids[(i + 1 + i // team_count) % team_count]
+        rows.append({
+            'tournament_id': tournament.id, 'team1_id': team1_id, 'team2_id': team2_id,
+            'start_time': datetime(2024, 6, 1, 9, 0) + timedelta(minutes=10 * i),
+            'field_number': 1 + i % 2, 'status': 'finished' if i < 20 else 'planned',
+            'team1_score': i % 3 if i < 20 else None, 'team2_score': 1 if i < 20 else None,
+            'clock_accumulated': 0,
+        })
+    BaseService().bulk_insert(Match, rows)
+    db.session.commit()
+    return tournament.id, team_ids
+
+def test_unknown_profile():
+    """Test nieznanego profilu ładowania"""
+    with pytest.raises(ValueError):
+        QueryService.load_options('missing')
+
+def test_tournament_matches_profile_loads_teams(app, assert_max_queries):
+    """Test profilu karty meczu - nazwy drużyn bez dodatkowych zapytań"""
+    with app.app_context():
+        tournament_id, _ = create_tournament_with_matches()
+        db.session.expunge_all()
+
+        with assert_max_queries(1):
+            matches = QueryService.tournament_matches(tournament_id)
+            names = [(match.team1.name, match.team2.name) for match in matches]
+
+        assert len(names) == 60
+
+def test_team_history_query_count(app, assert_max_queries):
+    """Test historii drużyny - stała liczba zapytań niezależnie od liczby meczów"""
+    with app.app_context():
+        _, team_ids = create_tournament_with_matches()
+        db.session.expunge_all()
+
+        with assert_max_queries(2):
+            history = StatsService().get_team_history(team_ids[0])
+
+        assert history['total_matches'] > 0
+
+def test_parent_tournament_page_query_count(app, client, assert_max_queries):
+    """Test strony turnieju dla rodzica - liczba zapytań nie rośnie z liczbą meczów"""
+    with app.app_context():
+        tournament_id, _ = create_tournament_with_matches()
+
+    with client.session_transaction() as sess:
+        sess['role'] = 'parent'
+
+    with assert_max_queries(10):
+        response = client.get(f'/parent/tournament/{tournament_id}')
+
+    assert response.status_code == 200
+    assert b'Team 0' in response.data
@@ -0,0 +1,61 @@
+import logging
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from extensions import db
+from services.query_stats_service import QueryStatsService, percentile
+
+def test_percentile():
+    """Test percentyli metodą najbliższej rangi"""
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.95) == 0.0
+    assert percentile([7], 0.99) == 7
+
+def test_endpoint_percentiles():
+    """Test agregacji próbek per endpoint"""
+    QueryStatsService.reset()
+    for i in range(1, 101):
+        QueryStatsService.record('parent.tournament_details', i, float(i), float(2 * i))
+    QueryStatsService.record('main.index', 1, 0.5, 1.0)
+
+    stats = QueryStatsService.get_stats()
+    assert stats[0]['endpoint'] == 'parent.tournament_details'
+    assert stats[0]['requests'] == 100
+    assert stats[0]['queries']['p95'] == 95
+    assert stats[0]['total_ms']['p99'] == 198
+    QueryStatsService.reset()
+
+def test_server_timing_header(app, client):
+    """Test nagłówka Server-Timing i zapisu statystyk żądania"""
+    QueryStatsService.reset()
+    with client.session_transaction() as sess:
+        sess['role'] = 'parent'
+
+    response = client.get('/parent/')
+
+    timings = response.headers.getlist('Server-Timing')
+    assert any(timing.startswith('db;dur=') and 'queries' in timing for timing in timings)
+    assert any(row['requests'] == 1 for row in QueryStatsService.get_stats())
+
+def test_slow_query_logged(app, client, caplog, monkeypatch):
+    """Test logowania wolnych zapytań z nazwą endpointu"""
+    monkeypatch.setattr(QueryStatsService, '_slow_threshold_ms', 0)
+    with client.session_transaction() as sess:
+        sess['role'] = 'parent'
+
+    with caplog.at_level(logging.WARNING):
+        client.get('/parent/')
+
+    assert any('Slow query' in record.getMessage() and 'select_year' in record.getMessage()
+               for record in caplog.records)
+
+def test_failed_query_clears_timing_stack(app):
+    """Test zdjęcia czasu startu zapytania zakończonego błędem"""
+    with app.app_context():
+        with db.engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT * FROM missing_table'))
+            assert conn.info.get('query_started') == []
@@ -0,0 +1,80 @@
+import time
+from datetime import datetime, date, timedelta
+from itertools import combinations
+from models import Year, Tournament, Team, Match
+from services.schedule_optimizer import circle_rounds, optimize_schedule, rest_slots, build_schedule
+from services.tournament_service import TournamentService
+from extensions import db
+
+def assert_valid_schedule(schedule, teams, fields, min_rest_slots):
+    pairs = [frozenset((match['team1_id'], match['team2_id'])) for match in schedule['matches']]
+    assert sorted(map(sorted, pairs)) == sorted(map(sorted, map(frozenset, combinations(teams, 2))))
+
+    slots_by_team = {}
+    for match in schedule['matches']:
+        assert 1 <= match['field_number'] <= fields
+        for team in (match['team1_id'], match['team2_id']):
+            slots_by_team.setdefault(team, []).append(match['slot'])
+    for slots in slots_by_team.values():
+        slots.sort()
+        assert all(current - previous > min_rest_slots for previous, current in zip(slots, slots[1:]))
+
+    used = [(match['slot'], match['field_number']) for match in schedule['matches']]
+    assert len(used) == len(set(used))
+
+def test_circle_rounds():
+    """Test metody kołowej - każda drużyna gra raz w kolejce"""
+    for team_count in (4, 7):
+        rounds = circle_rounds(range(1, team_count + 1))
+        assert len(rounds) == team_count - (team_count % 2 == 0)
+        for pairs in rounds:
+            teams = [team for pair in pairs for team in pair]
+            assert len(teams) == len(set(teams))
+        assert sum(len(pairs) for pairs in rounds) == team_count * (team_count - 1) // 2
+
+def test_optimize_schedule_respects_fields_and_rest():
+    """Test ograniczeń planu: boiska, odpoczynek, komplet par"""
+    for team_count, fields in ((5, 1), (8, 2), (16, 4), (13, 3)):
+        teams = list(range(1, team_count + 1))
+        schedule = optimize_schedule(teams, fields, min_rest_slots=1)
+        assert_valid_schedule(schedule, teams, fields, 1)
+        assert 0 < schedule['score'] <= 1
+        assert schedule['slots'] >= schedule['lower_bound']
+
+    assert rest_slots(10, match_length=20, break_length=5) == 1
+    assert rest_slots(5, match_length=20, break_length=5) == 0
+    assert rest_slots(40, match_length=20, break_length=5) == 2
+
+def test_large_schedule_is_fast_and_tight():
+    """Test wydajności: 64 drużyny na 8 boiskach poniżej sekundy"""
+    teams = list(range(1, 65))
+    started = time.perf_counter()
+    schedule = build_schedule(teams, datetime(2024, 6, 1, 9, 0), fields=8, match_length=10, break_length=2)
+    assert time.perf_counter() - started < 1.0
+    assert_valid_schedule(schedule, teams, 8, 1)
+    assert schedule['slots'] == schedule['lower_bound'] == 252
+    last_kickoff = schedule['matches'][-1]['start_time']
+    assert last_kickoff == datetime(2024, 6, 1, 9, 0) + timedelta(minutes=12 * 251)
+    assert schedule['end_time'] == last_kickoff + timedelta(minutes=10)
+
+def test_generate_matches_uses_all_fields(app):
+    """Test generowania meczów turnieju przez optymalizator"""
+    with app.app_context():
+        year = Year(year=2024)
+        db.session.add(year)
+        db.session.commit()
+        tournament = Tournament(name='Plan Cup', year_id=year.id, status='planned', date=date(2024, 6, 1),
+                                start_time=datetime(2024, 6, 1, 9, 0), number_of_fields=2,
+                                match_length=20, break_length=5)
+        db.session.add(tournament)
+        db.session.commit()
+        db.session.add_all([Team(name=f'Plan {i}', tournament_id=tournament.id) for i in range(6)])
+        db.session.commit()
+
+        assert TournamentService().generate_matches(tournament.id)
+
+        matches = Match.query.filter_by(tournament_id=tournament.id).all()
+        assert len(matches) == 15
+        assert {match.field_number for match in matches} == {1, 2}
+        kickoffs = {(match.start_time, match.field_number) for match in matches}
+        assert len(kickoffs) == len(matches)
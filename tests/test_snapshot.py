@@ -0,0 +1,104 @@
+import json
+from datetime import datetime, date
+from models import Year, Tournament, Team, Match
+from services.snapshot_service import SnapshotService
+from extensions import db
+
+def create_finished_tournament():
+    year = Year(year=2023)
+    db.session.add(year)
+    db.session.commit()
+    tournament = Tournament(name='Archive Cup', year_id=year.id, status='ongoing', date=date(2023, 6, 1),
+                            start_time=datetime(2023, 6, 1, 9, 0), number_of_fields=1)
+    db.session.add(tournament)
+    db.session.commit()
+    team1 = Team(name='Eagles', tournament_id=tournament.id)
+    team2 = Team(name='Hawks', tournament_id=tournament.id)
+    db.session.add_all([team1, team2])
+    db.session.commit()
+    match = Match(tournament_id=tournament.id, team1_id=team1.id, team2_id=team2.id, team1_score=2,
+                  team2_score=1, start_time=datetime(2023, 6, 1, 9, 0), field_number=1, status='finished')
+    db.session.add(match)
+    db.session.commit()
+    tournament.status = 'finished'
+    db.session.commit()
+    return tournament.id, match.id
+
+def test_publish_and_serve_without_queries(app, client, tmp_path, assert_max_queries):
+    """Test publikacji zakończonego turnieju i wysyłania plików bez zapytań"""
+    app.config['SNAPSHOT_DIR'] = str(tmp_path)
+    with app.app_context():
+        tournament_id, match_id = create_finished_tournament()
+        result = SnapshotService().refresh(tournament_id)
+    assert result['pages'] == 2
+
+    with client.session_transaction() as sess:
+        sess['role'] = 'parent'
+
+    with assert_max_queries(0):
+        page = client.get(f'/parent/tournament/{tournament_id}')
+        match_page = client.get(f'/parent/match/{match_id}')
+        standings = client.get(f'/api/tournaments/{tournament_id}/standings')
+
+    assert page.status_code == 200
+    assert b'Archive Cup' in page.data
+    assert b'Hawks' in match_page.data
+    assert standings.content_type == 'application/json'
+    assert json.loads(standings.data)['standings'][0]['team_name'] == 'Eagles'
+
+def test_reopened_tournament_unpublished(app, tmp_path):
+    """Test usunięcia plików turnieju, który przestał być zakończony"""
+    app.config['SNAPSHOT_DIR'] = str(tmp_path)
+    with app.app_context():
+        tournament_id, match_id = create_finished_tournament()
+        service = SnapshotService()
+        service.refresh(tournament_id)
+        assert SnapshotService.is_published(tournament_id)
+
+        db.session.get(Tournament, tournament_id).status = 'ongoing'
+        db.session.commit()
+        service.refresh(tournament_id)
+
+        assert not SnapshotService.is_published(tournament_id)
+        assert SnapshotService.page('match', match_id) is None
+
+def test_edit_of_published_tournament_schedules_refresh(app, tmp_path, monkeypatch):
+    """Test ponownej publikacji po poprawce w zakończonym turnieju"""
+    app.config.update(SNAPSHOT_DIR=str(tmp_path), SNAPSHOT_PUBLISH=True)
+    scheduled = []
+    monkeypatch.setattr(SnapshotService, 'schedule', classmethod(lambda cls, tournament_id: scheduled.append(tournament_id)))
+    with app.app_context():
+        tournament_id, match_id = create_finished_tournament()
+        assert scheduled == [tournament_id]
+
+        SnapshotService().publish(db.session.get(Tournament, tournament_id))
+        scheduled.clear()
+
+        db.session.get(Match, match_id).team2_score = 2
+        db.session.commit()
+
+    assert scheduled == [tournament_id]
+
+def test_snapshot_page_layout_rendered_per_request(app, client, tmp_path):
+    """Test szablonu strony renderowanego przy żądaniu - logo i komunikaty nie są zapisane w pliku"""
+    app.config['SNAPSHOT_DIR'] = str(tmp_path)
+    with app.app_context():
+        tournament_id, match_id = create_finished_tournament()
+        SnapshotService().refresh(tournament_id)
+
+        from services.config_service import ConfigService
+        from models import SystemSettings
+        db.session.add(SystemSettings(key='logo_path', value='uploads/logo.png'))
+        ConfigService.bump_version()
+        db.session.commit()
+        ConfigService.config_changed()
+
+    with client.session_transaction() as sess:
+        sess['role'] = 'parent'
+        sess['_flashes'] = [('info', 'Witaj na stronie turnieju')]
+
+    page = client.get(f'/parent/match/{match_id}')
+    assert page.status_code == 200
+    assert b'uploads/logo.png' in page.data
+    assert 'Witaj na stronie turnieju'.encode('utf-8') in page.data
+    assert b'csrf' not in (tmp_path / 'matches' / f'{match_id}.json').read_bytes()
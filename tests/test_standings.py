@@ -0,0 +1,166 @@
+import pytest
+from datetime import datetime, date, time
+from models import Tournament, Year, Team, Match, TournamentStanding
+from services.standings_service import StandingsService
+from services.season_standings_service import SeasonStandingsService, compute_standings
+from services.stats_service import StatsService
+from extensions import db
+
+@pytest.fixture
+def tournament_teams(app):
+    """Fixture tworzący turniej z trzema drużynami"""
+    with app.app_context():
+        year = Year(year=2023)
+        db.session.add(year)
+        db.session.commit()
+
+        tournament = Tournament(
+            name='Standings Tournament',
+            year_id=year.id,
+            status='ongoing',
+            date=date(2023, 12, 1),
+            start_time=datetime.combine(date(2023, 12, 1), time(10, 0))
+        )
+        db.session.add(tournament)
+        db.session.commit()
+
+        teams = [Team(name=f'Team {i}', tournament_id=tournament.id) for i in range(1, 4)]
+        db.session.add_all(teams)
+        db.session.commit()
+
+        return tournament.id, [team.id for team in teams]
+
+def _standing(tournament_id, team_id):
+    return TournamentStanding.query.filter_by(tournament_id=tournament_id, team_id=team_id).first()
+
+def _add_match(tournament_id, team1_id, team2_id, status='planned', score=(None, None)):
+    match = Match(
+        tournament_id=tournament_id,
+        team1_id=team1_id,
+        team2_id=team2_id,
+        team1_score=score[0],
+        team2_score=score[1],
+        start_time=datetime.now(),
+        status=status
+    )
+    db.session.add(match)
+    db.session.commit()
+    return match
+
+def test_finishing_match_updates_standings(app, tournament_teams):
+    """Test aktualizacji tabeli po zakończeniu meczu"""
+    tournament_id, (team1, team2, team3) = tournament_teams
+    with app.app_context():
+        match = _add_match(tournament_id, team1, team2, status='ongoing', score=(0, 0))
+        assert _standing(tournament_id, team1) is None
+
+        match.team1_score = 2
+        match.team2_score = 1
+        match.status = 'finished'
+        db.session.commit()
+
+        winner = _standing(tournament_id, team1)
+        loser = _standing(tournament_id, team2)
+        assert (winner.points, winner.wins, winner.goals_for, winner.goal_difference) == (3, 1, 2, 1)
+        assert (loser.points, loser.losses, loser.goals_against, loser.goal_difference) == (0, 1, 2, -1)
+
+def test_score_correction_reverts_previous_result(app, tournament_teams):
+    """Test poprawy wyniku zakończonego meczu"""
+    tournament_id, (team1, team2, team3) = tournament_teams
+    with app.app_context():
+        match = _add_match(tournament_id, team1, team2, status='finished', score=(2, 1))
+
+        match.team2_score = 2
+        db.session.commit()
+
+        for team_id in (team1, team2):
+            standing = _standing(tournament_id, team_id)
+            assert (standing.points, standing.matches_played, standing.draws) == (1, 1, 1)
+            assert (standing.wins, standing.losses, standing.goal_difference) == (0, 0, 0)
+
+        # Przywrócenie meczu do trwającego wycofuje wynik
+        match.status = 'ongoing'
+        db.session.commit()
+        assert _standing(tournament_id, team1).matches_played == 0
+
+def test_deleting_finished_match_reverts_standings(app, tournament_teams):
+    """Test usunięcia zakończonego meczu"""
+    tournament_id, (team1, team2, team3) = tournament_teams
+    with app.app_context():
+        match = _add_match(tournament_id, team1, team2, status='finished', score=(3, 0))
+        db.session.delete(match)
+        db.session.commit()
+
+        standing = _standing(tournament_id, team1)
+        assert (standing.points, standing.matches_played, standing.goals_for) == (0, 0, 0)
+
+def test_get_table_ordering_and_rebuild(app, tournament_teams):
+    """Test kolejności tabeli oraz zgodności przeliczenia od zera"""
+    tournament_id, (team1, team2, team3) = tournament_teams
+    with app.app_context():
+        _add_match(tournament_id, team1, team2, status='finished', score=(1, 1))
+        _add_match(tournament_id, team3, team1, status='finished', score=(0, 2))
+        _add_match(tournament_id, team2, team3, status='finished', score=(4, 0))
+        _add_match(tournament_id, team1, team3)
+
+        table = StandingsService.get_table(tournament_id)
+        assert [row['team_id'] for row in table] == [team2, team1, team3]
+        assert [row['points'] for row in table] == [4, 4, 0]
+        incremental = [(row['team_id'], row['points'], row['goals_for']) for row in table]
+
+        StandingsService().rebuild(tournament_id)
+        rebuilt = [(row['team_id'], row['points'], row['goals_for'])
+                   for row in StandingsService.get_table(tournament_id)]
+        assert rebuilt == incremental
+
+        standings = StandingsService.get_standings(tournament_id)
+        assert [row['position'] for row in standings] == [1, 2, 3]
+        assert 'team' not in standings[0]
+
+def test_compute_standings_vectorized():
+    """Test hurtowego liczenia tabeli z kolumn meczów"""
+    table = compute_standings([1, 3, 2], [2, 1, 3], [1, 0, 4], [1, 2, None])
+    rows = {team_id: index for index, team_id in enumerate(table['team_id'].tolist())}
+    assert table['points'][rows[1]] == 4
+    assert table['points'][rows[2]] == 4
+    assert table['goal_difference'][rows[2]] == 4
+    assert table['losses'][rows[3]] == 2
+    assert table['matches_played'].sum() == 6
+
+def test_season_tables_match_incremental_standings(app, tournament_teams):
+    """Test zgodności tabel rocznika z tabelą przyrostową"""
+    tournament_id, (team1, team2, team3) = tournament_teams
+    with app.app_context():
+        _add_match(tournament_id, team1, team2, status='finished', score=(1, 1))
+        _add_match(tournament_id, team3, team1, status='finished', score=(0, 2))
+        _add_match(tournament_id, team2, team3, status='finished', score=(4, 0))
+
+        tables = SeasonStandingsService().get_year_tables(2023)
+        expected = [(row['team_id'], row['points'], row['goal_difference'])
+                    for row in StandingsService.get_table(tournament_id)]
+        assert [(row['team_id'], row['points'], row['goal_difference'])
+                for row in tables[tournament_id]] == expected
+
+        stats = StatsService().get_global_stats()
+        assert stats['users']['total'] == 1
+        assert stats['teams']['top'][0]['team_id'] == team2
+        assert stats['matches']['draws'] == 1
+
+def test_season_archive_single_pass(app, tournament_teams, assert_max_queries, monkeypatch):
+    """Test archiwum sezonu ze stałą liczbą zapytań"""
+    from services.archive_task_service import ArchiveTaskService
+    tournament_id, (team1, team2, team3) = tournament_teams
+    saved = {}
+    with app.app_context():
+        _add_match(tournament_id, team1, team2, status='finished', score=(3, 1))
+        _add_match(tournament_id, team2, team3, status='finished', score=(0, 0))
+        service = ArchiveTaskService()
+        monkeypatch.setattr(service, '_save_archive', lambda name, data: saved.setdefault(name, data) and name)
+
+        with assert_max_queries(3):
+            result = service._archive_season(2023)
+
+    summary = saved['season_2023_summary']['tournaments'][0]
+    assert result['total_tournaments'] == 1
+    assert (summary['total_matches'], summary['total_goals']) == (2, 4)
+    assert summary['standings'][0]['team_id'] == team1
@@ -0,0 +1,267 @@
+import os
+import queue
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta
+from models import Task
+from services.task_queue import DatabaseTaskQueue, FairTaskScheduler, task_reference, resolve_task_reference
+from services.task_service import TaskService
+from services.stats_service import StatsService
+from extensions import db
+
+CALLS = []
+
+def record_call(value, fail_times=0):
+    CALLS.append(value)
+    if len(CALLS) <= fail_times:
+        raise RuntimeError('temporary failure')
+    return {'value': value}
+
+def current_pid():
+    return os.getpid()
+
+@pytest.fixture
+def durable_tasks(app, monkeypatch):
+    """Fixture przełączający TaskService w tryb trwałej kolejki bez wątków"""
+    service = TaskService()
+    service.shutdown()
+    app.config['TASK_QUEUE_MODE'] = 'database'
+    app.config['TASK_RETRY_BACKOFF'] = 0
+    service.init_app(app)
+    monkeypatch.setattr(service, '_start_workers', lambda: None)
+    CALLS.clear()
+    yield service
+    app.config['TASK_QUEUE_MODE'] = 'memory'
+    service.init_app(app)
+
+def test_task_reference_round_trip():
+    """Test zapisu funkcji jako referencji i jej odtworzenia"""
+    assert resolve_task_reference(task_reference(record_call)) is record_call
+
+    reference = task_reference(StatsService().get_global_stats)
+    assert reference == 'services.stats_service:StatsService.get_global_stats'
+    assert resolve_task_reference(reference).__name__ == 'get_global_stats'
+
+    assert task_reference(lambda: None) is None
+
+def test_durable_task_claim_and_complete(app, durable_tasks):
+    """Test wykonania zadania zapisanego w bazie"""
+    with app.app_context():
+        task_id = durable_tasks.submit_task(record_call, 'Record', args=(5,), notify_user=False)
+        task = Task.query.filter_by(uid=task_id).first()
+        assert (task.durable, task.status, task.args) == (True, 'pending', [5])
+
+        assert durable_tasks._run_durable_task() is True
+        assert durable_tasks._run_durable_task() is False
+
+        db.session.expire_all()  # zadanie wykonano w osobnym kontekście aplikacji
+        status = durable_tasks.get_task_status(task_id)
+        assert status['status'] == 'completed'
+        assert status['result'] == {'value': 5}
+        assert status['attempts'] == 1
+        assert durable_tasks.get_queue_stats()['durable']['completed'] == 1
+
+def test_durable_task_retries_with_backoff(app, durable_tasks):
+    """Test ponawiania zadania po błędzie aż do limitu prób"""
+    with app.app_context():
+        task_id = durable_tasks.submit_task(record_call, 'Retry', args=(1,),
+                                            kwargs={'fail_times': 5}, max_attempts=2,
+                                            notify_user=False)
+        durable_tasks._run_durable_task()
+        task = Task.query.filter_by(uid=task_id).first()
+        assert (task.status, task.attempts) == ('pending', 1)
+        assert task.error_message == 'temporary failure'
+
+        durable_tasks._run_durable_task()
+        db.session.refresh(task)
+        assert (task.status, task.attempts) == ('failed', 2)
+        assert len(CALLS) == 2
+
+def test_expired_lease_and_orphans_are_requeued(app):
+    """Test powrotu do kolejki zadań przerwanych przez awarię workera"""
+    with app.app_context():
+        queue = DatabaseTaskQueue(visibility_timeout=60)
+        stuck = Task(type='record_call', durable=True, function=task_reference(record_call),
+                     args=[1], kwargs={}, status='running', locked_by='other-host:1',
+                     locked_until=datetime.utcnow() - timedelta(seconds=1))
+        orphan = Task(type='record_call', durable=True, function=task_reference(record_call),
+                      args=[2], kwargs={}, status='running', locked_by=queue.worker_id,
+                      locked_until=datetime.utcnow() + timedelta(seconds=60))
+        db.session.add_all([stuck, orphan])
+        db.session.commit()
+
+        assert queue.requeue_orphans() == 2
+        claimed = queue.claim()
+        assert claimed is not None and claimed.status == 'running'
+        assert claimed.locked_by == claimed.claim_token
+        assert claimed.locked_by.startswith(f'{queue.worker_id}:')
+
+def test_lost_lease_drops_result(app):
+    """Test odrzucenia wyniku workera, któremu zadanie przejął inny worker"""
+    with app.app_context():
+        queue = DatabaseTaskQueue(visibility_timeout=60)
+        task = Task(type='record_call', durable=True, function=task_reference(record_call),
+                    args=[1], kwargs={}, status='pending', available_at=datetime.utcnow())
+        db.session.add(task)
+        db.session.commit()
+
+        claimed = queue.claim()
+        assert queue.renew(claimed.id, claimed.claim_token, 60) is True
+        db.session.execute(db.update(Task).where(Task.id == claimed.id).values(locked_by='other-host:1'))
+        db.session.commit()
+
+        assert queue.renew(claimed.id, claimed.claim_token, 60) is False
+        assert queue.complete(claimed, {'value': 1}) is False
+        assert queue.fail(claimed, 'error') is None
+        db.session.expire_all()
+        assert db.session.get(Task, claimed.id).result is None
+
+def test_reclaim_in_same_process_fences_stale_attempt(app):
+    """Test odrzucenia wyniku wątku, któremu zadanie przejął inny wątek tego samego procesu"""
+    with app.app_context():
+        queue = DatabaseTaskQueue(visibility_timeout=60)
+        task = Task(type='record_call', durable=True, function=task_reference(record_call),
+                    args=[1], kwargs={}, status='pending', available_at=datetime.utcnow())
+        db.session.add(task)
+        db.session.commit()
+
+        first = queue.claim()
+        stale_token = first.claim_token
+        # Dzierżawa wygasła - zadanie wraca do kolejki i przejmuje je ten sam proces
+        db.session.execute(db.update(Task).where(Task.id == first.id).values(
+            locked_until=datetime.utcnow() - timedelta(seconds=1)))
+        db.session.commit()
+        assert queue.requeue_expired() == 1
+        second = queue.claim()
+        assert second.claim_token != stale_token
+
+        fresh_token = second.claim_token
+        assert queue.renew(second.id, stale_token, 60) is False
+        # Ten sam wiersz widziany przez wątek ze starym przejęciem
+        second.claim_token = stale_token
+        assert queue.complete(second, {'value': 'stale'}) is False
+        second.claim_token = fresh_token
+        assert queue.complete(second, {'value': 'fresh'}) is True
+        db.session.expire_all()
+        assert db.session.get(Task, second.id).result == {'value': 'fresh'}
+
+def test_cancel_pending_durable_task(app, durable_tasks):
+    """Test anulowania zadania, którego nikt jeszcze nie przejął"""
+    with app.app_context():
+        task_id = durable_tasks.submit_task(record_call, 'Cancel', args=(3,), notify_user=False)
+        assert durable_tasks.cancel_task(task_id) is True
+        assert durable_tasks._run_durable_task() is False
+        assert durable_tasks.cancel_task(task_id) is False
+        assert CALLS == []
+
+def test_process_lane_runs_outside_web_process(app):
+    """Test wykonania zadania CPU w puli procesów z metrykami toru"""
+    service = TaskService()
+    app.config['TASK_PROCESS_WORKERS'] = 1
+    service.shutdown()
+    service.init_app(app)
+    try:
+        with app.app_context():
+            task_id = service.submit_task(current_pid, 'Pid', lane='process',
+                                          notify_user=False, persist=False)
+            fallback_id = service.submit_task(lambda: os.getpid(), 'Lambda', lane='process',
+                                              notify_user=False, persist=False)
+            service._scheduler.join()
+
+            assert service.get_task_status(task_id)['result'] != os.getpid()
+            assert service.get_task_status(fallback_id)['result'] == os.getpid()
+
+            lanes = service.get_queue_stats()['lanes']
+            assert lanes['process']['workers'] == 1
+            assert lanes['process']['run_ms']['count'] == 1
+            assert lanes['process']['queue_depth'] == 0
+            assert lanes['thread']['run_ms']['count'] >= 1
+    finally:
+        service.shutdown()
+        app.config.pop('TASK_PROCESS_WORKERS')
+        service.init_app(app)
+
+def _scheduled(task_id, user_id=None, priority='interactive', task_type='job'):
+    return {'id': task_id, 'user_id': user_id, 'priority': priority, 'type': task_type, 'lane': 'thread'}
+
+def test_scheduler_priorities_and_round_robin():
+    """Test kolejności klas priorytetu i przeplatania użytkowników"""
+    scheduler = FairTaskScheduler(['thread'])
+    for index in range(3):
+        scheduler.put(_scheduled(f'a{index}', user_id=1, priority='batch'))
+    scheduler.put(_scheduled('b0', user_id=2, priority='batch'))
+    scheduler.put(_scheduled('rt', user_id=1, priority='realtime'))
+
+    order = []
+    for _ in range(5):
+        task = scheduler.get('thread', timeout=0)
+        order.append(task['id'])
+        scheduler.task_done(task)
+    assert order == ['rt', 'a0', 'b0', 'a1', 'a2']
+    scheduler.join()
+
+def test_scheduler_per_user_and_type_limits():
+    """Test limitów równoległości per użytkownik i per typ zadania"""
+    scheduler = FairTaskScheduler(['thread'], per_user_limit=1, type_limits={'bulk': 1})
+    scheduler.put(_scheduled('u1-a', user_id=1))
+    scheduler.put(_scheduled('u1-b', user_id=1))
+    scheduler.put(_scheduled('bulk-a', user_id=2, task_type='bulk'))
+    scheduler.put(_scheduled('bulk-b', user_id=3, task_type='bulk'))
+    scheduler.put(_scheduled('u1-rt', user_id=1, priority='realtime'))
+
+    running = [scheduler.get('thread', timeout=0) for _ in range(3)]
+    assert [task['id'] for task in running] == ['u1-rt', 'u1-a', 'bulk-a']
+    with pytest.raises(queue.Empty):
+        scheduler.get('thread', timeout=0.05)
+    assert scheduler.stats()['interactive'] == {'queued': 2, 'waiting_users': 2, 'running': 2}
+
+    scheduler.task_done(running[1])
+    assert scheduler.get('thread', timeout=0)['id'] == 'u1-b'
+    scheduler.task_done(running[2])
+    assert scheduler.get('thread', timeout=0)['id'] == 'bulk-b'
+
+def test_realtime_task_not_blocked_by_busy_workers(app):
+    """Test natychmiastowego wykonania zadania realtime przy zajętych wątkach"""
+    service = TaskService()
+    service.shutdown()
+    app.config['TASK_WORKERS'] = 1
+    service.init_app(app)
+    release = threading.Event()
+    try:
+        with app.app_context():
+            for _ in range(3):
+                service.submit_task(release.wait, 'Archiwum', args=(5,), priority='batch',
+                                    notify_user=False, persist=False)
+            started = time.time()
+            task_id = service.submit_task(current_pid, 'Powiadomienie', priority='realtime',
+                                          notify_user=False, persist=False)
+            while service.get_task_status(task_id)['status'] != 'completed':
+                assert time.time() - started < 1
+                time.sleep(0.01)
+
+            classes = service.get_queue_stats()['classes']
+            assert classes['batch']['running'] == 1
+            assert classes['batch']['queued'] == 2
+            assert classes['realtime']['run_ms']['count'] >= 1
+    finally:
+        release.set()
+        service._scheduler.join()
+        service.shutdown()
+        app.config['TASK_WORKERS'] = 3
+        service.init_app(app)
+
+def test_pool_worker_app_is_lightweight(monkeypatch):
+    """Test aplikacji procesu puli - bez Socket.IO i tworzenia schematu"""
+    from app import create_app
+    created = []
+    monkeypatch.setattr(db, 'create_all', lambda *args, **kwargs: created.append(True))
+    worker_app = create_app('testing', config_overrides={
+        'TASK_POOL_WORKER': True,
+        'TASK_WORKERS_AUTOSTART': False,
+        'AUDIT_LOG_ASYNC': False,
+        'CONFIG_LISTENER': False
+    })
+
+    assert created == []
+    assert 'socketio' not in worker_app.extensions
@@ -1,7 +1,15 @@
 from flask import render_template, redirect, url_for, flash, request, session, abort, jsonify, Response, stream_with_context, current_app
 from flask_login import login_required, current_user, logout_user
 from flask_wtf import FlaskForm
-from models import User, Year, Tournament, Team, Match, SystemLog, SystemSettings
+from models import User, Year, Tournament, Team, Match, SystemLog, SystemSettings, TournamentStanding
+from services.standings_service import StandingsService
+from services.broker_service import BrokerService, tournament_topic
+from services.schedule_optimizer import build_schedule
+from services.base_service import BaseService
+from services.tournament_service import match_rows
+from services.query_service import QueryService
+from services.log_service import LogService, LogFilters
+from services.config_service import ConfigService
 from forms.auth import LoginForm
 from extensions import db, bcrypt
 import os
@@ -9,13 +17,9 @@ from werkzeug.utils import secure_filename
 import datetime
 from flask_wtf.csrf import CSRFProtect
 import json
-import queue
 import threading
 import time
 
-# Global queues for updates
-match_updates = queue.Queue()
-tournament_updates = queue.Queue()
 
 def init_views(app):
     # Import blueprints
@@ -98,8 +102,7 @@ def init_views(app):
                 return redirect(url_for('login'))
             
         form = LoginForm()
-        logo_setting = SystemSettings.query.filter_by(key='logo_path').first()
-        logo_path = logo_setting.value if logo_setting else None
+        logo_path = ConfigService.get_setting('logo_path')
         
         if role == 'admin':
             if request.method == 'POST':
@@ -134,9 +137,8 @@ def init_views(app):
     @app.route('/parent/select-year')
     def parent_select_year():
         try:
-            years = Year.query.order_by(Year.year.desc()).all()
-            logo_setting = SystemSettings.query.filter_by(key='logo_path').first()
-            logo_path = logo_setting.value if logo_setting else None
+            years = QueryService.years()
+            logo_path = ConfigService.get_setting('logo_path')
             
             # Add tournament count for each year
             for year in years:
@@ -154,9 +156,8 @@ def init_views(app):
     def parent_dashboard(year_id):
         try:
             year = Year.query.get_or_404(year_id)
-            tournaments = Tournament.query.filter_by(year_id=year_id).all()
-            logo_setting = SystemSettings.query.filter_by(key='logo_path').first()
-            logo_path = logo_setting.value if logo_setting else None
+            tournaments = QueryService.tournaments(year_id=year_id)
+            logo_path = ConfigService.get_setting('logo_path')
             
             return render_template('parent/tournaments.html',
                                 year=year,
@@ -171,58 +172,11 @@ def init_views(app):
     def parent_tournament_details(tournament_id):
         try:
             tournament = Tournament.query.get_or_404(tournament_id)
-            matches = Match.query.filter_by(tournament_id=tournament_id).order_by(Match.start_time).all()
-            teams = Team.query.filter_by(tournament_id=tournament_id).all()
-            logo_setting = SystemSettings.query.filter_by(key='logo_path').first()
-            logo_path = logo_setting.value if logo_setting else None
+            matches = QueryService.tournament_matches(tournament_id)
+            logo_path = ConfigService.get_setting('logo_path')
             
-            # Calculate team statistics
-            team_stats = []
-            for team in teams:
-                stats = {
-                    'team': team,
-                    'matches_played': 0,
-                    'wins': 0,
-                    'draws': 0,
-                    'losses': 0,
-                    'goals_for': 0,
-                    'goals_against': 0,
-                    'points': 0
-                }
-                
-                for match in matches:
-                    if match.status != 'finished':
-                        continue
-                    
-                    if match.team1_id == team.id:
-                        stats['goals_for'] += match.team1_score or 0
-                        stats['goals_against'] += match.team2_score or 0
-                        if match.team1_score > match.team2_score:
-                            stats['wins'] += 1
-                            stats['points'] += 3
-                        elif match.team1_score == match.team2_score:
-                            stats['draws'] += 1
-                            stats['points'] += 1
-                        else:
-                            stats['losses'] += 1
-                        stats['matches_played'] += 1
-                    elif match.team2_id == team.id:
-                        stats['goals_for'] += match.team2_score or 0
-                        stats['goals_against'] += match.team1_score or 0
-                        if match.team2_score > match.team1_score:
-                            stats['wins'] += 1
-                            stats['points'] += 3
-                        elif match.team1_score == match.team2_score:
-                            stats['draws'] += 1
-                            stats['points'] += 1
-                        else:
-                            stats['losses'] += 1
-                        stats['matches_played'] += 1
-                
-                team_stats.append(stats)
-            
-            # Sort teams by points
-            team_stats.sort(key=lambda x: (-x['points'], -(x['goals_for'] - x['goals_against']), -x['goals_for']))
+            # Tabela wyników utrzymywana przyrostowo przez StandingsService
+            team_stats = StandingsService.get_table(tournament_id)
             
             return render_template('parent/tournament_details.html',
                                 tournament=tournament,
@@ -248,8 +202,8 @@ def init_views(app):
                 'teams_count': Team.query.count(),
                 'active_matches': Match.query.filter_by(status='ongoing').count()
             }
-            active_tournaments = Tournament.query.filter_by(status='ongoing').all()
-            recent_matches = Match.query.order_by(Match.start_time.desc()).limit(5).all()
+            active_tournaments = QueryService.tournaments(profile='tournament_summary', status='ongoing')
+            recent_matches = QueryService.recent_matches(5)
             form = EmptyForm()
             
             return render_template('admin/dashboard.html', 
@@ -369,7 +323,9 @@ def init_views(app):
                         pass
                     
                     logo_setting.value = None
+                    ConfigService.bump_version()
                     db.session.commit()
+                    ConfigService.config_changed()
                     return jsonify({'success': True})
                 return jsonify({'error': 'No logo found'}), 404
             
@@ -407,15 +363,16 @@ def init_views(app):
                         setting = SystemSettings(key='logo_path', value=f'uploads/{filename}')
                         db.session.add(setting)
                     
+                    ConfigService.bump_version()
                     db.session.commit()
+                    ConfigService.config_changed()
                     flash('Logo zostało zaktualizowane', 'success')
                     return redirect(url_for('manage_logo'))
                 else:
                     flash('Niedozwolony format pliku', 'danger')
             
-            logo_path = SystemSettings.query.filter_by(key='logo_path').first()
             return render_template('admin/manage_logo.html', 
-                                logo_path=logo_path.value if logo_path else None,
+                                logo_path=ConfigService.get_setting('logo_path'),
                                 form=form)
             
         except Exception as e:
@@ -435,40 +392,25 @@ def init_views(app):
             return redirect(url_for('admin.dashboard'))
         
         try:
-            page = request.args.get('page', 1, type=int)
-            per_page = 20  # Zmniejszamy ilość logów na stronę dla lepszej czytelności
-            
-            # Filtrowanie
-            log_type = request.args.get('type')
-            action = request.args.get('action')
-            user = request.args.get('user')
-            start_date = request.args.get('start_date')
-            end_date = request.args.get('end_date')
-            
-            query = SystemLog.query
-            
-            if log_type:
-                query = query.filter_by(type=log_type)
-            if action:
-                query = query.filter_by(action=action)
-            if user:
-                query = query.filter(SystemLog.user.ilike(f'%{user}%'))
-            if start_date:
-                query = query.filter(SystemLog.timestamp >= datetime.datetime.strptime(start_date, '%Y-%m-%d'))
-            if end_date:
-                # Dodajemy 23:59:59 do daty końcowej, aby uwzględnić cały dzień
-                end_datetime = datetime.datetime.strptime(end_date, '%Y-%m-%d')
-                end_datetime = end_datetime.replace(hour=23, minute=59, second=59)
-                query = query.filter(SystemLog.timestamp <= end_datetime)
-            
-            # Sortowanie od najnowszych
-            query = query.order_by(SystemLog.timestamp.desc())
-            
-            # Paginacja
-            logs = query.paginate(page=page, per_page=per_page)
+            # Stronicowanie kursorem (timestamp, id) - koszt strony nie rośnie z jej numerem
+            filters = LogFilters.from_args(request.args)
+            filter_args = {key: value for key, value in request.args.items()
+                           if key not in ('cursor', 'direction', 'page') and value}
+            try:
+                logs = LogService().get_logs_page(
+                    cursor=request.args.get('cursor'),
+                    direction=request.args.get('direction', 'next'),
+                    per_page=20,  # Zmniejszamy ilość logów na stronę dla lepszej czytelności
+                    filters=filters,
+                    include_archive=bool(request.args.get('archive'))
+                )
+            except ValueError:
+                flash('Nieprawidłowy kursor stronicowania', 'warning')
+                return redirect(url_for('view_logs', **filter_args))
             
             return render_template('admin/logs.html', 
-                                logs=logs)
+                                logs=logs,
+                                filter_args=filter_args)
             
         except Exception as e:
             app.logger.error(f'Błąd podczas ładowania logów: {str(e)}')
@@ -482,12 +424,11 @@ def init_views(app):
             return jsonify({'error': 'Unauthorized'}), 403
         
         try:
-            # Usuń wszystkie logi starsze niż 30 dni
+            # Przenieś do archiwum wszystkie logi starsze niż 30 dni
             thirty_days_ago = datetime.datetime.now() - datetime.timedelta(days=30)
-            SystemLog.query.filter(SystemLog.timestamp < thirty_days_ago).delete()
-            db.session.commit()
+            archived = LogService().archive_logs(thirty_days_ago)
             
-            flash('Stare logi zostały usunięte', 'success')
+            flash(f'Zarchiwizowano {archived} starych logów', 'success')
             return redirect(url_for('view_logs'))
             
         except Exception as e:
@@ -556,6 +497,8 @@ def init_views(app):
                 for tournament in year.tournaments:
                     # Usuń wszystkie mecze w turnieju
                     Match.query.filter_by(tournament_id=tournament.id).delete()
+                    # Usuń tabelę wyników turnieju
+                    TournamentStanding.query.filter_by(tournament_id=tournament.id).delete()
                     # Usuń wszystkie drużyny w turnieju
                     Team.query.filter_by(tournament_id=tournament.id).delete()
                 
@@ -765,6 +708,8 @@ def init_views(app):
                 Match.query.filter(
                     (Match.team1_id == team_id) | (Match.team2_id == team_id)
                 ).delete()
+                # Masowe usunięcie omija zdarzenia sesji, więc przelicz tabelę wyników
+                StandingsService().rebuild(tournament.id, commit=False)
                 
                 # Usuń drużynę
                 db.session.delete(team)
@@ -797,10 +742,10 @@ def init_views(app):
             return redirect(url_for('auth.login'))
         
         try:
-            tournament = Tournament.query.get_or_404(tournament_id)
+            tournament = QueryService.get_tournament_or_404(tournament_id, 'tournament_header')
             # Sortowanie meczów po czasie rozpoczęcia
-            matches = Match.query.filter_by(tournament_id=tournament_id).order_by(Match.start_time.asc()).all()
-            teams = Team.query.filter_by(tournament_id=tournament_id).all()
+            matches = QueryService.tournament_matches(tournament_id)
+            teams = tournament.teams
             form = EmptyForm()
             return render_template('admin/tournament_matches.html', 
                                  tournament=tournament,
@@ -817,58 +762,9 @@ def init_views(app):
     def tournament_results(tournament_id):
         try:
             tournament = Tournament.query.get_or_404(tournament_id)
-            matches = Match.query.filter_by(tournament_id=tournament_id).all()
-            teams = Team.query.filter_by(tournament_id=tournament_id).all()
             
-            # Oblicz statystyki dla każdej drużyny
-            team_stats = []
-            for team in teams:
-                stats = {
-                    'team': team,
-                    'matches_played': 0,
-                    'wins': 0,
-                    'draws': 0,
-                    'losses': 0,
-                    'goals_for': 0,
-                    'goals_against': 0,
-                    'points': 0
-                }
-                
-                # Przeanalizuj wszystkie mecze drużyny
-                for match in Match.query.filter(
-                    (Match.team1_id == team.id) | (Match.team2_id == team.id),
-                    Match.tournament_id == tournament_id,
-                    Match.status == 'finished'
-                ).all():
-                    stats['matches_played'] += 1
-                    
-                    if match.team1_id == team.id:
-                        stats['goals_for'] += match.team1_score or 0
-                        stats['goals_against'] += match.team2_score or 0
-                        if match.team1_score > match.team2_score:
-                            stats['wins'] += 1
-                            stats['points'] += 3
-                        elif match.team1_score == match.team2_score:
-                            stats['draws'] += 1
-                            stats['points'] += 1
-                        else:
-                            stats['losses'] += 1
-                    else:
-                        stats['goals_for'] += match.team2_score or 0
-                        stats['goals_against'] += match.team1_score or 0
-                        if match.team2_score > match.team1_score:
-                            stats['wins'] += 1
-                            stats['points'] += 3
-                        elif match.team1_score == match.team2_score:
-                            stats['draws'] += 1
-                            stats['points'] += 1
-                        else:
-                            stats['losses'] += 1
-                
-                team_stats.append(stats)
-            
-            # Posortuj drużyny według punktów
-            team_stats.sort(key=lambda x: (-x['points'], -(x['goals_for'] - x['goals_against']), -x['goals_for']))
+            # Tabela wyników utrzymywana przyrostowo przez StandingsService
+            team_stats = StandingsService.get_table(tournament_id)
             
             return render_template('admin/tournament_results.html',
                                  tournament=tournament,
@@ -882,8 +778,7 @@ def init_views(app):
     def parent_tournaments():
         try:
             tournaments = Tournament.query.filter_by(status='ongoing').all()
-            logo_setting = SystemSettings.query.filter_by(key='logo_path').first()
-            logo_path = logo_setting.value if logo_setting else None
+            logo_path = ConfigService.get_setting('logo_path')
             
             return render_template('parent/tournaments.html',
                                  tournaments=tournaments,
@@ -948,7 +843,7 @@ def init_views(app):
                     'matches': [],
                     'stats': []
                 }
-                match_updates.put(tournament_update)
+                BrokerService.publish(tournament_topic(tournament.id), 'tournament_updated', tournament_update)
                 
                 flash('Turniej został rozpoczęty', 'success')
                 return redirect(url_for('admin.tournament_matches', tournament_id=tournament_id))
@@ -1001,7 +896,7 @@ def init_views(app):
                     'matches': [],
                     'stats': []
                 }
-                match_updates.put(tournament_update)
+                BrokerService.publish(tournament_topic(tournament.id), 'tournament_updated', tournament_update)
                 app.logger.info('Tournament update broadcasted')
                 
                 flash('Turniej został zakończony', 'success')
@@ -1121,22 +1016,21 @@ def init_views(app):
             # Przygotuj dane do wysłania
             update_data = {
                 'match_id': match_id,
+                'matchId': match_id,
                 'team1_score': match.team1_score or 0,
                 'team2_score': match.team2_score or 0,
                 'status': match.status,
                 'start_time': match.start_time.isoformat() if match.start_time else None,
                 'match_length': match.tournament.match_length,
                 'is_timer_paused': match.is_timer_paused,
-                'elapsed_time': match.elapsed_time
+                'elapsed_time': match.clock_elapsed(),
+                'clock': match.clock_state()
             }
 
-            # Dodaj do kolejki aktualizacji z timeoutem
-            try:
-                match_updates.put(update_data, timeout=1)
-                app.logger.info(f'Match update broadcasted: {match_id}')
-            except queue.Full:
-                app.logger.warning(f'Update queue is full, skipping update for match: {match_id}')
-            
+            # Roześlij do wszystkich subskrybentów meczu i turnieju (SSE, Socket.IO)
+            BrokerService.publish_match(match_id, match.tournament_id, 'score_updated', update_data)
+            app.logger.info(f'Match update broadcasted: {match_id}')
+
         except Exception as e:
             app.logger.error(f'Error in broadcast_match_update: {str(e)}')
 
@@ -1164,8 +1058,7 @@ def init_views(app):
                 # Ustaw status i czas rozpoczęcia
                 match.status = 'ongoing'
                 match.start_time = datetime.datetime.now(datetime.timezone.utc)
-                match.is_timer_paused = False
-                match.elapsed_time = 0
+                match.start_clock()
                 
                 # Dodaj log
                 log = SystemLog(
@@ -1179,6 +1072,7 @@ def init_views(app):
                 
                 # Broadcast update
                 broadcast_match_update(match_id)
+                BrokerService.publish_match_clock(match)
                 
                 flash('Mecz został rozpoczęty', 'success')
                 return redirect(url_for('tournament_matches', tournament_id=tournament.id))
@@ -1268,44 +1162,31 @@ def init_views(app):
             if match.status != 'ongoing':
                 return jsonify({'success': False, 'message': 'Można zatrzymać/wznowić timer tylko dla trwających meczów'}), 400
             
-            # Toggle timer state
-            match.is_timer_paused = not match.is_timer_paused
+            # Zegar zapisuje tylko zmianę stanu - czas gry jest wyliczany
+            if match.clock_running:
+                match.pause_clock()
+            else:
+                match.resume_clock()
             
-            # Calculate elapsed time regardless of pause state to ensure consistency
-            if match.start_time:
-                now_utc = datetime.datetime.now(datetime.timezone.utc)
-                start_time_utc = match.start_time.replace(tzinfo=datetime.timezone.utc)
-                elapsed_seconds = int((now_utc - start_time_utc).total_seconds())
-                
-                # If pausing, store the current elapsed time
-                if match.is_timer_paused:
-                    match.elapsed_time = elapsed_seconds
-                else:
-                    # If resuming, adjust start_time to account for pause duration
-                    if match.elapsed_time is not None:
-                        pause_duration = elapsed_seconds - match.elapsed_time
-                        match.start_time = match.start_time + datetime.timedelta(seconds=pause_duration)
-                        match.elapsed_time = None
-                
-                # Add log
-                log = SystemLog(
-                    type='info',
-                    user=current_user.email,
-                    action='toggle_timer',
-                    details=f'{"Zatrzymano" if match.is_timer_paused else "Wznowiono"} timer meczu: {match.team1.name} vs {match.team2.name}'
-                )
-                db.session.add(log)
-                db.session.commit()
-                
-                # Broadcast update with current elapsed time
-                broadcast_match_update(match_id)
-                
-                # Return new state
-                return jsonify({
-                    'success': True,
-                    'is_paused': match.is_timer_paused,
-                    'elapsed_time': match.elapsed_time if match.elapsed_time is not None else elapsed_seconds
-                })
+            # Add log
+            log = SystemLog(
+                type='info',
+                user=current_user.email,
+                action='toggle_timer',
+                details=f'{"Zatrzymano" if match.is_timer_paused else "Wznowiono"} timer meczu: {match.team1.name} vs {match.team2.name}'
+            )
+            db.session.add(log)
+            db.session.commit()
+            
+            BrokerService.publish_match_clock(match)
+            
+            # Return new state
+            return jsonify({
+                'success': True,
+                'is_paused': match.is_timer_paused,
+                'elapsed_time': match.clock_elapsed(),
+                'clock': match.clock_state()
+            })
             
         except Exception as e:
             db.session.rollback()
@@ -1397,6 +1278,7 @@ def init_views(app):
                 now_utc = datetime.datetime.now(datetime.timezone.utc)
                 
                 match.status = 'finished'
+                match.stop_clock()
                 
                 # Get all subsequent matches on the same field that are planned
                 subsequent_matches = Match.query.filter(
@@ -1423,6 +1305,7 @@ def init_views(app):
                 
                 # Broadcast update to all clients
                 broadcast_match_update(match_id)
+                BrokerService.publish_match_clock(match)
                 
                 flash('Mecz został zakończony', 'success')
                 return redirect(url_for('tournament_matches', tournament_id=match.tournament_id))
@@ -1653,7 +1536,7 @@ def init_views(app):
             try:
                 # Konwertuj czas lokalny na UTC
                 start_time_local = datetime.datetime.strptime(start_time_str, '%Y-%m-%dT%H:%M')
-                start_time = local_to_utc(start_time_local)
+                start_time = start_time_local.astimezone(datetime.timezone.utc)
                 
                 # Sprawdź czy data nie jest w przeszłości
                 if start_time < datetime.datetime.now(datetime.timezone.utc):
@@ -1661,57 +1544,46 @@ def init_views(app):
             except ValueError:
                 return jsonify({'success': False, 'message': 'Nieprawidłowy format daty'}), 400
             
-            # Generuj mecze każdy z każdym
-            matches = []
-            current_time = start_time
-            field_number = 1
+            # Generuj mecze każdy z każdym, rozkładając kolejki na wszystkie boiska
+            schedule = build_schedule(
+                [team.id for team in teams],
+                start_time=start_time.replace(tzinfo=None),
+                fields=tournament.number_of_fields or 1,
+                match_length=tournament.match_length,
+                break_length=tournament.break_length,
+                min_rest=app.config.get('SCHEDULE_MIN_REST_MINUTES')
+            )
+            team_names = {team.id: team.name for team in teams}
             
-            for i in range(len(teams)):
-                for j in range(i + 1, len(teams)):
-                    # Konwertuj czas UTC na lokalny i formatuj
-                    local_time = current_time.replace(tzinfo=datetime.timezone.utc).astimezone()
-                    formatted_time = local_time.strftime('%H:%M')
-                    
-                    match = {
-                        'team1': teams[i].name,
-                        'team2': teams[j].name,
-                        'start_time': formatted_time,
-                        'field': field_number
-                    }
-                    matches.append(match)
-                    
-                    # Przejdź do następnego czasu i boiska
-                    current_time += datetime.timedelta(minutes=tournament.match_length + tournament.break_length)
-                    field_number = (field_number % tournament.number_of_fields) + 1
+            matches = []
+            for planned in schedule['matches']:
+                # Konwertuj czas UTC na lokalny i formatuj
+                local_time = planned['start_time'].replace(tzinfo=datetime.timezone.utc).astimezone()
+                matches.append({
+                    'team1': team_names[planned['team1_id']],
+                    'team2': team_names[planned['team2_id']],
+                    'start_time': local_time.strftime('%H:%M'),
+                    'field': planned['field_number'],
+                    'round': planned['round']
+                })
             
             # Jeśli to tylko podgląd, zwróć listę meczy
             if is_preview:
                 return jsonify({
                     'success': True,
-                    'matches': matches
+                    'matches': matches,
+                    'schedule': {
+                        'slots': schedule['slots'],
+                        'lower_bound': schedule['lower_bound'],
+                        'score': schedule['score'],
+                        'utilization': schedule['utilization'],
+                        'max_wait_slots': schedule['max_wait_slots'],
+                        'end_time': schedule['end_time'].replace(tzinfo=datetime.timezone.utc).astimezone().strftime('%H:%M')
+                    }
                 })
             
-            # W przeciwnym razie zapisz mecze w bazie
-            for match_data in matches:
-                # Utwórz pełną datę z godziną
-                match_time = start_time_local.replace(
-                    hour=int(match_data['start_time'].split(':')[0]),
-                    minute=int(match_data['start_time'].split(':')[1])
-                )
-                match_time_utc = local_to_utc(match_time)
-                
-                team1 = next(t for t in teams if t.name == match_data['team1'])
-                team2 = next(t for t in teams if t.name == match_data['team2'])
-                
-                match = Match(
-                    tournament_id=tournament_id,
-                    team1_id=team1.id,
-                    team2_id=team2.id,
-                    start_time=match_time_utc,
-                    field_number=match_data['field'],
-                    status='planned'
-                )
-                db.session.add(match)
+            # W przeciwnym razie zapisz mecze w bazie jednym wsadem
+            BaseService().bulk_insert(Match, match_rows(tournament_id, schedule))
             
             # Dodaj log
             log = SystemLog(